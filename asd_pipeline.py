@@ -64,7 +64,7 @@ MIN_TRACK_LEN = 10      # Minimum frames for a valid face track
 IOU_TRACK_THRESH = 0.5  # IOU threshold for face tracking
 NUM_FAILED_DET = 10     # Max missed detections before dropping track
 CROP_SCALE = 0.40       # Padding around face crops
-ASD_DURATION_SET = [1, 1, 1, 2, 2, 2, 3, 3, 4, 5, 6]  # Multi-scale scoring
+# Multi-scale ASD durations: DURATIONS in ginny_server/core_api/braid/asd_batch.py
 ASD_SPEAKING_THRESH = 0.0  # Score > 0 means speaking
 
 # ── LASER/LoCoNet weight downloads (Google Drive file IDs) ────────────
@@ -337,24 +337,28 @@ def run_asd_scoring(crop_dir, pretrain_model=None, device="cuda"):
     os.chdir(_cwd)
 
     avi_files = sorted(glob.glob(os.path.join(crop_dir, "*.avi")))
-    all_scores = []
+    all_scores = [None] * len(avi_files)
 
-    for fpath in avi_files:
+    # Load every track first, then score all tracks × durations in batched
+    # forwards (see ginny_server/core_api/braid/asd_batch.py).
+    asd_batch = _load_asd_batch()
+    items, item_idx = [], []
+    for tidx, fpath in enumerate(avi_files):
         basename = os.path.splitext(os.path.basename(fpath))[0]
         wav_path = os.path.join(crop_dir, basename + ".wav")
 
         if not os.path.exists(wav_path):
-            all_scores.append(np.array([0.0]))
+            all_scores[tidx] = np.array([0.0])
             continue
 
         # Load audio features (MFCC)
         try:
             _, audio = scipy_wavfile.read(wav_path)
         except Exception:
-            all_scores.append(np.array([0.0]))
+            all_scores[tidx] = np.array([0.0])
             continue
         if len(audio) == 0:
-            all_scores.append(np.array([0.0]))
+            all_scores[tidx] = np.array([0.0])
             continue
         audio_feat = python_speech_features.mfcc(
             audio, AUDIO_SR, numcep=13, winlen=0.025, winstep=0.010,
@@ -375,7 +379,7 @@ def run_asd_scoring(crop_dir, pretrain_model=None, device="cuda"):
         video_feat = np.array(video_feat)
 
         if video_feat.shape[0] == 0 or audio_feat.shape[0] == 0:
-            all_scores.append(np.array([0.0]))
+            all_scores[tidx] = np.array([0.0])
             continue
 
         # Align audio/video lengths (in seconds)
@@ -384,46 +388,49 @@ def run_asd_scoring(crop_dir, pretrain_model=None, device="cuda"):
             video_feat.shape[0] / VIDEO_FPS,
         )
         if length <= 0:
-            all_scores.append(np.array([0.0]))
+            all_scores[tidx] = np.array([0.0])
             continue
 
         audio_feat = audio_feat[:int(round(length * 100)), :]
         video_feat = video_feat[:int(round(length * VIDEO_FPS)), :, :]
-
-        # Multi-scale scoring for robustness
-        multi_scores = []
-        for dur in ASD_DURATION_SET:
-            n_batches = int(math.ceil(length / dur))
-            scores = []
-            with torch.no_grad():
-                for i in range(n_batches):
-                    a_slice = audio_feat[i * dur * 100:(i + 1) * dur * 100, :]
-                    v_slice = video_feat[i * dur * VIDEO_FPS:(i + 1) * dur * VIDEO_FPS, :, :]
-                    if a_slice.shape[0] == 0 or v_slice.shape[0] == 0:
-                        continue
-                    inputA = torch.FloatTensor(a_slice).unsqueeze(0).cuda()
-                    inputV = torch.FloatTensor(v_slice).unsqueeze(0).cuda()
-                    embedA = model.model.forward_audio_frontend(inputA)
-                    embedV = model.model.forward_visual_frontend(inputV)
-                    out = model.model.forward_audio_visual_backend(embedA, embedV)
-                    score = model.lossAV.forward(out, labels=None)
-                    scores.extend(score)
-            if scores:
-                multi_scores.append(scores)
-
-        if multi_scores:
-            final = np.round(
-                np.mean(np.array(multi_scores), axis=0), 1
-            ).astype(float)
-        else:
-            final = np.array([0.0])
-
-        all_scores.append(final)
+        items.append(asd_batch.ASDTrackInput(
+            audio_feat=audio_feat, video_feat=video_feat,
+            length=length, video_fps=VIDEO_FPS,
+        ))
+        item_idx.append(tidx)
+
+    # Multi-scale scoring for robustness
+    if items:
+        asd_device = next(model.parameters()).device
+        batched = asd_batch.score_tracks(model, items, asd_device)
+        for tidx, multi_scores in zip(item_idx, batched):
+            if multi_scores:
+                final = np.round(
+                    np.mean(np.array(multi_scores), axis=0), 1
+                ).astype(float)
+            else:
+                final = np.array([0.0])
+            all_scores[tidx] = final
 
     print(f"    Scored {len(all_scores)} face tracks")
     return all_scores
 
 
+def _load_asd_batch():
+    """Load the batched Light-ASD scorer by file path (same reason as
+    run_speaker_identification: skip ginny_server/core_api/__init__.py)."""
+    import importlib.util
+    spec = importlib.util.spec_from_file_location(
+        "_asd_batch_mod",
+        os.path.join(SCRIPT_DIR, "ginny_server", "core_api",
+                     "braid", "asd_batch.py"),
+    )
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = mod   # dataclasses resolve annotations via sys.modules
+    spec.loader.exec_module(mod)
+    return mod
+
+
 def run_asd_scoring_visual_only(crop_dir, pretrain_model=None, device="cuda"):
     """Run Light-ASD using only the visual encoder (no audio fusion)."""
     _cwd = os.getcwd()
@@ -834,14 +841,12 @@ def run_speaker_identification(audio_path):
     _diar_spec.loader.exec_module(_diar_mod)
     _Diarization = _diar_mod._Diarization
 
-    _sr_spec = importlib.util.spec_from_file_location(
-        "_sr_mod",
-        os.path.join(SCRIPT_DIR, "ginny_server", "core_api",
-                     "speaker_recognition", "speaker_recognition.py"),
-    )
-    _sr_mod = importlib.util.module_from_spec(_sr_spec)
-    _sr_spec.loader.exec_module(_sr_mod)
-    _SpeakerRecognition = _sr_mod._SpeakerRecognition
+    # speaker_recognition.py imports core_api.vector_index relatively, so it
+    # needs a parent package: tools/_bootstrap.py registers core_api without
+    # running its __init__.
+    sys.path.insert(0, os.path.join(SCRIPT_DIR, "tools"))
+    import _bootstrap  # noqa: F401
+    from core_api.speaker_recognition.speaker_recognition import _SpeakerRecognition
 
     with wave.open(audio_path, "rb") as wf:
         sr = wf.getframerate()
@@ -871,6 +876,16 @@ def run_speaker_identification(audio_path):
         clusters[label]["audio"].extend(seg["audio"])
         clusters[label]["segments"].append((seg["start"], seg["end"]))
 
+    # One batched encoder call for every cluster long enough to identify
+    labels = [label for label, cluster in clusters.items()
+              if (len(cluster["audio"]) // 2) / sr >= 1.0]
+    try:
+        embeddings = dict(zip(labels, speaker_rec.extract_embeddings_batch(
+            [bytes(clusters[label]["audio"]) for label in labels], sr)))
+    except Exception as e:
+        print(f"    Batched voice embedding failed ({e}); embedding per speaker")
+        embeddings = {}
+
     speaker_voices = {}
     for label, cluster in clusters.items():
         cluster_audio = bytes(cluster["audio"])
@@ -879,7 +894,9 @@ def run_speaker_identification(audio_path):
             speaker_voices[label] = f"Speaker_{label}"
             continue
         try:
-            embedding = speaker_rec.extract_embedding(cluster_audio, sr)
+            embedding = embeddings.get(label)
+            if embedding is None:
+                embedding = speaker_rec.extract_embedding(cluster_audio, sr)
             result = speaker_rec.match_or_buffer(
                 embedding, cluster_audio, sr, min_samples=1,
             )
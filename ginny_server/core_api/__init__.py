@@ -26,7 +26,8 @@ RelationshipChecker = _RelationshipChecker()
 AttributeFinder = _AttributeFinder()
 ClipClassification = _ClipClassification()
 SpeakerRecognition = _SpeakerRecognition(
-    model_name=_os.environ.get("SPEAKER_MODEL", "eres2netv2")
+    model_name=_os.environ.get("SPEAKER_MODEL", "eres2netv2"),
+    index_kind=_os.environ.get("SPEAKER_INDEX", "exact"),
 )
 Diarization = _Diarization()
 
@@ -0,0 +1,225 @@
+"""Batched multi-scale Light-ASD scoring.
+
+Light-ASD is scored at every duration in ``DURATIONS`` and the per-frame
+scores are averaged. Run naively that is one frontend + backend call per
+(track, duration, slice) at batch size 1. This module plans every slice up
+front and then:
+
+  * de-duplicates identical slices — the repeated durations (1, 1, 1, ...)
+    produce the same slices, and tracks that share the window audio share
+    their audio-frontend embeddings;
+  * buckets equal-length slices from all tracks and all durations and runs
+    each bucket as one batched forward;
+  * copies backend scores to the CPU once per bucket.
+
+Buckets are keyed on exact slice length rather than padded: the Light-ASD
+temporal convolutions and GRU are not mask-aware, so padding would change
+the scores. Equal-length batching keeps the output identical to the
+per-slice loop (``reference_scores``) up to float32 kernel noise;
+test/braid/asd_batch_parity.py checks that with ``max_parity_error``.
+
+The module only depends on numpy/torch so ``asd_pipeline.py`` can load it by
+file path alongside the diarization/speaker modules.
+"""
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+DURATIONS = (1, 1, 1, 2, 2, 2, 3, 3, 4, 5, 6)   # seconds; the only copy, asd_pipeline.py uses it too
+AUDIO_FPS = 100                                 # MFCC frames per second
+
+
+@dataclass
+class ASDTrackInput:
+    """One face track, already trimmed to the aligned audio/video length."""
+    audio_feat: np.ndarray          # (N, 13) MFCC at 100 Hz
+    video_feat: np.ndarray          # (T, 112, 112) grayscale crops
+    length: float                   # aligned seconds
+    video_fps: int                  # video frames per second used for slicing
+    audio_key: Optional[Hashable] = None  # equal keys ⇒ audio_feat are prefixes of one stream
+
+
+def _slice_plan(item: ASDTrackInput, audio_key: Hashable, track_key: int):
+    """Yield ``(dur_idx, akey, vkey)`` for every non-empty slice of ``item``
+    in the same order the reference loop visits them."""
+    n_a = item.audio_feat.shape[0]
+    n_v = item.video_feat.shape[0]
+    for dur_idx, dur in enumerate(DURATIONS):
+        n_batches = int(math.ceil(item.length / dur))
+        for i in range(n_batches):
+            a0 = min(i * dur * AUDIO_FPS, n_a)
+            a1 = min((i + 1) * dur * AUDIO_FPS, n_a)
+            v0 = min(i * dur * item.video_fps, n_v)
+            v1 = min((i + 1) * dur * item.video_fps, n_v)
+            if a1 <= a0 or v1 <= v0:
+                continue
+            yield dur_idx, (audio_key, a0, a1), (track_key, v0, v1)
+
+
+def _buckets(keys, length_of, max_frames: int):
+    """Group ``keys`` by slice length, splitting each group so a batch holds at
+    most ``max_frames`` frames (always at least one slice)."""
+    by_len: Dict[int, List[Any]] = {}
+    for k in keys:
+        by_len.setdefault(length_of(k), []).append(k)
+    for n, group in by_len.items():
+        per_batch = max(1, max_frames // max(1, n))
+        for s in range(0, len(group), per_batch):
+            yield group[s:s + per_batch]
+
+
+def _to_numpy_scores(raw, batch: int) -> np.ndarray:
+    if hasattr(raw, "detach"):
+        raw = raw.detach().float().cpu().numpy()
+    return np.asarray(raw, dtype=np.float32).reshape(batch, -1)
+
+
+def score_tracks(model, items: List[ASDTrackInput], device,
+                 max_batch_frames: int = 1500) -> List[Optional[List[np.ndarray]]]:
+    """Score every track at every duration with as few forwards as possible.
+
+    Returns, per input track, the list of raw per-frame score arrays for each
+    duration that produced scores (in ``DURATIONS`` order), or ``None`` if any
+    forward touching that track failed — the same all-or-nothing behaviour as
+    the per-track try/except in the reference loop.
+    """
+    import torch
+
+    audio_src: Dict[Hashable, np.ndarray] = {}
+    video_src: Dict[int, np.ndarray] = {}
+    plans: List[List[Tuple[int, Tuple, Tuple]]] = []
+    for t, item in enumerate(items):
+        akey = item.audio_key if item.audio_key is not None else ("track", t)
+        prev = audio_src.get(akey)
+        if prev is None or prev.shape[0] < item.audio_feat.shape[0]:
+            audio_src[akey] = item.audio_feat
+        video_src[t] = item.video_feat
+        plans.append(list(_slice_plan(item, akey, t)))
+
+    a_keys = list(dict.fromkeys(a for plan in plans for _, a, _ in plan))
+    v_keys = list(dict.fromkeys(v for plan in plans for _, _, v in plan))
+    pair_keys = list(dict.fromkeys((a, v) for plan in plans for _, a, v in plan))
+
+    failed_a: set = set()
+    failed_v: set = set()
+    failed_pairs: set = set()
+    embed_a: Dict[Tuple, Any] = {}
+    embed_v: Dict[Tuple, Any] = {}
+    scores: Dict[Tuple, np.ndarray] = {}
+
+    with torch.no_grad():
+        # Audio frontend: every window slice computed once, shared by tracks.
+        # MFCC frames are 4× the video rate, so scale the frame budget.
+        for batch in _buckets(a_keys, lambda k: k[2] - k[1], 4 * max_batch_frames):
+            try:
+                x = np.stack([audio_src[k[0]][k[1]:k[2]] for k in batch], axis=0)
+                inp = torch.as_tensor(x, dtype=torch.float32, device=device)
+                out = model.model.forward_audio_frontend(inp)
+                for j, k in enumerate(batch):
+                    embed_a[k] = out[j]
+            except Exception:
+                failed_a.update(batch)
+
+        for batch in _buckets(v_keys, lambda k: k[2] - k[1], max_batch_frames):
+            try:
+                x = np.stack([video_src[k[0]][k[1]:k[2]] for k in batch], axis=0)
+                inp = torch.as_tensor(x, dtype=torch.float32, device=device)
+                out = model.model.forward_visual_frontend(inp)
+                for j, k in enumerate(batch):
+                    embed_v[k] = out[j]
+            except Exception:
+                failed_v.update(batch)
+
+        ready = [p for p in pair_keys if p[0] in embed_a and p[1] in embed_v]
+        failed_pairs.update(p for p in pair_keys if p[0] in failed_a or p[1] in failed_v)
+
+        def _pair_len(p):
+            return (int(embed_a[p[0]].shape[0]), int(embed_v[p[1]].shape[0]))
+
+        by_shape: Dict[Tuple[int, int], List[Tuple]] = {}
+        for p in ready:
+            by_shape.setdefault(_pair_len(p), []).append(p)
+        for (_, n_v), group in by_shape.items():
+            per_batch = max(1, max_batch_frames // max(1, n_v))
+            for s in range(0, len(group), per_batch):
+                batch = group[s:s + per_batch]
+                try:
+                    ea = torch.stack([embed_a[p[0]] for p in batch], dim=0)
+                    ev = torch.stack([embed_v[p[1]] for p in batch], dim=0)
+                    out = model.model.forward_audio_visual_backend(ea, ev)
+                    raw = model.lossAV.forward(out, labels=None)
+                    arr = _to_numpy_scores(raw, len(batch))
+                    for j, p in enumerate(batch):
+                        scores[p] = arr[j]
+                except Exception:
+                    failed_pairs.update(batch)
+
+    results: List[Optional[List[np.ndarray]]] = []
+    for plan in plans:
+        if any((a, v) in failed_pairs for _, a, v in plan):
+            results.append(None)
+            continue
+        parts: Dict[int, List[np.ndarray]] = {}
+        for dur_idx, a, v in plan:
+            parts.setdefault(dur_idx, []).append(scores[(a, v)])
+        results.append([np.concatenate(parts[d]) for d in sorted(parts)])
+    return results
+
+
+def reference_scores(model, items: List[ASDTrackInput], device) -> List[Optional[List[np.ndarray]]]:
+    """The original one-slice-at-a-time loop, kept for parity checks against
+    ``score_tracks`` (see ``max_parity_error``)."""
+    import torch
+
+    results: List[Optional[List[np.ndarray]]] = []
+    for item in items:
+        try:
+            per_dur: List[np.ndarray] = []
+            with torch.no_grad():
+                for dur in DURATIONS:
+                    n_batches = int(math.ceil(item.length / dur))
+                    out_scores: List[float] = []
+                    for i in range(n_batches):
+                        a_slice = item.audio_feat[i * dur * AUDIO_FPS:(i + 1) * dur * AUDIO_FPS, :]
+                        v_slice = item.video_feat[i * dur * item.video_fps:(i + 1) * dur * item.video_fps, :, :]
+                        if a_slice.shape[0] == 0 or v_slice.shape[0] == 0:
+                            continue
+                        inputA = torch.as_tensor(a_slice, dtype=torch.float32, device=device).unsqueeze(0)
+                        inputV = torch.as_tensor(v_slice, dtype=torch.float32, device=device).unsqueeze(0)
+                        embedA = model.model.forward_audio_frontend(inputA)
+                        embedV = model.model.forward_visual_frontend(inputV)
+                        out = model.model.forward_audio_visual_backend(embedA, embedV)
+                        raw = model.lossAV.forward(out, labels=None)
+                        out_scores.extend(_to_numpy_scores(raw, 1).reshape(-1).tolist())
+                    if out_scores:
+                        per_dur.append(np.asarray(out_scores, dtype=np.float32))
+            results.append(per_dur)
+        except Exception:
+            results.append(None)
+    return results
+
+
+def max_parity_error(model, items: List[ASDTrackInput], device) -> float:
+    """Largest absolute per-frame difference between ``score_tracks`` and
+    ``reference_scores``. Returns ``inf`` if they disagree on which tracks
+    failed or on score lengths."""
+    got = score_tracks(model, items, device)
+    want = reference_scores(model, items, device)
+    worst = 0.0
+    for g, w in zip(got, want):
+        if (g is None) != (w is None):
+            return float("inf")
+        if g is None:
+            continue
+        if len(g) != len(w):
+            return float("inf")
+        for gs, ws in zip(g, w):
+            if gs.shape != ws.shape:
+                return float("inf")
+            if gs.size:
+                worst = max(worst, float(np.max(np.abs(gs - ws))))
+    return worst
@@ -20,7 +20,7 @@ from .perception import DiarizationCluster, FaceTrack, RawObservations
 logger = logging.getLogger("braid")
 
 
-@dataclass
+@dataclass(slots=True)
 class PersonObservation:
     """§2.3 observation bundle O_i — joined into a single struct per candidate.
 
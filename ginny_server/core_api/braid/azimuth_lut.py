@@ -0,0 +1,157 @@
+"""Lookup tables for the azimuth likelihoods in posterior.py.
+
+``PosteriorComputer`` needs normalised wrapped-Gaussian vectors over the
+``num_azimuth_bins`` bin centres for the face location (σ_det), the carried
+location prior (σ_drift) and SSL (σ_0/√(conf+0.01), so σ varies per person).
+Evaluating them means a wrap + exp per bin, per person, per tick.
+
+``AzimuthLUT`` tabulates those vectors once for a grid of means (and, for
+SSL, a geometric ladder of sigmas) and answers a query by linearly
+interpolating the two nearest means (×2 sigma levels). The rows are already
+normalised and interpolation is a convex blend, so results sum to 1 without
+renormalising.
+
+Accuracy: linear interpolation of f costs at most h²/8·max|f''|. With
+``steps_per_sigma`` s the mean step is h = σ/s, and |f''| ≤ peak/σ² for a
+Gaussian, so the error is ≤ peak/(8s²) (≈5e-4·peak at s=16). Blending
+sigma levels with ratio r adds ≤ (ln r)²/4·peak (≈6e-4·peak at r=1.05).
+That bound assumes a smooth f, but wrapping the difference into [-π, π)
+leaves a kink at ±π whose height grows with σ. Only σ ≤ MAX_SIGMA (π/3,
+kink < 1.2% of the peak) is tabulated; wider Gaussians, i.e. very low SSL
+confidence, take the exact path. tools/azimuth_lut_bench.py measures the
+realised error against the exact path.
+
+Tables are memoised on (bins, sigmas, resolution), i.e. once per config
+snapshot; a hot reload that touches none of those reuses them.
+"""
+from __future__ import annotations
+
+import math
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from .config import BraidConfig
+
+_EPS = 1e-9
+_TWO_PI = 2.0 * math.pi
+SIGMA_RATIO = 1.05          # geometric spacing of the SSL sigma ladder
+MAX_SIGMA = math.pi / 3     # widest tabulated Gaussian (see module doc)
+
+
+def gaussian_bins(bin_centers: np.ndarray, mu: float, sigma: float) -> np.ndarray:
+    """Exact normalised wrapped Gaussian over ``bin_centers`` (the reference
+    the tables are built from and checked against)."""
+    diff = bin_centers - mu
+    diff = ((diff + math.pi) % _TWO_PI) - math.pi
+    p = np.exp(-0.5 * (diff / max(_EPS, sigma)) ** 2)
+    s = p.sum()
+    return p / s if s > 0 else np.full(len(bin_centers), 1.0 / len(bin_centers))
+
+
+class AzimuthLUT:
+    """Normalised bin-likelihood vectors for means on a uniform grid over
+    [-π, π) and sigmas on a geometric ladder from ``sigma_min`` to
+    ``sigma_max`` (a single level when they are equal)."""
+
+    def __init__(self, bin_centers: np.ndarray, sigma_min: float,
+                 sigma_max: Optional[float] = None, steps_per_sigma: int = 16,
+                 ratio: float = SIGMA_RATIO):
+        sigma_min = max(_EPS, float(sigma_min))
+        sigma_max = sigma_min if sigma_max is None else max(sigma_min, float(sigma_max))
+        self.n_bins = len(bin_centers)
+        self.sigma_min = sigma_min
+        self.sigma_max = sigma_max
+        self._log_ratio = math.log(ratio)
+        n_levels = 1 + int(math.ceil(math.log(sigma_max / sigma_min) / self._log_ratio - 1e-9))
+        self.sigmas = sigma_min * ratio ** np.arange(n_levels)
+        # Each level gets its own mean grid (wider σ → coarser grid). Row
+        # `steps` duplicates row 0 so interpolation never wraps an index.
+        self._tables = []
+        self._steps = []
+        for sigma in self.sigmas:
+            steps = max(self.n_bins, int(math.ceil(_TWO_PI * steps_per_sigma / sigma)))
+            mus = -math.pi + _TWO_PI * np.arange(steps + 1) / steps
+            diff = bin_centers[None, :] - mus[:, None]
+            diff = ((diff + math.pi) % _TWO_PI) - math.pi
+            tbl = np.exp(-0.5 * (diff / sigma) ** 2)
+            sums = tbl.sum(axis=1, keepdims=True)
+            tbl = np.where(sums > 0, tbl / np.where(sums > 0, sums, 1.0), 1.0 / self.n_bins)
+            tbl.setflags(write=False)
+            self._tables.append(tbl)
+            self._steps.append(steps)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(t.nbytes for t in self._tables)
+
+    def _row(self, level: int, mu: float) -> np.ndarray:
+        steps = self._steps[level]
+        u = ((mu + math.pi) % _TWO_PI) * (steps / _TWO_PI)
+        i = int(u)
+        if i >= steps:                 # mu rounding onto +π
+            i, u = 0, 0.0
+        t = u - i
+        tbl = self._tables[level]
+        if t == 0.0:
+            return tbl[i]
+        return tbl[i] + t * (tbl[i + 1] - tbl[i])
+
+    def lookup(self, mu: float, sigma: Optional[float] = None) -> Optional[np.ndarray]:
+        """Bin likelihoods for mean ``mu``; ``sigma`` defaults to the single
+        level. Returns None for a sigma outside the ladder (use the exact path).
+        The result may be a read-only table row — don't modify it in place."""
+        if sigma is None or len(self.sigmas) == 1:
+            return self._row(0, mu)
+        if not (self.sigma_min <= sigma <= self.sigma_max):
+            return None
+        x = math.log(sigma / self.sigma_min) / self._log_ratio
+        k = min(int(x), len(self.sigmas) - 2)
+        t = x - k
+        lo = self._row(k, mu)
+        if t <= 0.0:
+            return lo
+        return lo + t * (self._row(k + 1, mu) - lo)
+
+
+class AzimuthLUTs(NamedTuple):
+    """Tables for one config snapshot; a None field means "compute exactly"."""
+    loc: Optional[AzimuthLUT]       # face bbox azimuth, σ_det
+    drift: Optional[AzimuthLUT]     # carried location prior, σ_drift
+    ssl: Optional[AzimuthLUT]       # SSL, σ_0/√(conf+0.01) ladder
+
+
+_EXACT = AzimuthLUTs(None, None, None)
+
+# SSL sigma = σ_0 / sqrt(max(0.01, conf) + 0.01); confidences are in [0, 1].
+_SSL_SQRT_MIN = math.sqrt(0.02)
+_SSL_SQRT_MAX = math.sqrt(1.01)
+
+
+def _table(bins: np.ndarray, sigma_min: float, sigma_max: Optional[float],
+           steps_per_sigma: int) -> Optional[AzimuthLUT]:
+    if sigma_min > MAX_SIGMA:
+        return None
+    if sigma_max is not None:
+        sigma_max = min(sigma_max, MAX_SIGMA)
+    return AzimuthLUT(bins, sigma_min, sigma_max, steps_per_sigma=steps_per_sigma)
+
+
+@lru_cache(maxsize=8)
+def _build(n: int, sigma_det: float, sigma_drift: float,
+           sigma_0: float, steps_per_sigma: int) -> AzimuthLUTs:
+    bins = np.linspace(-math.pi, math.pi, n, endpoint=False) + (math.pi / n)
+    return AzimuthLUTs(
+        loc=_table(bins, sigma_det, None, steps_per_sigma),
+        drift=_table(bins, sigma_drift, None, steps_per_sigma),
+        ssl=_table(bins, sigma_0 / _SSL_SQRT_MAX, sigma_0 / _SSL_SQRT_MIN, steps_per_sigma),
+    )
+
+
+def luts_for(cfg: BraidConfig) -> AzimuthLUTs:
+    """Tables for ``cfg``; all None when ``azimuth_lut_steps_per_sigma`` is 0."""
+    if cfg.azimuth_lut_steps_per_sigma <= 0:
+        return _EXACT
+    return _build(cfg.num_azimuth_bins, cfg.sigma_det, cfg.sigma_drift,
+                  cfg.sigma_0, cfg.azimuth_lut_steps_per_sigma)
@@ -2,15 +2,22 @@
 
 Reads braid_config.yaml next to this module. All thresholds in Blueprint §3.6
 live there; this module only provides typed access + sensible fallbacks.
+``BraidConfig`` is an immutable snapshot; ``ConfigWatcher`` swaps in a new
+one when the YAML changes on disk.
 """
 from __future__ import annotations
 
 import logging
 import math
 import os
-from dataclasses import dataclass, field
+import threading
 from pathlib import Path
-from typing import Any, Dict
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+
+import numpy as np
+
+from .log_style import C
 
 try:
     import yaml  # type: ignore
@@ -29,134 +36,325 @@ _DEFAULTS: Dict[str, Any] = {
     # priors / noise
     "p_new": 0.3,
     "sigma_0_deg": 15.0, "sigma_det_deg": 5.0, "sigma_drift_deg": 10.0,
+    "azimuth_lut_steps_per_sigma": 16,
     # embeddings
     "theta_face": 0.30, "beta_face": 0.05, "lambda_face": 0.20,
     "theta_voice": 0.25, "beta_voice": 0.06, "lambda_voice": 0.15,
     # re-assoc
     "reassoc_face_cos": 0.5, "reassoc_voice_cos": 0.5,
     "gallery_ema_alpha": 0.1,
+    "gallery_index": "exact", "gallery_ann_nprobe": 16, "gallery_candidates_k": 32,
     # quality
     "face_area_min_px": 6400, "lap_min": 40.0, "yaw_sigma_deg": 30.0,
     # infra
     "num_azimuth_bins": 36, "camera_hfov_deg": 57.0, "max_persons": 4,
+    "parallel_perception": True,
+    "frame_decode_workers": 4,
+    "max_concurrent_ticks": 1, "max_queued_ticks": 16,
+    "coalesce_stale_ticks": True, "tick_queue_timeout_s": 300.0,
+    "session_idle_ttl_s": 1800.0, "max_sessions": 64, "max_memories_per_session": 32,
+    "video_keyframe_stride": 1, "video_reembed_iou": 1.0,
+    "video_reembed_quality_margin": 0.1,
+    "config_reload_s": 2.0,
     # action
     "rotate_min_deg": 10.0, "rotate_nudge_deg": 15.0, "move_forward_m": 0.3,
     # tick
     "tick_window_seconds": 30.0,
     # paths
     "gallery_dir": "/workspace/database/braid_sys_db",
+    "record_dir": "",
+    "session_snapshot_dir": "",
+    # metrics
+    "metrics_port": 0, "metrics_jsonl_path": "",
+    "metrics_jsonl_max_mb": 50.0, "metrics_jsonl_backups": 5,
     # asd fallback
     "asd_stub_default_alpha": 0.5,
 }
 
 
-@dataclass
+def _rad(v: Any) -> float:
+    return math.radians(float(v))
+
+
+def _pos_int(v: Any) -> int:
+    return max(1, int(v))
+
+
+def _nonneg_int(v: Any) -> int:
+    return max(0, int(v))
+
+
+def _opt_str(v: Any) -> str:
+    return str(v or "")
+
+
+def _opt_int(v: Any) -> int:
+    return int(v or 0)
+
+
+def _sigmoid(x: float) -> float:
+    if x >= 0:
+        return 1.0 / (1.0 + math.exp(-x))
+    z = math.exp(x)
+    return z / (1.0 + z)
+
+
+# attribute → (yaml key, converter). Converted once per snapshot, so hot
+# paths read a plain slot instead of a dict lookup + cast.
+_FIELDS: Dict[str, Tuple[str, Callable[[Any], Any]]] = {
+    # decision rules
+    "tau_recog": ("tau_recog", float),
+    "Q_recog": ("Q_recog", float),
+    "tau_confirm": ("tau_confirm", float),
+    "Q_confirm": ("Q_confirm", float),
+    "tau_enrol_unk": ("tau_enrol_unk", float),
+    "Q_enrol": ("Q_enrol", float),
+    "Q_min": ("Q_min", float),
+    "Q_min_enrol": ("Q_min_enrol", float),
+    "H_explore": ("H_explore", float),
+    "tau_bridge": ("tau_bridge", float),
+    # priors
+    "p_new": ("p_new", float),
+    # radians conversions
+    "sigma_0": ("sigma_0_deg", _rad),
+    "sigma_det": ("sigma_det_deg", _rad),
+    "sigma_drift": ("sigma_drift_deg", _rad),
+    "camera_hfov": ("camera_hfov_deg", _rad),
+    "rotate_min_rad": ("rotate_min_deg", _rad),
+    "rotate_nudge_rad": ("rotate_nudge_deg", _rad),
+    "yaw_sigma_deg": ("yaw_sigma_deg", float),
+    "azimuth_lut_steps_per_sigma": ("azimuth_lut_steps_per_sigma", _nonneg_int),
+    # embedding operating points
+    "theta_face": ("theta_face", float),
+    "beta_face": ("beta_face", float),
+    "lambda_face": ("lambda_face", float),
+    "theta_voice": ("theta_voice", float),
+    "beta_voice": ("beta_voice", float),
+    "lambda_voice": ("lambda_voice", float),
+    # re-assoc / gallery
+    "reassoc_face_cos": ("reassoc_face_cos", float),
+    "reassoc_voice_cos": ("reassoc_voice_cos", float),
+    "gallery_ema_alpha": ("gallery_ema_alpha", float),
+    "gallery_index": ("gallery_index", str),
+    "gallery_ann_nprobe": ("gallery_ann_nprobe", _pos_int),
+    "gallery_candidates_k": ("gallery_candidates_k", _pos_int),
+    # quality
+    "face_area_min_px": ("face_area_min_px", float),
+    "lap_min": ("lap_min", float),
+    # infra
+    "num_azimuth_bins": ("num_azimuth_bins", int),
+    "max_persons": ("max_persons", int),
+    "parallel_perception": ("parallel_perception", bool),
+    "frame_decode_workers": ("frame_decode_workers", _pos_int),
+    "max_concurrent_ticks": ("max_concurrent_ticks", _pos_int),
+    "max_queued_ticks": ("max_queued_ticks", _pos_int),
+    "coalesce_stale_ticks": ("coalesce_stale_ticks", bool),
+    "tick_queue_timeout_s": ("tick_queue_timeout_s", float),
+    "session_idle_ttl_s": ("session_idle_ttl_s", float),
+    "max_sessions": ("max_sessions", _pos_int),
+    "max_memories_per_session": ("max_memories_per_session", _pos_int),
+    "video_keyframe_stride": ("video_keyframe_stride", _pos_int),
+    "video_reembed_iou": ("video_reembed_iou", float),
+    "video_reembed_quality_margin": ("video_reembed_quality_margin", float),
+    "config_reload_s": ("config_reload_s", float),
+    # action / tick
+    "move_forward_m": ("move_forward_m", float),
+    "tick_window_seconds": ("tick_window_seconds", float),
+    # paths
+    "gallery_dir": ("gallery_dir", str),
+    "record_dir": ("record_dir", _opt_str),
+    "session_snapshot_dir": ("session_snapshot_dir", _opt_str),
+    # metrics
+    "metrics_port": ("metrics_port", _opt_int),
+    "metrics_jsonl_path": ("metrics_jsonl_path", _opt_str),
+    "metrics_jsonl_max_mb": ("metrics_jsonl_max_mb", float),
+    "metrics_jsonl_backups": ("metrics_jsonl_backups", _nonneg_int),
+    # asd fallback
+    "asd_stub_default_alpha": ("asd_stub_default_alpha", float),
+}
+
+# Values derived from the fields above (see BraidConfig._derive).
+_DERIVED = (
+    "bin_centers",                          # azimuth bin centres, read-only array
+    "inv_beta_face", "inv_beta_voice",      # 1 / sigmoid temperature
+    "face_unk_lik", "voice_unk_lik",        # ∅-slot likelihoods
+)
+
+# Keys baked into long-lived objects at server start (pools, scheduler,
+# session manager, gallery index, metrics endpoint). A reload still swaps
+# the snapshot, but these only take effect after a restart.
+_RESTART_KEYS = (
+    "frame_decode_workers", "max_concurrent_ticks", "max_queued_ticks",
+    "coalesce_stale_ticks", "tick_queue_timeout_s", "session_idle_ttl_s",
+    "max_sessions", "max_memories_per_session", "session_snapshot_dir",
+    "gallery_dir", "gallery_index", "gallery_ann_nprobe", "record_dir",
+    "metrics_port", "metrics_jsonl_path", "metrics_jsonl_max_mb",
+    "metrics_jsonl_backups", "config_reload_s",
+)
+
+_EPS = 1e-9
+
+
 class BraidConfig:
-    data: Dict[str, Any] = field(default_factory=lambda: dict(_DEFAULTS))
-
-    # ---- decision rules ----
-    @property
-    def tau_recog(self) -> float:     return float(self.data["tau_recog"])
-    @property
-    def Q_recog(self) -> float:       return float(self.data["Q_recog"])
-    @property
-    def tau_confirm(self) -> float:   return float(self.data["tau_confirm"])
-    @property
-    def Q_confirm(self) -> float:     return float(self.data["Q_confirm"])
-    @property
-    def tau_enrol_unk(self) -> float: return float(self.data["tau_enrol_unk"])
-    @property
-    def Q_enrol(self) -> float:       return float(self.data["Q_enrol"])
-    @property
-    def Q_min(self) -> float:         return float(self.data["Q_min"])
-    @property
-    def Q_min_enrol(self) -> float:   return float(self.data["Q_min_enrol"])
-    @property
-    def H_explore(self) -> float:     return float(self.data["H_explore"])
-    @property
-    def tau_bridge(self) -> float:    return float(self.data["tau_bridge"])
-
-    # ---- priors ----
-    @property
-    def p_new(self) -> float:         return float(self.data["p_new"])
-
-    # ---- radians conversions ----
-    @property
-    def sigma_0(self) -> float:       return math.radians(float(self.data["sigma_0_deg"]))
-    @property
-    def sigma_det(self) -> float:     return math.radians(float(self.data["sigma_det_deg"]))
-    @property
-    def sigma_drift(self) -> float:   return math.radians(float(self.data["sigma_drift_deg"]))
-    @property
-    def camera_hfov(self) -> float:   return math.radians(float(self.data["camera_hfov_deg"]))
-    @property
-    def rotate_min_rad(self) -> float:   return math.radians(float(self.data["rotate_min_deg"]))
-    @property
-    def rotate_nudge_rad(self) -> float: return math.radians(float(self.data["rotate_nudge_deg"]))
-    @property
-    def yaw_sigma_deg(self) -> float: return float(self.data["yaw_sigma_deg"])
-
-    # ---- embedding operating points ----
-    @property
-    def theta_face(self) -> float:    return float(self.data["theta_face"])
-    @property
-    def beta_face(self) -> float:     return float(self.data["beta_face"])
-    @property
-    def lambda_face(self) -> float:   return float(self.data["lambda_face"])
-    @property
-    def theta_voice(self) -> float:   return float(self.data["theta_voice"])
-    @property
-    def beta_voice(self) -> float:    return float(self.data["beta_voice"])
-    @property
-    def lambda_voice(self) -> float:  return float(self.data["lambda_voice"])
-
-    # ---- re-assoc ----
-    @property
-    def reassoc_face_cos(self) -> float: return float(self.data["reassoc_face_cos"])
-    @property
-    def reassoc_voice_cos(self) -> float: return float(self.data["reassoc_voice_cos"])
-    @property
-    def gallery_ema_alpha(self) -> float: return float(self.data["gallery_ema_alpha"])
-
-    # ---- quality ----
-    @property
-    def face_area_min_px(self) -> float: return float(self.data["face_area_min_px"])
-    @property
-    def lap_min(self) -> float:          return float(self.data["lap_min"])
-
-    # ---- infra ----
-    @property
-    def num_azimuth_bins(self) -> int:  return int(self.data["num_azimuth_bins"])
-    @property
-    def max_persons(self) -> int:       return int(self.data["max_persons"])
-    @property
-    def move_forward_m(self) -> float:  return float(self.data["move_forward_m"])
-    @property
-    def tick_window_seconds(self) -> float: return float(self.data["tick_window_seconds"])
-    @property
-    def gallery_dir(self) -> str:       return str(self.data["gallery_dir"])
-    @property
-    def asd_stub_default_alpha(self) -> float: return float(self.data["asd_stub_default_alpha"])
+    """Immutable snapshot of braid_config.yaml.
 
+    Every typed value (and everything derived from them) is computed once in
+    ``__init__`` and stored in a slot. Snapshots are never mutated: build a
+    new one with ``with_overrides`` or let ``ConfigWatcher`` swap one in.
+    ``data`` is a read-only view of the merged YAML, unknown keys included.
+    """
 
-def load_config(path: str | None = None) -> BraidConfig:
-    """Load BRAID config from YAML. Falls back to hardcoded defaults if
-    pyyaml is unavailable or the file is missing. Unknown keys are kept so
-    callers can introduce new thresholds without touching this module."""
-    if path is None:
-        path = str(Path(__file__).with_name("braid_config.yaml"))
+    __slots__ = ("data",) + tuple(_FIELDS) + _DERIVED
+
+    def __init__(self, data: Optional[Mapping[str, Any]] = None):
+        merged = dict(_DEFAULTS)
+        if data:
+            merged.update(data)
+        _set = object.__setattr__
+        _set(self, "data", MappingProxyType(merged))
+        for attr, (key, conv) in _FIELDS.items():
+            _set(self, attr, conv(merged[key]))
+        for attr, value in self._derive().items():
+            _set(self, attr, value)
+
+    def _derive(self) -> Dict[str, Any]:
+        n = self.num_azimuth_bins
+        bins = np.linspace(-math.pi, math.pi, n, endpoint=False) + (math.pi / n)
+        bins.setflags(write=False)
+        inv_bf = 1.0 / max(_EPS, self.beta_face)
+        inv_bv = 1.0 / max(_EPS, self.beta_voice)
+        return {
+            "bin_centers": bins,
+            "inv_beta_face": inv_bf,
+            "inv_beta_voice": inv_bv,
+            "face_unk_lik": _sigmoid((self.lambda_face - self.theta_face) * inv_bf),
+            "voice_unk_lik": _sigmoid((self.lambda_voice - self.theta_voice) * inv_bv),
+        }
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"BraidConfig is frozen; use with_overrides({name}=...)")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError("BraidConfig is frozen")
+
+    def __reduce__(self):
+        return (BraidConfig, (dict(self.data),))
+
+    def __repr__(self) -> str:
+        return f"BraidConfig({len(self.data)} keys)"
 
-    merged: Dict[str, Any] = dict(_DEFAULTS)
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.data.get(key, default)
+
+    def with_overrides(self, **overrides: Any) -> "BraidConfig":
+        """New snapshot with YAML keys replaced (e.g. ``sigma_0_deg=20``)."""
+        merged = dict(self.data)
+        merged.update(overrides)
+        return BraidConfig(merged)
+
+
+def _default_path() -> str:
+    return str(Path(__file__).with_name("braid_config.yaml"))
+
+
+def _read_yaml(path: str) -> Optional[Dict[str, Any]]:
+    """Parsed YAML mapping, or None (with a warning) if it can't be used."""
     if yaml is None:
         logger.warning("PyYAML not installed; using built-in BRAID defaults.")
-        return BraidConfig(data=merged)
+        return None
     if not os.path.exists(path):
         logger.warning("braid_config.yaml not found at %s; using defaults.", path)
-        return BraidConfig(data=merged)
-    with open(path, "r") as fh:
-        loaded = yaml.safe_load(fh) or {}
+        return None
+    try:
+        with open(path, "r") as fh:
+            loaded = yaml.safe_load(fh) or {}
+    except Exception as e:
+        logger.warning("braid_config.yaml unreadable (%s); using defaults.", e)
+        return None
     if not isinstance(loaded, dict):
         logger.warning("braid_config.yaml malformed; using defaults.")
-        return BraidConfig(data=merged)
-    merged.update(loaded)
-    return BraidConfig(data=merged)
+        return None
+    return loaded
+
+
+def load_config(path: str | None = None) -> BraidConfig:
+    """Load BRAID config from YAML. Falls back to hardcoded defaults if
+    pyyaml is unavailable or the file is missing. Unknown keys are kept so
+    callers can introduce new thresholds without touching this module."""
+    return BraidConfig(_read_yaml(path or _default_path()))
+
+
+class ConfigWatcher:
+    """Hot-reloads braid_config.yaml.
+
+    A daemon thread polls the file's mtime/size every ``poll_s`` seconds and,
+    on change, builds a fresh ``BraidConfig`` and swaps it into ``current``
+    with a single reference assignment. Readers pin a snapshot by reading
+    ``current`` once (one per tick) and never see a half-applied reload. A
+    file that fails to parse or convert keeps the previous snapshot.
+    """
+
+    def __init__(self, path: str | None = None, poll_s: float = 2.0,
+                 initial: Optional[BraidConfig] = None):
+        self.path = path or _default_path()
+        self.poll_s = float(poll_s)
+        self._stamp = self._stat()
+        self.current: BraidConfig = initial or load_config(self.path)
+        self.reloads = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def check(self) -> bool:
+        """Poll once; True if a new snapshot was swapped in."""
+        stamp = self._stat()
+        if stamp is None or stamp == self._stamp:
+            return False
+        self._stamp = stamp
+        loaded = _read_yaml(self.path)
+        if loaded is None:
+            logger.warning(f"{C.grpc}[config]{C.r} reload skipped; keeping previous snapshot")
+            return False
+        try:
+            new = BraidConfig(loaded)
+        except Exception as e:
+            logger.warning(f"{C.grpc}[config]{C.r} reload rejected (%s); keeping previous snapshot", e)
+            return False
+        old = self.current
+        changed = sorted(k for k in set(old.data) | set(new.data)
+                         if old.data.get(k) != new.data.get(k))
+        if not changed:
+            return False
+        self.current = new
+        self.reloads += 1
+        logger.info(f"{C.grpc}[config]{C.r} reloaded %s: %s", self.path, ", ".join(changed))
+        pending = [k for k in changed if k in _RESTART_KEYS]
+        if pending:
+            logger.warning(f"{C.grpc}[config]{C.r} restart required for: %s", ", ".join(pending))
+        return True
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.poll_s):
+            try:
+                self.check()
+            except Exception as e:  # never let the watcher die silently
+                logger.warning(f"{C.grpc}[config]{C.r} watcher error: %s", e)
+
+    def start(self) -> "ConfigWatcher":
+        if self._thread is None and self.poll_s > 0:
+            self._thread = threading.Thread(target=self._loop, name="braid-config-watch",
+                                            daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_s + 1.0)
+            self._thread = None
@@ -0,0 +1,195 @@
+"""Keyframe scheduler for the BRAID video pass.
+
+Full InsightFace detection (plus the head-pose / sharpness quality terms)
+runs only on every ``stride``-th frame. In between, each track that was
+detected on the last keyframe is carried forward by an OC-SORT
+``KalmanBoxTracker`` so ASD still gets a face crop on every frame.
+
+On keyframes a detection that IoU-matches a live track re-uses that track's
+identity without a new recognition forward unless the box has moved
+(IoU with the last *embedded* box ≤ ``reembed_iou``) or the face quality has
+improved by more than ``quality_margin``. ``reembed_iou >= 1`` embeds every
+detection, which with ``stride == 1`` reproduces the exhaustive pass.
+
+``tradeoff_report`` replays bundles at several strides and compares the
+resulting tracks to the exhaustive pass (``tools/braid_replay.py --tradeoff``).
+"""
+from __future__ import annotations
+
+import logging
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from ..trackers.ocsort.association import iou_batch, linear_assignment
+from ..trackers.ocsort.ocsort import KalmanBoxTracker
+from .log_style import C
+
+logger = logging.getLogger("braid")
+
+BBox = Tuple[int, int, int, int]
+
+
+def _iou(a: BBox, b: BBox) -> float:
+    return float(iou_batch(np.asarray([a], dtype=np.float64),
+                           np.asarray([b], dtype=np.float64))[0, 0])
+
+
+class KeyframeScheduler:
+    """Per-tick state: one Kalman box tracker per live face track."""
+
+    def __init__(self, stride: int = 1, reembed_iou: float = 1.0,
+                 quality_margin: float = 0.1, match_iou: float = 0.3):
+        self.stride = max(1, int(stride))
+        self.reembed_iou = float(reembed_iou)
+        self.quality_margin = float(quality_margin)
+        self.match_iou = float(match_iou)
+        self._kf: Dict[int, KalmanBoxTracker] = {}
+        self._last_embed: Dict[int, Tuple[BBox, float]] = {}
+        self._last_quality: Dict[int, float] = {}
+        self._live: Set[int] = set()
+        self.stats: Dict[str, int] = {
+            "frames": 0, "keyframes": 0, "propagated": 0,
+            "detections": 0, "embeddings": 0, "reused": 0,
+        }
+
+    def is_keyframe(self, frame_idx: int) -> bool:
+        return frame_idx % self.stride == 0
+
+    def predict(self, img_w: int, img_h: int) -> Dict[int, BBox]:
+        """Advance every tracker one frame. Returns clipped predicted boxes of
+        tracks that were detected on the most recent keyframe."""
+        self.stats["frames"] += 1
+        out: Dict[int, BBox] = {}
+        for t_idx, kf in self._kf.items():
+            pos = kf.predict()[0]
+            if t_idx not in self._live or np.any(np.isnan(pos)):
+                continue
+            x1, y1, x2, y2 = (int(round(v)) for v in pos[:4])
+            x1, x2 = max(0, x1), min(img_w, x2)
+            y1, y2 = max(0, y1), min(img_h, y2)
+            if x2 - x1 >= 4 and y2 - y1 >= 4:
+                out[t_idx] = (x1, y1, x2, y2)
+        return out
+
+    def last_quality(self, t_idx: int) -> float:
+        return self._last_quality.get(t_idx, 0.0)
+
+    def match(self, det_bboxes: Sequence[BBox],
+              predicted: Dict[int, BBox]) -> Dict[int, int]:
+        """IoU-associate this keyframe's detections with predicted track boxes.
+        Returns ``{det_idx: track_idx}``."""
+        if not det_bboxes or not predicted:
+            return {}
+        t_ids = list(predicted.keys())
+        ious = iou_batch(np.asarray(det_bboxes, dtype=np.float64),
+                         np.asarray([predicted[t] for t in t_ids], dtype=np.float64))
+        out: Dict[int, int] = {}
+        for d, j in linear_assignment(-ious):
+            d, j = int(d), int(j)
+            if ious[d, j] >= self.match_iou:
+                out[d] = t_ids[j]
+        return out
+
+    def needs_embedding(self, t_idx: Optional[int], bbox: BBox, quality: float) -> bool:
+        if t_idx is None or t_idx not in self._last_embed:
+            return True
+        last_bbox, last_q = self._last_embed[t_idx]
+        if _iou(bbox, last_bbox) <= self.reembed_iou:
+            return True
+        return quality > last_q + self.quality_margin
+
+    def observe(self, t_idx: int, bbox: BBox, quality: float, embedded: bool) -> None:
+        """Record a keyframe detection assigned to ``t_idx``."""
+        det = np.asarray([*bbox, 1.0], dtype=np.float64)
+        kf = self._kf.get(t_idx)
+        if kf is None:
+            self._kf[t_idx] = KalmanBoxTracker(det)
+        else:
+            kf.update(det)
+        self._last_quality[t_idx] = quality
+        if embedded:
+            self._last_embed[t_idx] = (bbox, quality)
+            self.stats["embeddings"] += 1
+        else:
+            self.stats["reused"] += 1
+
+    def end_keyframe(self, detected: Iterable[int]) -> None:
+        """Only tracks seen on this keyframe are propagated until the next."""
+        self.stats["keyframes"] += 1
+        self._live = set(detected)
+
+
+# ----- accuracy vs. cost ------------------------------------------------------
+
+def _compare_tracks(base, other) -> Dict[str, float]:
+    """Match each exhaustive-pass track to its most similar track in
+    ``other`` (by averaged embedding) and summarise the disagreement."""
+    if not base:
+        return {"matched": 0.0, "emb_cos": 1.0, "az_err_deg": 0.0, "frame_recall": 1.0}
+    cos_l, az_l, rec_l, matched = [], [], [], 0
+    for bt in base:
+        if not other:
+            rec_l.append(0.0)
+            continue
+        sims = [float(np.dot(bt.avg_embedding, ot.avg_embedding)) for ot in other]
+        j = int(np.argmax(sims))
+        if sims[j] <= 0.5:
+            rec_l.append(0.0)
+            continue
+        matched += 1
+        ot = other[j]
+        cos_l.append(sims[j])
+        az_l.append(abs(np.degrees(bt.azimuth_rad - ot.azimuth_rad)))
+        base_ts = set(bt.frame_ts)
+        rec_l.append(len(base_ts & set(ot.frame_ts)) / max(1, len(base_ts)))
+    return {
+        "matched": matched / len(base),
+        "emb_cos": float(np.mean(cos_l)) if cos_l else 0.0,
+        "az_err_deg": float(np.mean(az_l)) if az_l else 0.0,
+        "frame_recall": float(np.mean(rec_l)) if rec_l else 0.0,
+    }
+
+
+def tradeoff_report(engine, bundles: Iterable, strides: Sequence[int] = (1, 2, 3, 5, 8),
+                    reembed_iou: Optional[float] = None) -> List[Dict[str, float]]:
+    """Run ``engine._video_pass`` over ``bundles`` once exhaustively and once
+    per stride, and report cost (wall time, detector / recognition calls) and
+    accuracy against the exhaustive tracks (track match rate, mean embedding
+    cosine, azimuth error, per-frame coverage). One row per stride, averaged
+    over bundles."""
+    rows: Dict[int, List[Dict[str, float]]] = {s: [] for s in strides}
+    for bundle in bundles:
+        t = time.time()
+        base, base_stats = engine._video_pass(bundle, keyframe_stride=1,
+                                              reembed_iou=1.0, return_stats=True)
+        base_wall = time.time() - t
+        for s in strides:
+            t = time.time()
+            tracks, stats = engine._video_pass(bundle, keyframe_stride=s,
+                                               reembed_iou=reembed_iou,
+                                               return_stats=True)
+            wall = time.time() - t
+            row = _compare_tracks(base, tracks)
+            row.update({
+                "wall_s": wall,
+                "speedup": base_wall / max(1e-6, wall),
+                "detector_calls": float(stats["keyframes"]),
+                "embed_calls": float(stats["embeddings"]),
+                "embed_ratio": stats["embeddings"] / max(1, base_stats["embeddings"]),
+            })
+            rows[s].append(row)
+
+    report: List[Dict[str, float]] = []
+    for s in strides:
+        if not rows[s]:
+            continue
+        avg = {k: float(np.mean([r[k] for r in rows[s]])) for k in rows[s][0]}
+        avg["stride"] = float(s)
+        report.append(avg)
+        logger.info(f"{C.perception}[scheduler]{C.r} stride=%d wall=%.2fs speedup=%.2fx "
+                    "embed_ratio=%.2f matched=%.2f emb_cos=%.3f az_err=%.2f° frame_recall=%.2f",
+                    s, avg["wall_s"], avg["speedup"], avg["embed_ratio"], avg["matched"],
+                    avg["emb_cos"], avg["az_err_deg"], avg["frame_recall"])
+    return report
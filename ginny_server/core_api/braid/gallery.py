@@ -6,6 +6,12 @@ Layout:
         p_<n>.json      # human-readable metadata
         p_<n>.png       # optional representative face image
         next_id.txt     # monotonically increasing id counter
+        _index_face.npz # trained IVF quantizer (index="ivf" only; vectors
+        _index_voice.npz  # are rebuilt from p_<n>.npz on load)
+
+Face and voice embeddings are also kept in a ``vector_index`` per modality
+so ``candidates`` can return the nearest entries without scanning the whole
+gallery ("exact" scans, "ivf" probes a few k-means lists).
 
 Thread-safe via an internal ``threading.Lock`` (the gRPC servicer may run
 concurrent ticks per session).
@@ -19,10 +25,11 @@ import threading
 import time
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Iterable, List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 
 import numpy as np
 
+from ..vector_index import ExactIndex, load_index, make_index
 from .log_style import C
 
 logger = logging.getLogger("braid")
@@ -41,17 +48,78 @@ class GalleryEntry:
 
 
 class BraidGallery:
-    def __init__(self, db_dir: str | Path):
+    def __init__(self, db_dir: str | Path, index: str = "exact", nprobe: int = 16):
         self.db_dir = Path(db_dir)
         self.db_dir.mkdir(parents=True, exist_ok=True)
+        self.index_kind = index
+        self.nprobe = nprobe
+        make_index(index, 1)    # validate the kind up front
         self._lock = threading.Lock()
         self._entries: List[GalleryEntry] = []
+        self._by_id: Dict[str, GalleryEntry] = {}
+        self._pos: Dict[str, int] = {}
+        self._snapshot: Optional[Tuple[Tuple[GalleryEntry, ...], Tuple[str, ...]]] = None
+        self._indexes: Dict[str, ExactIndex] = {}
         self._load()
 
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # ---- vector index --------------------------------------------------------
+
+    def _index_path(self, modality: str) -> Path:
+        return self.db_dir / f"_index_{modality}.npz"
+
+    def _index_put(self, modality: str, pid: str, emb: Optional[np.ndarray],
+                   persist: bool = True) -> None:
+        if emb is None:
+            return
+        idx = self._indexes.get(modality)
+        if idx is None:
+            idx = self._open_index(modality, emb.size)
+            self._indexes[modality] = idx
+        trained_at = idx.trained_at
+        try:
+            idx.add(pid, emb)
+        except ValueError as e:     # embedding size changed (model swap)
+            logger.warning(f"{C.gallery}[gallery]{C.r} %s not indexed (%s): %s",
+                           pid, modality, e)
+            return
+        if persist and idx.trained_at != trained_at:
+            try:
+                idx.save(self._index_path(modality), vectors=False)
+            except Exception as e:
+                logger.warning(f"{C.gallery}[gallery]{C.r} failed to save %s index: %s",
+                               modality, e)
+
+    def _open_index(self, modality: str, dim: int) -> ExactIndex:
+        path = self._index_path(modality)
+        if self.index_kind != "exact" and path.exists():
+            try:
+                idx = load_index(path)
+                if idx.kind == self.index_kind and idx.dim == dim:
+                    idx.nprobe = self.nprobe
+                    return idx
+            except Exception as e:
+                logger.warning(f"{C.gallery}[gallery]{C.r} ignoring %s: %s", path, e)
+        return make_index(self.index_kind, dim, nprobe=self.nprobe)
+
+    def _register(self, e: GalleryEntry, persist: bool = True) -> None:
+        self._snapshot = None
+        self._pos[e.person_id] = len(self._entries)
+        self._entries.append(e)
+        self._by_id[e.person_id] = e
+        self._index_put("face", e.person_id, e.face_emb, persist)
+        self._index_put("voice", e.person_id, e.voice_emb, persist)
+
     # ---- IO ---------------------------------------------------------------
 
     def _load(self):
         self._entries.clear()
+        self._by_id.clear()
+        self._pos.clear()
+        self._indexes.clear()
+        self._snapshot = None
         for meta_path in sorted(self.db_dir.glob("*.json")):
             try:
                 with open(meta_path, "r") as fh:
@@ -65,7 +133,7 @@ class BraidGallery:
                         face_emb = data["face_emb"].astype(np.float32)
                     if "voice_emb" in data.files and data["voice_emb"].size > 0:
                         voice_emb = data["voice_emb"].astype(np.float32)
-                self._entries.append(GalleryEntry(
+                self._register(GalleryEntry(
                     person_id=pid,
                     face_emb=face_emb,
                     voice_emb=voice_emb,
@@ -74,11 +142,14 @@ class BraidGallery:
                     updated_at=float(meta.get("updated_at", time.time())),
                     face_count=int(meta.get("face_count", 1)),
                     voice_count=int(meta.get("voice_count", 1)),
-                ))
+                ), persist=False)
             except Exception as e:
                 logger.warning(f"{C.gallery}[gallery]{C.r} failed to load %s: %s", meta_path, e)
-        logger.info(f"{C.gallery}[gallery]{C.r} loaded %d entries from %s",
-                    len(self._entries), self.db_dir)
+        for modality, idx in self._indexes.items():
+            if idx.trained_at and not self._index_path(modality).exists():
+                idx.save(self._index_path(modality), vectors=False)
+        logger.info(f"{C.gallery}[gallery]{C.r} loaded %d entries from %s (index=%s)",
+                    len(self._entries), self.db_dir, self.index_kind)
 
     def _write_entry(self, e: GalleryEntry):
         npz_path = self.db_dir / f"{e.person_id}.npz"
@@ -106,12 +177,33 @@ class BraidGallery:
         with self._lock:
             return list(self._entries)
 
+    def snapshot(self) -> Tuple[Tuple[GalleryEntry, ...], Tuple[str, ...]]:
+        """``(entries, ids)`` with ``"__unk__"`` appended to ``ids``. Cached
+        until the next enrolment, so every posterior (and the session
+        memories built from them) shares one ids tuple instead of a copy."""
+        with self._lock:
+            if self._snapshot is None:
+                entries = tuple(self._entries)
+                self._snapshot = (entries,
+                                  tuple(e.person_id for e in entries) + ("__unk__",))
+            return self._snapshot
+
     def get(self, person_id: str) -> Optional[GalleryEntry]:
         with self._lock:
-            for e in self._entries:
-                if e.person_id == person_id:
-                    return e
-        return None
+            return self._by_id.get(person_id)
+
+    def candidates(self, face_emb: Optional[np.ndarray],
+                   voice_emb: Optional[np.ndarray], k: int,
+                   extra_ids: Iterable[str] = ()) -> List[GalleryEntry]:
+        """Union of the ``k`` nearest entries by face and by voice, plus any
+        ``extra_ids`` still in the gallery, in gallery (enrolment) order."""
+        with self._lock:
+            ids = {pid for pid in extra_ids if pid in self._by_id}
+            for modality, emb in (("face", face_emb), ("voice", voice_emb)):
+                idx = self._indexes.get(modality)
+                if emb is not None and idx is not None:
+                    ids.update(pid for pid, _ in idx.search(emb, k))
+            return [self._entries[i] for i in sorted(self._pos[pid] for pid in ids)]
 
     def _next_id(self) -> str:
         """Monotonic p_<n> ids; survives across runs."""
@@ -123,7 +215,7 @@ class BraidGallery:
             except Exception:
                 n = 1
         # Avoid colliding with any existing entry
-        while any(e.person_id == f"p_{n}" for e in self._entries):
+        while f"p_{n}" in self._by_id:
             n += 1
         counter_path.write_text(str(n))
         return f"p_{n}"
@@ -144,7 +236,7 @@ class BraidGallery:
                 face_count=1 if face_emb is not None else 0,
                 voice_count=1 if voice_emb is not None else 0,
             )
-            self._entries.append(e)
+            self._register(e)
             self._write_entry(e)
             if representative_image is not None:
                 try:
@@ -165,11 +257,7 @@ class BraidGallery:
                    alpha: float,
                    face_quality: Optional[float] = None) -> Optional[GalleryEntry]:
         with self._lock:
-            entry = None
-            for e in self._entries:
-                if e.person_id == person_id:
-                    entry = e
-                    break
+            entry = self._by_id.get(person_id)
             if entry is None:
                 return None
             if face_emb is not None:
@@ -186,6 +274,10 @@ class BraidGallery:
                     entry.voice_emb = ((1 - alpha) * entry.voice_emb
                                        + alpha * voice_emb.astype(np.float32)).astype(np.float32)
                 entry.voice_count += 1
+            if face_emb is not None:
+                self._index_put("face", person_id, entry.face_emb)
+            if voice_emb is not None:
+                self._index_put("voice", person_id, entry.voice_emb)
             if face_quality is not None:
                 entry.face_quality = float(face_quality)
             entry.updated_at = time.time()
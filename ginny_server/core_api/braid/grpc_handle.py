@@ -3,29 +3,35 @@
 Streams in a 30s tick bundle (audio chunks + frame JPEGs + SSL events +
 meta), runs the BRAID pipeline, returns one BraidTickResult.
 
-Thread-safety: per-session ``SessionState`` objects are stored in a dict
-protected by a lock so concurrent ticks (different session_ids) don't stomp
-each other.
+Thread-safety: per-session ``SessionState`` objects live in a
+``SessionManager`` (idle-TTL / LRU eviction, per-session memory cap), and
+every tick runs through ``TickScheduler`` so ticks of one session are
+serialised and GPU-heavy ticks are capped globally.
 """
 from __future__ import annotations
 
 import logging
 import math
-import threading
 import time
-from typing import Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
 
+import cv2
 import grpc
+import numpy as np
 
 from grpc_communication import grpc_pb2 as pb2
 from grpc_communication import grpc_pb2_grpc as pb2_grpc
 
-from .config import load_config
+from .config import ConfigWatcher, load_config
 from .decision import DecisionState
 from .gallery import BraidGallery
 from .log_style import C
+from .metrics import BraidMetrics
 from .perception import PerceptionEngine, TickBundle
-from .temporal import SessionState
+from .replay import BundleRecorder
+from .scheduler import TickRejected, TickScheduler
+from .sessions import SessionManager
 from .tick import run_tick
 
 logger = logging.getLogger("braid")
@@ -47,33 +53,103 @@ _ACTION_ENUM = {
 }
 
 
+class _PcmBuffer:
+    """Append-only PCM sink over one ``bytearray``. ``reserve`` preallocates
+    from the stream meta; writes past capacity grow it geometrically."""
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._n = 0
+
+    def reserve(self, capacity: int) -> None:
+        if capacity > len(self._buf):
+            self._buf.extend(bytes(capacity - len(self._buf)))
+
+    def write(self, data: bytes) -> None:
+        end = self._n + len(data)
+        if end > len(self._buf):
+            self.reserve(max(end, 2 * len(self._buf)))
+        self._buf[self._n:end] = data
+        self._n = end
+
+    def getbuffer(self) -> bytearray:
+        """Trim to the written length and hand the buffer over (no copy)."""
+        del self._buf[self._n:]
+        buf, self._buf, self._n = self._buf, bytearray(), 0
+        return buf
+
+
 class BraidServiceServicer(pb2_grpc.BraidServiceServicer):
     def __init__(self, cfg=None, engine: Optional[PerceptionEngine] = None,
                  gallery: Optional[BraidGallery] = None):
-        self.cfg = cfg or load_config()
+        # An explicit cfg (benches, tests) stays fixed; otherwise the YAML is
+        # watched and each tick pins whatever snapshot is current at arrival.
+        self.config_watcher: Optional[ConfigWatcher] = None
+        if cfg is None:
+            cfg = load_config()
+            if cfg.config_reload_s > 0:
+                self.config_watcher = ConfigWatcher(
+                    poll_s=cfg.config_reload_s, initial=cfg).start()
+        self.cfg = cfg
         self.engine = engine or PerceptionEngine(self.cfg)
-        self.gallery = gallery or BraidGallery(self.cfg.gallery_dir)
-        self._sessions: Dict[str, SessionState] = {}
-        self._sess_lock = threading.Lock()
+        self.gallery = gallery or BraidGallery(
+            self.cfg.gallery_dir, index=self.cfg.gallery_index, nprobe=self.cfg.gallery_ann_nprobe)
+        self.recorder = BundleRecorder(self.cfg.record_dir) if self.cfg.record_dir else None
+        self.scheduler = TickScheduler(
+            max_concurrent=self.cfg.max_concurrent_ticks,
+            max_queued=self.cfg.max_queued_ticks,
+            coalesce=self.cfg.coalesce_stale_ticks,
+            wait_timeout_s=self.cfg.tick_queue_timeout_s,
+        )
+        self.metrics = BraidMetrics.from_config(self.cfg)
+        self.sessions = SessionManager(
+            idle_ttl_s=self.cfg.session_idle_ttl_s,
+            max_sessions=self.cfg.max_sessions,
+            max_memories=self.cfg.max_memories_per_session,
+            snapshot_dir=self.cfg.session_snapshot_dir or None,
+            on_evict=self._on_evict,
+        )
+        # cv2.imdecode releases the GIL, so decoding overlaps with receiving.
+        self._decode_pool = ThreadPoolExecutor(
+            max_workers=self.cfg.frame_decode_workers,
+            thread_name_prefix="braid-decode",
+        )
 
     # ------ helpers ---------------------------------------------------------
 
-    def _get_session(self, session_id: str) -> SessionState:
-        with self._sess_lock:
-            if session_id not in self._sessions:
-                self._sessions[session_id] = SessionState(session_id=session_id)
-            return self._sessions[session_id]
+    def _on_evict(self, session_id: str) -> None:
+        self.scheduler.forget(session_id)
+        self.metrics.forget_session(session_id)
 
-    def _assemble_bundle(self, request_iterator) -> TickBundle:
-        """Drain the client stream into a TickBundle."""
+    def _current_cfg(self):
+        return self.config_watcher.current if self.config_watcher else self.cfg
+
+    def _decode_frame(self, jpeg: bytes):
+        try:
+            img = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+        except Exception as e:
+            logger.warning(f"{C.grpc}[grpc]{C.r} frame decode failed: %s", e)
+            return None
+        return img
+
+    def _assemble_bundle(self, request_iterator,
+                         raw_frames: Optional[List[Tuple[float, bytes]]] = None,
+                         cfg=None) -> TickBundle:
+        """Drain the client stream into a TickBundle. If ``raw_frames`` is
+        given, the undecoded ``(ts, jpeg)`` pairs are appended to it.
+
+        Audio is copied straight into one preallocated buffer sized from the
+        meta (sample rate × channels × tick window) and JPEGs are decoded on
+        ``_decode_pool`` while the rest of the stream is still arriving.
+        """
         tick_id: int = 0
         session_id: str = "default"
         heading: float = 0.0
         ws_ts: float = time.time()
         sr: int = 16000
         ch: int = 4
-        audio_chunks: List[bytes] = []
-        frames = []
+        audio = _PcmBuffer()
+        frame_futs = []
         ssl_events = []
         for chunk in request_iterator:
             if chunk.tick_id:
@@ -92,33 +168,36 @@ class BraidServiceServicer(pb2_grpc.BraidServiceServicer):
                 if m.robot_heading_rad: heading = float(m.robot_heading_rad)
                 if m.audio_sample_rate: sr = int(m.audio_sample_rate)
                 if m.audio_num_channels: ch = int(m.audio_num_channels)
+                audio.reserve(int(2 * sr * ch * (cfg or self.cfg).tick_window_seconds * 1.05))
             elif payload == "audio_chunk":
                 a = chunk.audio_chunk
-                audio_chunks.append(a.pcm)
+                audio.write(a.pcm)
                 if a.sample_rate: sr = int(a.sample_rate)
                 if a.channels: ch = int(a.channels)
             elif payload == "frame_chunk":
                 f = chunk.frame_chunk
-                try:
-                    import numpy as np
-                    import cv2
-                    arr = np.frombuffer(f.jpeg, dtype=np.uint8)
-                    img = cv2.imdecode(arr, cv2.IMREAD_COLOR)
-                    if img is not None:
-                        frames.append((float(f.ts), img))
-                except Exception as e:
-                    logger.warning(f"{C.grpc}[grpc]{C.r} frame decode failed: %s", e)
+                jpeg = f.jpeg
+                if raw_frames is not None:
+                    raw_frames.append((float(f.ts), jpeg))
+                frame_futs.append((float(f.ts),
+                                   self._decode_pool.submit(self._decode_frame, jpeg)))
             elif payload == "ssl_event":
                 s = chunk.ssl_event
                 ssl_events.append((float(s.ts), float(s.azimuth_rad),
                                    float(s.confidence)))
 
+        frames = []
+        for ts, fut in frame_futs:
+            img = fut.result()
+            if img is not None:
+                frames.append((ts, img))
+
         return TickBundle(
             tick_id=tick_id,
             session_id=session_id,
             window_start_ts=ws_ts,
             robot_heading_rad=heading,
-            audio_pcm=b"".join(audio_chunks),
+            audio_pcm=audio.getbuffer(),
             audio_sample_rate=sr,
             audio_channels=ch,
             frames=frames,
@@ -155,13 +234,22 @@ class BraidServiceServicer(pb2_grpc.BraidServiceServicer):
         ))
         return out
 
+    def _session_tick(self, bundle, session, cfg):
+        """Runs under the scheduler's per-session lock, so nothing else touches
+        ``session.memories`` while the cap is applied and its size recorded."""
+        tick_res = run_tick(bundle, self.engine, self.gallery, session, cfg)
+        self.sessions.after_tick(session)
+        return tick_res
+
     # ------ RPC -------------------------------------------------------------
 
     def RunTick(self, request_iterator, context):
         t0 = time.time()
         logger.info(f"{C.grpc}[grpc]{C.r} RunTick RPC begin — draining client stream")
+        raw_frames: Optional[List[Tuple[float, bytes]]] = [] if self.recorder else None
+        cfg = self._current_cfg()     # pinned for the whole tick
         try:
-            bundle = self._assemble_bundle(request_iterator)
+            bundle = self._assemble_bundle(request_iterator, raw_frames, cfg)
             logger.info(
                 f"{C.grpc}[grpc]{C.r} bundle assembled tick=%d session=%s audio=%dB "
                 "(sr=%d ch=%d) frames=%d ssl=%d heading=%.2frad",
@@ -172,20 +260,43 @@ class BraidServiceServicer(pb2_grpc.BraidServiceServicer):
             )
         except Exception as e:
             logger.exception(f"{C.grpc}[grpc]{C.r} failed to assemble bundle: %s", e)
+            self.metrics.observe_outcome("bad_bundle")
             context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
             context.set_details(f"Failed to assemble tick bundle: {e}")
             return pb2.BraidTickResult()
 
-        session = self._get_session(bundle.session_id)
+        if self.recorder is not None:
+            self.recorder.record(bundle, raw_frames)
+
         try:
-            tick_res = run_tick(bundle, self.engine, self.gallery, session, self.cfg)
+            with self.sessions.lease(bundle.session_id) as session:
+                tick_res = self.scheduler.run(
+                    bundle.session_id, bundle.tick_id,
+                    lambda: self._session_tick(bundle, session, cfg),
+                )
+        except TickRejected as e:
+            self.metrics.observe_outcome(e.reason)
+            context.set_code(grpc.StatusCode.RESOURCE_EXHAUSTED
+                             if e.reason in ("queue_full", "timeout")
+                             else grpc.StatusCode.ABORTED)
+            context.set_details(f"tick {e.reason}: {e}")
+            return pb2.BraidTickResult(tick_id=bundle.tick_id,
+                                       session_id=bundle.session_id)
         except Exception as e:
             logger.exception(f"{C.grpc}[grpc]{C.r} run_tick failed: %s", e)
+            self.metrics.observe_outcome("failed")
             context.set_code(grpc.StatusCode.INTERNAL)
             context.set_details(f"run_tick failed: {e}")
             return pb2.BraidTickResult(tick_id=bundle.tick_id,
                                        session_id=bundle.session_id)
-        logger.info(f"{C.grpc}[grpc]{C.r} tick=%d persons=%d action=%s wall=%.2fs",
-                    bundle.tick_id, len(tick_res.persons),
-                    tick_res.action.type, time.time() - t0)
+        sched = self.scheduler.stats()
+        self.metrics.observe_tick(tick_res, len(self.gallery))
+        self.metrics.observe_service(sched, self.sessions.gauges())
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(f"{C.grpc}[grpc]{C.r} tick=%d persons=%d action=%s wall=%.2fs "
+                        "sched_wait=%.2fs queue_depth=%d sessions=%d session_mem=%.1fKB",
+                        bundle.tick_id, len(tick_res.persons),
+                        tick_res.action.type, time.time() - t0,
+                        sched["wait_last_s"], int(sched["queue_depth"]), len(self.sessions),
+                        self.sessions.memory_bytes(bundle.session_id) / 1024)
         return self._build_result(tick_res)
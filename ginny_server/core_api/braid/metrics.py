@@ -0,0 +1,340 @@
+"""Tick metrics for long-running BRAID servers.
+
+A small in-process registry of counters, gauges and histograms (no
+prometheus_client dependency) fed once per tick by ``BraidMetrics``:
+
+  * ``braid_phase_seconds{phase}``            histogram, run_tick phase wall time
+  * ``braid_tick_seconds{session}``           histogram, whole tick per robot
+  * ``braid_persons_per_tick``                histogram
+  * ``braid_gallery_size``                    gauge
+  * ``braid_decisions_total{state}``          counter (ENROL / RECOGNISE rates via rate())
+  * ``braid_decision_transitions_total{from,to}`` counter, prev_state → state
+  * ``braid_q_gate`` / ``braid_margin``       histograms of the posterior scalars
+  * ``braid_ticks_total{outcome}``            counter, ok / failed / rejected reasons
+  * scheduler + session gauges from ``TickScheduler.stats`` / ``SessionManager.gauges``
+
+Per-session series are dropped by ``forget_session`` when a session is evicted.
+
+``MetricsServer`` serves the Prometheus text format on ``/metrics``;
+``JsonlSink`` appends one JSON record per tick to a size-rotated file.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import logging.handlers
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .log_style import C
+
+logger = logging.getLogger("braid")
+
+_SECONDS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+_COUNT_BUCKETS = (0, 1, 2, 3, 4, 6, 8)
+_Q_GATE_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0)
+_UNIT_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+
+LabelKey = Tuple[str, ...]
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(names: Sequence[str], values: LabelKey, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt_value(v: float) -> str:
+    if math.isinf(v):
+        return "+Inf" if v > 0 else "-Inf"
+    return repr(float(v))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_: str, labels: Sequence[str], lock: threading.Lock):
+        self.name = name
+        self.help = help_
+        self.labels = tuple(labels)
+        self._lock = lock
+
+    def _key(self, labels: Optional[Dict[str, str]]) -> LabelKey:
+        labels = labels or {}
+        return tuple(str(labels.get(n, "")) for n in self.labels)
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def remove(self, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values.pop(key, None)
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{_fmt_labels(self.labels, k)} {_fmt_value(v)}"
+                for k, v in sorted(self._values.items())]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def replace(self, values: Iterable[Tuple[Dict[str, str], float]]) -> None:
+        """Swap all series at once (drops series that disappeared, e.g. evicted sessions)."""
+        fresh = {self._key(labels): float(v) for labels, v in values}
+        with self._lock:
+            self._values = fresh
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_: str, labels: Sequence[str], lock: threading.Lock,
+                 buckets: Sequence[float]):
+        super().__init__(name, help_, labels, lock)
+        self.buckets = tuple(sorted(buckets))
+        # key → [count per bucket..., +Inf count], sum
+        self._counts: Dict[LabelKey, List[int]] = {}
+        self._sums: Dict[LabelKey, float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            i = 0
+            while i < len(self.buckets) and value > self.buckets[i]:
+                i += 1
+            counts[i] += 1
+            self._sums[key] += value
+
+    def remove(self, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._counts.pop(key, None)
+            self._sums.pop(key, None)
+
+    def render(self) -> List[str]:
+        lines = []
+        for key in sorted(self._counts):
+            counts = self._counts[key]
+            cum = 0
+            for le, c in zip(self.buckets + (math.inf,), counts):
+                cum += c
+                le_label = 'le="%s"' % _fmt_value(le)
+                lines.append(f"{self.name}_bucket{_fmt_labels(self.labels, key, le_label)} {cum}")
+            lines.append(f"{self.name}_sum{_fmt_labels(self.labels, key)} "
+                         f"{_fmt_value(self._sums[key])}")
+            lines.append(f"{self.name}_count{_fmt_labels(self.labels, key)} {cum}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _add(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_: str, labels: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help_, labels, self._lock))
+
+    def gauge(self, name: str, help_: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(name, help_, labels, self._lock))
+
+    def histogram(self, name: str, help_: str, buckets: Sequence[float],
+                  labels: Sequence[str] = ()) -> Histogram:
+        return self._add(Histogram(name, help_, labels, self._lock, buckets))
+
+    def render_prometheus(self) -> str:
+        out: List[str] = []
+        with self._lock:
+            for m in self._metrics.values():
+                out.append(f"# HELP {m.name} {m.help}")
+                out.append(f"# TYPE {m.name} {m.kind}")
+                out.extend(m.render())
+        return "\n".join(out) + "\n"
+
+
+# ----- exporters -----------------------------------------------------------------
+
+class MetricsServer:
+    """``GET /metrics`` on ``host:port`` in a daemon thread."""
+
+    def __init__(self, registry: MetricsRegistry, port: int, host: str = "0.0.0.0"):
+        reg = registry
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = reg.render_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, fmt, *args):    # keep scrapes out of the BRAID log
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever,
+                                        name="braid-metrics", daemon=True)
+        self._thread.start()
+        logger.info(f"{C.grpc}[metrics]{C.r} Prometheus endpoint on http://%s:%d/metrics",
+                    host, self.port)
+
+    def close(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+class JsonlSink:
+    """One JSON object per line, rotated at ``max_bytes`` keeping ``backups`` files."""
+
+    def __init__(self, path: str | Path, max_bytes: int = 50 * 1024 * 1024, backups: int = 5):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._handler = logging.handlers.RotatingFileHandler(
+            str(path), maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+        self._handler.setFormatter(logging.Formatter("%(message)s"))
+
+    def write(self, record: dict) -> None:
+        self._handler.handle(logging.makeLogRecord(
+            {"msg": json.dumps(record, separators=(",", ":")), "levelno": logging.INFO}))
+
+    def close(self) -> None:
+        self._handler.close()
+
+
+# ----- BRAID facade --------------------------------------------------------------
+
+class BraidMetrics:
+    def __init__(self, port: int = 0, jsonl_path: str = "",
+                 jsonl_max_bytes: int = 50 * 1024 * 1024, jsonl_backups: int = 5):
+        r = self.registry = MetricsRegistry()
+        self.phase_seconds = r.histogram("braid_phase_seconds", "run_tick phase wall time",
+                                         _SECONDS_BUCKETS, ("phase",))
+        self.tick_seconds = r.histogram("braid_tick_seconds", "run_tick wall time per session",
+                                        _SECONDS_BUCKETS, ("session",))
+        self.persons = r.histogram("braid_persons_per_tick", "person hypotheses per tick",
+                                   _COUNT_BUCKETS)
+        self.gallery_size = r.gauge("braid_gallery_size", "BRAID gallery entries")
+        self.decisions = r.counter("braid_decisions_total", "decisions by state", ("state",))
+        self.transitions = r.counter("braid_decision_transitions_total",
+                                     "per-person decision state transitions", ("from", "to"))
+        self.q_gate = r.histogram("braid_q_gate", "posterior Q_gate", _Q_GATE_BUCKETS)
+        self.margin = r.histogram("braid_margin", "posterior p_best - p_second", _UNIT_BUCKETS)
+        self.ticks = r.counter("braid_ticks_total", "ticks by outcome", ("outcome",))
+        self.sched = r.gauge("braid_scheduler", "TickScheduler stats", ("stat",))
+        self.session_bytes = r.gauge("braid_session_bytes",
+                                     "estimated SessionState size", ("session",))
+        self.session_memories = r.gauge("braid_session_memories",
+                                        "person memories per session", ("session",))
+        self.server = MetricsServer(r, port) if port else None
+        self.sink = (JsonlSink(jsonl_path, jsonl_max_bytes, jsonl_backups)
+                     if jsonl_path else None)
+
+    @classmethod
+    def from_config(cls, cfg) -> "BraidMetrics":
+        return cls(port=cfg.metrics_port, jsonl_path=cfg.metrics_jsonl_path,
+                   jsonl_max_bytes=int(cfg.metrics_jsonl_max_mb * 1024 * 1024),
+                   jsonl_backups=cfg.metrics_jsonl_backups)
+
+    def observe_tick(self, res, gallery_size: int) -> None:
+        """Record one finished ``BraidTickResult``."""
+        for phase, secs in res.phase_seconds.items():
+            self.phase_seconds.observe(secs, phase=phase)
+        self.tick_seconds.observe(res.tick_wall_seconds, session=res.session_id)
+        self.persons.observe(len(res.persons))
+        self.gallery_size.set(gallery_size)
+        self.ticks.inc(outcome="ok")
+        for p in res.persons:
+            state = p.decision.state.value
+            self.decisions.inc(state=state)
+            self.transitions.inc(**{"from": p.prev_state, "to": state})
+            self.q_gate.observe(p.posterior.Q_gate)
+            self.margin.observe(p.posterior.margin)
+        if self.sink is not None:
+            self.sink.write({
+                "ts": time.time(),
+                "session": res.session_id,
+                "tick": res.tick_id,
+                "wall_s": round(res.tick_wall_seconds, 4),
+                "phases": {k: round(v, 4) for k, v in res.phase_seconds.items()},
+                "gallery": gallery_size,
+                "action": res.action.type,
+                "persons": [{
+                    "id": p.stable_id,
+                    "from": p.prev_state,
+                    "state": p.decision.state.value,
+                    "identity": p.decision.identity,
+                    "p_best": round(p.posterior.p_best, 4),
+                    "p_unk": round(p.posterior.p_unk, 4),
+                    "margin": round(p.posterior.margin, 4),
+                    "q_gate": round(p.posterior.Q_gate, 4),
+                } for p in res.persons],
+            })
+
+    def observe_outcome(self, outcome: str) -> None:
+        """Count a tick that did not finish (``failed`` or a ``TickRejected`` reason)."""
+        self.ticks.inc(outcome=outcome)
+
+    def observe_service(self, sched_stats: Dict[str, float],
+                        session_gauges: Dict[str, Dict[str, float]]) -> None:
+        self.sched.replace(({"stat": k}, v) for k, v in sched_stats.items())
+        self.session_bytes.replace(({"session": s}, g["bytes"]) for s, g in session_gauges.items())
+        self.session_memories.replace(({"session": s}, g["memories"])
+                                      for s, g in session_gauges.items())
+
+    def forget_session(self, session_id: str) -> None:
+        """Drop an evicted session's series so the label set stays bounded."""
+        self.tick_seconds.remove(session=session_id)
+        self.session_bytes.remove(session=session_id)
+        self.session_memories.remove(session=session_id)
+
+    def close(self) -> None:
+        if self.server is not None:
+            self.server.close()
+        if self.sink is not None:
+            self.sink.close()
@@ -17,21 +17,28 @@ import math
 import sys
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from dataclasses import dataclass, field
+from functools import partial
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 
+from .asd_batch import ASDTrackInput
+from .asd_batch import score_tracks as score_asd_tracks
 from .config import BraidConfig
 from .log_style import C
+from .frame_scheduler import KeyframeScheduler
+from .track_cluster import FaceTrackClusterer
 
 logger = logging.getLogger("braid")
 
 
 # ----- lightweight containers -------------------------------------------------
 
-@dataclass
+@dataclass(slots=True)
 class FaceTrack:
     """One visually observed person over the 30s window.
 
@@ -46,9 +53,10 @@ class FaceTrack:
     asd_scores: List[float] = field(default_factory=list)  # per-frame α
     frame_ts: List[float] = field(default_factory=list)    # timestamps for frames that contain this track
     representative_image: Optional[np.ndarray] = None      # for gallery image dump
+    gray_crops: List[np.ndarray] = field(default_factory=list)  # ASD input; dropped once scored
 
 
-@dataclass
+@dataclass(slots=True)
 class DiarizationCluster:
     cluster_id: str
     voice_embedding: Optional[np.ndarray]
@@ -56,10 +64,9 @@ class DiarizationCluster:
     end: float            # seconds from tick start
     duration: float
     delta: float          # diarization posterior (speaking confidence)
-    audio_bytes: Optional[bytes] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class RawObservations:
     """Output of PerceptionEngine.run(). Fed into association.py."""
     face_tracks: List[FaceTrack]
@@ -69,22 +76,39 @@ class RawObservations:
     ssl_confidences: List[float]
     num_frames: int
     tick_seconds: float
+    timings: Dict[str, float] = field(default_factory=dict)  # per-branch wall seconds
+
+
+class PerceptionBranchError(RuntimeError):
+    """Raised by ``PerceptionEngine.run`` when the video or audio branch
+    fails. ``branch`` names the failing branch; the original exception is
+    chained as ``__cause__``."""
+
+    def __init__(self, branch: str, cause: BaseException):
+        super().__init__(f"{branch} branch failed: {cause}")
+        self.branch = branch
 
 
 # ----- tick bundle (what the gRPC layer assembles from the stream) ------------
 
-@dataclass
+@dataclass(slots=True)
 class TickBundle:
     tick_id: int
     session_id: str
     window_start_ts: float
     robot_heading_rad: float
-    audio_pcm: bytes                       # interleaved int16 across `audio_channels`
+    audio_pcm: bytes | bytearray           # interleaved int16 across `audio_channels`
     audio_sample_rate: int
     audio_channels: int
     frames: List[Tuple[float, np.ndarray]] # (ts, bgr ndarray)
     ssl_events: List[Tuple[float, float, float]]  # (ts, az, conf)
 
+    def release_payloads(self) -> None:
+        """Drop the decoded frames and PCM once perception has consumed them
+        (ids, heading and SSL events stay for the rest of the tick)."""
+        self.frames = []
+        self.audio_pcm = b""
+
 
 # ----- perception engine ------------------------------------------------------
 
@@ -92,13 +116,35 @@ class PerceptionEngine:
     """Lazy-loaded orchestrator. Instantiate once per server process."""
 
     def __init__(self, cfg: BraidConfig):
-        self.cfg = cfg
+        self._base_cfg = cfg
+        self._pinned = threading.local()
         self._lock = threading.Lock()
         self._face_rec = None
         self._diar = None
         self._voice = None
         self._asd_model = None
         self._asd_available = False
+        # One worker per independent branch (video on the face GPU, audio on
+        # the diar/voice GPUs). Native inference releases the GIL, so plain
+        # threads are enough to overlap them.
+        self._branch_pool = ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix="braid-perception",
+        )
+
+    @property
+    def cfg(self) -> BraidConfig:
+        """Snapshot pinned by the tick running on this thread (see ``run``),
+        else the one the engine was built with."""
+        return getattr(self._pinned, "cfg", None) or self._base_cfg
+
+    @contextmanager
+    def _pin(self, cfg: Optional[BraidConfig]):
+        prev = getattr(self._pinned, "cfg", None)
+        self._pinned.cfg = cfg or prev
+        try:
+            yield
+        finally:
+            self._pinned.cfg = prev
 
     # ---------- model getters ----------
 
@@ -174,22 +220,71 @@ class PerceptionEngine:
 
     # ---------- public ----------
 
-    def run(self, bundle: TickBundle) -> RawObservations:
+    def run(self, bundle: TickBundle,
+            cfg: Optional[BraidConfig] = None) -> RawObservations:
         """Full-window pass. Internally:
           1. video: detect/embed/quality per frame, cluster into tracks, avg.
           2. audio: diarize → voice-embed each cluster.
           3. ASD score per (track, frame) subsampled.
           4. SSL stream aggregated into 10° azimuth bins.
+
+        Steps 1 and 2 are independent and run concurrently when
+        ``cfg.parallel_perception`` is set; both are joined before ASD.
+        ``cfg`` (the tick's pinned snapshot) is seen by every step, branch
+        threads included, even if the config is hot-reloaded meanwhile.
         """
+        with self._pin(cfg):
+            return self._run(bundle, self.cfg)
+
+    def _run(self, bundle: TickBundle, cfg: BraidConfig) -> RawObservations:
         t0 = time.time()
-        face_tracks = self._video_pass(bundle)
-        diar_clusters = self._audio_pass(bundle)
-        ssl_bins, az, conf = self._ssl_pass(bundle)
+        timings: Dict[str, float] = {}
+        video_fn = partial(self._video_pass, return_stats=True)
+        if cfg.parallel_perception:
+            video_fut = self._branch_pool.submit(self._timed_branch,
+                                                 video_fn, bundle, cfg)
+            audio_fut = self._branch_pool.submit(self._timed_branch,
+                                                 self._audio_pass, bundle, cfg)
+            t = time.time()
+            ssl_bins, az, conf = self._ssl_pass(bundle)
+            timings["ssl"] = time.time() - t
+            # Join both before raising so a failed branch never leaves the
+            # other one running against the next tick.
+            branch_results = {}
+            failures = []
+            for name, fut in (("video", video_fut), ("audio", audio_fut)):
+                try:
+                    branch_results[name], timings[name] = fut.result()
+                except Exception as e:
+                    failures.append((name, e))
+            if failures:
+                name, e = failures[0]
+                logger.error(f"{C.perception}[perception]{C.r} tick=%d %s branch failed: %s",
+                             bundle.tick_id, name, e)
+                raise PerceptionBranchError(name, e) from e
+            face_tracks, video_stats = branch_results["video"]
+            diar_clusters = branch_results["audio"]
+        else:
+            (face_tracks, video_stats), timings["video"] = self._timed_branch(video_fn, bundle)
+            diar_clusters, timings["audio"] = self._timed_branch(self._audio_pass, bundle)
+            t = time.time()
+            ssl_bins, az, conf = self._ssl_pass(bundle)
+            timings["ssl"] = time.time() - t
+        t = time.time()
         self._score_asd_for_tracks(face_tracks, bundle)
+        for ft in face_tracks:      # ASD was their only consumer
+            ft.gray_crops = []
+        timings["asd"] = time.time() - t
+        timings["total"] = time.time() - t0
         logger.info(
-            f"{C.perception}[perception]{C.r} tick=%d faces=%d clusters=%d ssl_events=%d wall=%.2fs",
+            f"{C.perception}[perception]{C.r} tick=%d faces=%d clusters=%d ssl_events=%d "
+            "wall=%.2fs (video=%.2fs audio=%.2fs asd=%.2fs parallel=%s) "
+            "keyframes=%d/%d embeds=%d reused=%d",
             bundle.tick_id, len(face_tracks), len(diar_clusters),
-            len(bundle.ssl_events), time.time() - t0,
+            len(bundle.ssl_events), timings["total"], timings["video"],
+            timings["audio"], timings["asd"], cfg.parallel_perception,
+            video_stats["keyframes"], video_stats["frames"],
+            video_stats["embeddings"], video_stats["reused"],
         )
         return RawObservations(
             face_tracks=face_tracks,
@@ -198,12 +293,62 @@ class PerceptionEngine:
             ssl_azimuths=az,
             ssl_confidences=conf,
             num_frames=len(bundle.frames),
-            tick_seconds=self.cfg.tick_window_seconds,
+            tick_seconds=cfg.tick_window_seconds,
+            timings=timings,
         )
 
+    def _timed_branch(self, fn, bundle: TickBundle,
+                      cfg: Optional[BraidConfig] = None):
+        t = time.time()
+        with self._pin(cfg):
+            out = fn(bundle)
+        return out, time.time() - t
+
     # ---------- video ----------
 
-    def _video_pass(self, bundle: TickBundle) -> List[FaceTrack]:
+    def _video_pass(self, bundle: TickBundle, keyframe_stride: Optional[int] = None,
+                    reembed_iou: Optional[float] = None,
+                    return_stats: bool = False):
+        """Detect/embed faces and cluster them into per-tick tracks.
+
+        Detection runs on every ``keyframe_stride``-th frame; in between, live
+        tracks are propagated by ``KeyframeScheduler``. The overrides default to
+        ``cfg.video_keyframe_stride`` / ``cfg.video_reembed_iou`` and exist for
+        ``frame_scheduler.tradeoff_report``.
+        """
+        scheduler = KeyframeScheduler(
+            stride=self.cfg.video_keyframe_stride if keyframe_stride is None else keyframe_stride,
+            reembed_iou=self.cfg.video_reembed_iou if reembed_iou is None else reembed_iou,
+            quality_margin=self.cfg.video_reembed_quality_margin,
+        )
+        tracks = self._video_pass_scheduled(bundle, scheduler)
+        return (tracks, scheduler.stats) if return_stats else tracks
+
+    def _detect_faces(self, face_rec, frame: np.ndarray):
+        """Detection + landmarks only. Falls back to the full ``app.get``
+        (which also embeds) if the detector submodel is not exposed."""
+        app = face_rec.app
+        det = getattr(app, "det_model", None)
+        if det is None or "recognition" not in getattr(app, "models", {}):
+            return app.get(frame)
+        from insightface.app.common import Face
+        bboxes, kpss = det.detect(frame, max_num=0, metric='default')
+        if bboxes is None or bboxes.shape[0] == 0:
+            return []
+        return [
+            Face(bbox=bboxes[i, 0:4], kps=None if kpss is None else kpss[i],
+                 det_score=bboxes[i, 4])
+            for i in range(bboxes.shape[0])
+        ]
+
+    @staticmethod
+    def _embed_face(face_rec, frame: np.ndarray, face) -> np.ndarray:
+        if getattr(face, "embedding", None) is None:
+            face_rec.app.models["recognition"].get(frame, face)
+        return np.asarray(face.embedding, dtype=np.float32).reshape(-1)
+
+    def _video_pass_scheduled(self, bundle: TickBundle,
+                              scheduler: KeyframeScheduler) -> List[FaceTrack]:
         face_rec = self._get_face()
         if face_rec is None or not bundle.frames:
             return []
@@ -215,88 +360,100 @@ class PerceptionEngine:
         import cv2
 
         # track-by-embedding: cluster per-frame faces by cosine > 0.5
-        track_store: List[Dict[str, Any]] = []
+        clusterer = FaceTrackClusterer(sim_threshold=0.5)
         cam_matrix_cache: Dict[Tuple[int, int], np.ndarray] = {}
 
-        for ts, frame in bundle.frames:
+        for frame_idx, (ts, frame) in enumerate(bundle.frames):
+            h, w = frame.shape[:2]
+            predicted = scheduler.predict(w, h)
+
+            if not scheduler.is_keyframe(frame_idx):
+                # Between keyframes: carry live tracks on their Kalman box.
+                for t_idx, bbox in predicted.items():
+                    az = self._bbox_to_azimuth(bbox, w)
+                    gray_crop = self._extract_asd_crop(frame, bbox)
+                    clusterer.tracks[t_idx].add_propagated(
+                        ts, bbox, scheduler.last_quality(t_idx), az, gray_crop)
+                    scheduler.stats["propagated"] += 1
+                continue
+
             try:
-                faces = face_rec.app.get(frame)
+                faces = self._detect_faces(face_rec, frame)
             except Exception:
+                scheduler.end_keyframe(())
                 continue
+            scheduler.stats["detections"] += len(faces)
             if not faces:
+                scheduler.end_keyframe(())
                 continue
-            h, w = frame.shape[:2]
             if (h, w) not in cam_matrix_cache:
                 cam_matrix_cache[(h, w)] = face_rec._get_camera_matrix(frame.shape)
             cam_matrix = cam_matrix_cache[(h, w)]
 
-            for face in faces:
-                emb = np.asarray(face.embedding, dtype=np.float32).reshape(-1)
-                emb = emb / (np.linalg.norm(emb) + 1e-8)
-                bbox = tuple(int(v) for v in face.bbox.astype(int))
-                # find track by cosine
-                matched_idx = -1
-                best_sim = -1.0
-                for idx, tr in enumerate(track_store):
-                    sim = float(np.dot(emb, tr["proto"]))
-                    if sim > best_sim and sim > 0.5:
-                        best_sim = sim
-                        matched_idx = idx
-                # face quality Q^face (§2.1)
-                q = self._face_quality(face, frame, bbox, cam_matrix)
+            bboxes = [tuple(int(v) for v in f.bbox.astype(int)) for f in faces]
+            # face quality Q^face (§2.1)
+            quals = [self._face_quality(f, frame, b, cam_matrix)
+                     for f, b in zip(faces, bboxes)]
+
+            # Detections that follow a live track and haven't moved or
+            # sharpened enough keep that track without a recognition forward.
+            matched = scheduler.match(bboxes, predicted)
+            assignment: List[int] = [-1] * len(faces)
+            to_embed: List[int] = []
+            for d in range(len(faces)):
+                t_idx = matched.get(d)
+                if t_idx is not None and not scheduler.needs_embedding(t_idx, bboxes[d], quals[d]):
+                    assignment[d] = t_idx
+                else:
+                    to_embed.append(d)
+
+            embedded: set = set()
+            if to_embed:
+                emb_rows, ok = [], []
+                for d in to_embed:
+                    try:
+                        emb_rows.append(self._embed_face(face_rec, frame, faces[d]))
+                        ok.append(d)
+                    except Exception:
+                        continue
+                if ok:
+                    embs = np.stack(emb_rows, axis=0)
+                    embs /= (np.linalg.norm(embs, axis=1, keepdims=True) + 1e-8)
+                    # one matrix product + joint assignment for the rest of the frame
+                    reused = [t for t in assignment if t >= 0]
+                    for d, t_idx in zip(ok, clusterer.assign(embs, exclude=reused)):
+                        assignment[d] = t_idx
+                        embedded.add(d)
+
+            seen: List[int] = []
+            for d, t_idx in enumerate(assignment):
+                if t_idx < 0:
+                    continue
+                bbox = bboxes[d]
                 az = self._bbox_to_azimuth(bbox, w)
                 gray_crop = self._extract_asd_crop(frame, bbox)
-                if matched_idx < 0:
-                    track_store.append({
-                        "embs": [emb],
-                        "proto": emb.copy(),
-                        "bboxes": [bbox],
-                        "qualities": [q],
-                        "azimuths": [az],
-                        "frame_ts": [ts],
-                        "gray_crops": [gray_crop] if gray_crop is not None else [],
-                        "best_quality_idx": 0,
-                        "best_frame": frame,
-                        "best_bbox": bbox,
-                    })
-                else:
-                    tr = track_store[matched_idx]
-                    tr["embs"].append(emb)
-                    # running mean as proto for future matches
-                    tr["proto"] = np.mean(tr["embs"], axis=0)
-                    tr["proto"] /= (np.linalg.norm(tr["proto"]) + 1e-8)
-                    tr["bboxes"].append(bbox)
-                    tr["qualities"].append(q)
-                    tr["azimuths"].append(az)
-                    tr["frame_ts"].append(ts)
-                    if gray_crop is not None:
-                        tr["gray_crops"].append(gray_crop)
-                    if q > tr["qualities"][tr["best_quality_idx"]]:
-                        tr["best_quality_idx"] = len(tr["qualities"]) - 1
-                        tr["best_frame"] = frame
-                        tr["best_bbox"] = bbox
+                clusterer.tracks[t_idx].add(ts, bbox, quals[d], az, gray_crop, frame)
+                scheduler.observe(t_idx, bbox, quals[d], embedded=d in embedded)
+                seen.append(t_idx)
+            scheduler.end_keyframe(seen)
 
         tracks: List[FaceTrack] = []
-        for i, tr in enumerate(track_store):
-            if not tr["embs"]:
+        for i, tr in enumerate(clusterer.tracks):
+            if tr.count == 0:
                 continue
-            avg = np.mean(tr["embs"], axis=0)
-            avg /= (np.linalg.norm(avg) + 1e-8)
-            q = float(np.mean(tr["qualities"]))
-            az = float(np.mean(tr["azimuths"]))
             # ASD scores populated by _score_asd_for_tracks after audio is known.
-            stub_alpha = [self.cfg.asd_stub_default_alpha] * len(tr["frame_ts"])
+            stub_alpha = [self.cfg.asd_stub_default_alpha] * len(tr.frame_ts)
             ft = FaceTrack(
                 track_id=f"t{i}",
-                avg_embedding=avg,
-                best_bbox=tr["best_bbox"],
-                quality=q,
-                azimuth_rad=az,
+                avg_embedding=clusterer.mean_embedding(i),
+                best_bbox=tr.best_bbox,
+                quality=float(tr.mean_quality),
+                azimuth_rad=float(tr.mean_azimuth),
                 asd_scores=stub_alpha,
-                frame_ts=list(tr["frame_ts"]),
-                representative_image=tr["best_frame"],
+                frame_ts=tr.frame_ts,
+                representative_image=tr.best_frame,
+                gray_crops=tr.gray_crops,
             )
-            ft._gray_crops = tr.get("gray_crops", [])  # type: ignore[attr-defined]
             tracks.append(ft)
             if len(tracks) >= self.cfg.max_persons:
                 break
@@ -386,31 +543,54 @@ class PerceptionEngine:
         for seg in segments:
             by_spk.setdefault(seg["speaker"], []).append(seg)
 
+        # pop: the per-segment copies are dead once concatenated
+        audio_by_spk = {spk: b"".join(s.pop("audio") for s in segs)
+                        for spk, segs in by_spk.items()}
+        embeddings = self._voice_embeddings(voice, audio_by_spk, sr)
+        del audio_by_spk        # embedded; don't hold the audio past this point
+
         clusters: List[DiarizationCluster] = []
         for spk, segs in by_spk.items():
-            audio_concat = b"".join(s["audio"] for s in segs)
             total_dur = sum(s["end"] - s["start"] for s in segs)
             start = min(s["start"] for s in segs)
             end = max(s["end"] for s in segs)
             delta = min(1.0, total_dur / max(1e-3, self.cfg.tick_window_seconds))
-            emb = None
-            if voice is not None and len(audio_concat) > 0:
-                try:
-                    emb = voice.extract_embedding(audio_concat, sample_rate=sr)
-                except Exception as e:
-                    logger.warning(f"{C.perception}[perception]{C.r} voice embed failed for %s: %s", spk, e)
-                    emb = None
             clusters.append(DiarizationCluster(
                 cluster_id=str(spk),
-                voice_embedding=emb,
+                voice_embedding=embeddings.get(spk),
                 start=float(start),
                 end=float(end),
                 duration=float(total_dur),
                 delta=float(delta),
-                audio_bytes=audio_concat,
             ))
         return clusters
 
+    def _voice_embeddings(self, voice, audio_by_spk: Dict[str, bytes],
+                          sr: int) -> Dict[str, Optional[np.ndarray]]:
+        """One voice embedding per speaker, in a single batched encoder call
+        when the encoder has ``extract_embeddings_batch``; otherwise (or if the
+        batch fails) one call per speaker, so a bad clip only loses its own
+        embedding."""
+        spks = [spk for spk, audio in audio_by_spk.items() if len(audio) > 0]
+        if voice is None or not spks:
+            return {}
+        if hasattr(voice, "extract_embeddings_batch"):
+            try:
+                embs = voice.extract_embeddings_batch(
+                    [audio_by_spk[spk] for spk in spks], sample_rate=sr)
+                return dict(zip(spks, embs))
+            except Exception as e:
+                logger.warning(f"{C.perception}[perception]{C.r} batched voice embed failed (%s); "
+                               "falling back to per-speaker", e)
+        out: Dict[str, Optional[np.ndarray]] = {}
+        for spk in spks:
+            try:
+                out[spk] = voice.extract_embedding(audio_by_spk[spk], sample_rate=sr)
+            except Exception as e:
+                logger.warning(f"{C.perception}[perception]{C.r} voice embed failed for %s: %s", spk, e)
+                out[spk] = None
+        return out
+
     # ---------- SSL ----------
 
     def _ssl_pass(self, bundle: TickBundle):
@@ -470,7 +650,8 @@ class PerceptionEngine:
           - MFCC(13) at 100 Hz for the whole mono 16 kHz audio
           - video feat = per-frame grayscale 112×112 crops
           - temporal align on min(audio_secs, video_secs)
-          - multi-scale forward over ASD_DURATION_SET, averaged
+          - multi-scale forward over asd_batch.DURATIONS, averaged (batched
+            across tracks and durations, see asd_batch.py)
           - sigmoid(raw) → [0,1] per video frame
 
         Falls back to the stub (cfg.asd_stub_default_alpha) on any failure.
@@ -523,10 +704,13 @@ class PerceptionEngine:
                 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
         tick_seconds = max(1e-3, self.cfg.tick_window_seconds)
-        DURATIONS = [1, 1, 1, 2, 2, 2, 3, 3, 4, 5, 6]   # asd_pipeline.py
 
+        # Build one aligned input per track; all tracks share the window
+        # audio, so the batched scorer runs each audio-frontend slice once.
+        scored: List[FaceTrack] = []
+        items: List[ASDTrackInput] = []
         for ft in tracks:
-            gray_crops = getattr(ft, "_gray_crops", [])
+            gray_crops = ft.gray_crops
             if not gray_crops:
                 continue
             video_feat = np.stack(gray_crops, axis=0).astype(np.float32)
@@ -547,49 +731,45 @@ class PerceptionEngine:
             v_trim = video_feat[: int(round(length * fps)), :, :]
             if a_trim.shape[0] == 0 or v_trim.shape[0] == 0:
                 continue
+            scored.append(ft)
+            items.append(ASDTrackInput(
+                audio_feat=a_trim, video_feat=v_trim, length=length,
+                video_fps=int(round(fps)), audio_key="tick",
+            ))
 
-            try:
-                multi_scores: List[List[float]] = []
-                with torch.no_grad():
-                    for dur in DURATIONS:
-                        n_batches = int(math.ceil(length / dur))
-                        scores: List[float] = []
-                        for i in range(n_batches):
-                            a_slice = a_trim[i * dur * 100:(i + 1) * dur * 100, :]
-                            v_slice = v_trim[i * dur * int(round(fps)):(i + 1) * dur * int(round(fps)), :, :]
-                            if a_slice.shape[0] == 0 or v_slice.shape[0] == 0:
-                                continue
-                            inputA = torch.as_tensor(a_slice, dtype=torch.float32, device=device).unsqueeze(0)
-                            inputV = torch.as_tensor(v_slice, dtype=torch.float32, device=device).unsqueeze(0)
-                            embedA = model.model.forward_audio_frontend(inputA)
-                            embedV = model.model.forward_visual_frontend(inputV)
-                            out = model.model.forward_audio_visual_backend(embedA, embedV)
-                            raw = model.lossAV.forward(out, labels=None)
-                            # lossAV returns either list-like per-frame scores or tensor
-                            if hasattr(raw, "detach"):
-                                raw = raw.detach().float().cpu().numpy().reshape(-1).tolist()
-                            else:
-                                raw = list(raw)
-                            scores.extend(raw)
-                        if scores:
-                            # pad/trim each scale to T_v for safe averaging
-                            if len(scores) < T_v:
-                                scores = scores + [scores[-1]] * (T_v - len(scores))
-                            else:
-                                scores = scores[:T_v]
-                            multi_scores.append(scores)
-
-                if not multi_scores:
+        if not items:
+            return
+        try:
+            per_track = score_asd_tracks(model, items, device)
+        except Exception as e:
+            logger.warning(f"{C.perception}[perception]{C.r} Light-ASD batched forward failed (%s); "
+                           "keeping stub α", e)
+            return
+
+        for ft, multi_scores in zip(scored, per_track):
+            if multi_scores is None:
+                logger.warning(f"{C.perception}[perception]{C.r} Light-ASD forward failed on %s; "
+                               "keeping stub α for this track", ft.track_id)
+                continue
+            if not multi_scores:
+                continue
+            T_v = len(ft.gray_crops)
+            # pad/trim each scale to T_v for safe averaging
+            padded = []
+            for scores in multi_scores:
+                if scores.size == 0:
                     continue
-                mean_raw = np.mean(np.asarray(multi_scores, dtype=np.float32), axis=0)
-                # Map raw score to α ∈ [0,1]. lossAV outputs are logit-like
-                # around 0 at the speaking/silent boundary → sigmoid is the
-                # natural calibration.
-                alpha = 1.0 / (1.0 + np.exp(-mean_raw))
-                ft.asd_scores = [float(x) for x in alpha.tolist()]
-            except Exception as e:
-                logger.warning(f"{C.perception}[perception]{C.r} Light-ASD forward failed on %s (%s); "
-                               "keeping stub α for this track", ft.track_id, e)
+                if scores.shape[0] < T_v:
+                    scores = np.concatenate(
+                        [scores, np.full(T_v - scores.shape[0], scores[-1], dtype=scores.dtype)])
+                padded.append(scores[:T_v])
+            if not padded:
                 continue
+            mean_raw = np.mean(np.stack(padded, axis=0).astype(np.float32), axis=0)
+            # Map raw score to α ∈ [0,1]. lossAV outputs are logit-like
+            # around 0 at the speaking/silent boundary → sigmoid is the
+            # natural calibration.
+            alpha = 1.0 / (1.0 + np.exp(-mean_raw))
+            ft.asd_scores = [float(x) for x in alpha.tolist()]
 
         logger.info(f"{C.perception}[perception]{C.r} ASD scored %d tracks", len(tracks))
@@ -15,6 +15,7 @@ from typing import Dict, List, Optional, Tuple
 import numpy as np
 
 from .association import PersonObservation
+from .azimuth_lut import gaussian_bins, luts_for
 from .config import BraidConfig
 from .gallery import BraidGallery
 from .log_style import C
@@ -22,6 +23,7 @@ from .log_style import C
 logger = logging.getLogger("braid")
 
 _EPS = 1e-9
+_ZERO = np.zeros(1, dtype=np.float32)
 
 
 def _sigmoid(x: float) -> float:
@@ -42,13 +44,17 @@ def _cosine(a: Optional[np.ndarray], b: Optional[np.ndarray]) -> float:
     return float(np.dot(a.reshape(-1), b.reshape(-1)) / (na * nb))
 
 
-@dataclass
+@dataclass(slots=True)
 class IdentityPosterior:
-    """Marginal identity posterior for one person hypothesis."""
+    """Marginal identity posterior for one person hypothesis.
+
+    ``ids`` is usually the gallery's shared snapshot tuple (see
+    ``BraidGallery.snapshot``), so it is referenced, not copied, per person.
+    """
     person_id: str
-    # ordered ids: first M are gallery, last is ∅
-    ids: List[str] = field(default_factory=list)
-    probs: List[float] = field(default_factory=list)
+    # ordered ids: first K are (scored) gallery entries, last is ∅
+    ids: Tuple[str, ...] = ("__unk__",)
+    probs: np.ndarray = field(default_factory=lambda: np.ones(1))
     p_best: float = 0.0
     p_second: float = 0.0
     p_unk: float = 1.0
@@ -66,9 +72,12 @@ class IdentityPosterior:
 class PosteriorComputer:
     def __init__(self, cfg: BraidConfig):
         self.cfg = cfg
-        self._bin_centers = np.linspace(
-            -math.pi, math.pi, cfg.num_azimuth_bins, endpoint=False
-        ) + (math.pi / cfg.num_azimuth_bins)
+        self._bin_centers = cfg.bin_centers
+        self._uniform = np.full(len(cfg.bin_centers), 1.0 / len(cfg.bin_centers))
+        self._uniform.setflags(write=False)
+        # Lookup tables shared by every computer built from an equivalent
+        # snapshot; a None table → evaluate that Gaussian exactly.
+        self._luts = luts_for(cfg)
 
     # ------ likelihood terms -------------------------------------------------
 
@@ -81,13 +90,12 @@ class PosteriorComputer:
             return 1.0 / (M + 1)
         if face_emb is None or gallery_face is None:
             # Visible but unknown slot
-            return _sigmoid((cfg.lambda_face - cfg.theta_face) / max(_EPS, cfg.beta_face))
+            return cfg.face_unk_lik
         cos = _cosine(face_emb, gallery_face)
-        return _sigmoid((cos - cfg.theta_face) / max(_EPS, cfg.beta_face))
+        return _sigmoid((cos - cfg.theta_face) * cfg.inv_beta_face)
 
     def _p_face_unk(self) -> float:
-        cfg = self.cfg
-        return _sigmoid((cfg.lambda_face - cfg.theta_face) / max(_EPS, cfg.beta_face))
+        return self.cfg.face_unk_lik
 
     def _p_voice(self, voice_emb: Optional[np.ndarray],
                  gallery_voice: Optional[np.ndarray], speaking: bool,
@@ -97,43 +105,41 @@ class PosteriorComputer:
         if not speaking:
             return 1.0 / (M + 1)
         if voice_emb is None or gallery_voice is None:
-            return _sigmoid((cfg.lambda_voice - cfg.theta_voice) / max(_EPS, cfg.beta_voice))
+            return cfg.voice_unk_lik
         cos = _cosine(voice_emb, gallery_voice)
-        return _sigmoid((cos - cfg.theta_voice) / max(_EPS, cfg.beta_voice))
+        return _sigmoid((cos - cfg.theta_voice) * cfg.inv_beta_voice)
 
     def _p_voice_unk(self) -> float:
-        cfg = self.cfg
-        return _sigmoid((cfg.lambda_voice - cfg.theta_voice) / max(_EPS, cfg.beta_voice))
+        return self.cfg.voice_unk_lik
 
-    @staticmethod
-    def _gaussian(x: np.ndarray, mu: float, sigma: float) -> np.ndarray:
-        # wrapped-ish; we keep azimuths in [-π, π] and just use a plain Gaussian
-        diff = x - mu
-        diff = ((diff + math.pi) % (2 * math.pi)) - math.pi
-        return np.exp(-0.5 * (diff / max(_EPS, sigma)) ** 2)
+    # The three location terms below return normalised vectors over the bin
+    # centres. They may be shared/read-only (uniform, LUT rows): don't
+    # modify them in place.
 
     def _p_loc(self, bbox_az: Optional[float], visible: bool) -> np.ndarray:
         if not visible or bbox_az is None:
-            return np.ones_like(self._bin_centers) / len(self._bin_centers)
-        p = self._gaussian(self._bin_centers, bbox_az, self.cfg.sigma_det)
-        s = p.sum()
-        return p / s if s > 0 else np.ones_like(p) / len(p)
+            return self._uniform
+        if self._luts.loc is not None:
+            return self._luts.loc.lookup(bbox_az)
+        return gaussian_bins(self._bin_centers, bbox_az, self.cfg.sigma_det)
 
     def _p_ssl(self, ssl_az: Optional[float], ssl_conf: float,
                speaking: bool) -> np.ndarray:
         if not speaking or ssl_az is None:
-            return np.ones_like(self._bin_centers) / len(self._bin_centers)
+            return self._uniform
         sigma = self.cfg.sigma_0 / math.sqrt(max(0.01, ssl_conf) + 0.01)
-        p = self._gaussian(self._bin_centers, ssl_az, sigma)
-        s = p.sum()
-        return p / s if s > 0 else np.ones_like(p) / len(p)
+        if self._luts.ssl is not None:
+            p = self._luts.ssl.lookup(ssl_az, sigma)
+            if p is not None:
+                return p
+        return gaussian_bins(self._bin_centers, ssl_az, sigma)
 
     def _loc_prior(self, prior_az: Optional[float]) -> np.ndarray:
         if prior_az is None:
-            return np.ones_like(self._bin_centers) / len(self._bin_centers)
-        p = self._gaussian(self._bin_centers, prior_az, self.cfg.sigma_drift)
-        s = p.sum()
-        return p / s if s > 0 else np.ones_like(p) / len(p)
+            return self._uniform
+        if self._luts.drift is not None:
+            return self._luts.drift.lookup(prior_az)
+        return gaussian_bins(self._bin_centers, prior_az, self.cfg.sigma_drift)
 
     # ------ main ------------------------------------------------------------
 
@@ -144,24 +150,43 @@ class PosteriorComputer:
         identity_prior: Optional[Dict[str, float]] = None,
         location_prior_az: Optional[float] = None,
     ) -> IdentityPosterior:
-        """Return identity posterior for one person."""
+        """Return identity posterior for one person.
+
+        With an ANN gallery index, only the ``gallery_candidates_k`` nearest
+        entries per modality (plus ids carried in ``identity_prior``) are
+        scored one by one. The other entries still count towards the gallery
+        size M and the normaliser, as a lumped term scored at cosine 0, so
+        probabilities stay comparable with the exact scan.
+        """
         cfg = self.cfg
-        entries = gallery.entries()
-        gallery_ids = [e.person_id for e in entries]
-        M = len(gallery_ids)
+        if cfg.gallery_index != "exact" and len(gallery) > cfg.gallery_candidates_k:
+            entries = gallery.candidates(
+                person.face_emb if person.visible else None, person.voice_emb,
+                cfg.gallery_candidates_k, extra_ids=identity_prior or (),
+            )
+            ids = tuple(e.person_id for e in entries) + ("__unk__",)
+        else:
+            entries, ids = gallery.snapshot()
+        gallery_ids = ids[:-1]
+        K = len(entries)                      # scored entries
+        M = max(K, len(gallery))              # gallery size
+        rest = M - K                          # unscored entries (ANN only)
 
         # ---- identity prior -------------------------------------------------
         if identity_prior:
             prior = [max(_EPS, float(identity_prior.get(gid, 0.0))) for gid in gallery_ids]
             prior.append(max(_EPS, float(identity_prior.get("__unk__", cfg.p_new))))
-            s = sum(prior)
+            s = sum(prior) + rest * _EPS
             prior = [p / s for p in prior]
+            prior_rest = _EPS / s
         else:
             if M > 0:
                 each = (1.0 - cfg.p_new) / M
-                prior = [each] * M + [cfg.p_new]
+                prior = [each] * K + [cfg.p_new]
+                prior_rest = each
             else:
                 prior = [1.0]  # only unknown
+                prior_rest = 0.0
 
         # ---- ASD / diar → P(S_i=1) -----------------------------------------
         p_asd_speak = person.mean_asd if person.visible else 0.5
@@ -175,10 +200,10 @@ class PosteriorComputer:
         ploc_prior = self._loc_prior(location_prior_az)
 
         # Face / voice likelihood tables indexed by (j including ∅)
-        face_lik = np.zeros(M + 1, dtype=np.float64)
-        voice_lik_s1 = np.zeros(M + 1, dtype=np.float64)
-        face_cos_tbl = np.full(M + 1, -1.0)    # for rank_face
-        voice_cos_tbl = np.full(M + 1, -1.0)   # for rank_voice
+        face_lik = np.zeros(K + 1, dtype=np.float64)
+        voice_lik_s1 = np.zeros(K + 1, dtype=np.float64)
+        face_cos_tbl = np.full(K + 1, -1.0)    # for rank_face
+        voice_cos_tbl = np.full(K + 1, -1.0)   # for rank_voice
 
         for j, entry in enumerate(entries):
             face_lik[j] = self._p_face(person.face_emb, entry.face_emb, person.visible, M)
@@ -186,21 +211,25 @@ class PosteriorComputer:
             face_cos_tbl[j] = _cosine(person.face_emb, entry.face_emb)
             voice_cos_tbl[j] = _cosine(person.voice_emb, entry.voice_emb)
         # ∅ slot
-        face_lik[M] = self._p_face_unk() if person.visible else 1.0 / (M + 1)
-        voice_lik_s1[M] = self._p_voice_unk()
+        face_lik[K] = self._p_face_unk() if person.visible else 1.0 / (M + 1)
+        voice_lik_s1[K] = self._p_voice_unk()
+        # unscored entries, as if at cosine 0 (zero vector → _cosine = 0)
+        face_lik_rest = self._p_face(person.face_emb, _ZERO, person.visible, M)
+        voice_lik_rest = self._p_voice(person.voice_emb, _ZERO, True, M)
 
         # Quality-modulated face likelihood §3.3.1
         q = max(0.0, min(1.0, person.face_quality)) if person.visible else 0.0
         face_lik_eff = np.power(np.clip(face_lik, _EPS, 1.0), q if q > 0 else 0.0)
+        face_lik_rest_eff = min(1.0, max(_EPS, face_lik_rest)) ** q
         if q <= 0:
             face_lik_eff = np.ones_like(face_lik) / (M + 1)
+            face_lik_rest_eff = 1.0 / (M + 1)
 
         # Accumulate joint over azimuth bins, then marginalise.
         # joint[j] = sum_theta P_face_eff(j) * P_loc_vis(theta) * P(j) * P_loc_prior(theta) * Gamma(j,theta)
         # Gamma = sum_S P_voice(j|S) * P(S|asd,V) * P_SSL(theta|ssl,S) * P(S|delta)
-        bins = self._bin_centers
         ssl_s1 = self._p_ssl(person.ssl_azimuth_rad, person.ssl_confidence, True)
-        ssl_s0 = np.ones_like(bins) / len(bins)
+        ssl_s0 = self._uniform
 
         p_s_asd_1 = p_asd_speak
         p_s_asd_0 = 1.0 - p_s_asd_1
@@ -211,33 +240,36 @@ class PosteriorComputer:
         loc_factor = ploc_vis * ploc_prior
         loc_factor = loc_factor / (loc_factor.sum() + _EPS)
 
-        joint = np.zeros(M + 1, dtype=np.float64)
-        for j in range(M + 1):
-            gamma_s1 = voice_lik_s1[j] * p_s_asd_1 * p_s_diar_1  # weight
+        def _gamma(voice_lik: float) -> float:
+            gamma_s1 = voice_lik * p_s_asd_1 * p_s_diar_1  # weight
             gamma_s0 = (1.0 / (M + 1)) * p_s_asd_0 * p_s_diar_0
             # integrate over azimuth:
             integrand = (gamma_s1 * ssl_s1 + gamma_s0 * ssl_s0) * loc_factor
-            gamma_marginal = float(integrand.sum())
-            joint[j] = face_lik_eff[j] * prior[j] * max(_EPS, gamma_marginal)
+            return max(_EPS, float(integrand.sum()))
+
+        joint = np.zeros(K + 1, dtype=np.float64)
+        for j in range(K + 1):
+            joint[j] = face_lik_eff[j] * prior[j] * _gamma(voice_lik_s1[j])
+        joint_rest = (rest * face_lik_rest_eff * prior_rest * _gamma(voice_lik_rest)
+                      if rest else 0.0)
 
-        Z = float(joint.sum())
+        Z = float(joint.sum()) + joint_rest
         if Z <= 0:
-            probs = np.ones(M + 1) / (M + 1)
+            probs = np.ones(K + 1) / (K + 1)
         else:
             probs = joint / Z
 
-        ids = gallery_ids + ["__unk__"]
         # --- marginal metrics ---
         order = np.argsort(-probs)
         p_best = float(probs[order[0]])
         p_second = float(probs[order[1]]) if len(order) > 1 else 0.0
         # "best gallery" excludes ∅
-        gallery_scores = probs[:M] if M > 0 else np.array([])
+        gallery_scores = probs[:K] if K > 0 else np.array([])
         j_best = None
-        if M > 0:
+        if K > 0:
             g_order = np.argsort(-gallery_scores)
             j_best = gallery_ids[int(g_order[0])]
-        p_unk = float(probs[M])
+        p_unk = float(probs[K])
         margin = p_best - p_second
         H = -float(np.sum(probs * np.log(np.clip(probs, _EPS, 1.0))))
         Q_gate = margin * (M + 1)
@@ -245,9 +277,9 @@ class PosteriorComputer:
         # face_rank / voice_rank for j_best (for modality agreement)
         face_rank = -1
         voice_rank = -1
-        if j_best is not None and M > 0:
-            face_rank = int(np.argsort(-face_cos_tbl[:M]).tolist().index(gallery_ids.index(j_best)))
-            voice_rank = int(np.argsort(-voice_cos_tbl[:M]).tolist().index(gallery_ids.index(j_best)))
+        if j_best is not None and K > 0:
+            face_rank = int(np.argsort(-face_cos_tbl[:K]).tolist().index(gallery_ids.index(j_best)))
+            voice_rank = int(np.argsort(-voice_cos_tbl[:K]).tolist().index(gallery_ids.index(j_best)))
         # agreement ≡ both modalities rank j_best at position 0
         modality_agreement = (face_rank == 0 and voice_rank == 0) \
             if (person.face_emb is not None and person.voice_emb is not None) else False
@@ -262,7 +294,7 @@ class PosteriorComputer:
         return IdentityPosterior(
             person_id=person.person_id,
             ids=ids,
-            probs=probs.tolist(),
+            probs=probs,
             p_best=p_best, p_second=p_second, p_unk=p_unk,
             j_best=j_best, margin=margin, entropy=H, Q_gate=Q_gate,
             modality_agreement=modality_agreement,
@@ -0,0 +1,506 @@
+"""Record / replay of BRAID tick bundles.
+
+Recording (``BraidServiceServicer`` with ``record_dir`` set) stores every
+assembled ``TickBundle`` as one uncompressed zip:
+
+    <record_dir>/<session_id>/tick_<tick_id>_<ms>.braidtick
+        meta.json        # tick/session ids, heading, audio format, frame ts, SSL events
+        audio.pcm        # interleaved int16 as received
+        frames/<n>.jpg   # the client's JPEG bytes, untouched
+
+Replay pushes a directory of recordings through ``run_tick`` against a
+throwaway gallery, so the live gallery is never written. ``StubPerceptionEngine``
+swaps the GPU models for small deterministic CPU stand-ins (Haar face
+detector, pixel-projection face embedding, energy VAD, spectral voice
+embedding, ASD stub α); any of them can be replaced by passing a real model.
+
+Each replayed tick yields one JSON record with per-phase timings and the
+per-person decisions. ``diff_runs`` compares two runs tick by tick, which is
+what ``tools/braid_replay.py --baseline`` uses as a regression gate.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import math
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .config import BraidConfig
+from .gallery import BraidGallery
+from .log_style import C
+from .perception import PerceptionEngine, TickBundle
+from .temporal import SessionState
+from .tick import BraidTickResult, run_tick
+
+logger = logging.getLogger("braid")
+
+FORMAT_VERSION = 1
+SUFFIX = ".braidtick"
+
+
+# ----- on-disk format ---------------------------------------------------------
+
+def save_bundle(path: str | Path, bundle: TickBundle,
+                jpegs: Sequence[Tuple[float, bytes]]) -> Path:
+    """Write ``bundle`` to ``path``. ``jpegs`` are the ``(ts, jpeg_bytes)``
+    pairs as received; decoded frames in ``bundle.frames`` are not stored."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    meta = {
+        "version": FORMAT_VERSION,
+        "tick_id": bundle.tick_id,
+        "session_id": bundle.session_id,
+        "window_start_ts": bundle.window_start_ts,
+        "robot_heading_rad": bundle.robot_heading_rad,
+        "audio_sample_rate": bundle.audio_sample_rate,
+        "audio_channels": bundle.audio_channels,
+        "frame_ts": [float(ts) for ts, _ in jpegs],
+        "ssl_events": [list(e) for e in bundle.ssl_events],
+        "recorded_at": time.time(),
+    }
+    tmp = path.with_suffix(path.suffix + ".part")
+    with zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_STORED) as zf:
+        zf.writestr("meta.json", json.dumps(meta))
+        zf.writestr("audio.pcm", bundle.audio_pcm)
+        for i, (_, jpeg) in enumerate(jpegs):
+            zf.writestr(f"frames/{i:05d}.jpg", jpeg)
+    tmp.replace(path)
+    return path
+
+
+def load_bundle(path: str | Path) -> TickBundle:
+    """Inverse of ``save_bundle``; JPEGs are decoded with OpenCV."""
+    import cv2
+
+    with zipfile.ZipFile(path, "r") as zf:
+        meta = json.loads(zf.read("meta.json"))
+        if int(meta.get("version", 0)) > FORMAT_VERSION:
+            raise ValueError(f"{path}: recording format v{meta['version']} is newer "
+                             f"than supported v{FORMAT_VERSION}")
+        audio = zf.read("audio.pcm")
+        frames = []
+        for i, ts in enumerate(meta["frame_ts"]):
+            arr = np.frombuffer(zf.read(f"frames/{i:05d}.jpg"), dtype=np.uint8)
+            img = cv2.imdecode(arr, cv2.IMREAD_COLOR)
+            if img is not None:
+                frames.append((float(ts), img))
+    return TickBundle(
+        tick_id=int(meta["tick_id"]),
+        session_id=str(meta["session_id"]),
+        window_start_ts=float(meta["window_start_ts"]),
+        robot_heading_rad=float(meta["robot_heading_rad"]),
+        audio_pcm=audio,
+        audio_sample_rate=int(meta["audio_sample_rate"]),
+        audio_channels=int(meta["audio_channels"]),
+        frames=frames,
+        ssl_events=[tuple(float(v) for v in e) for e in meta["ssl_events"]],
+    )
+
+
+def iter_recordings(root: str | Path) -> List[Path]:
+    """All recordings under ``root``, ordered by (session, tick_id, time)."""
+    def _key(p: Path):
+        stem = p.stem.split("_")      # tick_<id>_<ms>
+        try:
+            return (p.parent.name, int(stem[1]), int(stem[2]))
+        except (IndexError, ValueError):
+            return (p.parent.name, 0, 0)
+    return sorted(Path(root).rglob(f"*{SUFFIX}"), key=_key)
+
+
+class BundleRecorder:
+    """Persists bundles under ``root/<session_id>/``. Never raises: a failed
+    write is logged and the tick proceeds."""
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def record(self, bundle: TickBundle,
+               jpegs: Sequence[Tuple[float, bytes]]) -> Optional[Path]:
+        safe_session = "".join(ch if ch.isalnum() or ch in "-_." else "_"
+                               for ch in bundle.session_id) or "default"
+        path = (self.root / safe_session
+                / f"tick_{bundle.tick_id:06d}_{int(time.time() * 1000)}{SUFFIX}")
+        try:
+            save_bundle(path, bundle, jpegs)
+        except Exception as e:
+            logger.warning(f"{C.grpc}[record]{C.r} failed to record tick=%d: %s",
+                           bundle.tick_id, e)
+            return None
+        logger.info(f"{C.grpc}[record]{C.r} tick=%d → %s (%d frames, %dB audio)",
+                    bundle.tick_id, path, len(jpegs), len(bundle.audio_pcm))
+        return path
+
+
+# ----- CPU stand-in models ----------------------------------------------------
+
+class _StubFace:
+    """Attribute bag shaped like ``insightface.app.common.Face``."""
+
+    def __init__(self, bbox: np.ndarray, kps: np.ndarray, det_score: float,
+                 embedding: np.ndarray):
+        self.bbox = bbox
+        self.kps = kps
+        self.det_score = det_score
+        self.embedding = embedding
+
+
+class _StubFaceApp:
+    """OpenCV Haar detector + a fixed random projection of the grayscale
+    face crop as the 512-d embedding. Deterministic for identical frames."""
+
+    EMB_DIM = 512
+    CROP = 24
+
+    def __init__(self, seed: int = 0):
+        import cv2
+        self._cascade = cv2.CascadeClassifier(
+            cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+        rng = np.random.default_rng(seed)
+        self._proj = rng.standard_normal(
+            (self.CROP * self.CROP, self.EMB_DIM)).astype(np.float32)
+
+    @staticmethod
+    def _kps(x1: float, y1: float, w: float, h: float) -> np.ndarray:
+        # eyes, nose, mouth corners at canonical proportions of the box
+        rel = np.array([[0.3, 0.4], [0.7, 0.4], [0.5, 0.6],
+                        [0.35, 0.8], [0.65, 0.8]], dtype=np.float32)
+        return rel * np.array([w, h], dtype=np.float32) + np.array([x1, y1], dtype=np.float32)
+
+    def get(self, frame: np.ndarray) -> List[_StubFace]:
+        import cv2
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        rects = self._cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5,
+                                               minSize=(32, 32))
+        faces: List[_StubFace] = []
+        for (x, y, w, h) in (rects if len(rects) else []):
+            crop = cv2.resize(gray[y:y + h, x:x + w], (self.CROP, self.CROP)).astype(np.float32)
+            crop = (crop - crop.mean()) / (crop.std() + 1e-6)
+            emb = crop.reshape(-1) @ self._proj
+            emb /= (np.linalg.norm(emb) + 1e-8)
+            faces.append(_StubFace(
+                bbox=np.array([x, y, x + w, y + h], dtype=np.float32),
+                kps=self._kps(x, y, w, h),
+                det_score=1.0,
+                embedding=emb,
+            ))
+        return faces
+
+
+class StubFaceRecognizer:
+    """Exposes the two members ``_video_pass`` touches: ``app.get`` and
+    ``_get_camera_matrix``. No ``det_model`` so the full-``get`` path is used."""
+
+    def __init__(self, hfov_rad: float, seed: int = 0):
+        self.app = _StubFaceApp(seed)
+        self._hfov = hfov_rad
+
+    def _get_camera_matrix(self, img_shape) -> np.ndarray:
+        h, w = img_shape[:2]
+        f = (w / 2.0) / math.tan(self._hfov / 2.0)
+        return np.array([[f, 0, w / 2.0], [0, f, h / 2.0], [0, 0, 1]], dtype=np.float64)
+
+
+class StubDiarizer:
+    """Energy VAD over 0.5 s windows; each speech run is labelled by its
+    spectral-centroid band so different voices tend to split."""
+
+    WIN_S = 0.5
+
+    def __init__(self, max_speakers: int = 4, energy_db: float = -40.0):
+        self.max_speakers = max(1, int(max_speakers))
+        self.energy_db = float(energy_db)
+
+    def diarize(self, audio_data: bytes, sample_rate: int = 16000) -> List[dict]:
+        pcm = np.frombuffer(audio_data, dtype=np.int16)
+        win = max(1, int(self.WIN_S * sample_rate))
+        n = pcm.shape[0] // win
+        if n == 0:
+            return []
+        x = pcm[: n * win].astype(np.float32).reshape(n, win) / 32768.0
+        rms_db = 20.0 * np.log10(np.sqrt((x ** 2).mean(axis=1)) + 1e-9)
+        spec = np.abs(np.fft.rfft(x, axis=1))
+        freqs = np.fft.rfftfreq(win, 1.0 / sample_rate)
+        centroid = (spec * freqs).sum(axis=1) / (spec.sum(axis=1) + 1e-9)
+        band = np.minimum((centroid / (sample_rate / 8.0) * self.max_speakers).astype(int),
+                          self.max_speakers - 1)
+
+        segments: List[dict] = []
+        run_start: Optional[int] = None
+        for i in range(n + 1):
+            speech = i < n and rms_db[i] > self.energy_db
+            same = (speech and run_start is not None and band[i] == band[run_start])
+            if run_start is not None and not same:
+                a0, a1 = run_start * win, i * win
+                segments.append({
+                    "speaker": f"SPEAKER_{int(band[run_start]):02d}",
+                    "start": run_start * self.WIN_S,
+                    "end": i * self.WIN_S,
+                    "audio": pcm[a0:a1].tobytes(),
+                })
+                run_start = None
+            if speech and run_start is None:
+                run_start = i
+        return segments
+
+
+class StubVoiceEncoder:
+    """Log-spectrum pooled into ``dim`` bands, mean over 32 ms frames."""
+
+    def __init__(self, dim: int = 192):
+        self.dim = int(dim)
+
+    def extract_embedding(self, audio_data: bytes, sample_rate: int = 16000) -> np.ndarray:
+        pcm = np.frombuffer(audio_data, dtype=np.int16).astype(np.float32) / 32768.0
+        frame = max(2 * self.dim, int(0.032 * sample_rate))
+        n = pcm.shape[0] // frame
+        if n == 0:
+            raise ValueError("audio shorter than one frame")
+        spec = np.log1p(np.abs(np.fft.rfft(pcm[: n * frame].reshape(n, frame), axis=1)))
+        bands = np.array_split(spec.mean(axis=0), self.dim)
+        emb = np.array([b.mean() for b in bands], dtype=np.float32)
+        emb -= emb.mean()
+        return emb / (np.linalg.norm(emb) + 1e-8)
+
+
+class StubPerceptionEngine(PerceptionEngine):
+    """``PerceptionEngine`` with CPU stand-ins. Pass ``face``/``diar``/``voice``
+    to plug in any object with the same interface (e.g. a real model)."""
+
+    def __init__(self, cfg: BraidConfig, face=None, diar=None, voice=None):
+        super().__init__(cfg)
+        self._face_rec = face if face is not None else StubFaceRecognizer(cfg.camera_hfov)
+        self._diar = diar if diar is not None else StubDiarizer(cfg.max_persons)
+        self._voice = voice if voice is not None else StubVoiceEncoder()
+        self._asd_available = False     # Light-ASD needs the GPU weights; use stub α
+
+    def _get_asd(self):
+        return None
+
+
+# ----- replay -----------------------------------------------------------------
+
+def _tick_record(path: Path, res: BraidTickResult, load_s: float) -> dict:
+    return {
+        "recording": path.name,
+        "session_id": res.session_id,
+        "tick_id": res.tick_id,
+        "load_seconds": load_s,
+        "tick_wall_seconds": res.tick_wall_seconds,
+        "phases": res.phase_seconds,
+        "persons": [{
+            "stable_id": r.stable_id,
+            "state": r.decision.state.value,
+            "identity": r.decision.identity or "",
+            "p_best": round(float(r.posterior.p_best), 4),
+            "p_unk": round(float(r.posterior.p_unk), 4),
+            "visible": bool(r.observation.visible),
+        } for r in res.persons],
+        "action": {
+            "type": res.action.type,
+            "magnitude": round(float(res.action.magnitude), 4),
+            "target_person_id": res.action.target_person_id or "",
+        },
+    }
+
+
+def replay(recordings: Iterable[Path], engine: PerceptionEngine, cfg: BraidConfig,
+           gallery_seed: Optional[str | Path] = None,
+           trace_alloc: bool = False) -> Iterator[dict]:
+    """Run each recording through ``run_tick`` in order, one ``SessionState``
+    per session, against a temporary copy of ``gallery_seed`` (or an empty
+    gallery). Yields one record per tick.
+
+    With ``trace_alloc`` each record also gets ``alloc``: the tracemalloc
+    peak above the pre-tick baseline (bundle already loaded) and the net
+    change once the tick returns. Tracing slows Python-heavy phases down,
+    so don't compare those timings against an untraced baseline.
+    """
+    tmp = Path(tempfile.mkdtemp(prefix="braid_replay_"))
+    if trace_alloc:
+        tracemalloc.start()
+    try:
+        gdir = tmp / "gallery"
+        if gallery_seed:
+            shutil.copytree(gallery_seed, gdir)
+        gallery = BraidGallery(gdir, index=cfg.gallery_index, nprobe=cfg.gallery_ann_nprobe)
+        sessions: Dict[str, SessionState] = {}
+        for path in recordings:
+            t = time.time()
+            bundle = load_bundle(path)
+            load_s = time.time() - t
+            session = sessions.setdefault(bundle.session_id,
+                                          SessionState(session_id=bundle.session_id))
+            if trace_alloc:
+                tracemalloc.reset_peak()
+                before = tracemalloc.get_traced_memory()[0]
+            res = run_tick(bundle, engine, gallery, session, cfg)
+            rec = _tick_record(path, res, load_s)
+            if trace_alloc:
+                after, peak = tracemalloc.get_traced_memory()
+                rec["alloc"] = {"peak_mb": round((peak - before) / 1e6, 3),
+                                "net_kb": round((after - before) / 1e3, 1)}
+            del bundle, res
+            yield rec
+    finally:
+        if trace_alloc:
+            tracemalloc.stop()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _decision_key(rec: dict) -> Tuple:
+    persons = tuple(sorted((p["stable_id"], p["state"], p["identity"])
+                           for p in rec["persons"]))
+    return persons, rec["action"]["type"], rec["action"]["target_person_id"]
+
+
+def diff_runs(baseline: List[dict], current: List[dict]) -> dict:
+    """Tick-by-tick decision diffs and median per-phase timing ratios."""
+    base = {(r["session_id"], r["tick_id"]): r for r in baseline}
+    diffs: List[dict] = []
+    for rec in current:
+        key = (rec["session_id"], rec["tick_id"])
+        b = base.get(key)
+        if b is None:
+            diffs.append({"session_id": key[0], "tick_id": key[1], "kind": "new_tick"})
+            continue
+        if _decision_key(b) != _decision_key(rec):
+            diffs.append({
+                "session_id": key[0], "tick_id": key[1], "kind": "decision",
+                "baseline": {"persons": b["persons"], "action": b["action"]},
+                "current": {"persons": rec["persons"], "action": rec["action"]},
+            })
+    seen = {(r["session_id"], r["tick_id"]) for r in current}
+    diffs.extend({"session_id": k[0], "tick_id": k[1], "kind": "missing_tick"}
+                 for k in base if k not in seen)
+
+    def _median_phases(records: List[dict]) -> Dict[str, float]:
+        keys = {k for r in records for k in r["phases"]} | {"total"}
+        out = {}
+        for k in keys:
+            vals = [r["tick_wall_seconds"] if k == "total" else r["phases"].get(k)
+                    for r in records]
+            vals = [v for v in vals if v is not None]
+            if vals:
+                out[k] = statistics.median(vals)
+        return out
+
+    bm, cm = _median_phases(baseline), _median_phases(current)
+    timing = {k: {"baseline": bm[k], "current": cm[k],
+                  "ratio": cm[k] / bm[k] if bm[k] > 0 else float("inf")}
+              for k in sorted(bm.keys() & cm.keys())}
+    return {"decision_diffs": diffs, "timing": timing}
+
+
+def read_jsonl(path: str | Path) -> List[dict]:
+    with open(path, "r") as fh:
+        return [json.loads(line) for line in fh if line.strip()]
+
+
+def _tradeoff_main(engine: PerceptionEngine, paths: List[Path], args) -> int:
+    """``--tradeoff``: one row per stride, averaged over the recordings."""
+    from .frame_scheduler import tradeoff_report
+
+    bundles = (load_bundle(p) for p in paths)
+    rows = tradeoff_report(engine, bundles, strides=args.strides,
+                           reembed_iou=args.reembed_iou)
+    if args.out:
+        with open(args.out, "w") as fh:
+            for row in rows:
+                fh.write(json.dumps(row) + "\n")
+    print(f"{'stride':>6} {'wall_s':>7} {'speedup':>7} {'det':>6} {'embed':>6} "
+          f"{'emb_ratio':>9} {'matched':>7} {'emb_cos':>7} {'az_err':>7} {'recall':>6}")
+    for r in rows:
+        print(f"{int(r['stride']):>6} {r['wall_s']:>7.2f} {r['speedup']:>6.2f}x "
+              f"{r['detector_calls']:>6.0f} {r['embed_calls']:>6.0f} {r['embed_ratio']:>9.2f} "
+              f"{r['matched']:>7.2f} {r['emb_cos']:>7.3f} {r['az_err_deg']:>6.2f}° "
+              f"{r['frame_recall']:>6.2f}")
+    return 0
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    import argparse
+    from .config import load_config
+
+    parser = argparse.ArgumentParser(description="Replay recorded BRAID ticks offline")
+    parser.add_argument("recordings", help="directory of *.braidtick files (searched recursively)")
+    parser.add_argument("--models", choices=["stub", "real"], default="stub",
+                        help="perception models: CPU stand-ins (default) or the real GPU stack")
+    parser.add_argument("--config", default=None, help="braid_config.yaml override")
+    parser.add_argument("--gallery", default=None,
+                        help="gallery dir to seed from (copied; never written)")
+    parser.add_argument("--out", default=None, help="write per-tick records as JSONL")
+    parser.add_argument("--baseline", default=None, help="JSONL from a previous run to diff against")
+    parser.add_argument("--max-decision-diffs", type=int, default=0,
+                        help="fail if more ticks than this differ from the baseline")
+    parser.add_argument("--max-slowdown", type=float, default=None,
+                        help="fail if median total tick time exceeds baseline by this ratio")
+    parser.add_argument("--max-tick-alloc-mb", type=float, default=None,
+                        help="trace allocations (tracemalloc) and fail if any tick's "
+                             "Python-heap peak exceeds this many MB")
+    parser.add_argument("--tradeoff", action="store_true",
+                        help="instead of replaying ticks, report keyframe stride vs "
+                             "accuracy of the video pass (frame_scheduler.tradeoff_report)")
+    parser.add_argument("--strides", type=int, nargs="+", default=[1, 2, 3, 5, 8],
+                        help="keyframe strides for --tradeoff")
+    parser.add_argument("--reembed-iou", type=float, default=None,
+                        help="re-embed IoU for --tradeoff (default: video_reembed_iou)")
+    args = parser.parse_args(argv)
+    trace_alloc = args.max_tick_alloc_mb is not None
+
+    cfg = load_config(args.config)
+    engine = StubPerceptionEngine(cfg) if args.models == "stub" else PerceptionEngine(cfg)
+    paths = iter_recordings(args.recordings)
+    if not paths:
+        print(f"no {SUFFIX} files under {args.recordings}")
+        return 2
+    if args.tradeoff:
+        return _tradeoff_main(engine, paths, args)
+
+    records: List[dict] = []
+    out_fh = open(args.out, "w") if args.out else None
+    try:
+        for rec in replay(paths, engine, cfg, gallery_seed=args.gallery,
+                          trace_alloc=trace_alloc):
+            records.append(rec)
+            if out_fh:
+                out_fh.write(json.dumps(rec) + "\n")
+            phases = " ".join(f"{k}={v:.3f}" for k, v in rec["phases"].items())
+            alloc = (f" alloc_peak={rec['alloc']['peak_mb']:.2f}MB net={rec['alloc']['net_kb']:.0f}KB"
+                     if trace_alloc else "")
+            print(f"{rec['session_id']}#{rec['tick_id']} wall={rec['tick_wall_seconds']:.3f}s "
+                  f"persons={len(rec['persons'])} action={rec['action']['type']} {phases}{alloc}")
+    finally:
+        if out_fh:
+            out_fh.close()
+
+    alloc_failed = False
+    if trace_alloc and records:
+        worst = max(records, key=lambda r: r["alloc"]["peak_mb"])
+        alloc_failed = worst["alloc"]["peak_mb"] > args.max_tick_alloc_mb
+        print(f"max tick alloc peak: {worst['alloc']['peak_mb']:.2f}MB "
+              f"({worst['session_id']}#{worst['tick_id']}, bound {args.max_tick_alloc_mb:g}MB)  →  "
+              f"{'FAIL' if alloc_failed else 'OK'}")
+    if not args.baseline:
+        return 1 if alloc_failed else 0
+    report = diff_runs(read_jsonl(args.baseline), records)
+    for k, t in report["timing"].items():
+        print(f"timing {k:<28} base={t['baseline']:.3f}s now={t['current']:.3f}s x{t['ratio']:.2f}")
+    for d in report["decision_diffs"]:
+        print(f"diff {d['session_id']}#{d['tick_id']} {d['kind']}")
+    failed = len(report["decision_diffs"]) > args.max_decision_diffs
+    total = report["timing"].get("total")
+    if args.max_slowdown is not None and total and total["ratio"] > args.max_slowdown:
+        failed = True
+    print(f"decision diffs: {len(report['decision_diffs'])}  →  {'FAIL' if failed else 'OK'}")
+    return 1 if failed or alloc_failed else 0
@@ -0,0 +1,177 @@
+"""Tick admission for ``BraidServiceServicer``.
+
+Several robots share one GPU box. ``TickScheduler.run`` wraps each tick so
+that:
+
+  * ticks of one ``session_id`` run one at a time (they share ``SessionState``);
+  * at most ``max_concurrent`` ticks run at once across all sessions;
+  * a tick still waiting when a newer tick of the same session arrives is
+    dropped (``coalesce``) — the robot only acts on the latest window — and a
+    tick older than one already queued or running is rejected outright
+    (a lower id after the session went idle is a client restart, not stale);
+  * at most ``max_queued`` ticks wait at any time.
+
+Rejections raise ``TickRejected`` with a ``reason`` the servicer maps to a
+gRPC status. ``stats()`` exports queue depth, wait times and counters.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional, TypeVar
+
+from .log_style import C
+
+logger = logging.getLogger("braid")
+
+T = TypeVar("T")
+
+
+class TickRejected(RuntimeError):
+    """A tick was not run. ``reason`` is one of ``superseded``, ``stale``,
+    ``queue_full`` or ``timeout``."""
+
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+@dataclass
+class _SessionSlot:
+    lock: threading.Lock
+    newest_seq: int = 0            # arrival seq of the newest tick seen
+    active: Dict[int, int] = field(default_factory=dict)   # seq → tick_id, queued or running
+    waiting: int = 0
+
+
+class TickScheduler:
+    def __init__(self, max_concurrent: int = 1, max_queued: int = 16,
+                 coalesce: bool = True, wait_timeout_s: float = 300.0):
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.max_queued = max(1, int(max_queued))
+        self.coalesce = bool(coalesce)
+        self.wait_timeout_s = float(wait_timeout_s)
+        self._gpu = threading.BoundedSemaphore(self.max_concurrent)
+        self._lock = threading.Lock()
+        self._slots: Dict[str, _SessionSlot] = {}
+        self._seq = 0
+        self._waiting = 0
+        self._running = 0
+        self._counters: Dict[str, int] = {
+            "admitted": 0, "completed": 0, "failed": 0,
+            "superseded": 0, "stale": 0, "queue_full": 0, "timeout": 0,
+        }
+        self._wait_last = 0.0
+        self._wait_max = 0.0
+        self._wait_ewma = 0.0
+
+    # ---- helpers -----------------------------------------------------------
+
+    def _slot(self, session_id: str) -> _SessionSlot:
+        slot = self._slots.get(session_id)
+        if slot is None:
+            slot = self._slots[session_id] = _SessionSlot(lock=threading.Lock())
+        return slot
+
+    def _reject(self, reason: str, message: str) -> TickRejected:
+        self._counters[reason] += 1
+        logger.warning(f"{C.grpc}[sched]{C.r} reject (%s): %s", reason, message)
+        return TickRejected(reason, message)
+
+    def _acquire(self, lock, deadline: float) -> bool:
+        return lock.acquire(timeout=max(0.0, deadline - time.time()))
+
+    def forget(self, session_id: str) -> None:
+        """Drop bookkeeping for an evicted session (no-op while it is busy)."""
+        with self._lock:
+            slot = self._slots.get(session_id)
+            if slot is not None and not slot.active:
+                del self._slots[session_id]
+
+    # ---- public ------------------------------------------------------------
+
+    def run(self, session_id: str, tick_id: int, fn: Callable[[], T]) -> T:
+        t0 = time.time()
+        deadline = t0 + self.wait_timeout_s
+        with self._lock:
+            slot = self._slot(session_id)
+            newest_active = max(slot.active.values(), default=None)
+            if newest_active is not None and tick_id < newest_active:
+                raise self._reject("stale", f"session={session_id} tick={tick_id} "
+                                            f"older than in-flight tick={newest_active}")
+            if self._waiting >= self.max_queued:
+                raise self._reject("queue_full", f"session={session_id} tick={tick_id} "
+                                                 f"queue depth={self._waiting}")
+            self._seq += 1
+            seq = self._seq
+            slot.newest_seq = seq
+            slot.active[seq] = tick_id
+            slot.waiting += 1
+            self._waiting += 1
+
+        session_held = gpu_held = False
+        try:
+            session_held = self._acquire(slot.lock, deadline)
+            if session_held and self.coalesce and slot.newest_seq != seq:
+                with self._lock:
+                    raise self._reject("superseded", f"session={session_id} tick={tick_id} "
+                                                     "superseded by a newer queued tick")
+            if session_held:
+                gpu_held = self._acquire(self._gpu, deadline)
+            if not gpu_held:
+                with self._lock:
+                    raise self._reject("timeout", f"session={session_id} tick={tick_id} "
+                                                  f"waited > {self.wait_timeout_s:.0f}s")
+            wait = time.time() - t0
+            with self._lock:
+                slot.waiting -= 1
+                self._waiting -= 1
+                self._running += 1
+                self._counters["admitted"] += 1
+                self._wait_last = wait
+                self._wait_max = max(self._wait_max, wait)
+                self._wait_ewma = (wait if self._counters["admitted"] == 1
+                                   else 0.8 * self._wait_ewma + 0.2 * wait)
+                depth = self._waiting
+            logger.info(f"{C.grpc}[sched]{C.r} admit session=%s tick=%d wait=%.2fs "
+                        "running=%d queued=%d", session_id, tick_id, wait,
+                        self._running, depth)
+            try:
+                out = fn()
+            except Exception:
+                with self._lock:
+                    self._counters["failed"] += 1
+                raise
+            with self._lock:
+                self._counters["completed"] += 1
+            return out
+        finally:
+            with self._lock:
+                slot.active.pop(seq, None)
+                if gpu_held:
+                    self._running -= 1
+                else:
+                    slot.waiting -= 1
+                    self._waiting -= 1
+            if gpu_held:
+                self._gpu.release()
+            if session_held:
+                slot.lock.release()
+
+    def stats(self, session_id: Optional[str] = None) -> Dict[str, float]:
+        with self._lock:
+            out: Dict[str, float] = {
+                "queue_depth": float(self._waiting),
+                "running": float(self._running),
+                "max_concurrent": float(self.max_concurrent),
+                "wait_last_s": self._wait_last,
+                "wait_ewma_s": self._wait_ewma,
+                "wait_max_s": self._wait_max,
+                "sessions": float(len(self._slots)),
+            }
+            out.update({k: float(v) for k, v in self._counters.items()})
+            if session_id is not None and session_id in self._slots:
+                out["session_queue_depth"] = float(self._slots[session_id].waiting)
+        return out
@@ -0,0 +1,300 @@
+"""Bounded ``SessionState`` store for long-running BRAID servers.
+
+``SessionManager`` replaces the servicer's plain dict:
+
+  * sessions idle for longer than ``idle_ttl_s`` are evicted;
+  * at most ``max_sessions`` are kept, least recently used evicted first;
+  * each session keeps at most ``max_memories`` person memories — the ones
+    matched least recently (oldest ``last_tick_id``) are pruned first;
+  * with ``snapshot_dir`` set, evicted sessions are written to disk and
+    restored on the robot's next tick, so it resumes with its memories.
+
+A session is only evicted while no tick holds a ``lease`` on it. The memory
+cap is applied by ``after_tick`` from inside the caller's per-session
+serialised section (the ``TickScheduler`` callable), since ``run_tick``
+mutates ``state.memories`` without a lock. Snapshot restores run outside the
+table lock; concurrent leases of a restoring session wait for it.
+``memory_bytes`` / ``gauges`` report each session's size as recorded by its
+last ``after_tick`` — they never walk another session's live memories.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from .log_style import C
+from .temporal import PersonMemory, SessionState
+
+logger = logging.getLogger("braid")
+
+_MEMORY_OVERHEAD_BYTES = 256        # slotted dataclass + array headers, rough
+_PRIOR_ID_BYTES = 8                 # one tuple slot; the id strings are shared
+
+
+@dataclass
+class _Entry:
+    state: SessionState
+    last_access: float
+    leases: int = 0
+    bytes: int = 0                  # recorded by after_tick / restore
+    memories: int = 0
+    ready: threading.Event = field(default_factory=threading.Event)
+
+
+def memory_bytes(state: SessionState) -> int:
+    """Approximate bytes held by ``state`` (embeddings + priors + overhead)."""
+    total = _MEMORY_OVERHEAD_BYTES
+    for mem in state.memories.values():
+        total += (_MEMORY_OVERHEAD_BYTES + _PRIOR_ID_BYTES * len(mem.prior_ids)
+                  + int(mem.prior_probs.nbytes))
+        for emb in (mem.face_emb, mem.voice_emb):
+            if emb is not None:
+                total += int(emb.nbytes)
+    return total
+
+
+def prune_memories(state: SessionState, max_memories: int) -> List[str]:
+    """Drop the least recently matched memories beyond ``max_memories``."""
+    excess = len(state.memories) - max_memories
+    if excess <= 0:
+        return []
+    order = sorted(state.memories.values(), key=lambda m: (m.last_tick_id, m.stable_id))
+    dropped = [m.stable_id for m in order[:excess]]
+    for sid in dropped:
+        del state.memories[sid]
+    return dropped
+
+
+# ----- snapshots ----------------------------------------------------------------
+
+def _safe_name(session_id: str) -> str:
+    return "".join(ch if ch.isalnum() or ch in "-_." else "_" for ch in session_id) or "default"
+
+
+def save_snapshot(path: Path, state: SessionState) -> None:
+    """npz of embeddings + a JSON meta string; loadable without pickle."""
+    arrays: Dict[str, np.ndarray] = {}
+    mems = []
+    for i, mem in enumerate(state.memories.values()):
+        if mem.face_emb is not None:
+            arrays[f"face_{i}"] = mem.face_emb
+        if mem.voice_emb is not None:
+            arrays[f"voice_{i}"] = mem.voice_emb
+        mems.append({
+            "stable_id": mem.stable_id,
+            "last_azimuth_rad": mem.last_azimuth_rad,
+            "identity_prior": mem.identity_prior,
+            "last_state": mem.last_state,
+            "last_tick_id": mem.last_tick_id,
+        })
+    meta = {
+        "session_id": state.session_id,
+        "last_heading_rad": state.last_heading_rad,
+        "last_tick_id": state.last_tick_id,
+        "next_stable": state.next_stable,
+        "memories": mems,
+        "saved_at": time.time(),
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".part")
+    with open(tmp, "wb") as fh:
+        np.savez(fh, meta=np.array(json.dumps(meta)), **arrays)
+    tmp.replace(path)
+
+
+def load_snapshot(path: Path) -> SessionState:
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(str(data["meta"]))
+        state = SessionState(
+            session_id=meta["session_id"],
+            last_heading_rad=float(meta["last_heading_rad"]),
+            last_tick_id=int(meta["last_tick_id"]),
+            next_stable=int(meta["next_stable"]),
+        )
+        for i, m in enumerate(meta["memories"]):
+            prior = m["identity_prior"]
+            state.memories[m["stable_id"]] = PersonMemory(
+                stable_id=m["stable_id"],
+                face_emb=data[f"face_{i}"].astype(np.float32) if f"face_{i}" in data.files else None,
+                voice_emb=data[f"voice_{i}"].astype(np.float32) if f"voice_{i}" in data.files else None,
+                last_azimuth_rad=m["last_azimuth_rad"],
+                prior_ids=tuple(prior),
+                prior_probs=np.fromiter(prior.values(), dtype=np.float32, count=len(prior)),
+                last_state=m["last_state"],
+                last_tick_id=int(m["last_tick_id"]),
+            )
+    return state
+
+
+# ----- manager --------------------------------------------------------------------
+
+class SessionManager:
+    def __init__(self, idle_ttl_s: float = 1800.0, max_sessions: int = 64,
+                 max_memories: int = 32, snapshot_dir: Optional[str] = None,
+                 on_evict: Optional[Callable[[str], None]] = None):
+        self.idle_ttl_s = float(idle_ttl_s)
+        self.max_sessions = max(1, int(max_sessions))
+        self.max_memories = max(1, int(max_memories))
+        self.snapshot_dir = Path(snapshot_dir) if snapshot_dir else None
+        self.on_evict = on_evict
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self.evicted = 0
+        self.restored = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _snapshot_path(self, session_id: str) -> Optional[Path]:
+        if self.snapshot_dir is None:
+            return None
+        return self.snapshot_dir / f"{_safe_name(session_id)}.npz"
+
+    def _restore(self, session_id: str) -> Optional[SessionState]:
+        path = self._snapshot_path(session_id)
+        if path is None or not path.exists():
+            return None
+        try:
+            state = load_snapshot(path)
+            path.unlink()
+        except Exception as e:
+            logger.warning(f"{C.temporal}[sessions]{C.r} snapshot restore failed for %s: %s",
+                           session_id, e)
+            return None
+        if state.session_id != session_id:
+            return None
+        with self._lock:
+            self.restored += 1
+        logger.info(f"{C.temporal}[sessions]{C.r} restored session=%s memories=%d from %s",
+                    session_id, len(state.memories), path)
+        return state
+
+    def _evict_locked(self, now: float, keep: Optional[str] = None) -> List[_Entry]:
+        """Pick entries to evict (TTL first, then LRU over the cap) and drop
+        them from the table. Snapshots are written after the lock is released."""
+        out: List[_Entry] = []
+        for sid, e in list(self._entries.items()):
+            if sid != keep and e.leases == 0 and now - e.last_access > self.idle_ttl_s:
+                out.append(self._entries.pop(sid))
+        for sid, e in list(self._entries.items()):     # oldest first
+            if len(self._entries) <= self.max_sessions:
+                break
+            if sid != keep and e.leases == 0:
+                out.append(self._entries.pop(sid))
+        return out
+
+    def _finish_evictions(self, entries: List[_Entry]) -> None:
+        for e in entries:
+            sid = e.state.session_id
+            path = self._snapshot_path(sid)
+            if path is not None and e.state.memories:
+                try:
+                    save_snapshot(path, e.state)
+                except Exception as ex:
+                    logger.warning(f"{C.temporal}[sessions]{C.r} snapshot failed for %s: %s",
+                                   sid, ex)
+            self.evicted += 1
+            if self.on_evict is not None:
+                self.on_evict(sid)
+            logger.info(f"{C.temporal}[sessions]{C.r} evicted session=%s memories=%d "
+                        "idle=%.0fs snapshot=%s", sid, len(e.state.memories),
+                        time.time() - e.last_access, path is not None)
+
+    @contextmanager
+    def lease(self, session_id: str) -> Iterator[SessionState]:
+        """Get-or-create ``session_id`` and pin it for the duration of a tick;
+        idle sessions are swept on the way in. A new entry is pinned before its
+        snapshot is loaded, so the restore runs outside the table lock and
+        other leases of the same session wait for it."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(session_id)
+            restore = entry is None
+            if restore:
+                entry = self._entries[session_id] = _Entry(
+                    state=SessionState(session_id=session_id), last_access=now)
+            self._entries.move_to_end(session_id)
+            entry.last_access = now
+            entry.leases += 1
+            evicted = self._evict_locked(now, keep=session_id)
+        self._finish_evictions(evicted)
+        if restore:
+            try:
+                state = self._restore(session_id)
+                if state is not None:
+                    entry.state = state
+                entry.bytes = memory_bytes(entry.state)
+                entry.memories = len(entry.state.memories)
+            finally:
+                entry.ready.set()
+        else:
+            entry.ready.wait()
+        try:
+            yield entry.state
+        finally:
+            with self._lock:
+                entry.leases -= 1
+                entry.last_access = time.time()
+
+    def after_tick(self, state: SessionState) -> List[str]:
+        """Prune ``state`` to ``max_memories`` and record its size for
+        ``gauges``. Call it where the session's ticks are serialised (right
+        after ``run_tick``), not on lease release: another tick of the same
+        session may be inside ``run_tick`` by then."""
+        dropped = prune_memories(state, self.max_memories)
+        size, count = memory_bytes(state), len(state.memories)
+        with self._lock:
+            e = self._entries.get(state.session_id)
+            if e is not None and e.state is state:
+                e.bytes, e.memories = size, count
+        if dropped:
+            logger.info(f"{C.temporal}[sessions]{C.r} session=%s pruned %d memories "
+                        "(cap=%d): %s", state.session_id, len(dropped), self.max_memories,
+                        ",".join(dropped))
+        return dropped
+
+    def sweep(self) -> int:
+        """Evict idle sessions now; returns how many were evicted."""
+        with self._lock:
+            evicted = self._evict_locked(time.time())
+        self._finish_evictions(evicted)
+        return len(evicted)
+
+    def snapshot_all(self) -> None:
+        """Write every idle session to ``snapshot_dir`` (e.g. on shutdown)."""
+        if self.snapshot_dir is None:
+            return
+        with self._lock:
+            states = [e.state for e in self._entries.values() if e.leases == 0]
+        for st in states:
+            path = self._snapshot_path(st.session_id)
+            if st.memories:
+                save_snapshot(path, st)
+
+    def memory_bytes(self, session_id: str) -> int:
+        with self._lock:
+            e = self._entries.get(session_id)
+            return e.bytes if e is not None else 0
+
+    def gauges(self) -> Dict[str, Dict[str, float]]:
+        """Per-session ``bytes``, ``memories`` (as of each session's last
+        ``after_tick``) and ``idle_s``."""
+        now = time.time()
+        with self._lock:
+            return {
+                sid: {
+                    "bytes": float(e.bytes),
+                    "memories": float(e.memories),
+                    "idle_s": now - e.last_access,
+                }
+                for sid, e in self._entries.items()
+            }
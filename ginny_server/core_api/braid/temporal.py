@@ -5,7 +5,7 @@ Responsibilities:
   * Propagate location belief with Gaussian drift (§5.1).
   * Compensate for robot body rotation between ticks (§5.1 last eq).
   * Re-associate this tick's observations with prior hypotheses by face/voice
-    cosine > 0.5 (§5.3).
+    cosine > 0.5 (§5.3), as one global assignment.
 
 A ``SessionState`` object is held per gRPC session_id.
 """
@@ -22,23 +22,34 @@ from .association import PersonObservation
 from .config import BraidConfig
 from .log_style import C
 from .posterior import IdentityPosterior
+from ..trackers.ocsort.association import linear_assignment
 
 logger = logging.getLogger("braid")
 
 
-@dataclass
+@dataclass(slots=True)
 class PersonMemory:
-    """Last-tick info for one person hypothesis."""
+    """Last-tick info for one person hypothesis.
+
+    The identity prior is kept as the posterior's ids tuple (shared with the
+    gallery snapshot) plus a float32 array, not a per-memory dict.
+    """
     stable_id: str
     face_emb: Optional[np.ndarray]
     voice_emb: Optional[np.ndarray]
     last_azimuth_rad: Optional[float]
-    identity_prior: Dict[str, float]  # ID → prob (incl. "__unk__")
+    prior_ids: Tuple[str, ...]        # incl. "__unk__"
+    prior_probs: np.ndarray           # float32, aligned with prior_ids
     last_state: str
     last_tick_id: int
 
+    @property
+    def identity_prior(self) -> Dict[str, float]:
+        """ID → prob (incl. "__unk__")."""
+        return dict(zip(self.prior_ids, self.prior_probs.tolist()))
 
-@dataclass
+
+@dataclass(slots=True)
 class SessionState:
     session_id: str
     last_heading_rad: float = 0.0
@@ -47,14 +58,27 @@ class SessionState:
     next_stable: int = 1
 
 
-def _cos(a: Optional[np.ndarray], b: Optional[np.ndarray]) -> float:
-    if a is None or b is None:
-        return 0.0
-    na = float(np.linalg.norm(a))
-    nb = float(np.linalg.norm(b))
-    if na == 0 or nb == 0:
-        return 0.0
-    return float(np.dot(a.reshape(-1), b.reshape(-1)) / (na * nb))
+_GATED = 1e6   # assignment cost for pairs that fail both reassoc gates
+
+
+def _unit_rows(embs: List[Optional[np.ndarray]]) -> np.ndarray:
+    """Stack embeddings into an (N, D) matrix of unit rows. Missing, zero or
+    wrong-sized embeddings become zero rows, so their cosines come out 0."""
+    dim = next((e.size for e in embs if e is not None), 0)
+    mat = np.zeros((len(embs), dim), dtype=np.float32)
+    for i, e in enumerate(embs):
+        if e is not None and e.size == dim:
+            mat[i] = e.reshape(-1)
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    np.divide(mat, norms, out=mat, where=norms > 0)
+    return mat
+
+
+def _cos_matrix(a: List[Optional[np.ndarray]], b: List[Optional[np.ndarray]]) -> np.ndarray:
+    ma, mb = _unit_rows(a), _unit_rows(b)
+    if ma.shape[1] == 0 or mb.shape[1] == 0 or ma.shape[1] != mb.shape[1]:
+        return np.zeros((len(a), len(b)), dtype=np.float32)
+    return ma @ mb.T
 
 
 def reassociate(
@@ -65,31 +89,27 @@ def reassociate(
     """Map each current-tick observation to a prior memory (or None if new).
 
     Cosine > cfg.reassoc_face_cos on face, else > cfg.reassoc_voice_cos on voice.
-    Greedy best-match; memories are consumed at most once per tick.
+    Scores max(face, 0.9·voice) are assigned globally (Hungarian), so a
+    memory goes to the person that matches it best regardless of order;
+    memories are consumed at most once per tick.
     """
     logger.info(f"{C.temporal}[temporal]{C.r} ENTER reassoc: %d incoming persons vs %d memories",
                 len(persons), len(state.memories))
-    claimed: set = set()
-    pairs: List[Tuple[PersonObservation, Optional[PersonMemory]]] = []
-    for po in persons:
-        best_mem: Optional[PersonMemory] = None
-        best_score = 0.0
-        for sid, mem in state.memories.items():
-            if sid in claimed:
-                continue
-            face_sim = _cos(po.face_emb, mem.face_emb)
-            voice_sim = _cos(po.voice_emb, mem.voice_emb)
-            score = max(face_sim, voice_sim * 0.9)  # slight face preference
-            gate = (face_sim > cfg.reassoc_face_cos) or (voice_sim > cfg.reassoc_voice_cos)
-            if gate and score > best_score:
-                best_score = score
-                best_mem = mem
-        if best_mem is not None:
-            claimed.add(best_mem.stable_id)
-            logger.info(f"{C.temporal}[temporal]{C.r} reassoc %s → %s score=%.2f",
-                        po.person_id, best_mem.stable_id, best_score)
-        pairs.append((po, best_mem))
-    return pairs
+    mems = list(state.memories.values())
+    matched: List[Optional[PersonMemory]] = [None] * len(persons)
+    if persons and mems:
+        face_sim = _cos_matrix([po.face_emb for po in persons], [m.face_emb for m in mems])
+        voice_sim = _cos_matrix([po.voice_emb for po in persons], [m.voice_emb for m in mems])
+        score = np.maximum(face_sim, voice_sim * 0.9)  # slight face preference
+        ok = ((face_sim > cfg.reassoc_face_cos) | (voice_sim > cfg.reassoc_voice_cos)) & (score > 0)
+        cost = np.where(ok, -score, _GATED)
+        for p, m in linear_assignment(cost):
+            p, m = int(p), int(m)
+            if ok[p, m]:
+                matched[p] = mems[m]
+                logger.info(f"{C.temporal}[temporal]{C.r} reassoc %s → %s score=%.2f",
+                            persons[p].person_id, mems[m].stable_id, score[p, m])
+    return list(zip(persons, matched))
 
 
 def location_prior_for(mem: Optional[PersonMemory],
@@ -107,7 +127,7 @@ def identity_prior_for(mem: Optional[PersonMemory],
                        default_p_new: float) -> Optional[Dict[str, float]]:
     if mem is None:
         return None
-    return dict(mem.identity_prior)
+    return mem.identity_prior
 
 
 def commit_memory(
@@ -127,10 +147,6 @@ def commit_memory(
         state.next_stable += 1
 
     # Identity prior = this tick's posterior (carries over).
-    id_prior: Dict[str, float] = {}
-    for iid, p in zip(post.ids, post.probs):
-        id_prior[iid] = float(p)
-
     # EMA on stored embeddings so memory doesn't jitter tick-to-tick.
     def _ema(prev: Optional[np.ndarray], new: Optional[np.ndarray], alpha: float = 0.3):
         if new is None:
@@ -145,7 +161,8 @@ def commit_memory(
         voice_emb=_ema(prev_mem.voice_emb if prev_mem else None, person.voice_emb),
         last_azimuth_rad=(person.face_azimuth_rad if person.visible
                           else person.ssl_azimuth_rad),
-        identity_prior=id_prior,
+        prior_ids=post.ids,
+        prior_probs=np.asarray(post.probs, dtype=np.float32),
         last_state=decision_state_name,
         last_tick_id=tick_id,
     )
@@ -3,6 +3,9 @@
 ``run_tick(bundle, engine, gallery, session_state, cfg)`` is the main glue:
 perception → association → temporal re-associate → posterior → decision →
 action_policy → gallery writes. Returns a BraidTickResult-ready dataclass.
+``cfg`` is the snapshot pinned for this tick; every stage reads only it.
+The bundle's frames/PCM are released once perception has consumed them
+(test/braid/tick_alloc_check.py checks that and bounds the per-tick peak).
 """
 from __future__ import annotations
 
@@ -10,7 +13,7 @@ import logging
 import math
 import time
 from dataclasses import dataclass, field
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 
@@ -33,7 +36,7 @@ from .temporal import (
 logger = logging.getLogger("braid")
 
 
-@dataclass
+@dataclass(slots=True)
 class PersonTickResult:
     stable_id: str
     observation: PersonObservation
@@ -42,13 +45,15 @@ class PersonTickResult:
     prev_state: str
 
 
-@dataclass
+@dataclass(slots=True)
 class BraidTickResult:
     tick_id: int
     session_id: str
     persons: List[PersonTickResult] = field(default_factory=list)
     action: BraidAction = field(default_factory=lambda: BraidAction("STAY", 0.0, "noop", ""))
     tick_wall_seconds: float = 0.0
+    # per-phase wall seconds; perception sub-branches as "perception.<name>"
+    phase_seconds: Dict[str, float] = field(default_factory=dict)
 
 
 def run_tick(
@@ -59,24 +64,36 @@ def run_tick(
     cfg: BraidConfig,
 ) -> BraidTickResult:
     t0 = time.time()
+    phases: Dict[str, float] = {}
+    # Per-person / action log lines build their arguments eagerly; skip them
+    # outright when INFO is off (metrics.py carries the same numbers).
+    verbose = logger.isEnabledFor(logging.INFO)
     logger.info(f"{C.tick}{C.bold}========== [tick] START tick=%d session=%s "
                 f"heading=%.2frad prior_memories=%d gallery=%d =========={C.r}",
                 bundle.tick_id, bundle.session_id, bundle.robot_heading_rad,
-                len(session_state.memories), len(gallery.entries()))
+                len(session_state.memories), len(gallery))
 
     # 1. Perception.
     logger.info(f"{C.tick}[tick]{C.r} phase=1 perception — running face/ASD/diar/voice/SSL pipelines")
     t_p = time.time()
-    obs = engine.run(bundle)
-    logger.info(f"{C.tick}[tick]{C.r} perception done in %.2fs: face_tracks=%d diar_clusters=%d "
-                "ssl_events=%d",
-                time.time() - t_p, len(obs.face_tracks),
-                len(obs.diar_clusters), len(obs.ssl_azimuths))
+    obs = engine.run(bundle, cfg)
+    phases["perception"] = time.time() - t_p
+    # Frames and PCM are dead from here on; only the ids/heading are read.
+    bundle.release_payloads()
+    for k, v in obs.timings.items():
+        phases[f"perception.{k}"] = v
+    logger.info(f"{C.tick}[tick]{C.r} perception done in %.2fs (video=%.2fs audio=%.2fs "
+                "asd=%.2fs): face_tracks=%d diar_clusters=%d ssl_events=%d",
+                time.time() - t_p, obs.timings.get("video", 0.0),
+                obs.timings.get("audio", 0.0), obs.timings.get("asd", 0.0),
+                len(obs.face_tracks), len(obs.diar_clusters), len(obs.ssl_azimuths))
 
     # 2. Audio-visual association (+ phantoms).
     logger.info(f"{C.tick}[tick]{C.r} phase=2 association — bridging faces↔clusters (tau_bridge=%.2f)",
                 cfg.tau_bridge)
+    t_p = time.time()
     persons = associate(obs, cfg)
+    phases["association"] = time.time() - t_p
     vis = sum(1 for p in persons if p.visible)
     logger.info(f"{C.tick}[tick]{C.r} association done: persons=%d (visible=%d phantom=%d)",
                 len(persons), vis, len(persons) - vis)
@@ -84,13 +101,16 @@ def run_tick(
     # 3. Temporal re-association with prior memory.
     logger.info(f"{C.tick}[tick]{C.r} phase=3 temporal reassoc — face_cos>%.2f or voice_cos>%.2f",
                 cfg.reassoc_face_cos, cfg.reassoc_voice_cos)
+    t_p = time.time()
     pairs = reassociate(session_state, persons, cfg)
+    phases["reassoc"] = time.time() - t_p
     matched = sum(1 for _, m in pairs if m is not None)
     logger.info(f"{C.tick}[tick]{C.r} reassoc done: matched=%d new=%d", matched, len(pairs) - matched)
 
     # 4. Posterior + decision per person.
     logger.info(f"{C.tick}[tick]{C.r} phase=4 posterior+decision — gallery size M=%d",
-                len(gallery.entries()))
+                len(gallery))
+    t_p = time.time()
     computer = PosteriorComputer(cfg)
     results: List[PersonTickResult] = []
     for po, prev_mem in pairs:
@@ -106,12 +126,13 @@ def run_tick(
         dec = decide(po, post, cfg)
         prev_state = prev_mem.last_state if prev_mem else "NEW"
 
-        logger.info(
-            f"{C.tick}[tick]{C.r} person=%s posterior: p_best=%.3f p_unk=%.3f margin=%.3f "
-            "H=%.2f Q_gate=%.2f j_best=%s mod_agree=%s",
-            po.person_id, post.p_best, post.p_unk, post.margin, post.entropy,
-            post.Q_gate, post.j_best or "-", post.modality_agreement,
-        )
+        if verbose:
+            logger.info(
+                f"{C.tick}[tick]{C.r} person=%s posterior: p_best=%.3f p_unk=%.3f margin=%.3f "
+                "H=%.2f Q_gate=%.2f j_best=%s mod_agree=%s",
+                po.person_id, post.p_best, post.p_unk, post.margin, post.entropy,
+                post.Q_gate, post.j_best or "-", post.modality_agreement,
+            )
 
         # 5. Gallery writes.
         if dec.state == DecisionState.ENROL:
@@ -132,6 +153,9 @@ def run_tick(
                 alpha=cfg.gallery_ema_alpha,
                 face_quality=po.face_quality if po.visible else None,
             )
+        # The BGR frame is only needed for the enrolment PNG; don't let the
+        # returned result (and anything holding it) pin a full frame per person.
+        po.representative_image = None
 
         # 6. Commit memory for next tick (after decision, so state is accurate).
         sid = commit_memory(session_state, po, post, dec.state.value,
@@ -143,30 +167,36 @@ def run_tick(
         ))
 
         # 7. Structured per-person log line (spec requirement).
-        sc = state_color(dec.state.value)
-        logger.info(
-            f"{C.bold}person=%s{C.r} decision=%s→{sc}%s{C.r} p_best=%.2f p_unk=%.2f "
-            "margin=%.2f Q_gate=%.2f H=%.2f mod_agree=%s identity=%s reason=%s",
-            sid, prev_state, dec.state.value, post.p_best, post.p_unk,
-            post.margin, post.Q_gate, post.entropy, post.modality_agreement,
-            dec.identity or "-", dec.reason,
-        )
+        if verbose:
+            sc = state_color(dec.state.value)
+            logger.info(
+                f"{C.bold}person=%s{C.r} decision=%s→{sc}%s{C.r} p_best=%.2f p_unk=%.2f "
+                "margin=%.2f Q_gate=%.2f H=%.2f mod_agree=%s identity=%s reason=%s",
+                sid, prev_state, dec.state.value, post.p_best, post.p_unk,
+                post.margin, post.Q_gate, post.entropy, post.modality_agreement,
+                dec.identity or "-", dec.reason,
+            )
+
+    phases["posterior_decision"] = time.time() - t_p
 
     # 8. Action selection.
     logger.info(f"{C.tick}[tick]{C.r} phase=6 action_policy — %d persons considered", len(results))
+    t_p = time.time()
     action = select_action(
         [(r.observation, r.posterior, r.decision) for r in results],
         robot_heading_rad=bundle.robot_heading_rad,
         cfg=cfg,
     )
-    logger.info(
-        f"{C.action}action=%s{C.r} magnitude=%.2f%s reason=%s target_person=%s",
-        action.type.lower(),
-        math.degrees(action.magnitude) if action.type.startswith("ROTATE")
-        else action.magnitude,
-        "°" if action.type.startswith("ROTATE") else ("m" if action.type == "MOVE_FORWARD" else ""),
-        action.reason, action.target_person_id or "-",
-    )
+    phases["action"] = time.time() - t_p
+    if verbose:
+        logger.info(
+            f"{C.action}action=%s{C.r} magnitude=%.2f%s reason=%s target_person=%s",
+            action.type.lower(),
+            math.degrees(action.magnitude) if action.type.startswith("ROTATE")
+            else action.magnitude,
+            "°" if action.type.startswith("ROTATE") else ("m" if action.type == "MOVE_FORWARD" else ""),
+            action.reason, action.target_person_id or "-",
+        )
 
     session_state.last_heading_rad = bundle.robot_heading_rad
     session_state.last_tick_id = bundle.tick_id
@@ -181,4 +211,5 @@ def run_tick(
         persons=results,
         action=action,
         tick_wall_seconds=time.time() - t0,
+        phase_seconds=phases,
     )
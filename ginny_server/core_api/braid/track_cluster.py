@@ -0,0 +1,144 @@
+"""Per-tick face track clustering for ``PerceptionEngine._video_pass``.
+
+Faces are linked across frames by embedding cosine. Each track keeps a
+running *sum* of its normalised embeddings (the normalised sum equals the
+normalised mean, so the prototype is the same as averaging every embedding
+seen so far) in a preallocated matrix. Per frame, all faces are scored
+against all prototypes with one matrix product and assigned jointly with
+the Hungarian solver from ``trackers/ocsort``, so two faces in the same
+frame can never claim the same track.
+
+Per-track memory is bounded to what downstream stages read: timestamps and
+112×112 ASD crops per frame, plus scalar sums and the single best frame.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from ..trackers.ocsort.association import linear_assignment
+
+_GATED = 1e6   # assignment cost for pairs below the similarity gate
+
+
+@dataclass
+class TrackAccumulator:
+    """Everything ``_video_pass`` needs to build a ``FaceTrack`` at the end."""
+    frame_ts: List[float] = field(default_factory=list)
+    gray_crops: List[np.ndarray] = field(default_factory=list)
+    quality_sum: float = 0.0
+    azimuth_sum: float = 0.0
+    count: int = 0
+    best_quality: float = -1.0
+    best_frame: Optional[np.ndarray] = None
+    best_bbox: Optional[Tuple[int, int, int, int]] = None
+
+    def add(self, ts: float, bbox: Tuple[int, int, int, int], quality: float,
+            azimuth: float, gray_crop: Optional[np.ndarray],
+            frame: np.ndarray) -> None:
+        self.frame_ts.append(ts)
+        if gray_crop is not None:
+            self.gray_crops.append(gray_crop)
+        self.quality_sum += quality
+        self.azimuth_sum += azimuth
+        self.count += 1
+        # First detection seeds "best"; later ones must be strictly better.
+        if self.count == 1 or quality > self.best_quality:
+            self.best_quality = quality
+            self.best_frame = frame
+            self.best_bbox = bbox
+
+    def add_propagated(self, ts: float, bbox: Tuple[int, int, int, int],
+                       quality: float, azimuth: float,
+                       gray_crop: Optional[np.ndarray]) -> None:
+        """Frame between keyframes: the box is a Kalman prediction, so it
+        feeds ASD and the running means but never becomes the best frame."""
+        self.frame_ts.append(ts)
+        if gray_crop is not None:
+            self.gray_crops.append(gray_crop)
+        self.quality_sum += quality
+        self.azimuth_sum += azimuth
+        self.count += 1
+
+    @property
+    def mean_quality(self) -> float:
+        return self.quality_sum / max(1, self.count)
+
+    @property
+    def mean_azimuth(self) -> float:
+        return self.azimuth_sum / max(1, self.count)
+
+
+class FaceTrackClusterer:
+    """Running-sum prototypes + per-frame joint assignment."""
+
+    def __init__(self, sim_threshold: float = 0.5, initial_capacity: int = 8):
+        self.sim_threshold = float(sim_threshold)
+        self._cap = max(1, int(initial_capacity))
+        self._sums: Optional[np.ndarray] = None     # (cap, D) running sums
+        self._protos: Optional[np.ndarray] = None   # (cap, D) L2-normalised sums
+        self.tracks: List[TrackAccumulator] = []
+
+    def __len__(self) -> int:
+        return len(self.tracks)
+
+    def _ensure_capacity(self, n: int, dim: int) -> None:
+        if self._sums is None:
+            while self._cap < n:
+                self._cap *= 2
+            self._sums = np.zeros((self._cap, dim), dtype=np.float32)
+            self._protos = np.zeros((self._cap, dim), dtype=np.float32)
+            return
+        if n <= self._cap:
+            return
+        while self._cap < n:
+            self._cap *= 2
+        for name in ("_sums", "_protos"):
+            old = getattr(self, name)
+            grown = np.zeros((self._cap, old.shape[1]), dtype=np.float32)
+            grown[: old.shape[0]] = old
+            setattr(self, name, grown)
+
+    def _refresh(self, rows: np.ndarray) -> None:
+        s = self._sums[rows]
+        self._protos[rows] = s / (np.linalg.norm(s, axis=1, keepdims=True) + 1e-8)
+
+    def assign(self, embs: np.ndarray,
+               exclude: Optional[Iterable[int]] = None) -> List[int]:
+        """Assign each row of ``embs`` (F, D), already L2-normalised, to a
+        track index. Faces that clear no prototype above ``sim_threshold``
+        open new tracks. Tracks in ``exclude`` (already claimed this frame)
+        are not candidates. Prototypes are updated before returning."""
+        embs = np.asarray(embs, dtype=np.float32)
+        n_faces = embs.shape[0]
+        if n_faces == 0:
+            return []
+        k = len(self.tracks)
+        out = [-1] * n_faces
+
+        if k > 0:
+            sims = embs @ self._protos[:k].T                    # (F, K)
+            if exclude:
+                sims[:, [t for t in exclude if 0 <= t < k]] = -1.0
+            cost = np.where(sims > self.sim_threshold, -sims, _GATED)
+            for f, t in linear_assignment(cost):
+                f, t = int(f), int(t)
+                if sims[f, t] > self.sim_threshold:
+                    out[f] = t
+
+        new_faces = [f for f in range(n_faces) if out[f] < 0]
+        self._ensure_capacity(k + len(new_faces), embs.shape[1])
+        for j, f in enumerate(new_faces):
+            out[f] = k + j
+            self.tracks.append(TrackAccumulator())
+
+        rows = np.asarray(out, dtype=np.int64)
+        np.add.at(self._sums, rows, embs)
+        self._refresh(rows)
+        return out
+
+    def mean_embedding(self, idx: int) -> np.ndarray:
+        """L2-normalised mean embedding of track ``idx``."""
+        return self._protos[idx].copy()
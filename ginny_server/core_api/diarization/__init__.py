@@ -1 +1,2 @@
 from .diarization import _Diarization
+from .incremental import IncrementalDiarizer
@@ -1,7 +1,5 @@
 import os
 import sys
-import wave
-import tempfile
 import threading
 import numpy as np
 import torch
@@ -116,6 +114,10 @@ class _DiariZenCUDA1(DiariZenPipeline):
         Like pipeline.__call__() but also returns the raw soft powerset posteriors.
         Single forward pass of segmentation.
 
+        ``in_wav`` is a path / ProtocolFile (loaded with torchaudio, as upstream)
+        or an in-memory pyannote input {"waveform": (channels, samples) float
+        tensor, "sample_rate": int}, which never touches the filesystem.
+
         The hard path is byte-identical to upstream inference.py:120-190 because:
           1. get_segmentations(soft=True) returns raw powerset probabilities.
           2. We replay self._segmentation.conversion(soft_data, soft=False) which
@@ -148,8 +150,11 @@ class _DiariZenCUDA1(DiariZenPipeline):
         assert hasattr(self._segmentation, 'conversion'), \
             "Inference wrapper must have conversion attribute (pyannote Inference contract)"
 
-        in_wav = in_wav if not isinstance(in_wav, ProtocolFile) else in_wav['audio']
-        waveform, sample_rate = torchaudio.load(in_wav)
+        if isinstance(in_wav, dict) and "waveform" in in_wav:
+            waveform, sample_rate = in_wav["waveform"], in_wav["sample_rate"]
+        else:
+            in_wav = in_wav if not isinstance(in_wav, ProtocolFile) else in_wav['audio']
+            waveform, sample_rate = torchaudio.load(in_wav)
         waveform = torch.unsqueeze(waveform[0], 0)
 
         # *** SINGLE SOFT FORWARD PASS ***
@@ -239,6 +244,66 @@ class _DiariZenCUDA1(DiariZenPipeline):
 
         return result, soft_data_raw, sw
 
+    # ---- Chunk-level primitives (used by incremental.IncrementalDiarizer) ----
+
+    def segment_chunks(self, chunks: torch.Tensor):
+        """
+        Segmentation for a batch of equal-length mono chunks, without the
+        sliding-window driver: the per-chunk body of call_with_posteriors.
+
+        Args:
+            chunks: float tensor (num_chunks, 1, window_samples) in [-1, 1]
+
+        Returns:
+            (soft_data_raw, binarized)
+            - soft_data_raw: np.ndarray (num_chunks, frames, num_powerset_classes), float32
+            - binarized: np.ndarray (num_chunks, frames, num_local_speakers), the
+              hard multilabel tensor after the (per-chunk) median filter
+        """
+        from scipy.ndimage import median_filter
+
+        inference = self._segmentation
+        try:
+            target_device = inference.device
+        except AttributeError:
+            target_device = next(inference.model.parameters()).device
+        batch_size = getattr(inference, "batch_size", 32)
+
+        # Same forward as Inference.infer; the model ends in log-softmax, and
+        # exp() of it is what get_segmentations(soft=True) returns.
+        outputs = []
+        with torch.inference_mode():
+            for i in range(0, len(chunks), batch_size):
+                outputs.append(torch.exp(inference.model(chunks[i:i + batch_size].to(target_device))))
+            soft = torch.cat(outputs)
+            conversion = inference.conversion
+            if conversion.mapping.device != soft.device:
+                conversion.to(soft.device)
+            multilabel_hard = conversion(soft, soft=False).cpu().numpy()
+        soft_data_raw = soft.float().cpu().numpy()
+
+        if self.apply_median_filtering:
+            multilabel_hard = median_filter(multilabel_hard, size=(1, 11, 1), mode='reflect')
+        return soft_data_raw, multilabel_hard
+
+    def embed_chunks(self, waveform: torch.Tensor, sample_rate: int,
+                     binarized: np.ndarray, sliding_window) -> np.ndarray:
+        """
+        Local speaker embeddings for ``binarized`` chunks laid out on
+        ``sliding_window`` over ``waveform`` (1, num_samples).
+
+        Returns:
+            np.ndarray (num_chunks, num_local_speakers, dim); NaN rows for
+            speakers with too little (clean) speech, as in get_embeddings.
+        """
+        from pyannote.core import SlidingWindowFeature
+
+        return self.get_embeddings(
+            {"waveform": waveform, "sample_rate": sample_rate},
+            SlidingWindowFeature(binarized, sliding_window),
+            exclude_overlap=self.embedding_exclude_overlap,
+        )
+
     @classmethod
     def from_pretrained(
         cls,
@@ -274,9 +339,10 @@ class _Diarization:
     """
     Diarization module wrapping DiariZen with device override.
 
-    Provides two modes:
+    Provides three modes:
     1. diarize(audio_data) - Full diarization on a single audio buffer
     2. Session-based buffer management for accumulating short segments
+    3. incremental() - streaming diarizer that never re-processes old audio
 
     Thread-safe via Lock.
     """
@@ -380,32 +446,50 @@ class _Diarization:
         self._session_buffers: Dict[str, dict] = {}
         self._buffer_lock = threading.Lock()
 
-    def _save_to_temp_wav(self, audio_data: bytes, sample_rate: int = 16000) -> str:
-        """Save raw PCM_16 bytes to a temporary WAV file."""
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".wav")
-        temp_file_path = temp_file.name
-        temp_file.close()
-        try:
-            with wave.open(temp_file_path, 'wb') as wave_file:
-                wave_file.setnchannels(1)
-                wave_file.setsampwidth(2)
-                wave_file.setframerate(sample_rate)
-                wave_file.writeframes(audio_data)
-            return temp_file_path
-        except Exception:
-            if os.path.exists(temp_file_path):
-                os.remove(temp_file_path)
-            raise
-
-    def get_audio_duration(self, audio_data: bytes, sample_rate: int = 16000) -> float:
-        """Calculate duration in seconds from PCM_16 audio bytes."""
-        num_samples = len(audio_data) // 2
-        return num_samples / sample_rate
-
-    def diarize(self, audio_data: bytes, sample_rate: int = 16000) -> List[dict]:
+    @staticmethod
+    def _as_int16(audio_data) -> np.ndarray:
+        """
+        int16 samples of any accepted audio input: PCM_16 bytes or an int16
+        array (viewed, no copy), or a float array / tensor in [-1, 1].
+        """
+        if isinstance(audio_data, torch.Tensor):
+            audio_data = audio_data.detach().cpu().numpy()
+        if isinstance(audio_data, np.ndarray):
+            if np.issubdtype(audio_data.dtype, np.floating):
+                return np.round(np.clip(audio_data.reshape(-1), -1.0, 32767 / 32768) * 32768
+                                ).astype(np.int16)
+            return audio_data.astype(np.int16, copy=False).reshape(-1)
+        return np.frombuffer(audio_data, dtype=np.int16, count=len(audio_data) // 2)
+
+    @staticmethod
+    def _waveform_input(audio_data, sample_rate: int = 16000) -> dict:
+        """
+        pyannote in-memory input {"waveform": (1, samples) float32 tensor,
+        "sample_rate"}. PCM_16 is scaled by 1/32768, exactly as torchaudio.load
+        reads a PCM_16 WAV, so results match the old temp-file path.
+        """
+        if isinstance(audio_data, torch.Tensor) and audio_data.is_floating_point():
+            waveform = audio_data.detach().float().cpu().reshape(1, -1)
+        elif isinstance(audio_data, np.ndarray) and np.issubdtype(audio_data.dtype, np.floating):
+            waveform = torch.from_numpy(np.ascontiguousarray(audio_data, dtype=np.float32)).reshape(1, -1)
+        else:
+            pcm = _Diarization._as_int16(audio_data)
+            waveform = torch.from_numpy(pcm.astype(np.float32) * (1.0 / 32768.0)).unsqueeze(0)
+        return {"waveform": waveform, "sample_rate": sample_rate}
+
+    def get_audio_duration(self, audio_data, sample_rate: int = 16000) -> float:
+        """Calculate duration in seconds of PCM_16 bytes or an audio array / tensor."""
+        if isinstance(audio_data, (np.ndarray, torch.Tensor)):
+            return audio_data.shape[-1] / sample_rate
+        return (len(audio_data) // 2) / sample_rate
+
+    def diarize(self, audio_data, sample_rate: int = 16000) -> List[dict]:
         """
         Run full diarization on audio buffer.
         Only call on audio >= MIN_DIARIZATION_DURATION (10s).
+        ``audio_data`` is PCM_16 bytes, an int16 array (e.g. a ring-buffer view)
+        or a float32 array / tensor in [-1, 1]; it is passed to the pipeline
+        in memory (no temp WAV).
 
         Returns:
             List of {"speaker": str, "start": float, "end": float, "audio": bytes}
@@ -418,15 +502,13 @@ class _Diarization:
                 f"Use single-speaker path for short segments."
             )
 
+        # DiariZenPipeline.__call__ only takes a path; call_with_posteriors runs
+        # the same hard path on an in-memory waveform.
         with self._lock:
-            temp_wav = self._save_to_temp_wav(audio_data, sample_rate)
-            try:
-                diar_result = self.pipeline(temp_wav)
-            finally:
-                if os.path.exists(temp_wav):
-                    os.remove(temp_wav)
+            diar_result = self.pipeline.call_with_posteriors(
+                self._waveform_input(audio_data, sample_rate))[0]
 
-        audio_np = np.frombuffer(audio_data, dtype=np.int16)
+        audio_np = self._as_int16(audio_data)
 
         segments = []
         for turn, _, speaker in diar_result.itertracks(yield_label=True):
@@ -449,7 +531,7 @@ class _Diarization:
 
         return segments
 
-    def diarize_with_posteriors(self, audio_data: bytes, sample_rate: int = 16000):
+    def diarize_with_posteriors(self, audio_data, sample_rate: int = 16000):
         """
         Like diarize() but also returns soft powerset posteriors and metadata
         needed by the per-frame enrollment gate.
@@ -470,14 +552,10 @@ class _Diarization:
             )
 
         with self._lock:
-            temp_wav = self._save_to_temp_wav(audio_data, sample_rate)
-            try:
-                result, soft_data_raw, sw = self.pipeline.call_with_posteriors(temp_wav)
-            finally:
-                if os.path.exists(temp_wav):
-                    os.remove(temp_wav)
-
-        audio_np = np.frombuffer(audio_data, dtype=np.int16)
+            result, soft_data_raw, sw = self.pipeline.call_with_posteriors(
+                self._waveform_input(audio_data, sample_rate))
+
+        audio_np = self._as_int16(audio_data)
         segments = []
         for turn, _, speaker in result.itertracks(yield_label=True):
             start_sample = max(0, int(turn.start * sample_rate))
@@ -540,6 +618,14 @@ class _Diarization:
 
         return segments
 
+    def incremental(self, sample_rate: int = 16000, **kwargs):
+        """
+        Streaming diarizer over this pipeline that only processes new audio
+        (see incremental.IncrementalDiarizer; kwargs are passed through).
+        """
+        from .incremental import IncrementalDiarizer
+        return IncrementalDiarizer(self, sample_rate=sample_rate, **kwargs)
+
     def clear_session(self, session_id: str):
         """Clean up session buffer when conversation ends."""
         with self._buffer_lock:
@@ -0,0 +1,330 @@
+"""
+Incremental (streaming) diarization over one audio stream.
+
+The sliding-window callers diarize 30s windows that overlap by 10s, so a
+third of the audio is segmented, embedded and clustered twice. The
+IncrementalDiarizer runs the segmentation model on a fixed chunk grid
+anchored at the start of the stream. It caches each chunk's outputs:
+
+  - soft powerset posteriors and binarized local-speaker activity
+  - one embedding per (chunk, local speaker)
+
+push(audio) computes only the chunks the new audio completes. It then
+re-clusters the cached chunks of the last ``context_s`` seconds; that part is
+CPU-only and cheap. Finally it stitches the clusters onto stream-global
+speaker ids with a constrained assignment:
+
+  1. Must-link. Chunks labelled by an earlier push vote for the global id
+     they carried, weighted by active frames. Each cluster takes the id with
+     the most votes, one-to-one (Hungarian). Two clusters from the same
+     context therefore never collapse onto one speaker (cannot-link).
+  2. Clusters without votes are speakers that only appear in new audio. They
+     are matched against the centroid bank of the global speakers that are
+     still free, at cosine >= ``bank_threshold``. Otherwise they open a new id.
+
+A frame is final once every chunk that covers it has been computed, i.e.
+up to one step past the start of the last chunk. push() returns the
+segments between the previous horizon and that one; flush() zero-pads the
+tail and returns the rest.
+
+Segments use the diarize() dict layout. Times are seconds from the start of
+the stream (the samples pushed so far), and labels are integer global
+speaker ids. A turn that crosses a push boundary comes back as two adjacent
+segments with the same label.
+"""
+import time
+from typing import List, Optional
+
+import numpy as np
+import torch
+from scipy.optimize import linear_sum_assignment
+
+from pyannote.core import SlidingWindow, SlidingWindowFeature
+
+
+class IncrementalDiarizer:
+    """
+    Streaming diarizer bound to one _Diarization instance (shares its models
+    and GPU lock). One instance per stream; not thread-safe.
+
+    Args:
+        diarization: the loaded _Diarization
+        sample_rate: must match the segmentation model (16 kHz)
+        context_s: seconds of cached chunks re-clustered on every push
+        step_s: chunk hop; defaults to twice the pipeline's segmentation step
+        bank_threshold: min cosine to re-use a global speaker id that has no
+            must-link votes in the current context
+    """
+
+    def __init__(self, diarization, sample_rate: int = 16000, context_s: float = 30.0,
+                 step_s: Optional[float] = None, bank_threshold: float = 0.6):
+        self._diar = diarization
+        self._pipeline = diarization.pipeline
+        inference = self._pipeline._segmentation
+        model_sr = inference.model.audio.sample_rate
+        if sample_rate != model_sr:
+            raise ValueError(f"IncrementalDiarizer needs {model_sr}Hz audio, got {sample_rate}Hz")
+        self.sample_rate = sample_rate
+        self._win = int(round(inference.duration * sample_rate))
+        # 30s windows every 20s run ~10 chunks per 20s of new audio (16s
+        # chunks, 1.6s step, edges covered by a single chunk). A continuous grid
+        # at the same step would run 12.5; at twice the step it runs 6.25 and
+        # still covers every frame with chunk_s / step_s >= 5 chunks.
+        self._hop = int(round((step_s or 2 * inference.step) * sample_rate))
+        self.chunk_s = self._win / sample_rate
+        self.step_s = self._hop / sample_rate
+        self.context_s = max(context_s, self.chunk_s)
+        self.bank_threshold = bank_threshold
+
+        self._audio = np.zeros(0, dtype=np.int16)   # stream samples from _audio_origin
+        self._audio_origin = 0
+        self._pending: List[np.ndarray] = []    # pushed since the last _join, in order
+        self._num_samples = 0
+        self._next_chunk = 0          # first chunk index not yet computed
+        self._first_chunk = 0         # chunk index of the cache's first entry
+        self._soft: List[np.ndarray] = []     # per chunk (frames, powerset classes)
+        self._binarized: List[np.ndarray] = []  # per chunk (frames, local speakers)
+        self._embeddings: List[np.ndarray] = []  # per chunk (local speakers, dim)
+        self._labels: List[np.ndarray] = []   # per chunk global id; -1 unlabelled, -2 inactive
+        self._bank = {}               # global id -> [sum of unit embeddings, count]
+        self._next_label = 0
+        self._emitted_s = 0.0
+        self._finished = False
+        self.stats = {"chunks": 0, "segmentation_s": 0.0, "embedding_s": 0.0,
+                      "clustering_s": 0.0}
+
+    # ---- public API ----
+
+    @property
+    def duration(self) -> float:
+        return self._num_samples / self.sample_rate
+
+    def push(self, audio_data) -> List[dict]:
+        """Append PCM_16 bytes / an int16 array; return newly final segments."""
+        if self._finished:
+            raise RuntimeError("push() after flush()")
+        # Own copy: an int16 array argument may be a view the caller reuses.
+        samples = np.array(self._diar._as_int16(audio_data), dtype=np.int16)
+        self._pending.append(samples)
+        self._num_samples += len(samples)
+        if self._num_samples < self._win:
+            return []
+        n_chunks = (self._num_samples - self._win) // self._hop + 1
+        if n_chunks <= self._next_chunk:
+            return []
+        return self._advance(n_chunks, horizon_s=n_chunks * self.step_s)
+
+    def flush(self) -> List[dict]:
+        """Diarize the tail (last chunks zero-padded) and end the stream."""
+        if self._finished:
+            return []
+        self._finished = True
+        if self._num_samples == 0:
+            return []
+        tail = max(0, self._num_samples - self._win)
+        n_chunks = max(self._next_chunk, -(-tail // self._hop) + 1)
+        return self._advance(n_chunks, horizon_s=self.duration)
+
+    def posteriors(self):
+        """
+        (soft_data_raw, sw) for the chunks used by the last push, in the
+        layout _compute_alone_timeline expects; ``sw`` is in stream seconds.
+        """
+        if not self._soft:
+            return np.zeros((0, 0, 0), dtype=np.float32), None
+        return np.stack(self._soft), self._sliding_window(self._first_chunk)
+
+    # ---- internals ----
+
+    def _sliding_window(self, first_chunk: int) -> SlidingWindow:
+        return SlidingWindow(start=first_chunk * self.step_s,
+                             duration=self.chunk_s, step=self.step_s)
+
+    def _context_start(self) -> int:
+        """Cache index of the first chunk the next clustering needs: every
+        chunk overlapping un-emitted frames, and at least ``context_s``."""
+        end_s = (self._next_chunk - 1) * self.step_s + self.chunk_s
+        keep_from = min(self._emitted_s - self.chunk_s, end_s - self.context_s)
+        k = max(self._first_chunk, int(np.floor(keep_from / self.step_s)) + 1)
+        return min(k, self._next_chunk) - self._first_chunk
+
+    def _join(self):
+        """Append the pushed pieces to ``_audio`` in one copy. Runs once per
+        _advance, and every _trim cuts ``_audio`` back to the un-emitted span,
+        so a stream costs O(total samples) rather than O(n²) over pushes."""
+        if self._pending:
+            self._audio = np.concatenate([self._audio, *self._pending])
+            self._pending = []
+
+    def _trim(self):
+        # Runs at the start of a push, so posteriors() still covers every
+        # chunk behind the segments the previous push returned.
+        i0 = self._context_start()
+        if i0 > 0:
+            del self._soft[:i0], self._binarized[:i0], self._embeddings[:i0], self._labels[:i0]
+            self._first_chunk += i0
+        keep = min(self._next_chunk * self._hop, int(round(self._emitted_s * self.sample_rate)))
+        drop = keep - self._audio_origin
+        if drop > 0:
+            self._audio = self._audio[drop:]
+            self._audio_origin = keep
+
+    def _waveform(self, start: int, end: int) -> torch.Tensor:
+        """Float samples [start, end) of the stream, zero-padded past its end."""
+        seg = self._audio[start - self._audio_origin:end - self._audio_origin]
+        out = np.zeros(end - start, dtype=np.float32)
+        out[:len(seg)] = seg
+        out *= 1.0 / 32768.0
+        return torch.from_numpy(out)
+
+    def _advance(self, n_chunks: int, horizon_s: float) -> List[dict]:
+        self._join()
+        self._trim()
+        k0 = self._next_chunk
+        if n_chunks > k0:
+            excerpt = self._waveform(k0 * self._hop, (n_chunks - 1) * self._hop + self._win)
+            chunks = excerpt.unfold(0, self._win, self._hop).unsqueeze(1).contiguous()
+            with self._diar._lock:
+                t = time.perf_counter()
+                soft, binarized = self._pipeline.segment_chunks(chunks)
+                self.stats["segmentation_s"] += time.perf_counter() - t
+                t = time.perf_counter()
+                embeddings = self._pipeline.embed_chunks(
+                    excerpt.unsqueeze(0), self.sample_rate, binarized, self._sliding_window(0))
+                self.stats["embedding_s"] += time.perf_counter() - t
+            for c in range(len(chunks)):
+                self._soft.append(soft[c])
+                self._binarized.append(binarized[c])
+                self._embeddings.append(embeddings[c])
+                self._labels.append(np.full(binarized.shape[-1], -1, dtype=np.int64))
+            self._next_chunk = n_chunks
+            self.stats["chunks"] += len(chunks)
+
+        t = time.perf_counter()
+        segments = self._cluster_and_emit(min(horizon_s, self.duration))
+        self.stats["clustering_s"] += time.perf_counter() - t
+        return segments
+
+    def _cluster_and_emit(self, horizon_s: float) -> List[dict]:
+        from pyannote.audio.utils.signal import Binarize
+
+        i0 = self._context_start()
+        binarized = np.stack(self._binarized[i0:])
+        embeddings = np.stack(self._embeddings[i0:])
+        anchors = np.stack(self._labels[i0:])
+        segmentations = SlidingWindowFeature(binarized, self._sliding_window(self._first_chunk + i0))
+
+        frames = binarized.sum(axis=1)                      # (chunks, local speakers)
+        active = frames > 0
+        valid = active & ~np.isnan(embeddings).any(axis=-1)
+        if not active.any():
+            for j in range(len(anchors)):
+                self._labels[i0 + j][:] = -2
+            self._emitted_s = max(self._emitted_s, horizon_s)
+            return []
+
+        pipeline = self._pipeline
+        if valid.sum() >= 2:
+            with self._diar._lock:
+                hard_clusters, _, _ = pipeline.clustering(
+                    embeddings=embeddings,
+                    segmentations=segmentations,
+                    min_clusters=pipeline.min_speakers,
+                    max_clusters=pipeline.max_speakers,
+                )
+            hard_clusters = np.asarray(hard_clusters, dtype=np.int64).copy()
+        else:
+            hard_clusters = np.zeros(active.shape, dtype=np.int64)
+        hard_clusters[~active] = -2
+
+        global_clusters = self._stitch(hard_clusters, anchors, frames, embeddings, valid)
+        for j in range(len(anchors)):
+            self._labels[i0 + j] = global_clusters[j]
+
+        count = pipeline.speaker_count(
+            segmentations,
+            pipeline._segmentation.model._receptive_field,
+            warm_up=(0.0, 0.0),
+        )
+        count.data = np.minimum(count.data, pipeline.max_speakers).astype(np.int8)
+        discrete_diarization, _ = pipeline.reconstruct(segmentations, global_clusters, count)
+        annotation = Binarize(
+            onset=0.5, offset=0.5, min_duration_on=0.0, min_duration_off=0.0
+        )(discrete_diarization)
+
+        t0, t1 = self._emitted_s, horizon_s
+        segments = []
+        for turn, _, speaker in annotation.itertracks(yield_label=True):
+            start, end = float(max(turn.start, t0)), float(min(turn.end, t1))
+            if end <= start:
+                continue
+            a = int(round(start * self.sample_rate)) - self._audio_origin
+            b = int(round(end * self.sample_rate)) - self._audio_origin
+            if b <= a:
+                continue
+            segments.append({
+                "speaker": speaker,
+                "start": start,
+                "end": end,
+                "audio": self._audio[max(0, a):b].tobytes(),
+            })
+        segments.sort(key=lambda s: s["start"])
+        self._emitted_s = max(self._emitted_s, t1)
+        return segments
+
+    def _stitch(self, hard_clusters, anchors, frames, embeddings, valid) -> np.ndarray:
+        """Map this context's cluster indices onto stream-global speaker ids."""
+        clusters = np.unique(hard_clusters[hard_clusters >= 0])
+        mapping = {}
+
+        # 1. Must-link votes from chunks labelled by earlier pushes.
+        known = np.unique(anchors[anchors >= 0])
+        if len(clusters) and len(known):
+            voted = (hard_clusters >= 0) & (anchors >= 0)
+            votes = np.zeros((len(clusters), len(known)))
+            np.add.at(votes,
+                      (np.searchsorted(clusters, hard_clusters[voted]),
+                       np.searchsorted(known, anchors[voted])),
+                      frames[voted])
+            for r, c in zip(*linear_sum_assignment(-votes)):
+                if votes[r, c] > 0:
+                    mapping[int(clusters[r])] = int(known[c])
+
+        # 2. Centroid bank for clusters with no votes (cannot re-use an id
+        #    already taken in this context).
+        rest = [int(c) for c in clusters if int(c) not in mapping]
+        free = [g for g in self._bank if g not in set(mapping.values())]
+        if rest and free:
+            unit = embeddings / np.maximum(
+                np.linalg.norm(embeddings, axis=-1, keepdims=True), 1e-12)
+            bank = np.stack([self._bank[g][0] / np.linalg.norm(self._bank[g][0]) for g in free])
+            sim = np.full((len(rest), len(free)), -1.0)
+            for r, c in enumerate(rest):
+                members = valid & (hard_clusters == c)
+                if members.any():
+                    centroid = unit[members].mean(axis=0)
+                    sim[r] = bank @ (centroid / max(np.linalg.norm(centroid), 1e-12))
+            for r, c in zip(*linear_sum_assignment(-sim)):
+                if sim[r, c] >= self.bank_threshold:
+                    mapping[rest[r]] = free[c]
+        for c in rest:
+            if c not in mapping:
+                mapping[c] = self._next_label
+                self._next_label += 1
+
+        global_clusters = np.full_like(hard_clusters, -2)
+        for c, g in mapping.items():
+            global_clusters[hard_clusters == c] = g
+
+        # Bank update: each (chunk, speaker) embedding counts once, when first labelled.
+        fresh = valid & (anchors == -1) & (global_clusters >= 0)
+        for (i, s) in zip(*np.nonzero(fresh)):
+            e = embeddings[i, s]
+            e = e / max(np.linalg.norm(e), 1e-12)
+            g = int(global_clusters[i, s])
+            if g in self._bank:
+                self._bank[g][0] = self._bank[g][0] + e
+                self._bank[g][1] += 1
+            else:
+                self._bank[g] = [e.copy(), 1]
+        return global_clusters
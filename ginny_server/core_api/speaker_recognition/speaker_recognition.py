@@ -1,15 +1,14 @@
 import os
-import glob
 import wave
 import torch
 import logging
-import tempfile
 import numpy as np
 import threading
 from pathlib import Path
 from typing import Tuple, Optional, List
 
-from sklearn.metrics.pairwise import cosine_similarity
+from ..vector_index import make_index
+from .voice_store import VoiceStore
 
 # ANSI colors
 _CYAN = "\033[96m"
@@ -53,34 +52,191 @@ def _log_event(icon, label, detail, color=_RESET):
 
 _DB_ROOT = "/workspace/database/embedding_accumulation_method"
 
+# batch_masked: the batch extractor honours per-item lengths, so padded
+# batches give the same embeddings as one-at-a-time extraction. Backbones
+# without it only batch equal-length inputs (see extract_embeddings_batch).
+
 MODEL_REGISTRY = {
     "eres2netv2": {
         "display_name": "ERes2NetV2",
         "model_id": "iic/speech_eres2netv2_sv_zh-cn_16k-common",
         "db_dir": f"{_DB_ROOT}/voice_eres2netv2",
         "emb_dim": 192,
+        "batch_masked": True,
     },
     "titanet": {
         "display_name": "TitaNet Large",
         "model_id": "nvidia/speakerverification_en_titanet_large",
         "db_dir": f"{_DB_ROOT}/voice_titanet",
         "emb_dim": 192,
+        "batch_masked": True,
     },
     "redimnet": {
         "display_name": "ReDimNet B6",
         "model_id": "B6",
         "db_dir": f"{_DB_ROOT}/voice_redimnet",
         "emb_dim": 192,
+        "batch_masked": False,
     },
     "wavlm_ssl": {
         "display_name": "WavLM-MHFA (SSL-SV)",
         "model_id": "wavlm_mhfa",
         "db_dir": f"{_DB_ROOT}/voice_wavlm_ssl",
         "emb_dim": 256,
+        "batch_masked": False,
     },
 }
 
 
+def _length_buckets(lengths, max_batch, max_pad_ratio):
+    """Group indices into batches of similar length.
+
+    Indices are sorted by length; a batch is closed once it holds ``max_batch``
+    items or the next item is longer than ``(1 + max_pad_ratio)`` times its
+    shortest one. ``max_pad_ratio=0`` only groups identical lengths.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    buckets, current = [], []
+    for i in order:
+        if current and (len(current) >= max_batch
+                        or lengths[i] > lengths[current[0]] * (1.0 + max_pad_ratio)):
+            buckets.append(current)
+            current = []
+        current.append(i)
+    if current:
+        buckets.append(current)
+    return buckets
+
+
+def _pad_batch(waves, device):
+    """Zero-pad 1-D float32 waveforms (numpy or tensor) into a (B, T) tensor."""
+    tensors = [torch.as_tensor(w).reshape(-1).float() for w in waves]
+    return torch.nn.utils.rnn.pad_sequence(tensors, batch_first=True).to(device)
+
+
+class _PendingBuffer:
+    """Pending (not yet enrolled) voices for multi-sample enrollment.
+
+    Per pending ID the entry keeps a running embedding sum + count (the
+    running-average match target), its audio as a list of PCM_16 chunks
+    capped at ``max_bytes``, the stored speech seconds and a capped flag.
+    Unit-norm centroids of all entries are stacked in one matrix (rows in
+    creation order, updated in place), so best_match() scores every
+    candidate with one matrix-vector product. Cosine to the unit sum equals
+    cosine to the mean, so scores match the per-entry np.mean() loop.
+    Dict-like over entries: ``pid in buf``, ``buf[pid]``, ``buf.keys()``.
+    """
+
+    def __init__(self, dim: int, max_bytes: int):
+        self.dim = int(dim)
+        self.max_bytes = int(max_bytes)
+        self._entries = {}
+        self._ids: List[str] = []
+        self._centroids = np.zeros((16, self.dim), dtype=np.float32)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, pid):
+        return pid in self._entries
+
+    def __getitem__(self, pid):
+        return self._entries[pid]
+
+    def __iter__(self):
+        return iter(list(self._ids))
+
+    def keys(self):
+        return list(self._ids)
+
+    def items(self):
+        return [(pid, self._entries[pid]) for pid in self._ids]
+
+    def _set_centroid(self, entry):
+        norm = np.linalg.norm(entry["emb_sum"])
+        row = self._centroids[entry["row"]]
+        if norm > 0:
+            row[:] = entry["emb_sum"] / norm
+        else:
+            row[:] = 0.0
+
+    def _add_audio(self, entry, audio_data, sample_rate):
+        """Append audio up to the byte cap. Returns True if this call capped it."""
+        room = self.max_bytes - entry["audio_bytes"]
+        chunk = bytes(audio_data[:max(0, room) // 2 * 2]) if audio_data else b""
+        if chunk:
+            entry["audio_chunks"].append(chunk)
+            entry["audio_bytes"] += len(chunk)
+            entry["total_duration"] += len(chunk) / (sample_rate * 2)
+        if not entry["capped"] and entry["audio_bytes"] >= self.max_bytes:
+            entry["capped"] = True
+            return True
+        return False
+
+    def add(self, pid, embedding, audio_data=None, sample_rate=16000):
+        """New entry from its first embedding + audio. Returns the entry."""
+        row = len(self._ids)
+        if row >= self._centroids.shape[0]:
+            grown = np.zeros((2 * self._centroids.shape[0], self.dim), dtype=np.float32)
+            grown[:row] = self._centroids[:row]
+            self._centroids = grown
+        entry = {
+            "emb_sum": np.asarray(embedding, dtype=np.float64).reshape(-1).copy(),
+            "count": 1,
+            "audio_chunks": [],
+            "audio_bytes": 0,
+            "total_duration": 0.0,
+            "capped": False,
+            "row": row,
+        }
+        self._ids.append(pid)
+        self._entries[pid] = entry
+        self._set_centroid(entry)
+        self._add_audio(entry, audio_data, sample_rate)
+        return entry
+
+    def append(self, pid, embedding, audio_data=None, sample_rate=16000):
+        """Add a sample to an entry. Returns True if its audio just hit the cap."""
+        entry = self._entries[pid]
+        entry["emb_sum"] += np.asarray(embedding, dtype=np.float64).reshape(-1)
+        entry["count"] += 1
+        self._set_centroid(entry)
+        return self._add_audio(entry, audio_data, sample_rate)
+
+    def best_match(self, embedding) -> Tuple[Optional[str], float]:
+        """(pid, cosine) of the closest entry centroid; (None, 0.0) if no
+        entry scores above 0. Ties go to the oldest entry."""
+        n = len(self._ids)
+        if n == 0:
+            return None, 0.0
+        q = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(q)
+        if norm == 0:
+            return None, 0.0
+        scores = self._centroids[:n] @ (q / norm)
+        best = int(np.argmax(scores))
+        if scores[best] <= 0.0:
+            return None, 0.0
+        return self._ids[best], float(scores[best])
+
+    def audio(self, pid) -> bytes:
+        return b"".join(self._entries[pid]["audio_chunks"])
+
+    def pop(self, pid):
+        """Remove an entry (rows after it shift up, keeping creation order)."""
+        entry = self._entries.pop(pid)
+        row, n = entry["row"], len(self._ids)
+        self._centroids[row:n - 1] = self._centroids[row + 1:n]
+        self._centroids[n - 1] = 0.0
+        del self._ids[row]
+        for moved in self._ids[row:]:
+            self._entries[moved]["row"] -= 1
+        return entry
+
+    def __delitem__(self, pid):
+        self.pop(pid)
+
+
 class _SpeakerRecognition:
     """
     Speaker recognition with switchable models (16kHz input).
@@ -92,14 +248,19 @@ class _SpeakerRecognition:
     - wavlm_ssl: WavLM-Base+ MHFA from theolepage/wavlm_ssl_sv (256-dim)
 
     Each model has its own embedding directory under /workspace/database/.
-    Matches via in-memory cosine similarity (sklearn).
-    Thread-safe via Lock.
+    Matches via cosine similarity against an in-memory vector index
+    (index_kind "exact" scans every voice, "ivf" probes k-means lists for
+    large databases).
+    Thread-safe: one lock around model inference, another around the voice DB
+    (sessions match and enroll from separate threads).
     """
 
     def __init__(self,
                  model_name: str = "eres2netv2",
                  recognition_threshold: float = 0.7,
-                 device: str = "cuda:1"):
+                 device: str = "cuda:1",
+                 index_kind: str = "exact",
+                 index_nprobe: int = 16):
         if model_name not in MODEL_REGISTRY:
             raise ValueError(
                 f"Unknown model '{model_name}'. "
@@ -112,7 +273,9 @@ class _SpeakerRecognition:
         self.db_dir = Path(config["db_dir"])
         self.recognition_threshold = recognition_threshold
         self.emb_dim = config["emb_dim"]
-        self._lock = threading.Lock()
+        self._batch_masked = config["batch_masked"]
+        self._lock = threading.Lock()       # model inference
+        self._db_lock = threading.RLock()   # voice index + voice store
         self._display_name = config["display_name"]
 
         # Ensure embedding directory exists
@@ -124,10 +287,16 @@ class _SpeakerRecognition:
         loader(config["model_id"], device)
         _log_event("OK", "MODEL READY", f"{self._display_name} on {device}", _GREEN)
 
-        # Load existing voice embeddings from disk
-        self.known_ids, self.known_embeddings = self._load_database()
+        # Map the voice DB (one-time import of a per-file <id>.npy DB)
+        self._voices = VoiceStore(self.db_dir, self.emb_dim)
+        if self._voices.migrated:
+            _log_event("DB", "VOICE DB MIGRATED",
+                       f"{self._voices.migrated} .npy files -> {self._voices.path.name}", _YELLOW)
+        self._voice_index = make_index(index_kind, self.emb_dim, nprobe=index_nprobe)
+        for face_id, emb in zip(self._voices.ids, self._voices.matrix):
+            self._voice_index.add(face_id, emb)
         _log_event("DB", "VOICE DB",
-                   f"{len(self.known_ids)} voices loaded from {self.db_dir}  "
+                   f"{len(self._voices)} voices loaded from {self.db_dir}  "
                    f"[{self._display_name}]", _CYAN)
 
     # ===================== Model Loaders =====================
@@ -206,9 +375,11 @@ class _SpeakerRecognition:
 
     # ===================== Embedding Extractors =====================
 
+    # Extractors take float32 samples in [-1, 1] as a numpy array or a tensor.
+
     def _extract_eres2netv2(self, audio_np: np.ndarray) -> np.ndarray:
         """Extract embedding using ERes2NetV2 (ModelScope)."""
-        audio_tensor = torch.from_numpy(audio_np).to(self.device)
+        audio_tensor = torch.as_tensor(audio_np).to(self.device)
         with torch.no_grad():
             embedding = self.model(audio_tensor)
 
@@ -220,16 +391,17 @@ class _SpeakerRecognition:
 
     def _extract_titanet(self, audio_np: np.ndarray) -> np.ndarray:
         """Extract embedding using TitaNet Large (NeMo)."""
+        if isinstance(audio_np, torch.Tensor):
+            audio_np = audio_np.cpu().numpy()
         try:
             # Preferred: direct numpy input (NeMo >= 1.23)
             emb = self.model.infer_segment(audio_np)
         except (AttributeError, TypeError):
-            # Fallback: write temp WAV for older NeMo versions
-            wav_path = self._float32_to_temp_wav(audio_np)
-            try:
-                emb = self.model.get_embedding(wav_path)
-            finally:
-                os.remove(wav_path)
+            # Older NeMo: call forward() directly (what infer_segment wraps)
+            signal = torch.as_tensor(audio_np).unsqueeze(0).to(self.device)
+            length = torch.tensor([signal.shape[1]], device=self.device)
+            with torch.no_grad():
+                _, emb = self.model.forward(input_signal=signal, input_signal_length=length)
         # NeMo may return (embedding, logits) tuple
         if isinstance(emb, tuple):
             emb = emb[0]
@@ -239,20 +411,98 @@ class _SpeakerRecognition:
 
     def _extract_redimnet(self, audio_np: np.ndarray) -> np.ndarray:
         """Extract embedding using ReDimNet B6 (torch.hub)."""
-        waveform = torch.from_numpy(audio_np).unsqueeze(0).to(self.device)
+        waveform = torch.as_tensor(audio_np).unsqueeze(0).to(self.device)
         with torch.no_grad():
             emb = self.model(waveform)
         return emb.squeeze(0).cpu().float().numpy().flatten()
 
     def _extract_wavlm_ssl(self, audio_np: np.ndarray) -> np.ndarray:
         """Extract 256-dim embedding using WavLM-Base+ MHFA."""
-        waveform = torch.from_numpy(audio_np).unsqueeze(0).to(self.device)
+        waveform = torch.as_tensor(audio_np).unsqueeze(0).to(self.device)
         with torch.no_grad():
             emb = self.model([waveform, "test"])
         if isinstance(emb, torch.Tensor):
             emb = emb.cpu().numpy()
         return emb.flatten()
 
+    # Batch extractors take a list of float32 waveforms already grouped by
+    # _length_buckets and return a (B, emb_dim) array in the same order.
+
+    def _extract_batch_eres2netv2(self, waves) -> np.ndarray:
+        """Batched ERes2NetV2: per-item fbank + CMN (as the ModelScope
+        wrapper does), zero-padded along time. Every Conv2d input is masked
+        past each item's length so padding reads as the conv's own zero
+        padding, and the TSTP statistics only cover valid frames."""
+        import torchaudio.compliance.kaldi as Kaldi
+
+        backbone = self.model.embedding_model
+        feats = []
+        for w in waves:
+            f = Kaldi.fbank(torch.as_tensor(w).reshape(1, -1).float(),
+                            num_mel_bins=self.model.feature_dim)
+            feats.append(f - f.mean(dim=0, keepdim=True))
+        lengths = [f.shape[0] for f in feats]
+        x = torch.nn.utils.rnn.pad_sequence(feats, batch_first=True).to(self.device)
+
+        # Valid frames per item at each time resolution (stride-2 convs
+        # with padding 1 map T -> ceil(T / 2)).
+        valid_at = {}
+        t_max, valid = x.shape[1], torch.tensor(lengths, device=self.device)
+        for _ in range(4):
+            valid_at.setdefault(t_max, valid)
+            t_max, valid = (t_max + 1) // 2, (valid + 1) // 2
+
+        def _time_mask(t):
+            return (torch.arange(t, device=self.device)[None, :]
+                    < valid_at[t][:, None])[:, None, None, :]
+
+        def _mask_input(_module, inputs):
+            return (inputs[0] * _time_mask(inputs[0].shape[-1]),) + tuple(inputs[1:])
+
+        hooks = [m.register_forward_pre_hook(_mask_input)
+                 for m in backbone.modules() if isinstance(m, torch.nn.Conv2d)]
+        try:
+            with torch.no_grad():
+                out = x.permute(0, 2, 1).unsqueeze(1)      # (B, 1, F, T)
+                out = torch.relu(backbone.bn1(backbone.conv1(out)))
+                out3 = backbone.layer3(backbone.layer2(backbone.layer1(out)))
+                out4 = backbone.layer4(out3)
+                fused = backbone.fuse34(out4, backbone.layer3_ds(out3))
+        finally:
+            for h in hooks:
+                h.remove()
+
+        with torch.no_grad():
+            mask = _time_mask(fused.shape[-1]).float()
+            n = valid_at[fused.shape[-1]].float()[:, None, None]
+            mean = (fused * mask).sum(dim=-1) / n
+            var = (((fused - mean[..., None]) ** 2) * mask).sum(dim=-1) / (n - 1).clamp(min=1)
+            stats = torch.cat((mean.flatten(1), torch.sqrt(var + 1e-8).flatten(1)), dim=1)
+            emb = backbone.seg_1(stats)
+            if backbone.two_emb_layer:
+                emb = backbone.seg_2(backbone.seg_bn_1(torch.relu(emb)))
+        return emb.cpu().numpy()
+
+    def _extract_batch_titanet(self, waves) -> np.ndarray:
+        """Batched TitaNet: NeMo's forward() masks by input_signal_length."""
+        signal = _pad_batch(waves, self.device)
+        lengths = torch.tensor([len(w) for w in waves], device=self.device)
+        with torch.no_grad():
+            _, emb = self.model.forward(input_signal=signal, input_signal_length=lengths)
+        return emb.cpu().numpy()
+
+    def _extract_batch_redimnet(self, waves) -> np.ndarray:
+        """Batched ReDimNet. No length input: padding reaches the pooling."""
+        with torch.no_grad():
+            emb = self.model(_pad_batch(waves, self.device))
+        return emb.cpu().float().numpy()
+
+    def _extract_batch_wavlm_ssl(self, waves) -> np.ndarray:
+        """Batched WavLM-MHFA. No length input: padding reaches the pooling."""
+        with torch.no_grad():
+            emb = self.model([_pad_batch(waves, self.device), "test"])
+        return emb.cpu().numpy()
+
     # ===================== Public API =====================
 
     def _ensure_db_directory(self):
@@ -261,64 +511,39 @@ class _SpeakerRecognition:
             self.db_dir.mkdir(parents=True, exist_ok=True)
             logger.info(f"Created voice DB directory: {self.db_dir}")
 
-    def _load_database(self) -> Tuple[List[str], np.ndarray]:
-        """
-        Load known voice embeddings and IDs from the database directory.
-
-        Returns:
-            (list of face_ids, np.ndarray of embeddings stacked)
-        """
-        embedding_files = glob.glob(str(self.db_dir / "*.npy"))
-        known_ids = []
-        known_embeddings = []
-
-        for ef in embedding_files:
-            face_id = Path(ef).stem  # e.g., "face_1" from "face_1.npy"
-            emb = np.load(ef)
-            known_ids.append(face_id)
-            known_embeddings.append(emb.flatten())
-
-        if known_embeddings:
-            known_embeddings = np.vstack(known_embeddings)
-        else:
-            known_embeddings = np.array([])
+    @property
+    def known_ids(self) -> List[str]:
+        """Enrolled voice IDs, in row order of ``known_embeddings``."""
+        return self._voices.ids
 
-        return known_ids, known_embeddings
+    @property
+    def known_embeddings(self) -> np.ndarray:
+        """(N, emb_dim) read-only view onto the mapped voice DB."""
+        return self._voices.matrix
 
-    def _audio_bytes_to_temp_wav(self, audio_data: bytes, sample_rate: int = 16000) -> str:
-        """Save raw PCM_16 bytes to a temporary WAV file. Returns path."""
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".wav")
-        temp_file_path = temp_file.name
-        temp_file.close()
-        try:
-            with wave.open(temp_file_path, 'wb') as wave_file:
-                wave_file.setnchannels(1)
-                wave_file.setsampwidth(2)
-                wave_file.setframerate(sample_rate)
-                wave_file.writeframes(audio_data)
-            return temp_file_path
-        except Exception:
-            if os.path.exists(temp_file_path):
-                os.remove(temp_file_path)
-            raise
-
-    def _float32_to_temp_wav(self, audio_np: np.ndarray, sample_rate: int = 16000) -> str:
-        """Save float32 numpy array to a temporary WAV file. Returns path."""
-        import soundfile as sf
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".wav")
-        temp_file_path = temp_file.name
-        temp_file.close()
-        try:
-            sf.write(temp_file_path, audio_np.astype(np.float32), sample_rate)
-            return temp_file_path
-        except Exception:
-            if os.path.exists(temp_file_path):
-                os.remove(temp_file_path)
-            raise
-
-    def extract_embedding(self, audio_data: bytes, sample_rate: int = 16000) -> np.ndarray:
+    @staticmethod
+    def _to_float32(audio_data):
+        """
+        Mono float32 samples in [-1, 1] from PCM_16 bytes, an int16 / float32
+        numpy array or a torch tensor (int tensors are PCM_16 scaled). Tensors
+        stay tensors (and on their device); everything else becomes numpy.
         """
-        Extract 192-dim embedding from raw PCM_16 audio bytes.
+        if isinstance(audio_data, torch.Tensor):
+            audio_data = audio_data.detach().reshape(-1)
+            if audio_data.is_floating_point():
+                return audio_data.float()
+            return audio_data.float() / 32768.0
+        if isinstance(audio_data, np.ndarray):
+            if np.issubdtype(audio_data.dtype, np.floating):
+                return np.ascontiguousarray(audio_data.reshape(-1), dtype=np.float32)
+            return audio_data.reshape(-1).astype(np.float32) / 32768.0
+        return np.frombuffer(audio_data, dtype=np.int16).astype(np.float32) / 32768.0
+
+    def extract_embedding(self, audio_data, sample_rate: int = 16000) -> np.ndarray:
+        """
+        Extract 192-dim embedding from raw PCM_16 audio bytes, or in memory
+        from an int16 / float32 array or torch tensor (see _to_float32).
+        Never touches the filesystem.
         Uses the active model selected at init time.
         Thread-safe via Lock.
 
@@ -326,9 +551,7 @@ class _SpeakerRecognition:
             np.ndarray of shape (192,)
         """
         with self._lock:
-            # Convert PCM_16 bytes → float32 numpy, normalized to [-1, 1]
-            audio_np = np.frombuffer(audio_data, dtype=np.int16).astype(np.float32)
-            audio_np = audio_np / 32768.0
+            audio_np = self._to_float32(audio_data)
 
             extractor = getattr(self, f"_extract_{self.model_name}")
             embedding = extractor(audio_np)
@@ -341,28 +564,67 @@ class _SpeakerRecognition:
 
             return embedding
 
+    def extract_embeddings_batch(self, audio_list, sample_rate: int = 16000,
+                                 max_batch: int = 16,
+                                 max_pad_ratio: Optional[float] = None
+                                 ) -> List[Optional[np.ndarray]]:
+        """
+        Extract one embedding per clip with as few forward passes as possible.
+        Clips take any format extract_embedding accepts. They are sorted by
+        length and grouped into batches of at most ``max_batch``, where the
+        longest clip is at most ``(1 + max_pad_ratio)`` times the shortest.
+
+        max_pad_ratio defaults to 0.5 for backbones whose batch path masks
+        padding (eres2netv2, titanet: same embeddings as extract_embedding)
+        and to 0.0 for the others (redimnet, wavlm_ssl), which then only
+        share a forward pass between clips of identical length. Raising it
+        there trades exactness for fewer calls.
+
+        Returns:
+            list aligned with audio_list: np.ndarray of shape (emb_dim,), or
+            None for an empty clip
+        """
+        if max_pad_ratio is None:
+            max_pad_ratio = 0.5 if self._batch_masked else 0.0
+        results: List[Optional[np.ndarray]] = [None] * len(audio_list)
+        with self._lock:
+            waves = [self._to_float32(a) for a in audio_list]
+            live = [i for i, w in enumerate(waves) if len(w) > 0]
+            extractor = getattr(self, f"_extract_batch_{self.model_name}")
+            for bucket in _length_buckets([len(waves[i]) for i in live],
+                                          max(1, max_batch), max_pad_ratio):
+                idx = [live[b] for b in bucket]
+                embeddings = extractor([waves[i] for i in idx])
+                if embeddings.shape != (len(idx), self.emb_dim):
+                    raise ValueError(
+                        f"Expected ({len(idx)}, {self.emb_dim}) embeddings, got "
+                        f"{tuple(embeddings.shape)} from {self._display_name}."
+                    )
+                for i, emb in zip(idx, embeddings):
+                    results[i] = emb
+        return results
+
     def _match_voice(self, embedding: np.ndarray) -> Tuple[Optional[str], float]:
         """
-        Match embedding against all known voice embeddings using cosine similarity.
+        Match embedding against the known voice embeddings (vector index) using cosine similarity.
 
         Returns:
             (face_id, score) if match >= threshold, else (None, best_score)
         """
-        if self.known_embeddings.size == 0:
-            _log_event("--", "VOICE MATCH", "DB empty, no match possible", _DIM)
+        with self._db_lock:
+            if len(self._voice_index) == 0:
+                _log_event("--", "VOICE MATCH", "DB empty, no match possible", _DIM)
+                return None, 0.0
+            hits = self._voice_index.search(embedding, 1)
+        if not hits:
             return None, 0.0
-
-        embedding_2d = embedding.reshape(1, -1)
-        sim = cosine_similarity(embedding_2d, self.known_embeddings)
-        best_match_idx = np.argmax(sim)
-        best_score = float(sim[0, best_match_idx])
+        best_name, best_score = hits[0]
 
         if best_score >= self.recognition_threshold:
-            matched_id = self.known_ids[best_match_idx]
+            matched_id = best_name
             _log_event("~~", "VOICE MATCH", f"{_BOLD}{matched_id}{_RESET}  score={best_score:.4f}", _GREEN)
             return matched_id, best_score
         else:
-            best_name = self.known_ids[best_match_idx] if self.known_ids else "N/A"
             _log_event("xx", "NO MATCH", f"best={best_name}  score={best_score:.4f}  threshold={self.recognition_threshold}", _YELLOW)
             return None, best_score
 
@@ -372,19 +634,12 @@ class _SpeakerRecognition:
         Save a voice embedding to disk under the given face_id.
 
         Saves:
-            {db_dir}/face_N.npy  — the 192-dim embedding
+            {db_dir}/voices.f32  — the embedding, appended as one row
             {db_dir}/face_N.wav  — the source audio (optional)
         """
-        # Save embedding
-        npy_path = self.db_dir / f"{face_id}.npy"
-        np.save(npy_path, embedding)
-
-        # Update in-memory arrays
-        self.known_ids.append(face_id)
-        if self.known_embeddings.size == 0:
-            self.known_embeddings = embedding.reshape(1, -1)
-        else:
-            self.known_embeddings = np.vstack([self.known_embeddings, embedding.reshape(1, -1)])
+        with self._db_lock:
+            self._voices.put(face_id, embedding)
+            self._voice_index.add(face_id, embedding)
 
         # Optionally save audio as WAV
         if audio_data is not None:
@@ -395,23 +650,21 @@ class _SpeakerRecognition:
                     wf.setsampwidth(2)
                     wf.setframerate(sample_rate)
                     wf.writeframes(audio_data)
-                _log_event(">>", "VOICE SAVED", f"{_BOLD}{face_id}{_RESET}  .npy + .wav", _MAGENTA)
+                _log_event(">>", "VOICE SAVED", f"{_BOLD}{face_id}{_RESET}  row + .wav", _MAGENTA)
             except Exception as e:
                 logger.warning(f"Failed to save WAV for {face_id}: {e}")
-                _log_event(">>", "VOICE SAVED", f"{_BOLD}{face_id}{_RESET}  .npy only", _MAGENTA)
+                _log_event(">>", "VOICE SAVED", f"{_BOLD}{face_id}{_RESET}  row only", _MAGENTA)
         else:
-            _log_event(">>", "VOICE SAVED", f"{_BOLD}{face_id}{_RESET}  .npy only", _MAGENTA)
+            _log_event(">>", "VOICE SAVED", f"{_BOLD}{face_id}{_RESET}  row only", _MAGENTA)
 
     def has_voice(self, face_id: str) -> bool:
         """Check if a voice embedding exists for this face_id."""
-        return face_id in self.known_ids
+        return face_id in self._voices
 
     def _generate_voice_id(self) -> str:
-        """Generate a new voice_N ID (sequential, like face_N)."""
-        current_ids = [int(x.replace("voice_", ""))
-                       for x in self.known_ids if x.startswith("voice_")]
-        next_id = (max(current_ids) + 1) if current_ids else 1
-        return f"voice_{next_id}"
+        """Reserve a new voice_N ID (sequential, like face_N; O(1) counter)."""
+        with self._db_lock:
+            return self._voices.next_voice_id()
 
     # ===================== Multi-Sample Enrollment Buffer =====================
 
@@ -433,18 +686,23 @@ class _SpeakerRecognition:
             cls.PENDING_THRESHOLD_MAX,
         )
 
-    def init_enrollment_buffer(self):
-        """Initialize/reset the pending enrollment buffer.
+    def init_enrollment_buffer(self, sample_rate: int = 16000):
+        """Initialize/reset the pending enrollment buffer (_PendingBuffer).
 
         Schema per pending entry:
             {
-                "embeddings":         [np.ndarray, ...],  # for running-average match
-                "accumulated_audio":  bytearray,           # raw concat of cluster audio
-                "total_duration":     float,               # speech seconds (post-diar)
-                "capped":             bool,                # True once MAX_PENDING_AUDIO reached
+                "emb_sum":        np.ndarray,   # running sum (running-average match)
+                "count":          int,          # embeddings summed
+                "audio_chunks":   [bytes, ...], # raw cluster audio, capped at MAX_PENDING_AUDIO
+                "audio_bytes":    int,
+                "total_duration": float,        # stored speech seconds (post-diar)
+                "capped":         bool,         # True once MAX_PENDING_AUDIO reached
+                "row":            int,          # centroid matrix row
             }
         """
-        self._pending = {}
+        self._pending = _PendingBuffer(
+            self.emb_dim, max_bytes=int(self.MAX_PENDING_AUDIO * sample_rate) * 2
+        )
         self._next_pending_id = 1
         _log_event("--", "ENROLL BUF", "Enrollment buffer initialized", _DIM)
 
@@ -453,8 +711,8 @@ class _SpeakerRecognition:
         """
         Match embedding against voice DB. If no match, add to pending enrollment buffer.
 
-        Pending entries accumulate cluster audio (raw concat, no padding) until they
-        pass the gate (>=min_samples AND >=MIN_ENROLL_DURATION speech). On gate pass,
+        Pending entries accumulate cluster audio (raw chunks, no padding, capped at
+        MAX_PENDING_AUDIO) until they pass the gate (>=min_samples AND >=MIN_ENROLL_DURATION speech). On gate pass,
         the accumulated audio is re-extracted through the speaker encoder once to
         produce the final stitched embedding.
 
@@ -472,7 +730,7 @@ class _SpeakerRecognition:
             }
         """
         if not hasattr(self, '_pending'):
-            self.init_enrollment_buffer()
+            self.init_enrollment_buffer(sample_rate)
 
         # Step 1: Match against voice DB
         matched_id, confidence = self._match_voice(embedding)
@@ -486,17 +744,9 @@ class _SpeakerRecognition:
                 "status": f"recognized:{matched_id}"
             }
 
-        # Step 2: Match against pending buffer entries (running average per entry)
-        best_pending_id = None
-        best_pending_score = 0.0
-        emb_2d = embedding.reshape(1, -1)
-
-        for pid, entry in self._pending.items():
-            avg_emb = np.mean(entry["embeddings"], axis=0).reshape(1, -1)
-            score = float(cosine_similarity(emb_2d, avg_emb)[0, 0])
-            if score > best_pending_score:
-                best_pending_score = score
-                best_pending_id = pid
+        # Step 2: Match against pending buffer entries (running average per
+        # entry; one matrix-vector product over all centroids)
+        best_pending_id, best_pending_score = self._pending.best_match(embedding)
 
         if best_pending_id is not None:
             # Adaptive threshold computed against the CANDIDATE entry's total_duration
@@ -523,23 +773,15 @@ class _SpeakerRecognition:
                     "status": f"pending_capped:{best_pending_id}"
                 }
 
-            # Append embedding for running-average match
-            entry["embeddings"].append(embedding)
-
-            # Append raw audio bytes (no silence, no padding)
-            if audio_data:
-                dur = len(audio_data) / (sample_rate * 2)
-                entry["accumulated_audio"].extend(audio_data)
-                entry["total_duration"] += dur
-
-                if entry["total_duration"] >= self.MAX_PENDING_AUDIO:
-                    entry["capped"] = True
-                    _log_event("!!", "CAP REACHED",
-                               f"{_BOLD}{best_pending_id}{_RESET}  "
-                               f"{entry['total_duration']:.1f}s "
-                               f">= {self.MAX_PENDING_AUDIO:.0f}s, freezing", _YELLOW)
+            # Add embedding to the running sum; append raw audio bytes (no
+            # silence, no padding) up to the MAX_PENDING_AUDIO byte cap
+            if self._pending.append(best_pending_id, embedding, audio_data, sample_rate):
+                _log_event("!!", "CAP REACHED",
+                           f"{_BOLD}{best_pending_id}{_RESET}  "
+                           f"{entry['total_duration']:.1f}s "
+                           f">= {self.MAX_PENDING_AUDIO:.0f}s, freezing", _YELLOW)
 
-            n_samples = len(entry['embeddings'])
+            n_samples = entry["count"]
             total_dur = entry["total_duration"]
             _log_event("..", "PENDING",
                        f"{_BOLD}{best_pending_id}{_RESET}  "
@@ -564,16 +806,7 @@ class _SpeakerRecognition:
         # Step 3: No match in DB or buffer — create new pending entry
         pid = f"pending_{self._next_pending_id}"
         self._next_pending_id += 1
-        dur = len(audio_data) / (sample_rate * 2) if audio_data else 0.0
-        accum = bytearray()
-        if audio_data:
-            accum.extend(audio_data)
-        self._pending[pid] = {
-            "embeddings": [embedding],
-            "accumulated_audio": accum,
-            "total_duration": dur,
-            "capped": dur >= self.MAX_PENDING_AUDIO,
-        }
+        dur = self._pending.add(pid, embedding, audio_data, sample_rate)["total_duration"]
 
         _log_event("++", "NEW PENDING",
                    f"{_BOLD}{pid}{_RESET}  1/{min_samples} samples  "
@@ -597,9 +830,9 @@ class _SpeakerRecognition:
         prototype embedding, which is more reliable than averaging short-clip
         embeddings.
         """
+        accumulated_audio = self._pending.audio(pending_id)
         entry = self._pending.pop(pending_id)
-        accumulated_audio = bytes(entry["accumulated_audio"])
-        n_samples = len(entry["embeddings"])
+        n_samples = entry["count"]
         total_dur = entry["total_duration"]
 
         # Re-extract embedding from the full stitched audio
@@ -610,7 +843,7 @@ class _SpeakerRecognition:
         if norm > 0:
             stitched_embedding = stitched_embedding / norm
 
-        # Generate voice_id and save (saves npy + the FULL stitched WAV)
+        # Generate voice_id and save (saves the row + the FULL stitched WAV)
         voice_id = self._generate_voice_id()
         self._save_voice(voice_id, stitched_embedding, accumulated_audio, sample_rate)
 
@@ -638,8 +871,8 @@ class _SpeakerRecognition:
         results = []
         for pid in list(self._pending.keys()):
             entry = self._pending[pid]
-            n = len(entry["embeddings"])
-            total_dur = entry.get("total_duration", 0.0)
+            n = entry["count"]
+            total_dur = entry["total_duration"]
             if n >= min_samples and total_dur >= self.MIN_ENROLL_DURATION:
                 result = self._flush_enrollment(pid, sample_rate)
                 results.append(result)
@@ -748,6 +981,79 @@ MIN_CLEAN_DURATION_QUICKMATCH = 1.0        # seconds LCCS needed for quick-match
 MIN_CLEAN_DURATION_ENROLL = 3.0            # seconds LCCS needed for enrollment
 
 
+def _single_speaker_idxs(powerset_class_map, soft_data_raw):
+    """
+    Re-derive single-speaker class indices against the ACTUAL soft_data shape.
+    The Powerset.cardinality computed at startup discovery can mismatch the
+    model's actual output dimension if the loaded checkpoint's specs.classes
+    / specs.powerset_max_classes don't reflect the true output channel count.
+    Filter the discovered indices against the runtime shape to avoid OOB.
+    """
+    discovered_single_idxs = powerset_class_map["single_speaker_class_idxs"]
+    actual_num_classes = soft_data_raw.shape[-1]
+    single_idxs = [i for i in discovered_single_idxs if 0 <= i < actual_num_classes]
+    if not single_idxs:
+        # Fallback: derive from cardinality of a freshly-built powerset matching
+        # the actual shape. We don't know N and M, but we can infer single-speaker
+        # classes from the powerset enumeration: for any (N, M) layout, the
+        # single-speaker classes occupy positions [1 .. N] (silence is index 0,
+        # then single-speaker classes, then 2-overlap, etc.). For 4 classes:
+        # either N=2,M=2 (single=[1,2]) or N=3,M=1 (single=[1,2,3]).
+        # Without N, fall back to "all classes except silence and overlap by
+        # excluding the largest set sizes" — but the safest default is positions
+        # [1 .. min(N_discovered, actual_num_classes-1)].
+        fallback_max = min(len(discovered_single_idxs), actual_num_classes - 1)
+        single_idxs = list(range(1, 1 + fallback_max))
+        if not single_idxs:
+            raise RuntimeError(
+                f"_compute_alone_timeline: cannot derive single-speaker class indices. "
+                f"discovered={discovered_single_idxs}, actual_num_classes={actual_num_classes}, "
+                f"soft_data_raw.shape={soft_data_raw.shape}"
+            )
+    return single_idxs
+
+
+def _window_alone_frames(soft_data_raw, chunk_sliding_window, powerset_class_map, frame_rate_hz):
+    """
+    Per-window half of _compute_alone_timeline: P(single speaker) on the
+    window's posterior frame grid, averaged over every chunk covering a frame.
+
+    It depends only on the window's posteriors, not on the cluster, so callers
+    compute it once per window and pass it to _compute_alone_timeline for each
+    cluster (window_alone=...), which then only gathers its segments' frames.
+    Chunk contributions are accumulated in the same order as the per-segment
+    scatter used to, so the result is bit-identical.
+
+    Returns:
+        (first_frame, alone): alone[i] is the float32 mean for grid frame
+        first_frame + i (window-local frame index), 0.0 where no chunk covers it.
+    """
+    single_idxs = _single_speaker_idxs(powerset_class_map, soft_data_raw)
+    alone_per_chunk = soft_data_raw[:, :, single_idxs].sum(axis=-1).astype(np.float32)
+    num_chunks, frames_per_chunk = alone_per_chunk.shape
+    if alone_per_chunk.size == 0:
+        return 0, np.zeros(0, dtype=np.float32)
+
+    chunk_starts = np.array(
+        [chunk_sliding_window[c].start for c in range(num_chunks)],
+        dtype=np.float64
+    )
+    frame_offsets_sec = np.arange(frames_per_chunk, dtype=np.float64) / frame_rate_hz
+    chunk_frame_wc = chunk_starts[:, None] + frame_offsets_sec[None, :]
+    chunk_frame_global = np.round(chunk_frame_wc * frame_rate_hz).astype(np.int64)
+
+    first_frame = int(chunk_frame_global.min())
+    flat_idx = (chunk_frame_global - first_frame).ravel()
+    num_frames = int(flat_idx.max()) + 1
+
+    alone = np.zeros(num_frames, dtype=np.float32)
+    np.add.at(alone, flat_idx, alone_per_chunk.ravel())
+    counts = np.bincount(flat_idx, minlength=num_frames).astype(np.int32)
+    mask = counts > 0
+    alone[mask] /= counts[mask]
+    return first_frame, alone
+
+
 def _compute_alone_timeline(
     cluster_segments,
     cluster_segment_byte_lens,
@@ -758,6 +1064,7 @@ def _compute_alone_timeline(
     sample_rate,
     window_offset_s=0.0,
     apply_median_filter=True,
+    window_alone=None,
 ):
     """
     Build a per-frame "single-speaker-any" probability timeline aligned to
@@ -803,6 +1110,8 @@ def _compute_alone_timeline(
         sample_rate: audio sample rate (e.g. 16000)
         window_offset_s: subtract from each segment's start to get window-local
         apply_median_filter: smooth output timeline with size=11 median
+        window_alone: _window_alone_frames(...) for this window's posteriors;
+            computed here when None
 
     Returns:
         np.ndarray of shape (sum(cluster_segment_byte_lens) // bytes_per_frame,) float32.
@@ -828,75 +1137,27 @@ def _compute_alone_timeline(
     if total_output_frames == 0 or not cluster_segments:
         return np.zeros(0, dtype=np.float32)
 
-    # Re-derive single-speaker class indices against the ACTUAL soft_data shape.
-    # The Powerset.cardinality computed at startup discovery can mismatch the
-    # model's actual output dimension if the loaded checkpoint's specs.classes
-    # / specs.powerset_max_classes don't reflect the true output channel count.
-    # Filter the discovered indices against the runtime shape to avoid OOB.
-    discovered_single_idxs = powerset_class_map["single_speaker_class_idxs"]
-    actual_num_classes = soft_data_raw.shape[-1]
-    single_idxs = [i for i in discovered_single_idxs if 0 <= i < actual_num_classes]
-    if not single_idxs:
-        # Fallback: derive from cardinality of a freshly-built powerset matching
-        # the actual shape. We don't know N and M, but we can infer single-speaker
-        # classes from the powerset enumeration: for any (N, M) layout, the
-        # single-speaker classes occupy positions [1 .. N] (silence is index 0,
-        # then single-speaker classes, then 2-overlap, etc.). For 4 classes:
-        # either N=2,M=2 (single=[1,2]) or N=3,M=1 (single=[1,2,3]).
-        # Without N, fall back to "all classes except silence and overlap by
-        # excluding the largest set sizes" — but the safest default is positions
-        # [1 .. min(N_discovered, actual_num_classes-1)].
-        fallback_max = min(len(discovered_single_idxs), actual_num_classes - 1)
-        single_idxs = list(range(1, 1 + fallback_max))
-        if not single_idxs:
-            raise RuntimeError(
-                f"_compute_alone_timeline: cannot derive single-speaker class indices. "
-                f"discovered={discovered_single_idxs}, actual_num_classes={actual_num_classes}, "
-                f"soft_data_raw.shape={soft_data_raw.shape}"
-            )
-
-    alone_per_chunk = soft_data_raw[:, :, single_idxs].sum(axis=-1).astype(np.float32)
-    num_chunks, frames_per_chunk = alone_per_chunk.shape
-
-    chunk_starts = np.array(
-        [chunk_sliding_window[c].start for c in range(num_chunks)],
-        dtype=np.float64
+    if window_alone is None:
+        window_alone = _window_alone_frames(
+            soft_data_raw, chunk_sliding_window, powerset_class_map, frame_rate_hz
+        )
+    first_frame, alone = window_alone
+
+    # Window grid frame of every output frame: each segment's start frame
+    # (window-global wall-clock converted to window-local) plus its position
+    # within the segment.
+    seg_frames = np.array(per_segment_frames, dtype=np.int64)
+    seg_start_frames = np.array(
+        [int(round((s_start - window_offset_s) * frame_rate_hz)) for s_start, _ in cluster_segments],
+        dtype=np.int64
     )
-    frame_offsets_sec = np.arange(frames_per_chunk, dtype=np.float64) / frame_rate_hz
-    chunk_frame_wc = chunk_starts[:, None] + frame_offsets_sec[None, :]
-    chunk_frame_global = np.round(chunk_frame_wc * frame_rate_hz).astype(np.int64)
+    out_offsets = np.cumsum(seg_frames) - seg_frames
+    grid = np.repeat(seg_start_frames - first_frame - out_offsets, seg_frames)
+    grid += np.arange(total_output_frames, dtype=np.int64)
 
     output = np.zeros(total_output_frames, dtype=np.float32)
-    counts = np.zeros(total_output_frames, dtype=np.int32)
-
-    chunk_flat_global = chunk_frame_global.ravel()
-    chunk_flat_probs = alone_per_chunk.ravel()
-
-    out_offset = 0
-    for (s_start_global, _s_end_global), seg_frames in zip(cluster_segments, per_segment_frames):
-        if seg_frames == 0:
-            continue
-        if out_offset + seg_frames > total_output_frames:
-            seg_frames = total_output_frames - out_offset
-            if seg_frames <= 0:
-                break
-
-        # Convert window-global wall-clock to window-local for chunk alignment
-        s_start_local = s_start_global - window_offset_s
-        seg_start_frame = int(round(s_start_local * frame_rate_hz))
-
-        rel_pos = chunk_flat_global - seg_start_frame
-        valid = (rel_pos >= 0) & (rel_pos < seg_frames)
-
-        flat_out_idx = out_offset + rel_pos[valid]
-        flat_probs = chunk_flat_probs[valid]
-        np.add.at(output, flat_out_idx, flat_probs)
-        np.add.at(counts, flat_out_idx, 1)
-
-        out_offset += seg_frames
-
-    mask = counts > 0
-    output[mask] /= counts[mask]
+    covered = (grid >= 0) & (grid < len(alone))
+    output[covered] = alone[grid[covered]]
     # Frames with no chunk coverage stay 0.0 → rejected by threshold
 
     if apply_median_filter and total_output_frames >= 1:
@@ -947,3 +1208,40 @@ def _lccs_from_timeline(alone_timeline, threshold, cluster_audio, bytes_per_fram
     contiguous_bytes = cluster_audio[byte_start:byte_end]
 
     return contiguous_bytes, lccs_frames, total_clean_frames
+
+
+def _gate_cluster(alone_timeline, cluster_audio, bytes_per_frame, frame_rate_hz):
+    """
+    Three-tier per-frame gate for one diarization cluster.
+
+    Tiers:
+        "full":  LCCS@ENROLL >= MIN_CLEAN_DURATION_ENROLL → match_or_buffer on
+                 the strict span
+        "quick": LCCS@QUICK >= MIN_CLEAN_DURATION_QUICKMATCH → DB match only on
+                 the permissive span
+        "skip":  too contaminated to embed
+
+    Returns:
+        dict with "tier", "audio" (span to embed, None for skip) and the span
+        statistics in seconds: "enroll_lccs_s", "total_clean_strict_s",
+        "frag_strict", "quick_lccs_s" (None for the full tier)
+    """
+    enroll_audio, enroll_frames, total_clean_strict = _lccs_from_timeline(
+        alone_timeline, PER_FRAME_ALONE_THRESHOLD_ENROLL, cluster_audio, bytes_per_frame
+    )
+    gate = {
+        "enroll_lccs_s": enroll_frames / frame_rate_hz,
+        "total_clean_strict_s": total_clean_strict / frame_rate_hz,
+        "frag_strict": (total_clean_strict / enroll_frames) if enroll_frames > 0 else float('inf'),
+        "quick_lccs_s": None,
+    }
+    if gate["enroll_lccs_s"] >= MIN_CLEAN_DURATION_ENROLL:
+        return dict(gate, tier="full", audio=enroll_audio)
+
+    quick_audio, quick_frames, _ = _lccs_from_timeline(
+        alone_timeline, PER_FRAME_ALONE_THRESHOLD_QUICK, cluster_audio, bytes_per_frame
+    )
+    gate["quick_lccs_s"] = quick_frames / frame_rate_hz
+    if gate["quick_lccs_s"] < MIN_CLEAN_DURATION_QUICKMATCH:
+        return dict(gate, tier="skip", audio=None)
+    return dict(gate, tier="quick", audio=quick_audio)
@@ -0,0 +1,211 @@
+"""
+Voice DB: one memory-mapped float32 matrix + an append-only ID table.
+
+Layout under the model's db_dir:
+    voices.f32   64-byte header, then a preallocated (capacity, dim) float32
+                 matrix (row i = embedding of ids[i])
+    voices.ids   one voice ID per line, in row order
+    <id>.wav     optional source audio (written by _SpeakerRecognition)
+
+Header (little-endian): magic "GVOICE01", dim u32, reserved u32, capacity u64,
+count u64, next_voice u64. ``count`` is the commit point: an append writes the
+row and its ID line first and only then bumps ``count``, so a crash in between
+leaves the DB at the previous size (the stray ID line is trimmed on open).
+``next_voice`` is the voice_N counter, so new IDs are O(1). Capacity doubles
+by extending the file; existing rows never move.
+
+The old layout (one <id>.npy per voice) is migrated on first open; the .npy
+files are left in place. See tools/voice_db_migrate.py for doing it offline.
+"""
+import glob
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+MAGIC = b"GVOICE01"
+HEADER_BYTES = 64
+_HEADER = np.dtype([
+    ("magic", "S8"), ("dim", "<u4"), ("reserved", "<u4"),
+    ("capacity", "<u8"), ("count", "<u8"), ("next_voice", "<u8"),
+])
+_VOICE_ID_RE = re.compile(r"^voice_(\d+)$")
+
+
+def _natural_key(name: str):
+    return [int(t) if t.isdigit() else t for t in re.split(r"(\d+)", name)]
+
+
+class VoiceStore:
+    """Append-mostly voice embedding table backed by ``voices.f32``.
+
+    Not thread-safe on its own; _SpeakerRecognition serialises writes with
+    its DB lock.
+    """
+
+    MATRIX_FILE = "voices.f32"
+    IDS_FILE = "voices.ids"
+
+    def __init__(self, db_dir, dim: int, initial_capacity: int = 1024):
+        self.db_dir = Path(db_dir)
+        self.dim = int(dim)
+        self.path = self.db_dir / self.MATRIX_FILE
+        self.ids_path = self.db_dir / self.IDS_FILE
+        self.migrated = 0
+        self._sync = True
+        self.db_dir.mkdir(parents=True, exist_ok=True)
+        if not self.path.exists():
+            self._build(initial_capacity)
+        self._open()
+
+    # ---- file handling -----------------------------------------------------
+
+    def _build(self, capacity: int):
+        """Create the store (importing any <id>.npy) under .part names and
+        rename it into place at the end, so an interrupted migration simply
+        reruns on the next open."""
+        final, final_ids = self.path, self.ids_path
+        self.path = final.with_name(final.name + ".part")
+        self.ids_path = final_ids.with_name(final_ids.name + ".part")
+        try:
+            capacity = max(1, int(capacity))
+            header = np.zeros((), dtype=_HEADER)
+            header["magic"], header["dim"], header["capacity"] = MAGIC, self.dim, capacity
+            header["next_voice"] = 1
+            with open(self.path, "wb") as f:
+                f.write(header.tobytes().ljust(HEADER_BYTES, b"\0"))
+                f.truncate(HEADER_BYTES + capacity * self.dim * 4)
+            with open(self.ids_path, "w"):
+                pass
+            self._open()
+            self._sync = False          # one fsync at the end instead of per row
+            self.migrated = self._migrate_npy()
+            self.close()
+            for path in (self.ids_path, self.path):
+                with open(path, "rb+") as f:
+                    os.fsync(f.fileno())
+            os.replace(self.ids_path, final_ids)
+            os.replace(self.path, final)    # commit
+        finally:
+            self.path, self.ids_path = final, final_ids
+            self._sync = True
+
+    def _map(self):
+        self._header = np.memmap(self.path, dtype=_HEADER, mode="r+", shape=())
+        self._mat = np.memmap(self.path, dtype=np.float32, mode="r+", offset=HEADER_BYTES,
+                              shape=(int(self._header["capacity"]), self.dim))
+
+    def _open(self):
+        self._map()
+        if bytes(self._header["magic"]) != MAGIC:
+            raise ValueError(f"{self.path}: not a voice store")
+        if int(self._header["dim"]) != self.dim:
+            raise ValueError(f"{self.path}: {int(self._header['dim'])}-dim store, "
+                             f"model produces {self.dim}-dim embeddings")
+        count = int(self._header["count"])
+        with open(self.ids_path, "r", encoding="utf-8") as f:
+            ids = f.read().splitlines()
+        if len(ids) < count:
+            raise ValueError(f"{self.ids_path}: {len(ids)} ids for {count} rows")
+        if len(ids) > count:        # append interrupted before the count update
+            self._rewrite_ids(ids[:count])
+        self._ids: List[str] = ids[:count]
+        self._rows: Dict[str, int] = {vid: i for i, vid in enumerate(self._ids)}
+
+    def _rewrite_ids(self, ids: List[str]):
+        tmp = self.ids_path.with_name(self.ids_path.name + ".part")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.writelines(vid + "\n" for vid in ids)
+        tmp.replace(self.ids_path)
+
+    def _grow(self):
+        capacity = 2 * int(self._header["capacity"])
+        self._mat.flush()
+        with open(self.path, "r+b") as f:     # extend first, then publish
+            f.truncate(HEADER_BYTES + capacity * self.dim * 4)
+        self._header["capacity"] = capacity
+        self._header.flush()
+        del self._mat, self._header
+        self._map()
+
+    def _migrate_npy(self) -> int:
+        """Import every <id>.npy in db_dir (natural sort order)."""
+        files = sorted(glob.glob(str(self.db_dir / "*.npy")),
+                       key=lambda p: _natural_key(Path(p).stem))
+        for path in files:
+            self.put(Path(path).stem, np.load(path))
+        return len(files)
+
+    # ---- reads -------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, voice_id: str) -> bool:
+        return voice_id in self._rows
+
+    @property
+    def ids(self) -> List[str]:
+        return list(self._ids)
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """(count, dim) view onto the mapped file (no copy)."""
+        return self._mat[:len(self._ids)]
+
+    def get(self, voice_id: str) -> Optional[np.ndarray]:
+        row = self._rows.get(voice_id)
+        return None if row is None else np.array(self._mat[row])
+
+    # ---- writes ------------------------------------------------------------
+
+    def put(self, voice_id: str, embedding: np.ndarray) -> int:
+        """Append ``voice_id`` (or overwrite its row if present). Returns the row."""
+        if not voice_id or "\n" in voice_id:
+            raise ValueError(f"invalid voice id {voice_id!r}")
+        vec = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        if vec.shape[0] != self.dim:
+            raise ValueError(f"expected {self.dim}-dim embedding, got {vec.shape[0]}")
+
+        row = self._rows.get(voice_id)
+        if row is not None:
+            self._mat[row] = vec
+            self._mat.flush()
+            return row
+
+        row = len(self._ids)
+        if row >= int(self._header["capacity"]):
+            self._grow()
+        self._mat[row] = vec
+        self._mat.flush()
+        with open(self.ids_path, "a", encoding="utf-8") as f:
+            f.write(voice_id + "\n")
+            if self._sync:
+                f.flush()
+                os.fsync(f.fileno())
+        m = _VOICE_ID_RE.match(voice_id)
+        if m and int(m.group(1)) >= int(self._header["next_voice"]):
+            self._header["next_voice"] = int(m.group(1)) + 1
+        self._header["count"] = row + 1       # commit
+        self._header.flush()
+        self._ids.append(voice_id)
+        self._rows[voice_id] = row
+        return row
+
+    def next_voice_id(self) -> str:
+        """Reserve the next voice_N ID (persisted; never reused)."""
+        n = int(self._header["next_voice"])
+        while f"voice_{n}" in self._rows:
+            n += 1
+        self._header["next_voice"] = n + 1
+        self._header.flush()
+        return f"voice_{n}"
+
+    def close(self):
+        if getattr(self, "_mat", None) is not None:
+            self._mat.flush()
+            self._header.flush()
+            del self._mat, self._header
+            self._mat = self._header = None
@@ -0,0 +1 @@
+from .index import ExactIndex, IVFFlatIndex, make_index, load_index
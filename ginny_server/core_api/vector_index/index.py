@@ -0,0 +1,322 @@
+"""Cosine-similarity indexes for identity galleries.
+
+``ExactIndex`` scans every stored vector (one matrix-vector product).
+``IVFFlatIndex`` partitions vectors with spherical k-means into ~sqrt(N)
+lists and only scans the ``nprobe`` lists whose centroids are closest to the
+query, so a search costs O(sqrt(N)·D) instead of O(N·D). Lists keep the
+full float32 vectors, so the returned top-k scores are exact cosines —
+the coarse step only decides which rows get scored.
+
+Both share one interface:
+
+    idx = make_index("ivf", dim=512)
+    idx.add("p_1", emb)           # insert, or overwrite an existing key
+    idx.update("p_1", new_emb)    # e.g. after an EMA update
+    idx.search(query, k=5)        # → [(key, cosine), ...], best first
+    idx.save(path) / load_index(path)
+
+Vectors are L2-normalised on insert. Not thread-safe; callers hold their
+own lock (galleries already do).
+"""
+from __future__ import annotations
+
+import json
+import math
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+_EPS = 1e-8
+
+
+def _unit(vec: np.ndarray) -> np.ndarray:
+    v = np.asarray(vec, dtype=np.float32).reshape(-1)
+    n = float(np.linalg.norm(v))
+    return v / n if n > _EPS else v
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores, best first."""
+    if k >= scores.shape[0]:
+        return np.argsort(-scores)
+    part = np.argpartition(-scores, k - 1)[:k]
+    return part[np.argsort(-scores[part])]
+
+
+class ExactIndex:
+    kind = "exact"
+    trained_at = 0      # size at the last (re)training; IVF only
+
+    def __init__(self, dim: int):
+        self.dim = int(dim)
+        self._vecs = np.zeros((16, self.dim), dtype=np.float32)
+        self._keys: List[str] = []
+        self._rows: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._rows
+
+    def keys(self) -> List[str]:
+        return list(self._keys)
+
+    def vector(self, key: str) -> Optional[np.ndarray]:
+        row = self._rows.get(key)
+        return None if row is None else self._vecs[row].copy()
+
+    def _grow(self, n: int) -> None:
+        if n <= self._vecs.shape[0]:
+            return
+        cap = self._vecs.shape[0]
+        while cap < n:
+            cap *= 2
+        grown = np.zeros((cap, self.dim), dtype=np.float32)
+        grown[: len(self._keys)] = self._vecs[: len(self._keys)]
+        self._vecs = grown
+
+    def add(self, key: str, vec: np.ndarray) -> None:
+        v = _unit(vec)
+        if v.shape[0] != self.dim:
+            raise ValueError(f"expected {self.dim}-dim vector, got {v.shape[0]}")
+        row = self._rows.get(key)
+        if row is None:
+            row = len(self._keys)
+            self._grow(row + 1)
+            self._keys.append(key)
+            self._rows[key] = row
+            self._vecs[row] = v
+            self._on_insert(row)
+        else:
+            self._vecs[row] = v
+            self._on_update(row)
+
+    def update(self, key: str, vec: np.ndarray) -> None:
+        self.add(key, vec)
+
+    def remove(self, key: str) -> None:
+        row = self._rows.pop(key, None)
+        if row is None:
+            return
+        last = len(self._keys) - 1
+        self._on_remove(row, last)
+        if row != last:
+            moved = self._keys[last]
+            self._keys[row] = moved
+            self._rows[moved] = row
+            self._vecs[row] = self._vecs[last]
+        self._keys.pop()
+
+    # hooks for IVFFlatIndex
+    def _on_insert(self, row: int) -> None:
+        pass
+
+    def _on_update(self, row: int) -> None:
+        pass
+
+    def _on_remove(self, row: int, last: int) -> None:
+        pass
+
+    def _candidates(self, q: np.ndarray) -> Optional[np.ndarray]:
+        """Rows to score for query ``q``; None means all of them."""
+        return None
+
+    def search(self, query: np.ndarray, k: int = 1) -> List[Tuple[str, float]]:
+        n = len(self._keys)
+        if n == 0 or k <= 0:
+            return []
+        q = _unit(query)
+        if q.shape[0] != self.dim:
+            return []
+        rows = self._candidates(q)
+        if rows is None:
+            scores = self._vecs[:n] @ q
+            best = _top_k(scores, k)
+            return [(self._keys[i], float(scores[i])) for i in best]
+        if rows.size == 0:
+            return []
+        scores = self._vecs[rows] @ q
+        best = _top_k(scores, k)
+        return [(self._keys[rows[i]], float(scores[i])) for i in best]
+
+    # ---- persistence -------------------------------------------------------
+
+    def _state(self) -> Dict[str, np.ndarray]:
+        return {}
+
+    def _meta(self) -> dict:
+        return {"kind": self.kind, "dim": self.dim}
+
+    def save(self, path: str | Path, vectors: bool = True) -> None:
+        """Write the index to ``path`` (npz). With ``vectors=False`` only the
+        trained structure is stored; callers re-``add`` from their own store."""
+        arrays = dict(self._state())
+        meta = self._meta()
+        if vectors:
+            arrays["vecs"] = self._vecs[: len(self._keys)]
+            meta["keys"] = self._keys
+        path = Path(path)
+        tmp = path.with_name(path.name + ".part")
+        with open(tmp, "wb") as fh:
+            np.savez(fh, meta=np.array(json.dumps(meta)), **arrays)
+        tmp.replace(path)
+
+
+class IVFFlatIndex(ExactIndex):
+    kind = "ivf"
+
+    def __init__(self, dim: int, nprobe: int = 8, min_train_size: int = 1024,
+                 seed: int = 0):
+        super().__init__(dim)
+        self.nprobe = max(1, int(nprobe))
+        self.min_train_size = max(2, int(min_train_size))
+        self.seed = int(seed)
+        self.centroids: Optional[np.ndarray] = None
+        self.trained_at = 0
+        self._assign = np.zeros(16, dtype=np.int32)        # row → list
+        self._lists: List[List[int]] = []
+        self._list_arrays: List[Optional[np.ndarray]] = []
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    # ---- coarse quantizer --------------------------------------------------
+
+    def train(self, iters: int = 10, sample: int = 64) -> None:
+        """Spherical k-means over (a sample of) the stored vectors, then
+        rebuild the inverted lists. nlist ≈ sqrt(N)."""
+        n = len(self._keys)
+        if n == 0:
+            return
+        nlist = max(1, int(round(math.sqrt(n))))
+        rng = np.random.default_rng(self.seed)
+        data = self._vecs[:n]
+        if n > nlist * sample:
+            data = data[rng.choice(n, nlist * sample, replace=False)]
+        cent = data[rng.choice(data.shape[0], nlist, replace=False)].copy()
+        for _ in range(iters):
+            lab = np.argmax(data @ cent.T, axis=1)
+            sums = np.zeros_like(cent)
+            np.add.at(sums, lab, data)
+            counts = np.bincount(lab, minlength=nlist)
+            empty = counts == 0
+            if empty.any():
+                sums[empty] = data[rng.choice(data.shape[0], int(empty.sum()))]
+            cent = sums / (np.linalg.norm(sums, axis=1, keepdims=True) + _EPS)
+        self.centroids = cent.astype(np.float32)
+        self.trained_at = n
+        self._rebuild_lists()
+
+    def _rebuild_lists(self) -> None:
+        n = len(self._keys)
+        nlist = self.centroids.shape[0]
+        self._assign = np.zeros(max(16, self._vecs.shape[0]), dtype=np.int32)
+        self._lists = [[] for _ in range(nlist)]
+        self._list_arrays = [None] * nlist
+        if n:
+            lab = np.argmax(self._vecs[:n] @ self.centroids.T, axis=1)
+            self._assign[:n] = lab
+            for row, c in enumerate(lab.tolist()):
+                self._lists[c].append(row)
+
+    def _nearest_list(self, row: int) -> int:
+        return int(np.argmax(self.centroids @ self._vecs[row]))
+
+    def _move(self, row: int, old: int, new: int) -> None:
+        if old == new:
+            return
+        self._lists[old].remove(row)
+        self._lists[new].append(row)
+        self._list_arrays[old] = self._list_arrays[new] = None
+        self._assign[row] = new
+
+    # ---- hooks -------------------------------------------------------------
+
+    def _on_insert(self, row: int) -> None:
+        n = len(self._keys)
+        if not self.trained:
+            if n >= self.min_train_size:
+                self.train()
+            return
+        if n >= 2 * self.trained_at:           # amortised O(1) retraining
+            self.train()
+            return
+        if row >= self._assign.shape[0]:
+            grown = np.zeros(self._vecs.shape[0], dtype=np.int32)
+            grown[: self._assign.shape[0]] = self._assign
+            self._assign = grown
+        c = self._nearest_list(row)
+        self._assign[row] = c
+        self._lists[c].append(row)
+        self._list_arrays[c] = None
+
+    def _on_update(self, row: int) -> None:
+        if self.trained:
+            self._move(row, int(self._assign[row]), self._nearest_list(row))
+
+    def _on_remove(self, row: int, last: int) -> None:
+        if not self.trained:
+            return
+        c = int(self._assign[row])
+        self._lists[c].remove(row)
+        self._list_arrays[c] = None
+        if row != last:
+            c_last = int(self._assign[last])
+            lst = self._lists[c_last]
+            lst[lst.index(last)] = row
+            self._list_arrays[c_last] = None
+            self._assign[row] = c_last
+
+    def _candidates(self, q: np.ndarray) -> Optional[np.ndarray]:
+        if not self.trained:
+            return None
+        probe = _top_k(self.centroids @ q, self.nprobe)
+        parts = []
+        for c in probe.tolist():
+            arr = self._list_arrays[c]
+            if arr is None:
+                arr = self._list_arrays[c] = np.asarray(self._lists[c], dtype=np.int64)
+            parts.append(arr)
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+
+    # ---- persistence -------------------------------------------------------
+
+    def _state(self) -> Dict[str, np.ndarray]:
+        return {"centroids": self.centroids} if self.trained else {}
+
+    def _meta(self) -> dict:
+        meta = super()._meta()
+        meta.update(nprobe=self.nprobe, min_train_size=self.min_train_size,
+                    seed=self.seed, trained_at=self.trained_at)
+        return meta
+
+
+def make_index(kind: str, dim: int, nprobe: int = 8,
+               min_train_size: int = 1024) -> ExactIndex:
+    """``kind`` is ``exact`` or ``ivf``."""
+    if kind == "exact":
+        return ExactIndex(dim)
+    if kind == "ivf":
+        return IVFFlatIndex(dim, nprobe=nprobe, min_train_size=min_train_size)
+    raise ValueError(f"Unknown index kind '{kind}'. Choose from: exact, ivf")
+
+
+def load_index(path: str | Path) -> ExactIndex:
+    """Inverse of ``save``. An index saved without vectors comes back empty
+    but (for IVF) already trained, so re-adding rows skips k-means."""
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(str(data["meta"]))
+        idx = make_index(meta["kind"], meta["dim"], nprobe=meta.get("nprobe", 8),
+                         min_train_size=meta.get("min_train_size", 1024))
+        if isinstance(idx, IVFFlatIndex) and "centroids" in data.files:
+            idx.seed = int(meta.get("seed", 0))
+            idx.centroids = data["centroids"].astype(np.float32)
+            idx.trained_at = int(meta.get("trained_at", 0))
+            idx._rebuild_lists()
+        if "vecs" in data.files:
+            for key, vec in zip(meta["keys"], data["vecs"]):
+                idx.add(key, vec)
+    return idx
@@ -99,10 +99,12 @@ MODEL_DISPLAY = {
 }
 
 
-def serve(port=50051, max_workers=10, model="eres2netv2", braid=False, no_asd=False):
+def serve(port=50051, max_workers=10, model="eres2netv2", braid=False, no_asd=False,
+          record_in_memory=False):
     # Set env var so core_api/__init__.py picks up the model choice
     os.environ["SPEAKER_MODEL"] = model
     os.environ["SPEAKER_DISABLE_ASD"] = "1" if no_asd else "0"
+    os.environ["SPEAKER_RECORD_IN_MEMORY"] = "1" if record_in_memory else "0"
     model_label, model_dir = MODEL_DISPLAY[model]
 
     server = grpc.server(futures.ThreadPoolExecutor(max_workers=max_workers))
@@ -175,5 +177,9 @@ if __name__ == "__main__":
     parser.add_argument("--no-asd", action="store_true",
                         help="Disable Active Speaker Detection face-bbox overlay "
                              "(applies to both ProcessVideo and RecognizeSpeakers).")
+    parser.add_argument("--record-in-memory", action="store_true",
+                        help="Keep the RecognizeSpeakers session recording in RAM "
+                             "instead of spilling it to a temp file.")
     args = parser.parse_args()
-    serve(port=args.port, model=args.model, braid=args.braid, no_asd=args.no_asd)
+    serve(port=args.port, model=args.model, braid=args.braid, no_asd=args.no_asd,
+          record_in_memory=args.record_in_memory)
@@ -0,0 +1,170 @@
+"""
+Audio storage for the RecognizeSpeakers streaming RPC.
+
+AudioWindowBuffer — preallocated int16 ring feeding the sliding diarization
+window. The ring is mirrored: every sample is written at ``i`` and at
+``i + capacity``, so the unread span is always one contiguous slice and
+``window()`` returns a numpy view without copying. ``advance()`` only moves the
+read pointer (O(1)); nothing is shifted or reallocated while the window stays
+within capacity.
+
+SessionAudioRecorder — full-session recording used for the post-session
+video. By default the PCM is spilled to a temp file on disk so long sessions
+don't grow server RAM; ``in_memory=True`` keeps the old bytearray behaviour.
+"""
+import os
+import wave
+import tempfile
+
+import numpy as np
+
+
+def _as_int16(audio_data):
+    """int16 view of raw PCM_16 bytes (a trailing odd byte is dropped) or of an
+    int16 array."""
+    if isinstance(audio_data, np.ndarray):
+        return audio_data.astype(np.int16, copy=False).reshape(-1)
+    return np.frombuffer(audio_data, dtype=np.int16, count=len(audio_data) // 2)
+
+
+class AudioWindowBuffer:
+    """Timeline-aware mono int16 ring buffer.
+
+    ``write(audio, start_time)`` places a segment on the session timeline:
+    gaps since the previous segment longer than ``min_gap_s`` are filled with
+    silence, clamped to ``max_gap_s``. ``start_time`` is the timeline position
+    of the first unread sample and moves forward with ``advance()``.
+    """
+
+    def __init__(self, sample_rate=16000, capacity_s=60.0,
+                 min_gap_s=0.05, max_gap_s=5.0):
+        self.sample_rate = int(sample_rate)
+        self.min_gap_s = min_gap_s
+        self.max_gap_s = max_gap_s
+        self._cap = max(1, int(capacity_s * self.sample_rate))
+        self._buf = np.zeros(2 * self._cap, dtype=np.int16)
+        self._read = 0          # ring index of the first unread sample
+        self._n = 0             # unread samples
+        self.start_time = 0.0   # timeline position of the first unread sample
+        self.end_time = 0.0     # timeline end of the last written segment
+        self._started = False
+
+    def __len__(self):
+        return self._n
+
+    @property
+    def duration(self):
+        return self._n / self.sample_rate
+
+    @property
+    def capacity(self):
+        return self._cap
+
+    def _grow(self, need):
+        cap = self._cap
+        while cap < need:
+            cap *= 2
+        buf = np.zeros(2 * cap, dtype=np.int16)
+        buf[:self._n] = self.window()
+        buf[cap:cap + self._n] = buf[:self._n]
+        self._buf, self._cap, self._read = buf, cap, 0
+
+    def _put(self, samples=None, count=0):
+        """Append ``samples`` (or ``count`` zeros) at the write position."""
+        k = len(samples) if samples is not None else count
+        if k <= 0:
+            return
+        if self._n + k > self._cap:
+            self._grow(self._n + k)
+        cap = self._cap
+        pos = (self._read + self._n) % cap
+        done = 0
+        while done < k:
+            step = min(k - done, cap - pos)
+            for base in (pos, pos + cap):
+                dst = self._buf[base:base + step]
+                if samples is None:
+                    dst.fill(0)
+                else:
+                    dst[:] = samples[done:done + step]
+            done += step
+            pos = 0
+        self._n += k
+
+    def write(self, audio_data, start_time):
+        """Append a segment starting at ``start_time`` (timeline seconds).
+        Returns the raw gap before it in seconds (before clamping)."""
+        samples = _as_int16(audio_data)
+        if not self._started:
+            self.start_time = self.end_time = start_time
+            self._started = True
+        gap = start_time - self.end_time
+        if gap > self.min_gap_s:
+            self._put(count=int(min(gap, self.max_gap_s) * self.sample_rate))
+        self._put(samples)
+        self.end_time = start_time + len(samples) / self.sample_rate
+        return gap
+
+    def window(self):
+        """Contiguous read-only view of all unread samples. Only valid until
+        the next ``write``; copy it if it has to outlive that."""
+        view = self._buf[self._read:self._read + self._n]
+        view.flags.writeable = False
+        return view
+
+    def advance(self, seconds):
+        """Drop ``seconds`` of audio from the front (O(1)). The timeline start
+        moves by ``seconds`` even if fewer samples were buffered."""
+        k = min(self._n, int(seconds * self.sample_rate))
+        self._read = (self._read + k) % self._cap
+        self._n -= k
+        self.start_time += seconds
+
+
+class SessionAudioRecorder:
+    """Append-only PCM_16 recording of a whole session, on disk by default."""
+
+    def __init__(self, in_memory=False, spill_dir=None, prefix="session_audio_"):
+        self._mem = bytearray() if in_memory else None
+        self._file = None
+        self.path = None
+        self.nbytes = 0
+        if not in_memory:
+            fd, self.path = tempfile.mkstemp(prefix=prefix, suffix=".pcm", dir=spill_dir)
+            self._file = os.fdopen(fd, "wb")
+
+    def __len__(self):
+        return self.nbytes
+
+    def write(self, audio_data):
+        data = memoryview(_as_int16(audio_data)).cast("B")
+        if self._mem is not None:
+            self._mem.extend(data)
+        else:
+            self._file.write(data)
+        self.nbytes += len(data)
+
+    def to_wav(self, wav_path, sample_rate, chunk_bytes=1 << 20):
+        """Write the recording as a mono 16-bit WAV, streaming from disk."""
+        with wave.open(wav_path, 'wb') as wf:
+            wf.setnchannels(1); wf.setsampwidth(2); wf.setframerate(sample_rate)
+            if self._mem is not None:
+                wf.writeframes(self._mem)
+                return
+            self._file.flush()
+            with open(self.path, "rb") as f:
+                while True:
+                    chunk = f.read(chunk_bytes)
+                    if not chunk:
+                        break
+                    wf.writeframes(chunk)
+
+    def close(self):
+        """Release the buffer / delete the spill file."""
+        self._mem = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+        self.path = None
@@ -1,3 +1,4 @@
+import os
 import cv2
 import time
 import logging
@@ -7,6 +8,9 @@ import traceback
 import grpc_communication.grpc_pb2 as pb2
 import grpc_communication.grpc_pb2_grpc as pb2_grpc
 
+from .audio_buffer import AudioWindowBuffer, SessionAudioRecorder
+from .session_pipeline import SessionPipeline
+
 logger = logging.getLogger("speaker_recognition")
 
 _CYAN = "\033[96m"
@@ -133,8 +137,9 @@ class SpeakerRecognitionManager(pb2_grpc.SpeakerRecognitionServiceServicer):
         annotations. Bboxes are drawn thin/gray by default; thick/green when
         the ASD model says the face is speaking. No text on the bbox.
         Falls back to the original render path if ASD fails.
+        ``full_audio`` is the session's SessionAudioRecorder.
         """
-        import os, wave, subprocess, tempfile, shutil, glob, traceback
+        import os, subprocess, tempfile, shutil, glob, traceback
 
         output_dir = "/workspace/database/recordings"
         os.makedirs(output_dir, exist_ok=True)
@@ -163,9 +168,7 @@ class SpeakerRecognitionManager(pb2_grpc.SpeakerRecognitionServiceServicer):
         # Work dir + wav
         work_dir = tempfile.mkdtemp(prefix=f"render_{session_id}_")
         wav_path = os.path.join(work_dir, "audio.wav")
-        with wave.open(wav_path, 'wb') as wf:
-            wf.setnchannels(1); wf.setsampwidth(2); wf.setframerate(sample_rate)
-            wf.writeframes(bytes(full_audio))
+        full_audio.to_wav(wav_path, sample_rate)
 
         # Write raw (un-annotated) video so ASD can operate on it
         raw_video_path = os.path.join(work_dir, "raw.mp4")
@@ -337,19 +340,36 @@ class SpeakerRecognitionManager(pb2_grpc.SpeakerRecognitionServiceServicer):
         """
         Bidirectional streaming RPC with sliding-window diarization + multi-sample ReID.
 
-        Audio accumulates in a per-session buffer. When buffer reaches WINDOW_SIZE (30s):
-        1. Run DiariZen on the buffer → speaker clusters
-        2. Concat audio per cluster → ERes2NetV2 embedding
-        3. match_or_buffer against voice DB → voice_id or pending enrollment
-        4. Yield SpeakerResult for each cluster's segments
-        5. Shift buffer forward (keep WINDOW_OVERLAP for continuity)
-
-        Face recognition runs immediately on each image frame (decoupled).
+        Producer/consumer (see session_pipeline.py): a reader thread only routes
+        requests onto bounded queues, and three workers consume them:
+        - quick: per-segment embedding + DB match (immediate; drops its oldest
+          segment when behind, since diarization re-identifies it later)
+        - diar:  audio accumulates in a per-session ring buffer (AudioWindowBuffer).
+          When it holds WINDOW_SIZE (30s):
+          1. Run DiariZen on the buffer → speaker clusters
+          2. Per-frame gate per cluster, one batched embedding call
+          3. match_or_buffer against voice DB → voice_id or pending enrollment
+          4. Emit SpeakerResult for each cluster's segments
+          5. Advance the ring read pointer (keep WINDOW_OVERLAP for continuity)
+        - face:  face recognition on each image frame + frame recording
+        The diar and face queues are lossless: when full the reader blocks, which
+        pushes back on the client through gRPC flow control. Results from quick
+        and diar are merged onto the response stream in segment-timestamp order
+        (held at most RESULT_MAX_HOLD seconds). Queue depths are logged every
+        QUEUE_REPORT_EVERY seconds and at session end.
+
+        The full-session recording for the post-session video is spilled to a
+        temp file unless SPEAKER_RECORD_IN_MEMORY=1.
         """
         WINDOW_SIZE = 30.0      # seconds
         WINDOW_OVERLAP = 10.0   # seconds
         MIN_CLUSTER_AUDIO = 0.0 # replaced by per-frame enrollment gate
         MIN_ENROLL_SAMPLES = 3
+        QUICK_QUEUE = 8         # segments; oldest dropped when full
+        DIAR_QUEUE = 256        # segments (~minutes of audio); blocks the reader when full
+        FACE_QUEUE = 64         # frames; blocks the reader when full
+        RESULT_MAX_HOLD = 0.25  # seconds a result may wait for timestamp ordering
+        QUEUE_REPORT_EVERY = 10.0
 
         # Hoisted import for the per-frame gate helpers and constants
         # (avoid repeated import overhead inside the per-window loop).
@@ -359,15 +379,15 @@ class SpeakerRecognitionManager(pb2_grpc.SpeakerRecognitionServiceServicer):
         current_face_id = None
         sample_rate = 16000
 
-        # Per-session audio buffer (timeline-aware)
-        audio_buffer = bytearray()
-        buffer_start_time = 0.0  # absolute time of buffer start
-        buffer_end_time = 0.0    # expected end time of audio in buffer
-        first_segment_seen = False
+        # Per-session audio ring (timeline-aware); created on the first
+        # segment, once the sample rate is known.
+        audio_buffer = None
         window_count = 0
+        WINDOW_SHIFT = WINDOW_SIZE - WINDOW_OVERLAP
 
         # Recording: collect frames + audio + results for post-session video
-        recorded_full_audio = bytearray()   # all audio received
+        recorded_full_audio = SessionAudioRecorder(   # all audio received
+            in_memory=os.environ.get("SPEAKER_RECORD_IN_MEMORY", "0") == "1")
         recorded_frames = []                 # [(timestamp, jpeg_bytes, w, h, face_id)]
         recorded_voice_results = []          # [(seg_start, seg_end, voice_id, confidence, status)]
         recorded_diar_results = []           # [(seg_start, seg_end, diar_label, voice_id)]
@@ -376,311 +396,366 @@ class SpeakerRecognitionManager(pb2_grpc.SpeakerRecognitionServiceServicer):
         # Init enrollment buffer for this session
         self.speaker_recognition.init_enrollment_buffer()
 
-        try:
-            for request in request_iterator:
-                audio_data = request.audio_data
-                sample_rate = request.sample_rate or 16000
-                session_id = request.session_id
-                video_ts = request.video_timestamp
-
-                if session_start_time is None:
-                    session_start_time = __import__('time').time()
-
-                # === FACE RECOGNITION (immediate, every frame) ===
-                if request.image_data:
-                    detected_face = self._extract_face_id(
-                        request.image_data,
-                        request.image_width,
-                        request.image_height
-                    )
-                    if detected_face is not None:
-                        current_face_id = detected_face
-
-                    # Record frame for post-session video
-                    elapsed = __import__('time').time() - session_start_time
-                    recorded_frames.append((
-                        elapsed, request.image_data,
-                        request.image_width, request.image_height,
-                        current_face_id or "unknown"
+        def _route(request):
+            """Reader thread: bookkeeping only, no model calls."""
+            nonlocal session_id, sample_rate, session_start_time
+            sample_rate = request.sample_rate or 16000
+            session_id = request.session_id
+            if session_start_time is None:
+                session_start_time = time.time()
+
+            items = []
+            if request.image_data or request.face_id:
+                items.append(("face", time.time() - session_start_time, request))
+
+            audio_data = request.audio_data
+            seg_duration = (len(audio_data) // 2) / sample_rate
+            _log("..", "SEG IN", f"dur={seg_duration*1000:.0f}ms  bytes={len(audio_data)}", _DIM)
+            seg = (audio_data, request.video_timestamp)
+            if seg_duration >= 0.5:
+                items.append(("quick", request.segment_start_time, seg))
+            items.append(("diar", request.segment_start_time, seg))
+            return items
+
+        def _on_face(elapsed, request, emit):
+            # === FACE RECOGNITION (every frame, off the reader thread) ===
+            nonlocal current_face_id
+            if request.image_data:
+                detected_face = self._extract_face_id(
+                    request.image_data,
+                    request.image_width,
+                    request.image_height
+                )
+                if detected_face is not None:
+                    current_face_id = detected_face
+
+                # Record frame for post-session video
+                recorded_frames.append((
+                    elapsed, request.image_data,
+                    request.image_width, request.image_height,
+                    current_face_id or "unknown"
+                ))
+
+            if current_face_id is None and request.face_id:
+                current_face_id = request.face_id
+
+        def _on_quick(seg_start, seg, emit):
+            # === QUICK MATCH: per-segment voice matching (immediate) ===
+            audio_data, video_ts = seg
+            seg_duration = (len(audio_data) // 2) / sample_rate
+            try:
+                seg_embedding = self.speaker_recognition.extract_embedding(
+                    audio_data, sample_rate
+                )
+                matched_id, match_conf = self.speaker_recognition._match_voice(
+                    seg_embedding
+                )
+                seg_end = seg_start + seg_duration
+
+                if matched_id is not None:
+                    _log("~~", "QUICK MATCH",
+                         f"{_BOLD}{matched_id}{_RESET}  conf={match_conf:.2f}  "
+                         f"seg={seg_duration:.1f}s", _GREEN)
+                    emit(seg_start, pb2.SpeakerResult(
+                        speaker_id=matched_id,
+                        confidence=match_conf,
+                        segment_start_time=seg_start,
+                        segment_duration=seg_duration,
+                        is_new_speaker=False,
+                        session_id=session_id,
+                        is_correction=False,
+                        status=f"quick:{matched_id}",
+                        video_timestamp=video_ts
                     ))
+                    recorded_voice_results.append((
+                        seg_start, seg_end, matched_id, match_conf,
+                        f"quick:{matched_id}"
+                    ))
+                else:
+                    _log("xx", "QUICK MISS",
+                         f"best={match_conf:.2f}  seg={seg_duration:.1f}s  "
+                         f"(will try diarization)", _YELLOW)
+            except Exception as e:
+                _log("!!", "QUICK ERR", str(e), _RED)
+
+        def _on_audio(segment_start_time, seg, emit):
+            """Diarization worker. Returns its watermark: nothing earlier than
+            the ring's timeline start can be emitted any more."""
+            nonlocal audio_buffer, window_count
+            audio_data, video_ts = seg
+
+            # === ACCUMULATE AUDIO (timeline-aware for diarization) ===
+            if audio_buffer is None:
+                # Headroom over the window for the segment (+ gap silence)
+                # that crosses it; the ring grows if that is exceeded.
+                audio_buffer = AudioWindowBuffer(sample_rate, capacity_s=2 * WINDOW_SIZE)
+
+            # Gaps between segments become silence (max 5s to avoid bloat,
+            # gaps <50ms ignored)
+            gap = audio_buffer.write(audio_data, segment_start_time)
+            if gap > audio_buffer.max_gap_s:
+                _log("..", "GAP CLAMP",
+                     f"gap={gap:.1f}s clamped to {audio_buffer.max_gap_s:.1f}s silence", _DIM)
+            recorded_full_audio.write(audio_data)
+            buffer_duration = audio_buffer.duration
+
+            # === WINDOW READY? Run diarization + ReID ===
+            if buffer_duration >= WINDOW_SIZE:
+                window_count += 1
+                # Zero-copy view; diarization copies out what it keeps.
+                window_audio = audio_buffer.window()
+                win_start = audio_buffer.start_time
+                win_end = win_start + buffer_duration
+
+                _log(">>", f"WINDOW {window_count}",
+                     f"[{win_start:.0f}s - {win_end:.0f}s]  {buffer_duration:.1f}s audio",
+                     _CYAN)
+
+                # Run diarization on the window AND get soft posteriors for the gate
+                try:
+                    diar_segments, soft_data, sw, class_map, frame_rate_hz = \
+                        self.diarization.diarize_with_posteriors(window_audio, sample_rate)
+                except Exception as e:
+                    _log("!!", "DIAR ERROR", str(e), _RED)
+                    # Shift buffer and continue
+                    audio_buffer.advance(WINDOW_SHIFT)
+                    return audio_buffer.start_time
+
+                # Group diarized segments by speaker label.
+                # Track per-segment byte lengths for the per-frame gate.
+                clusters = {}
+                for seg in diar_segments:
+                    label = seg["speaker"]
+                    if label not in clusters:
+                        clusters[label] = {"audio": bytearray(), "segments": [], "segment_byte_lens": []}
+                    clusters[label]["audio"].extend(seg["audio"])
+                    clusters[label]["segments"].append(
+                        (seg["start"] + win_start, seg["end"] + win_start)
+                    )
+                    clusters[label]["segment_byte_lens"].append(len(seg["audio"]))
+
+                # DIAGNOSTIC: raw segment count + per-cluster breakdown
+                n_raw_segs = len(diar_segments)
+                _log("..", "CLUSTERS",
+                     f"{len(clusters)} labels / {n_raw_segs} raw segs in window {window_count}",
+                     _GREEN)
+                for _diag_label, _diag_cluster in clusters.items():
+                    _diag_audio_dur = (len(_diag_cluster["audio"]) // 2) / sample_rate
+                    _diag_n_segs = len(_diag_cluster["segments"])
+                    _diag_span_start = min(s for s, _ in _diag_cluster["segments"])
+                    _diag_span_end = max(e for _, e in _diag_cluster["segments"])
+                    _diag_span = _diag_span_end - _diag_span_start
+                    _log("  ", f"  {_diag_label}",
+                         f"{_diag_n_segs} segs, {_diag_audio_dur:.1f}s audio, "
+                         f"span {_diag_span:.1f}s [{_diag_span_start:.1f}-{_diag_span_end:.1f}]",
+                         _DIM)
+
+                # Per-frame gate constants (sr_mod imported once at method start)
+                samples_per_frame = round(sample_rate / frame_rate_hz)
+                bytes_per_frame = samples_per_frame * 2
+
+                # Window-level half of the gate, shared by every cluster. On
+                # failure each cluster recomputes it and reports TIMELINE ERR.
+                try:
+                    window_alone = sr_mod._window_alone_frames(
+                        soft_data, sw, class_map, frame_rate_hz
+                    )
+                except Exception:
+                    window_alone = None
+
+                # For each cluster: three-tier per-frame enrollment gate
+                gates = {}  # diar_label → sr_mod._gate_cluster result (+ "filter_ms")
+                for diar_label, cluster in clusters.items():
+                    cluster_audio = bytes(cluster["audio"])
+                    cluster_segments = cluster["segments"]
+                    cluster_segment_byte_lens = cluster["segment_byte_lens"]
+
+                    # Hard invariant check (not assert): byte_lens MUST sum to
+                    # cluster_audio length. Violation would silently misalign
+                    # the per-frame gate and could poison the voice DB. Nothing
+                    # of this window has been emitted yet: drop it, shift the
+                    # ring like DIAR ERROR so the next window is fresh audio,
+                    # and let the pipeline log the error.
+                    if sum(cluster_segment_byte_lens) != len(cluster_audio):
+                        audio_buffer.advance(WINDOW_SHIFT)
+                        raise RuntimeError(
+                            f"byte_lens mismatch: {sum(cluster_segment_byte_lens)} "
+                            f"vs {len(cluster_audio)} for {diar_label}"
+                        )
 
-                if current_face_id is None and request.face_id:
-                    current_face_id = request.face_id
-
-                # === QUICK MATCH: per-segment voice matching (immediate) ===
-                seg_duration = (len(audio_data) // 2) / sample_rate
-                _log("..", "SEG IN", f"dur={seg_duration*1000:.0f}ms  bytes={len(audio_data)}", _DIM)
-                if seg_duration >= 0.5:
+                    _t0 = time.perf_counter()
                     try:
-                        seg_embedding = self.speaker_recognition.extract_embedding(
-                            audio_data, sample_rate
-                        )
-                        matched_id, match_conf = self.speaker_recognition._match_voice(
-                            seg_embedding
+                        alone_timeline = sr_mod._compute_alone_timeline(
+                            cluster_segments, cluster_segment_byte_lens,
+                            soft_data, sw, class_map,
+                            frame_rate_hz, sample_rate,
+                            window_offset_s=win_start,
+                            window_alone=window_alone,
                         )
-                        seg_start = request.segment_start_time
-                        seg_end = seg_start + seg_duration
-
-                        if matched_id is not None:
-                            _log("~~", "QUICK MATCH",
-                                 f"{_BOLD}{matched_id}{_RESET}  conf={match_conf:.2f}  "
-                                 f"seg={seg_duration:.1f}s", _GREEN)
-                            yield pb2.SpeakerResult(
-                                speaker_id=matched_id,
-                                confidence=match_conf,
-                                segment_start_time=seg_start,
-                                segment_duration=seg_duration,
-                                is_new_speaker=False,
-                                session_id=session_id,
-                                is_correction=False,
-                                status=f"quick:{matched_id}",
-                                video_timestamp=video_ts
-                            )
-                            recorded_voice_results.append((
-                                seg_start, seg_end, matched_id, match_conf,
-                                f"quick:{matched_id}"
-                            ))
-                        else:
-                            _log("xx", "QUICK MISS",
-                                 f"best={match_conf:.2f}  seg={seg_duration:.1f}s  "
-                                 f"(will try diarization)", _YELLOW)
-                    except Exception as e:
-                        _log("!!", "QUICK ERR", str(e), _RED)
-
-                # === ACCUMULATE AUDIO (timeline-aware for diarization) ===
-                seg_start_t = request.segment_start_time
-                seg_dur_t = (len(audio_data) // 2) / sample_rate
-
-                if not first_segment_seen:
-                    # First segment: set buffer origin
-                    buffer_start_time = seg_start_t
-                    buffer_end_time = seg_start_t
-                    first_segment_seen = True
-
-                # Insert silence for gaps between segments (max 5s to avoid bloat)
-                gap = seg_start_t - buffer_end_time
-                if gap > 0.05:  # ignore tiny gaps (<50ms)
-                    silence_duration = min(gap, 5.0)
-                    silence_bytes = int(silence_duration * sample_rate * 2)
-                    audio_buffer.extend(b'\x00' * silence_bytes)
-                    if gap > 5.0:
-                        _log("..", "GAP CLAMP",
-                             f"gap={gap:.1f}s clamped to 5.0s silence", _DIM)
-
-                audio_buffer.extend(audio_data)
-                recorded_full_audio.extend(audio_data)
-                buffer_end_time = seg_start_t + seg_dur_t
-                buffer_duration = (len(audio_buffer) // 2) / sample_rate
-
-                # === WINDOW READY? Run diarization + ReID ===
-                if buffer_duration >= WINDOW_SIZE:
-                    window_count += 1
-                    # Ensure even byte count (int16 = 2 bytes per sample)
-                    if len(audio_buffer) % 2 != 0:
-                        audio_buffer = audio_buffer[:-1]
-                    window_audio = bytes(audio_buffer)
-                    win_start = buffer_start_time
-                    win_end = win_start + buffer_duration
-
-                    _log(">>", f"WINDOW {window_count}",
-                         f"[{win_start:.0f}s - {win_end:.0f}s]  {buffer_duration:.1f}s audio",
-                         _CYAN)
-
-                    # Run diarization on the window AND get soft posteriors for the gate
-                    try:
-                        diar_segments, soft_data, sw, class_map, frame_rate_hz = \
-                            self.diarization.diarize_with_posteriors(window_audio, sample_rate)
                     except Exception as e:
-                        _log("!!", "DIAR ERROR", str(e), _RED)
-                        # Shift buffer and continue
-                        shift_bytes = int(WINDOW_SIZE - WINDOW_OVERLAP) * sample_rate * 2
-                        audio_buffer = audio_buffer[shift_bytes:]
-                        buffer_start_time += (WINDOW_SIZE - WINDOW_OVERLAP)
+                        _log("!!", "TIMELINE ERR", f"{diar_label}: {e}", _RED)
                         continue
 
-                    # Group diarized segments by speaker label.
-                    # Track per-segment byte lengths for the per-frame gate.
-                    clusters = {}
-                    for seg in diar_segments:
-                        label = seg["speaker"]
-                        if label not in clusters:
-                            clusters[label] = {"audio": bytearray(), "segments": [], "segment_byte_lens": []}
-                        clusters[label]["audio"].extend(seg["audio"])
-                        clusters[label]["segments"].append(
-                            (seg["start"] + win_start, seg["end"] + win_start)
-                        )
-                        clusters[label]["segment_byte_lens"].append(len(seg["audio"]))
-
-                    # DIAGNOSTIC: raw segment count + per-cluster breakdown
-                    n_raw_segs = len(diar_segments)
-                    _log("..", "CLUSTERS",
-                         f"{len(clusters)} labels / {n_raw_segs} raw segs in window {window_count}",
-                         _GREEN)
-                    for _diag_label, _diag_cluster in clusters.items():
-                        _diag_audio_dur = (len(_diag_cluster["audio"]) // 2) / sample_rate
-                        _diag_n_segs = len(_diag_cluster["segments"])
-                        _diag_span_start = min(s for s, _ in _diag_cluster["segments"])
-                        _diag_span_end = max(e for _, e in _diag_cluster["segments"])
-                        _diag_span = _diag_span_end - _diag_span_start
-                        _log("  ", f"  {_diag_label}",
-                             f"{_diag_n_segs} segs, {_diag_audio_dur:.1f}s audio, "
-                             f"span {_diag_span:.1f}s [{_diag_span_start:.1f}-{_diag_span_end:.1f}]",
-                             _DIM)
-
-                    # Per-frame gate constants (sr_mod imported once at method start)
-                    samples_per_frame = round(sample_rate / frame_rate_hz)
-                    bytes_per_frame = samples_per_frame * 2
-
-                    # For each cluster: three-tier per-frame enrollment gate
-                    for diar_label, cluster in clusters.items():
-                        cluster_audio = bytes(cluster["audio"])
-                        cluster_segments = cluster["segments"]
-                        cluster_segment_byte_lens = cluster["segment_byte_lens"]
-                        cluster_dur = (len(cluster_audio) // 2) / sample_rate
-
-                        # Hard invariant check (not assert): byte_lens MUST sum to
-                        # cluster_audio length. Violation would silently misalign
-                        # the per-frame gate and could poison the voice DB.
-                        if sum(cluster_segment_byte_lens) != len(cluster_audio):
-                            raise RuntimeError(
-                                f"byte_lens mismatch: {sum(cluster_segment_byte_lens)} "
-                                f"vs {len(cluster_audio)} for {diar_label}"
+                    gate = sr_mod._gate_cluster(
+                        alone_timeline, cluster_audio, bytes_per_frame, frame_rate_hz
+                    )
+                    gate["filter_ms"] = (time.perf_counter() - _t0) * 1000
+                    gates[diar_label] = gate
+
+                # One batched embedding call for every FULL / QUICK span
+                embed_labels = [l for l, g in gates.items() if g["tier"] != "skip"]
+                embeddings = {}
+                if embed_labels:
+                    _t0 = time.perf_counter()
+                    try:
+                        embeddings = dict(zip(
+                            embed_labels,
+                            self.speaker_recognition.extract_embeddings_batch(
+                                [gates[l]["audio"] for l in embed_labels], sample_rate
                             )
-
-                        _t0 = time.perf_counter()
+                        ))
+                    except Exception as e:
+                        _log("!!", "EMBED ERR", f"batch of {len(embed_labels)}: {e}", _RED)
+                    _log("..", "EMBED",
+                         f"{len(embed_labels)} spans in "
+                         f"{(time.perf_counter() - _t0) * 1000:.1f}ms", _DIM)
+
+                for diar_label, gate in gates.items():
+                    cluster_segments = clusters[diar_label]["segments"]
+                    cluster_dur = (len(clusters[diar_label]["audio"]) // 2) / sample_rate
+                    enroll_lccs_s = gate["enroll_lccs_s"]
+                    _filter_ms = gate["filter_ms"]
+
+                    if gate["tier"] == "full":
+                        # === FULL tier ===
+                        enroll_audio = gate["audio"]
                         try:
-                            alone_timeline = sr_mod._compute_alone_timeline(
-                                cluster_segments, cluster_segment_byte_lens,
-                                soft_data, sw, class_map,
-                                frame_rate_hz, sample_rate,
-                                window_offset_s=win_start,
+                            embedding = embeddings.get(diar_label)
+                            if embedding is None:   # batch failed: embed this span alone
+                                embedding = self.speaker_recognition.extract_embedding(
+                                    enroll_audio, sample_rate
+                                )
+                            result = self.speaker_recognition.match_or_buffer(
+                                embedding, enroll_audio, sample_rate,
+                                min_samples=MIN_ENROLL_SAMPLES
                             )
                         except Exception as e:
-                            _log("!!", "TIMELINE ERR", f"{diar_label}: {e}", _RED)
+                            _log("!!", "FULL ERR", f"{diar_label}: {e}", _RED)
                             continue
 
-                        # === Strict pass: enrollment threshold (0.8) ===
-                        enroll_audio, enroll_frames, total_clean_strict = sr_mod._lccs_from_timeline(
-                            alone_timeline,
-                            sr_mod.PER_FRAME_ALONE_THRESHOLD_ENROLL,
-                            cluster_audio, bytes_per_frame
-                        )
-                        enroll_lccs_s = enroll_frames / frame_rate_hz
-                        total_clean_strict_s = total_clean_strict / frame_rate_hz
-                        frag_strict = (total_clean_strict / enroll_frames) if enroll_frames > 0 else float('inf')
+                        voice_id = result["voice_id"] or result.get("pending_id", "")
+                        confidence = result["confidence"]
 
-                        if enroll_lccs_s >= sr_mod.MIN_CLEAN_DURATION_ENROLL:
-                            # === FULL tier ===
-                            try:
-                                embedding = self.speaker_recognition.extract_embedding(
-                                    enroll_audio, sample_rate
-                                )
-                                result = self.speaker_recognition.match_or_buffer(
-                                    embedding, enroll_audio, sample_rate,
-                                    min_samples=MIN_ENROLL_SAMPLES
-                                )
-                            except Exception as e:
-                                _log("!!", "FULL ERR", f"{diar_label}: {e}", _RED)
-                                continue
-
-                            voice_id = result["voice_id"] or result.get("pending_id", "")
-                            confidence = result["confidence"]
-                            _filter_ms = (time.perf_counter() - _t0) * 1000
-
-                            for seg_start, seg_end in cluster_segments:
-                                yield pb2.SpeakerResult(
-                                    speaker_id=voice_id,
-                                    confidence=confidence,
-                                    segment_start_time=seg_start,
-                                    segment_duration=seg_end - seg_start,
-                                    is_new_speaker=result["is_new"],
-                                    session_id=session_id,
-                                    is_correction=False,
-                                    status=result["status"],
-                                    video_timestamp=video_ts
-                                )
-                                recorded_voice_results.append((
-                                    seg_start, seg_end, voice_id, confidence, result["status"]
-                                ))
-                                recorded_diar_results.append((
-                                    seg_start, seg_end, diar_label, voice_id
-                                ))
-
-                            _log("..", f"FULL {diar_label}",
-                                 f"raw={cluster_dur:.1f}s lccs@0.8={enroll_lccs_s:.1f}s "
-                                 f"tot_clean={total_clean_strict_s:.1f}s (frag={frag_strict:.2f}) "
-                                 f"filter={_filter_ms:.1f}ms → {_BOLD}{voice_id}{_RESET} "
-                                 f"conf={confidence:.2f} {_DIM}{result['status']}{_RESET}",
-                                 _GREEN)
-                            continue
+                        for seg_start, seg_end in cluster_segments:
+                            emit(seg_start, pb2.SpeakerResult(
+                                speaker_id=voice_id,
+                                confidence=confidence,
+                                segment_start_time=seg_start,
+                                segment_duration=seg_end - seg_start,
+                                is_new_speaker=result["is_new"],
+                                session_id=session_id,
+                                is_correction=False,
+                                status=result["status"],
+                                video_timestamp=video_ts
+                            ))
+                            recorded_voice_results.append((
+                                seg_start, seg_end, voice_id, confidence, result["status"]
+                            ))
+                            recorded_diar_results.append((
+                                seg_start, seg_end, diar_label, voice_id
+                            ))
 
-                        # === Permissive pass: quick-match only (0.6) ===
-                        quick_audio, quick_frames, total_clean_perm = sr_mod._lccs_from_timeline(
-                            alone_timeline,
-                            sr_mod.PER_FRAME_ALONE_THRESHOLD_QUICK,
-                            cluster_audio, bytes_per_frame
-                        )
-                        quick_lccs_s = quick_frames / frame_rate_hz
-
-                        if quick_lccs_s < sr_mod.MIN_CLEAN_DURATION_QUICKMATCH:
-                            # === SKIP tier ===
-                            _filter_ms = (time.perf_counter() - _t0) * 1000
-                            _log("--", f"SKIP {diar_label}",
-                                 f"raw={cluster_dur:.1f}s lccs@0.8={enroll_lccs_s:.1f}s "
-                                 f"lccs@0.6={quick_lccs_s:.1f}s filter={_filter_ms:.1f}ms TOO CONTAMINATED",
-                                 _DIM)
-                            continue
+                        _log("..", f"FULL {diar_label}",
+                             f"raw={cluster_dur:.1f}s lccs@0.8={enroll_lccs_s:.1f}s "
+                             f"tot_clean={gate['total_clean_strict_s']:.1f}s "
+                             f"(frag={gate['frag_strict']:.2f}) "
+                             f"filter={_filter_ms:.1f}ms → {_BOLD}{voice_id}{_RESET} "
+                             f"conf={confidence:.2f} {_DIM}{result['status']}{_RESET}",
+                             _GREEN)
+                        continue
 
-                        # === QUICK-ONLY tier ===
-                        try:
+                    # === Permissive pass: quick-match only (0.6) ===
+                    quick_lccs_s = gate["quick_lccs_s"]
+
+                    if gate["tier"] == "skip":
+                        # === SKIP tier ===
+                        _log("--", f"SKIP {diar_label}",
+                             f"raw={cluster_dur:.1f}s lccs@0.8={enroll_lccs_s:.1f}s "
+                             f"lccs@0.6={quick_lccs_s:.1f}s filter={_filter_ms:.1f}ms TOO CONTAMINATED",
+                             _DIM)
+                        continue
+
+                    # === QUICK-ONLY tier ===
+                    try:
+                        embedding = embeddings.get(diar_label)
+                        if embedding is None:   # batch failed: embed this span alone
                             embedding = self.speaker_recognition.extract_embedding(
-                                quick_audio, sample_rate
+                                gate["audio"], sample_rate
                             )
-                            matched_id, match_conf = self.speaker_recognition._match_voice(embedding)
-                        except Exception as e:
-                            _log("!!", "QUICK ERR", f"{diar_label}: {e}", _RED)
-                            continue
+                        matched_id, match_conf = self.speaker_recognition._match_voice(embedding)
+                    except Exception as e:
+                        _log("!!", "QUICK ERR", f"{diar_label}: {e}", _RED)
+                        continue
 
-                        _filter_ms = (time.perf_counter() - _t0) * 1000
-                        if matched_id is not None:
-                            for seg_start, seg_end in cluster_segments:
-                                yield pb2.SpeakerResult(
-                                    speaker_id=matched_id,
-                                    confidence=match_conf,
-                                    segment_start_time=seg_start,
-                                    segment_duration=seg_end - seg_start,
-                                    is_new_speaker=False,
-                                    session_id=session_id,
-                                    is_correction=False,
-                                    status="quick-matched",
-                                    video_timestamp=video_ts
-                                )
-                                recorded_voice_results.append((
-                                    seg_start, seg_end, matched_id, match_conf, "quick-matched"
-                                ))
-                                recorded_diar_results.append((
-                                    seg_start, seg_end, diar_label, matched_id
-                                ))
-                            _log("..", f"QUICK-ONLY {diar_label}",
-                                 f"raw={cluster_dur:.1f}s lccs@0.6={quick_lccs_s:.1f}s "
-                                 f"filter={_filter_ms:.1f}ms → {_BOLD}{matched_id}{_RESET} "
-                                 f"conf={match_conf:.2f} {_DIM}quick-matched{_RESET}",
-                                 _CYAN)
-                        else:
-                            _log("--", f"QUICK-ONLY {diar_label}",
-                                 f"raw={cluster_dur:.1f}s lccs@0.6={quick_lccs_s:.1f}s "
-                                 f"filter={_filter_ms:.1f}ms NO MATCH, DROPPED (no enrollment)",
-                                 _DIM)
-
-                    # Shift buffer: keep last WINDOW_OVERLAP seconds
-                    shift_bytes = int((WINDOW_SIZE - WINDOW_OVERLAP) * sample_rate * 2)
-                    audio_buffer = audio_buffer[shift_bytes:]
-                    buffer_start_time += (WINDOW_SIZE - WINDOW_OVERLAP)
+                    if matched_id is not None:
+                        for seg_start, seg_end in cluster_segments:
+                            emit(seg_start, pb2.SpeakerResult(
+                                speaker_id=matched_id,
+                                confidence=match_conf,
+                                segment_start_time=seg_start,
+                                segment_duration=seg_end - seg_start,
+                                is_new_speaker=False,
+                                session_id=session_id,
+                                is_correction=False,
+                                status="quick-matched",
+                                video_timestamp=video_ts
+                            ))
+                            recorded_voice_results.append((
+                                seg_start, seg_end, matched_id, match_conf, "quick-matched"
+                            ))
+                            recorded_diar_results.append((
+                                seg_start, seg_end, diar_label, matched_id
+                            ))
+                        _log("..", f"QUICK-ONLY {diar_label}",
+                             f"raw={cluster_dur:.1f}s lccs@0.6={quick_lccs_s:.1f}s "
+                             f"filter={_filter_ms:.1f}ms → {_BOLD}{matched_id}{_RESET} "
+                             f"conf={match_conf:.2f} {_DIM}quick-matched{_RESET}",
+                             _CYAN)
+                    else:
+                        _log("--", f"QUICK-ONLY {diar_label}",
+                             f"raw={cluster_dur:.1f}s lccs@0.6={quick_lccs_s:.1f}s "
+                             f"filter={_filter_ms:.1f}ms NO MATCH, DROPPED (no enrollment)",
+                             _DIM)
+
+                # Shift buffer: keep last WINDOW_OVERLAP seconds
+                audio_buffer.advance(WINDOW_SHIFT)
+            return audio_buffer.start_time
 
+        pipeline = SessionPipeline(
+            max_hold_s=RESULT_MAX_HOLD,
+            report=lambda line: _log("..", "QUEUES", line, _DIM),
+            report_every_s=QUEUE_REPORT_EVERY,
+        )
+        pipeline.add_stage("face", _on_face, FACE_QUEUE, emits=False)
+        pipeline.add_stage("quick", _on_quick, QUICK_QUEUE, drop_oldest=True)
+        pipeline.add_stage("diar", _on_audio, DIAR_QUEUE)
+
+        try:
+            for result in pipeline.run(request_iterator, _route):
+                yield result
         except Exception as e:
             _log("!!", "FATAL ERROR", str(e), _RED)
             traceback.print_exc()
         finally:
+            # Client gone (generator closed early): skip queued work. Either way
+            # wait for the workers so the flush/render below sees final state.
+            if not context.is_active():
+                pipeline.stop()
+            pipeline.join()
+            if pipeline.reader_error is not None:
+                _log("--", "STREAM ERROR", str(pipeline.reader_error), _DIM)
+            _log("..", "QUEUES", pipeline.stats_line(), _DIM)
+
             # Flush pending enrollments at end of session
             if hasattr(self.speaker_recognition, '_pending'):
                 flushed = self.speaker_recognition.flush_all_pending(sample_rate, min_samples=2)
@@ -704,37 +779,35 @@ class SpeakerRecognitionManager(pb2_grpc.SpeakerRecognitionServiceServicer):
                     traceback.print_exc()
             else:
                 _log("--", "NO VIDEO", f"Only {len(recorded_frames)} frames, skipping video render", _DIM)
+            recorded_full_audio.close()
 
     def ProcessVideo(self, request_iterator, context):
         """
         Batch video processing RPC.
         Client uploads video → server annotates with face+speaker labels → sends back.
+
+        The upload is ingested as a stream (see video_ingest.py): chunks go
+        to a temp file and through a live ffmpeg audio demux, so diarization
+        windows and their progress messages start while later chunks are
+        still arriving.
         """
         import os
-        import tempfile
         from speaker_service.video_processor import process_video
+        from speaker_service.video_ingest import StreamingVideoIngest
 
-        # Step 1: Receive video file chunks
-        temp_input = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
-        max_duration = 0.0
-        filename = "input.mp4"
-
-        for chunk in request_iterator:
-            if chunk.filename:
-                filename = chunk.filename
-            if chunk.max_duration_seconds > 0:
-                max_duration = chunk.max_duration_seconds
-            temp_input.write(chunk.data)
-
-        temp_input.close()
-        _log("<<", "VIDEO RECV", f"{filename} ({os.path.getsize(temp_input.name) / 1024 / 1024:.1f}MB), max_dur={max_duration}s", _CYAN)
+        # Step 1: Start receiving video chunks (returns after the first one)
+        ingest = StreamingVideoIngest().start(request_iterator)
+        filename = ingest.filename
+        max_duration = ingest.max_duration
+        _log("<<", "VIDEO RECV", f"{filename} (streaming), max_dur={max_duration}s", _CYAN)
 
-        # Step 2: Process video
+        # Step 2: Process video while it uploads
         output_path = None
         try:
             for progress, result_path in process_video(
-                temp_input.name, max_duration,
-                self.speaker_recognition, self.diarization
+                ingest.path, max_duration,
+                self.speaker_recognition, self.diarization,
+                ingest=ingest,
             ):
                 if progress:
                     yield pb2.VideoDownloadChunk(
@@ -745,10 +818,9 @@ class SpeakerRecognitionManager(pb2_grpc.SpeakerRecognitionServiceServicer):
         except Exception as e:
             _log("!!", "VIDEO ERROR", str(e), _RED)
             traceback.print_exc()
-            os.remove(temp_input.name)
             return
-
-        os.remove(temp_input.name)
+        finally:
+            ingest.close()      # also on client cancel (GeneratorExit)
 
         if not output_path or not os.path.exists(output_path):
             _log("!!", "VIDEO ERROR", "No output produced", _RED)
@@ -0,0 +1,280 @@
+"""
+Producer/consumer plumbing for the RecognizeSpeakers streaming RPC.
+
+A reader thread drains the gRPC request iterator and only routes each request
+onto bounded stage queues (quick-match, diarization, face). One worker thread
+per stage consumes its queue. Stages that produce SpeakerResults emit them
+into a ResultMerger, which the RPC generator drains onto the response stream
+in segment-timestamp order.
+
+Backpressure: lossless stages block the reader when their queue is full, so it
+stops pulling requests and gRPC flow control slows the client instead of the
+server buffering without bound. Latency-only stages (``drop_oldest=True``)
+drop their oldest item instead. Every queue keeps depth / high-water / drop /
+blocked-time counters; ``stats_line()`` formats them for the periodic log.
+"""
+import heapq
+import itertools
+import logging
+import math
+import queue
+import threading
+import time
+
+logger = logging.getLogger("speaker_recognition")
+
+_CLOSE = object()
+
+
+class StageQueue:
+    """Bounded FIFO with backpressure counters. Single producer (the reader)."""
+
+    def __init__(self, name, maxsize, drop_oldest=False):
+        self.name = name
+        self.maxsize = maxsize
+        self.drop_oldest = drop_oldest
+        self._q = queue.Queue(maxsize=maxsize)
+        self.puts = 0
+        self.dropped = 0
+        self.blocked = 0        # puts that had to wait for room
+        self.blocked_s = 0.0
+        self.high_water = 0
+
+    def put(self, item):
+        try:
+            self._q.put_nowait(item)
+        except queue.Full:
+            if self.drop_oldest:
+                try:
+                    self._q.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+                self._q.put(item)
+            else:
+                t = time.perf_counter()
+                self._q.put(item)
+                self.blocked += 1
+                self.blocked_s += time.perf_counter() - t
+        self.puts += 1
+        self.high_water = max(self.high_water, self._q.qsize())
+
+    def close(self):
+        """Queue the end-of-stream marker (never dropped)."""
+        self._q.put(_CLOSE)
+
+    def get(self):
+        return self._q.get()
+
+    @property
+    def depth(self):
+        return self._q.qsize()
+
+    def stats(self):
+        return {
+            "depth": self.depth, "maxsize": self.maxsize, "high_water": self.high_water,
+            "puts": self.puts, "dropped": self.dropped,
+            "blocked": self.blocked, "blocked_s": self.blocked_s,
+        }
+
+
+class ResultMerger:
+    """Orders results from several lanes by timestamp.
+
+    Each lane emits results in any order and advances a watermark: a promise
+    that it will not emit anything earlier. A result is released once every
+    unfinished lane's watermark has passed it, or after it has been held for
+    ``max_hold_s`` (bounded latency; ``None`` = strict order). Each release is
+    sorted by timestamp.
+    """
+
+    def __init__(self, lanes, max_hold_s=0.5):
+        self.max_hold_s = max_hold_s
+        self._heap = []                     # (ts, seq, arrival, item)
+        self._seq = itertools.count()
+        self._watermark = {lane: -math.inf for lane in lanes}
+        self._done = set()
+        self._cond = threading.Condition()
+        self.released = 0
+        self.held_out_of_order = 0          # released on max_hold_s, not watermark
+
+    def push(self, lane, ts, item):
+        with self._cond:
+            heapq.heappush(self._heap, (ts, next(self._seq), time.monotonic(), item))
+            self._cond.notify()
+
+    def advance(self, lane, watermark):
+        with self._cond:
+            if watermark > self._watermark[lane]:
+                self._watermark[lane] = watermark
+                self._cond.notify()
+
+    def finish(self, lane):
+        with self._cond:
+            self._done.add(lane)
+            self._cond.notify()
+
+    def _low_watermark(self):
+        live = [wm for lane, wm in self._watermark.items() if lane not in self._done]
+        return min(live) if live else math.inf
+
+    def _pop_ready(self):
+        """Results releasable now (sorted), and seconds until the next hold expires."""
+        low = self._low_watermark()
+        cutoff, wait = low, None
+        if self.max_hold_s is not None and self._heap:
+            now = time.monotonic()
+            for ts, _, arrival, _ in self._heap:
+                left = arrival + self.max_hold_s - now
+                if left <= 0:
+                    cutoff = max(cutoff, ts)
+                elif ts > cutoff:
+                    wait = left if wait is None else min(wait, left)
+        ready = []
+        while self._heap and self._heap[0][0] <= cutoff:
+            ts, _, _, item = heapq.heappop(self._heap)
+            if ts > low:
+                self.held_out_of_order += 1
+            ready.append(item)
+        self.released += len(ready)
+        return ready, wait
+
+    def __iter__(self):
+        """Yield results until every lane has finished and the heap is empty."""
+        while True:
+            with self._cond:
+                while True:
+                    ready, wait = self._pop_ready()
+                    if ready:
+                        break
+                    if len(self._done) == len(self._watermark) and not self._heap:
+                        return
+                    self._cond.wait(timeout=wait)
+            yield from ready
+
+    @property
+    def pending(self):
+        return len(self._heap)
+
+
+class SessionPipeline:
+    """Reader thread + one worker thread per stage + a ResultMerger.
+
+    ``add_stage(name, handler, maxsize, drop_oldest, emits)`` registers a
+    stage. Handlers are called as ``handler(ts, payload, emit)`` on the stage's
+    own thread, one item at a time, in queue order; ``emit(ts, result)`` sends
+    a result to the merger. A handler may return a watermark (the earliest
+    timestamp it can still emit); by default it is the item's ``ts``.
+
+    ``run(request_iterator, route)`` starts everything. ``route(request)``
+    returns ``[(stage, ts, payload), ...]`` for each request and runs on the
+    reader thread, so it must stay cheap.
+    """
+
+    def __init__(self, max_hold_s=0.5, report=None, report_every_s=10.0):
+        self._stages = {}
+        self._handlers = {}
+        self._emitting = []
+        self._threads = []
+        self._stop = threading.Event()
+        self._max_hold_s = max_hold_s
+        self._report = report
+        self._report_every_s = report_every_s
+        self.merger = None
+        self.requests = 0
+        self.reader_error = None
+
+    def add_stage(self, name, handler, maxsize, drop_oldest=False, emits=True):
+        self._stages[name] = StageQueue(name, maxsize, drop_oldest=drop_oldest)
+        self._handlers[name] = handler
+        if emits:
+            self._emitting.append(name)
+
+    def run(self, request_iterator, route):
+        self.merger = ResultMerger(self._emitting, max_hold_s=self._max_hold_s)
+        for name in self._stages:
+            self._spawn(f"rs-{name}", self._work, name)
+        self._spawn("rs-reader", self._read, request_iterator, route)
+        return self.merger
+
+    def _spawn(self, thread_name, target, *args):
+        t = threading.Thread(target=target, args=args, name=thread_name, daemon=True)
+        t.start()
+        self._threads.append(t)
+
+    def _read(self, request_iterator, route):
+        last_report = time.monotonic()
+        try:
+            for request in request_iterator:
+                if self._stop.is_set():
+                    break
+                self.requests += 1
+                for name, ts, payload in route(request):
+                    self._stages[name].put((ts, payload))
+                if self._report and time.monotonic() - last_report >= self._report_every_s:
+                    last_report = time.monotonic()
+                    self._report(self.stats_line())
+        except Exception as e:          # client cancel / transport error ends the stream
+            self.reader_error = e
+        finally:
+            for q in self._stages.values():
+                q.close()
+
+    def _work(self, name):
+        q, handler = self._stages[name], self._handlers[name]
+        emits = name in self._emitting
+
+        def emit(ts, result):
+            self.merger.push(name, ts, result)
+
+        while True:
+            item = q.get()
+            if item is _CLOSE:
+                break
+            if self._stop.is_set():
+                continue                # drain without work after stop()
+            ts, payload = item
+            try:
+                watermark = handler(ts, payload, emit)
+            except Exception:
+                # The handler leaves its own state consistent before raising
+                # (e.g. the diar stage shifts its ring); the session goes on.
+                logger.exception("RecognizeSpeakers stage %r failed at ts=%s", name, ts)
+                watermark = None
+            if emits:
+                self.merger.advance(name, ts if watermark is None else watermark)
+        if emits:
+            self.merger.finish(name)
+
+    def stop(self):
+        """Skip queued work (e.g. the client went away). The reader still
+        closes every queue when the request iterator ends."""
+        self._stop.set()
+
+    def join(self, timeout=None):
+        for t in self._threads:
+            t.join(timeout)
+
+    def stats(self):
+        out = {name: q.stats() for name, q in self._stages.items()}
+        out["merger"] = {
+            "pending": self.merger.pending if self.merger else 0,
+            "released": self.merger.released if self.merger else 0,
+            "out_of_order": self.merger.held_out_of_order if self.merger else 0,
+        }
+        return out
+
+    def stats_line(self):
+        parts = []
+        for name, s in self.stats().items():
+            if name == "merger":
+                continue
+            part = f"{name}={s['depth']}/{s['maxsize']} hw={s['high_water']}"
+            if s["dropped"]:
+                part += f" drop={s['dropped']}"
+            if s["blocked"]:
+                part += f" block={s['blocked']}({s['blocked_s']:.1f}s)"
+            parts.append(part)
+        m = self.stats()["merger"]
+        parts.append(f"out pending={m['pending']} sent={m['released']} late={m['out_of_order']}")
+        return "  ".join(parts)
@@ -0,0 +1,268 @@
+"""
+Audio sources for ProcessVideo's sliding diarization windows.
+
+BufferedAudio — the whole 16 kHz PCM track, already extracted (batch path).
+
+StreamingVideoIngest — the upload itself. A pump thread drains the gRPC
+VideoUploadChunk stream, appending each chunk to a temp file (still needed
+for ASD and rendering) and piping it into an ffmpeg process that demuxes and
+resamples the audio on the fly. A reader thread moves ffmpeg's s16le output
+into an AudioWindowBuffer ring, so the first diarization windows run while
+later chunks are still uploading; consumed audio is dropped from the ring as
+the windows advance.
+
+Containers ffmpeg cannot demux from a pipe (an .mp4 whose moov atom is at the
+end — the default for most cameras) produce no audio until the upload is
+complete. Then the reader re-extracts from the finished temp file, skipping
+whatever the pipe already delivered, and processing simply starts later.
+
+Both sources expose ``windows(size, step)``, which yields
+``(win_idx, win_start, win_end)`` in the same places the batch loop used to
+(window 0 always; window k > 0 only if it is full), and progress strings
+while it waits for audio.
+"""
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+
+import numpy as np
+
+from .audio_buffer import AudioWindowBuffer
+
+
+class _AudioSource:
+    sample_rate = 16000
+
+    def windows(self, size, step, poll_s=2.0):
+        win_idx = 0
+        while True:
+            win_start = win_idx * step
+            self.release(win_start)
+            while not self.wait_for(win_start + size, timeout=poll_s):
+                yield self.progress()
+            available = self.duration
+            if win_idx > 0 and win_start + size > available:
+                return
+            yield win_idx, win_start, min(win_start + size, available)
+            win_idx += 1
+
+    def expected_windows(self, size, step):
+        """Total window count, or None while the length is still unknown."""
+        if not self.ended:
+            return None
+        if self.duration < size:
+            return 1
+        return max(1, int((self.duration - size) / step) + 1)
+
+    def release(self, upto_s):
+        pass
+
+    def progress(self):
+        return ""
+
+
+class BufferedAudio(_AudioSource):
+    """A fully extracted PCM_16 track."""
+
+    ended = True
+
+    def __init__(self, pcm, sample_rate):
+        self._pcm = pcm
+        self.sample_rate = sample_rate
+        self.duration = (len(pcm) // 2) / sample_rate
+
+    def wait_for(self, seconds, timeout=None):
+        return True
+
+    def read(self, start_s, end_s):
+        return self._pcm[int(start_s * self.sample_rate) * 2:int(end_s * self.sample_rate) * 2]
+
+
+class StreamingVideoIngest(_AudioSource):
+    """Upload → temp file + live ffmpeg audio demux → ring buffer.
+
+    ``start(request_iterator)`` spawns the pump and returns once the first
+    chunk (filename, max_duration_seconds) has arrived. The window loop then
+    reads audio as it appears; ``wait_upload()`` blocks until the file is
+    complete (and re-raises an upload error). ``close()`` kills ffmpeg and
+    deletes the temp file.
+    """
+
+    READ_BYTES = 64 * 1024
+
+    def __init__(self, sample_rate=16000, spill_dir=None):
+        self.sample_rate = sample_rate
+        fd, self.path = tempfile.mkstemp(suffix=".mp4", dir=spill_dir)
+        self._file = os.fdopen(fd, "wb")
+        self.filename = "input.mp4"
+        self.max_duration = 0.0
+        self.received_bytes = 0
+        self.chunks = 0
+        self.piped_samples = 0          # delivered by the live demux
+        self.fallback = False           # re-extracted from the finished file
+        self.error = None
+        self._ring = AudioWindowBuffer(sample_rate, capacity_s=120.0)
+        self._base = 0                  # absolute sample index of the ring's first sample
+        self._total = 0                 # samples received so far
+        self._cond = threading.Condition()
+        self._ended = False
+        self._first_chunk = threading.Event()
+        self._uploaded = threading.Event()
+        self._proc = None
+        self._threads = []
+
+    # ---- producer side ---------------------------------------------------
+
+    def _ffmpeg(self, src):
+        cmd = ["ffmpeg", "-loglevel", "error", "-i", src]
+        if self.max_duration > 0:
+            cmd += ["-t", str(self.max_duration)]
+        cmd += ["-vn", "-ac", "1", "-ar", str(self.sample_rate), "-f", "s16le", "pipe:1"]
+        return subprocess.Popen(cmd, stdin=subprocess.PIPE if src == "pipe:0" else subprocess.DEVNULL,
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+    def _pump(self, request_iterator):
+        stdin = None
+        try:
+            for chunk in request_iterator:
+                if self.chunks == 0:
+                    if chunk.filename:
+                        self.filename = chunk.filename
+                    if chunk.max_duration_seconds > 0:
+                        self.max_duration = chunk.max_duration_seconds
+                    self._proc = self._ffmpeg("pipe:0")
+                    stdin = self._proc.stdin
+                    self._spawn(self._read_pcm)
+                    self._first_chunk.set()
+                self.chunks += 1
+                self._file.write(chunk.data)
+                self.received_bytes += len(chunk.data)
+                if stdin is not None:
+                    try:
+                        stdin.write(chunk.data)
+                    except (BrokenPipeError, OSError):
+                        stdin = None        # demux gave up; the file path takes over
+        except Exception as e:              # client cancel / transport error
+            self.error = e
+        finally:
+            self._file.close()
+            if stdin is not None:
+                try:
+                    stdin.close()
+                except OSError:
+                    pass
+            self._uploaded.set()
+            if not self._first_chunk.is_set():     # empty upload
+                self._end()
+                self._first_chunk.set()
+
+    def _drain(self, stdout, skip_samples=0):
+        """Copy s16le from ``stdout`` into the ring, dropping the first
+        ``skip_samples`` samples. Returns the number of samples seen."""
+        seen, carry = 0, b""
+        while True:
+            data = stdout.read(self.READ_BYTES)
+            if not data:
+                break
+            data = carry + data
+            usable = len(data) - len(data) % 2
+            data, carry = data[:usable], data[usable:]
+            samples = np.frombuffer(data, dtype=np.int16)
+            drop = min(len(samples), max(0, skip_samples - seen))
+            seen += len(samples)
+            if drop < len(samples):
+                self._append(samples[drop:])
+        return seen
+
+    def _read_pcm(self):
+        try:
+            self.piped_samples = self._drain(self._proc.stdout)
+            failed = self._proc.wait() != 0
+            self._uploaded.wait()
+            if (failed or self.piped_samples == 0) and self.error is None:
+                # Not streamable from a pipe (e.g. moov at the end): decode
+                # the finished file and continue after what the pipe gave us.
+                self.fallback = True
+                proc = self._ffmpeg(self.path)
+                self._drain(proc.stdout, skip_samples=self.piped_samples)
+                proc.wait()
+        finally:
+            self._end()
+
+    def _append(self, samples):
+        with self._cond:
+            self._ring.write(samples, self._ring.end_time)
+            self._total += len(samples)
+            self._cond.notify_all()
+
+    def _end(self):
+        with self._cond:
+            self._ended = True
+            self._cond.notify_all()
+
+    def _spawn(self, target, *args):
+        t = threading.Thread(target=target, args=args, daemon=True,
+                             name=f"video-ingest-{target.__name__.strip('_')}")
+        t.start()
+        self._threads.append(t)
+
+    def start(self, request_iterator):
+        if shutil.which("ffmpeg") is None:
+            raise RuntimeError("ffmpeg not found")
+        self._spawn(self._pump, request_iterator)
+        self._first_chunk.wait()
+        return self
+
+    # ---- consumer side ---------------------------------------------------
+
+    @property
+    def ended(self):
+        return self._ended
+
+    @property
+    def duration(self):
+        return self._total / self.sample_rate
+
+    def wait_for(self, seconds, timeout=None):
+        """True once ``seconds`` of audio are available or the stream ended."""
+        need = int(seconds * self.sample_rate)
+        with self._cond:
+            return self._cond.wait_for(lambda: self._total >= need or self._ended, timeout)
+
+    def read(self, start_s, end_s):
+        s0, s1 = int(start_s * self.sample_rate), int(end_s * self.sample_rate)
+        with self._cond:
+            if s0 < self._base:
+                raise ValueError(f"audio before {self._base / self.sample_rate:.1f}s was released")
+            view = self._ring.window()
+            return view[s0 - self._base:s1 - self._base].tobytes()
+
+    def release(self, upto_s):
+        """Drop audio before ``upto_s`` from the ring."""
+        with self._cond:
+            k = min(int(upto_s * self.sample_rate), self._total) - self._base
+            if k > 0:
+                self._ring.advance(k / self.sample_rate)
+                self._base = self._total - len(self._ring)
+
+    def progress(self):
+        return (f"Uploading... {self.received_bytes / 1024 / 1024:.1f}MB received, "
+                f"{self.duration:.0f}s audio"
+                + (" (waiting for end of file to demux)" if self.duration == 0 else ""))
+
+    def wait_upload(self):
+        """Block until the upload is complete; re-raise its error, if any."""
+        self._uploaded.wait()
+        if self.error is not None:
+            raise RuntimeError(f"upload failed: {self.error}")
+        return self.path
+
+    def close(self):
+        if self._proc is not None and self._proc.poll() is None:
+            self._proc.kill()
+        for t in self._threads:
+            t.join(timeout=5)
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -22,8 +22,24 @@ import multiprocessing as mp
 import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity
 
+from .video_ingest import BufferedAudio
+from .video_render import render_pipelined
+
 logger = logging.getLogger("speaker_recognition")
 
+# Annotation renderer: "pipelined" (video_render.py) or "chunked"
+# (_render_chunked). Codec/preset are ffmpeg's -c:v / -preset for the
+# pipelined encoder, e.g. SPEAKER_RENDER_CODEC=h264_nvenc SPEAKER_RENDER_PRESET=p1
+# on a GPU box, or "mp4v" for cv2.VideoWriter.
+RENDER_ENGINE = os.environ.get("SPEAKER_RENDER_ENGINE", "pipelined")
+RENDER_CODEC = os.environ.get("SPEAKER_RENDER_CODEC", "libx264")
+RENDER_PRESET = os.environ.get("SPEAKER_RENDER_PRESET", "veryfast")
+
+# Directory to record each window's per-frame gate inputs (posteriors + cluster
+# segments) and the timelines / tiers this run computed from them as
+# gate_wNNN.npz, replayed by tools/alone_timeline_check.py. Off when unset.
+GATE_RECORD_DIR = os.environ.get("SPEAKER_GATE_RECORD_DIR", "")
+
 CYAN = "\033[96m"
 GREEN = "\033[92m"
 YELLOW = "\033[93m"
@@ -63,6 +79,50 @@ def _get_color(identity, color_map, palette):
     return color_map[identity]
 
 
+def _annotate_frame(frame, frame_w, frame_h, face_entries, v_entry, summary_text):
+    """Draw one frame's overlays in place (summary_text=None: no banner).
+
+    Reference drawing; video_render.FrameAnnotator reproduces it pixel for
+    pixel from cached layers.
+    """
+    # ---- ASD: face bboxes (thin gray default, thick green when speaking, no text) ----
+    if face_entries is not None:
+        for (x1, y1, x2, y2, is_speaking) in face_entries:
+            if is_speaking:
+                cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+            else:
+                cv2.rectangle(frame, (x1, y1), (x2, y2), (120, 120, 120), 1)
+
+    # ---- VOICE: bottom bar (same look as original) ----
+    if v_entry is not None:
+        vid, vconf, vcolor = v_entry
+        overlay = frame.copy()
+        cv2.rectangle(overlay, (0, frame_h - 70), (frame_w, frame_h),
+                      (0, 0, 0), -1)
+        cv2.addWeighted(overlay, 0.6, frame, 0.4, 0, frame)
+        cv2.putText(frame, f"VOICE: {vid}", (10, frame_h - 45),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, vcolor, 2)
+        bar_w = int(vconf * 200)
+        cv2.rectangle(frame, (10, frame_h - 25),
+                      (10 + bar_w, frame_h - 15), vcolor, -1)
+        cv2.rectangle(frame, (10, frame_h - 25),
+                      (210, frame_h - 15), (100, 100, 100), 1)
+        cv2.putText(frame, f"{vconf:.2f}", (220, frame_h - 15),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.4, (200, 200, 200), 1)
+        cv2.circle(frame, (frame_w - 30, 30), 10, vcolor, -1)
+    else:
+        cv2.circle(frame, (frame_w - 30, 30), 10, (80, 80, 80), -1)
+
+    # ---- TOP-LEFT SUMMARY BANNER (first 60s only) ----
+    if summary_text is not None:
+        # Two lines: header + the counts
+        cv2.putText(frame, "PIPELINE", (10, 25),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.55, (180, 180, 180), 1)
+        cv2.putText(frame, summary_text, (10, 48),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+    return frame
+
+
 def _annotate_chunk(args):
     """
     Worker process: annotate a contiguous slice of frames and write a chunk .mp4.
@@ -105,43 +165,10 @@ def _annotate_chunk(args):
         if not ret:
             break
 
-        # ---- ASD: face bboxes (thin gray default, thick green when speaking, no text) ----
-        if face_slice is not None:
-            for (x1, y1, x2, y2, is_speaking) in face_slice[i]:
-                if is_speaking:
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                else:
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), (120, 120, 120), 1)
-
-        # ---- VOICE: bottom bar (same look as original) ----
-        v_entry = voice_slice[i]
-        if v_entry is not None:
-            vid, vconf, vcolor = v_entry
-            overlay = frame.copy()
-            cv2.rectangle(overlay, (0, frame_h - 70), (frame_w, frame_h),
-                          (0, 0, 0), -1)
-            cv2.addWeighted(overlay, 0.6, frame, 0.4, 0, frame)
-            cv2.putText(frame, f"VOICE: {vid}", (10, frame_h - 45),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, vcolor, 2)
-            bar_w = int(vconf * 200)
-            cv2.rectangle(frame, (10, frame_h - 25),
-                          (10 + bar_w, frame_h - 15), vcolor, -1)
-            cv2.rectangle(frame, (10, frame_h - 25),
-                          (210, frame_h - 15), (100, 100, 100), 1)
-            cv2.putText(frame, f"{vconf:.2f}", (220, frame_h - 15),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.4, (200, 200, 200), 1)
-            cv2.circle(frame, (frame_w - 30, 30), 10, vcolor, -1)
-        else:
-            cv2.circle(frame, (frame_w - 30, 30), 10, (80, 80, 80), -1)
-
-        # ---- TOP-LEFT SUMMARY BANNER (first 60s only) ----
-        # Absolute frame index for this iteration = start_frame + i
-        if (start_frame + i) < summary_until_frame:
-            # Two lines: header + the counts
-            cv2.putText(frame, "PIPELINE", (10, 25),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.55, (180, 180, 180), 1)
-            cv2.putText(frame, summary_text, (10, 48),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+        _annotate_frame(frame, frame_w, frame_h,
+                        face_slice[i] if face_slice is not None else None,
+                        voice_slice[i],
+                        summary_text if (start_frame + i) < summary_until_frame else None)
 
         out.write(frame)
         written += 1
@@ -151,17 +178,124 @@ def _annotate_chunk(args):
     return out_path, written
 
 
-def process_video(video_path, max_duration, speaker_recognition, diarization):
+def _render_chunked(working_video, total_frames, video_fps, frame_w, frame_h,
+                    voice_per_frame, diar_per_frame, face_per_frame,
+                    num_diar_speakers, summary_text, summary_until_frame):
     """
-    Process video with sliding-window diarization + multi-sample voice ReID.
-    Face recognition has been removed from this path to isolate annotation cost.
+    Chunked renderer: split frames into N == cpu_count chunks. Each worker
+    opens its own VideoCapture, seeks to its start frame, annotates, writes
+    its own segment .mp4; then ffmpeg concats all segments + muxes the
+    original audio in one call. Returns (final_output, frames_written).
     """
-    # Module-level import for the per-frame gate helpers and constants.
-    # Hoisted out of the per-window loop (perf: avoid repeat import overhead).
-    from ginny_server.core_api.speaker_recognition import speaker_recognition as sr_mod
-    logger.info(f"  {DIM}{_ts()}{RESET}  {CYAN}.. VIDEO{RESET}        Starting sliding-window pipeline")
+    n_workers = max(1, mp.cpu_count())
+    if total_frames < n_workers:
+        n_workers = max(1, total_frames)
+    chunk_size = (total_frames + n_workers - 1) // n_workers
+
+    chunk_paths = []
+    chunk_args = []
+    for w in range(n_workers):
+        f_start = w * chunk_size
+        f_end = min(f_start + chunk_size, total_frames)
+        if f_start >= f_end:
+            break
+        chunk_path = tempfile.NamedTemporaryFile(
+            delete=False, suffix=f"_chunk{w:02d}.mp4"
+        ).name
+        chunk_paths.append(chunk_path)
+        chunk_args.append((
+            working_video, f_start, f_end, video_fps, frame_w, frame_h,
+            voice_per_frame[f_start:f_end],
+            diar_per_frame[f_start:f_end],
+            face_per_frame[f_start:f_end],
+            num_diar_speakers,
+            summary_text,
+            summary_until_frame,
+            chunk_path,
+        ))
+
+    logger.info(
+        f"  {DIM}{_ts()}{RESET}  {CYAN}.. PARALLEL{RESET}    "
+        f"{total_frames} frames across {len(chunk_args)} workers "
+        f"(~{chunk_size} frames/worker)"
+    )
+
+    # Use spawn context to avoid potential cv2/fork interactions in a server.
+    ctx = mp.get_context("spawn")
+    with ctx.Pool(processes=len(chunk_args)) as pool:
+        results = pool.map(_annotate_chunk, chunk_args)
 
-    # Trim if needed
+    total_written = sum(n for _, n in results)
+    logger.info(
+        f"  {DIM}{_ts()}{RESET}  {GREEN}{BOLD}OK ANNOTATED{RESET}   "
+        f"{total_written} frames in {len(chunk_args)} chunks"
+    )
+
+    if total_written != total_frames:
+        # Per-chunk breakdown for debugging (see A/V DESYNC GUARD in process_video)
+        for idx, (path, nw) in enumerate(results):
+            expected_n = chunk_args[idx][2] - chunk_args[idx][1]  # end - start
+            if nw != expected_n:
+                logger.warning(
+                    f"  {DIM}{_ts()}{RESET}  {YELLOW}   chunk {idx}{RESET}: "
+                    f"wrote {nw}/{expected_n} frames "
+                    f"(range [{chunk_args[idx][1]}, {chunk_args[idx][2]}))"
+                )
+
+    # ffmpeg concat segments + mux original audio in one call
+    concat_list_file = tempfile.NamedTemporaryFile(
+        delete=False, suffix=".txt", mode="w"
+    )
+    for cp in chunk_paths:
+        concat_list_file.write(f"file '{cp}'\n")
+    concat_list_file.close()
+
+    final_output = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4").name
+    try:
+        subprocess.run([
+            "ffmpeg", "-y",
+            "-f", "concat", "-safe", "0", "-i", concat_list_file.name,
+            "-i", working_video,
+            "-c:v", "copy",
+            "-map", "0:v:0", "-map", "1:a:0",
+            "-shortest", final_output
+        ], capture_output=True, check=True)
+        logger.info(
+            f"  {DIM}{_ts()}{RESET}  {GREEN}OK MUX{RESET}         "
+            f"Concatenated {len(chunk_paths)} chunks + audio"
+        )
+    except subprocess.CalledProcessError as e:
+        logger.warning(
+            f"  {DIM}{_ts()}{RESET}  {YELLOW}!! MUX{RESET}         "
+            f"{e.stderr.decode(errors='replace')[-200:] if e.stderr else e}"
+        )
+        # Fallback: try concat without mux (audio missing) so user still
+        # gets a video back rather than nothing.
+        try:
+            subprocess.run([
+                "ffmpeg", "-y",
+                "-f", "concat", "-safe", "0", "-i", concat_list_file.name,
+                "-c", "copy", final_output
+            ], capture_output=True, check=True)
+        except Exception:
+            final_output = chunk_paths[0] if chunk_paths else None
+
+    # Cleanup chunks + concat list
+    for cp in chunk_paths:
+        try:
+            os.remove(cp)
+        except OSError:
+            pass
+    try:
+        os.remove(concat_list_file.name)
+    except OSError:
+        pass
+
+    return final_output, total_written
+
+
+def _trim_video(video_path, max_duration):
+    """Stream-copy the first max_duration seconds (0 = whole file)."""
     if max_duration > 0:
         temp_trimmed = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
         temp_trimmed.close()
@@ -171,34 +305,79 @@ def process_video(video_path, max_duration, speaker_recognition, diarization):
         ], capture_output=True)
         if result.returncode != 0:
             raise RuntimeError(f"Trim failed: {result.stderr.decode(errors='replace')[-200:]}")
-        working_video = temp_trimmed.name
-    else:
-        working_video = video_path
+        return temp_trimmed.name
+    return video_path
 
-    # Extract audio
-    temp_wav = tempfile.NamedTemporaryFile(delete=False, suffix=".wav")
-    temp_wav.close()
-    subprocess.run([
-        "ffmpeg", "-y", "-i", working_video,
-        "-ar", "16000", "-ac", "1", "-sample_fmt", "s16", temp_wav.name
-    ], capture_output=True, check=True)
 
-    with wave.open(temp_wav.name, 'rb') as wf:
-        sample_rate = wf.getframerate()
-        all_audio = wf.readframes(wf.getnframes())
-    os.remove(temp_wav.name)
+def _record_gate_inputs(record_dir, win_idx, win_start, soft_data, sw, class_map,
+                        frame_rate_hz, sample_rate, clusters, timelines, gates):
+    """Save one window's per-frame gate inputs, plus the alone timeline and
+    tier computed for each cluster (length -1 / tier "" where that failed),
+    for tools/alone_timeline_check.py."""
+    try:
+        os.makedirs(record_dir, exist_ok=True)
+        labels = list(clusters)
+        segs = [(k, s, e, n) for k, label in enumerate(labels)
+                for (s, e), n in zip(clusters[label]["segments"], clusters[label]["segment_byte_lens"])]
+        live = [timelines[label] for label in labels if label in timelines]
+        np.savez_compressed(
+            os.path.join(record_dir, f"gate_w{win_idx:03d}.npz"),
+            soft_data=np.asarray(soft_data),
+            chunk_starts=np.array([sw[c].start for c in range(len(soft_data))], dtype=np.float64),
+            single_idxs=np.array(class_map["single_speaker_class_idxs"], dtype=np.int64),
+            frame_rate_hz=frame_rate_hz, sample_rate=sample_rate, win_start=win_start,
+            labels=np.array(labels),
+            seg_cluster=np.array([s[0] for s in segs], dtype=np.int64),
+            seg_starts=np.array([s[1] for s in segs], dtype=np.float64),
+            seg_ends=np.array([s[2] for s in segs], dtype=np.float64),
+            byte_lens=np.array([s[3] for s in segs], dtype=np.int64),
+            live_timeline=(np.concatenate(live).astype(np.float32) if live
+                           else np.zeros(0, dtype=np.float32)),
+            live_timeline_len=np.array([len(timelines[label]) if label in timelines else -1
+                                        for label in labels], dtype=np.int64),
+            live_tier=np.array([gates[label]["tier"] if label in gates else ""
+                                for label in labels]),
+        )
+    except Exception as e:
+        logger.error(f"  {DIM}{_ts()}{RESET}  {YELLOW}    gate record failed: {e}{RESET}")
 
-    audio_duration = (len(all_audio) // 2) / sample_rate
-    logger.info(f"  {DIM}{_ts()}{RESET}  {GREEN}OK AUDIO{RESET}       {audio_duration:.1f}s extracted")
 
-    # Open video
-    cap = cv2.VideoCapture(working_video)
-    video_fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    frame_w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    frame_h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+def process_video(video_path, max_duration, speaker_recognition, diarization, ingest=None):
+    """
+    Process video with sliding-window diarization + multi-sample voice ReID.
+    Face recognition has been removed from this path to isolate annotation cost.
 
-    logger.info(f"  {DIM}{_ts()}{RESET}  {GREEN}OK VIDEO{RESET}       {frame_w}x{frame_h} @ {video_fps:.0f}fps, {total_frames} frames")
+    With ``ingest`` (a video_ingest.StreamingVideoIngest still receiving the
+    upload), windows are diarized as their audio arrives; ``video_path`` is
+    then the ingest's temp file, used once the upload has completed.
+    """
+    # Module-level import for the per-frame gate helpers and constants.
+    # Hoisted out of the per-window loop (perf: avoid repeat import overhead).
+    from ginny_server.core_api.speaker_recognition import speaker_recognition as sr_mod
+    logger.info(f"  {DIM}{_ts()}{RESET}  {CYAN}.. VIDEO{RESET}        Starting sliding-window pipeline"
+                f"{' (streaming upload)' if ingest is not None else ''}")
+
+    if ingest is None:
+        working_video = _trim_video(video_path, max_duration)
+
+        # Extract audio
+        temp_wav = tempfile.NamedTemporaryFile(delete=False, suffix=".wav")
+        temp_wav.close()
+        subprocess.run([
+            "ffmpeg", "-y", "-i", working_video,
+            "-ar", "16000", "-ac", "1", "-sample_fmt", "s16", temp_wav.name
+        ], capture_output=True, check=True)
+
+        with wave.open(temp_wav.name, 'rb') as wf:
+            sample_rate = wf.getframerate()
+            all_audio = wf.readframes(wf.getnframes())
+        os.remove(temp_wav.name)
+
+        audio = BufferedAudio(all_audio, sample_rate)
+        logger.info(f"  {DIM}{_ts()}{RESET}  {GREEN}OK AUDIO{RESET}       {audio.duration:.1f}s extracted")
+    else:
+        audio = ingest
+        sample_rate = ingest.sample_rate
 
     # ===================== SLIDING WINDOW DIARIZATION + ReID =====================
     WINDOW_SIZE = 30.0  # seconds
@@ -216,15 +395,18 @@ def process_video(video_path, max_duration, speaker_recognition, diarization):
     voice_color_map = {}
     diar_color_map = {}
 
-    num_windows = max(1, int((audio_duration - WINDOW_SIZE) / WINDOW_STEP) + 1)
-    if audio_duration < WINDOW_SIZE:
-        num_windows = 1
-
-    logger.info(f"  {DIM}{_ts()}{RESET}  {CYAN}.. WINDOWS{RESET}     {num_windows} windows ({WINDOW_SIZE:.0f}s each, {WINDOW_OVERLAP:.0f}s overlap)")
+    num_windows = audio.expected_windows(WINDOW_SIZE, WINDOW_STEP)
+    logger.info(f"  {DIM}{_ts()}{RESET}  {CYAN}.. WINDOWS{RESET}     {num_windows or '?'} windows ({WINDOW_SIZE:.0f}s each, {WINDOW_OVERLAP:.0f}s overlap)")
 
-    for win_idx in range(num_windows):
-        win_start = win_idx * WINDOW_STEP
-        win_end = min(win_start + WINDOW_SIZE, audio_duration)
+    # Windows come from the audio source as soon as their audio exists; a
+    # streaming source yields progress strings while the upload catches up.
+    windows_seen = 0
+    for item in audio.windows(WINDOW_SIZE, WINDOW_STEP):
+        if isinstance(item, str):
+            yield item, None
+            continue
+        win_idx, win_start, win_end = item
+        windows_seen = win_idx + 1
         win_dur = win_end - win_start
 
         # Skip windows shorter than diarization minimum
@@ -232,12 +414,11 @@ def process_video(video_path, max_duration, speaker_recognition, diarization):
             logger.info(f"  {DIM}{_ts()}{RESET}  {YELLOW}!! WIN {win_idx+1}{RESET}      too short ({win_dur:.1f}s), skipping")
             continue
 
-        yield f"Window {win_idx+1}/{num_windows} [{_vt(win_start)}-{_vt(win_end)}]...", None
+        num_windows = audio.expected_windows(WINDOW_SIZE, WINDOW_STEP)
+        yield f"Window {win_idx+1}/{num_windows or '?'} [{_vt(win_start)}-{_vt(win_end)}]...", None
 
-        # Extract window audio bytes
-        start_sample = int(win_start * sample_rate) * 2  # PCM_16 = 2 bytes/sample
-        end_sample = int(win_end * sample_rate) * 2
-        window_audio = all_audio[start_sample:end_sample]
+        # Extract window audio bytes (PCM_16)
+        window_audio = audio.read(win_start, win_end)
 
         # Step 1: Diarize this window AND get soft posteriors for the gate
         try:
@@ -273,12 +454,21 @@ def process_video(video_path, max_duration, speaker_recognition, diarization):
         samples_per_frame = round(sample_rate / frame_rate_hz)
         bytes_per_frame = samples_per_frame * 2
 
+        # Window-level half of the gate (chunk-averaged P(single speaker) on
+        # the posterior frame grid), shared by every cluster below. On failure
+        # each cluster recomputes it and reports the error itself.
+        try:
+            window_alone = sr_mod._window_alone_frames(soft_data, sw, class_map, frame_rate_hz)
+        except Exception:
+            window_alone = None
+
         # Step 2: For each cluster, apply the three-tier per-frame gate
+        gates = {}  # diar_label → _gate_cluster result (+ "filter_ms")
+        timelines = {}  # diar_label → alone timeline, kept only for GATE_RECORD_DIR
         for diar_label, cluster in clusters.items():
             cluster_audio = bytes(cluster["audio"])
             cluster_segments = cluster["segments"]
             cluster_segment_byte_lens = cluster["segment_byte_lens"]
-            cluster_dur = (len(cluster_audio) // 2) / sample_rate
 
             _get_color(diar_label, diar_color_map, DIAR_COLORS)
 
@@ -298,6 +488,7 @@ def process_video(video_path, max_duration, speaker_recognition, diarization):
                     soft_data, sw, class_map,
                     frame_rate_hz, sample_rate,
                     window_offset_s=win_start,
+                    window_alone=window_alone,
                 )
             except Exception as e:
                 logger.error(f"  {DIM}{_ts()}{RESET}  {YELLOW}    {diar_label}: alone_timeline failed: {e}{RESET}")
@@ -305,20 +496,47 @@ def process_video(video_path, max_duration, speaker_recognition, diarization):
                     diar_timeline.append((seg_start, seg_end, diar_label, "?", win_idx + 1))
                 continue
 
-            # === Strict pass: enrollment threshold (0.8) ===
-            enroll_audio, enroll_frames, total_clean_strict = sr_mod._lccs_from_timeline(
-                alone_timeline,
-                sr_mod.PER_FRAME_ALONE_THRESHOLD_ENROLL,
-                cluster_audio, bytes_per_frame
+            gate = sr_mod._gate_cluster(alone_timeline, cluster_audio, bytes_per_frame, frame_rate_hz)
+            gate["filter_ms"] = (time.perf_counter() - _t0) * 1000
+            gates[diar_label] = gate
+            if GATE_RECORD_DIR:
+                timelines[diar_label] = alone_timeline
+
+        if GATE_RECORD_DIR:
+            _record_gate_inputs(GATE_RECORD_DIR, win_idx, win_start, soft_data, sw,
+                                class_map, frame_rate_hz, sample_rate, clusters,
+                                timelines, gates)
+
+        # Step 3: One batched embedding call for every FULL / QUICK span
+        embed_labels = [label for label, gate in gates.items() if gate["tier"] != "skip"]
+        embeddings = {}
+        if embed_labels:
+            _t0 = time.perf_counter()
+            try:
+                embeddings = dict(zip(embed_labels, speaker_recognition.extract_embeddings_batch(
+                    [gates[label]["audio"] for label in embed_labels], sample_rate
+                )))
+            except Exception as e:
+                logger.error(f"  {DIM}{_ts()}{RESET}  {YELLOW}    EMBED batch failed: {e}{RESET}")
+            logger.info(
+                f"  {DIM}{_ts()}{RESET}  {DIM}    EMBED {len(embed_labels)} spans in "
+                f"{(time.perf_counter() - _t0) * 1000:.1f}ms{RESET}"
             )
-            enroll_lccs_s = enroll_frames / frame_rate_hz
-            total_clean_strict_s = total_clean_strict / frame_rate_hz
-            frag_strict = (total_clean_strict / enroll_frames) if enroll_frames > 0 else float('inf')
 
-            if enroll_lccs_s >= sr_mod.MIN_CLEAN_DURATION_ENROLL:
+        # Step 4: Match / enroll per cluster, in diarization order
+        for diar_label, gate in gates.items():
+            cluster_segments = clusters[diar_label]["segments"]
+            cluster_dur = (len(clusters[diar_label]["audio"]) // 2) / sample_rate
+            enroll_lccs_s = gate["enroll_lccs_s"]
+            _filter_ms = gate["filter_ms"]
+
+            if gate["tier"] == "full":
                 # === FULL tier ===
+                enroll_audio = gate["audio"]
                 try:
-                    embedding = speaker_recognition.extract_embedding(enroll_audio, sample_rate)
+                    embedding = embeddings.get(diar_label)
+                    if embedding is None:   # batch failed: embed this span alone
+                        embedding = speaker_recognition.extract_embedding(enroll_audio, sample_rate)
                     result = speaker_recognition.match_or_buffer(
                         embedding, enroll_audio, sample_rate, min_samples=MIN_ENROLL_SAMPLES
                     )
@@ -333,11 +551,10 @@ def process_video(video_path, max_duration, speaker_recognition, diarization):
                 if result["voice_id"]:
                     _get_color(result["voice_id"], voice_color_map, VOICE_COLORS)
 
-                _filter_ms = (time.perf_counter() - _t0) * 1000
                 logger.info(
                     f"  {DIM}{_ts()}{RESET}  {GREEN}    FULL {diar_label}{RESET}: "
                     f"raw={cluster_dur:.1f}s lccs@0.8={enroll_lccs_s:.1f}s "
-                    f"tot_clean={total_clean_strict_s:.1f}s (frag={frag_strict:.2f}) "
+                    f"tot_clean={gate['total_clean_strict_s']:.1f}s (frag={gate['frag_strict']:.2f}) "
                     f"filter={_filter_ms:.1f}ms → {BOLD}{voice_id}{RESET}  "
                     f"conf={confidence:.2f}  {DIM}{result['status']}{RESET}"
                 )
@@ -348,16 +565,10 @@ def process_video(video_path, max_duration, speaker_recognition, diarization):
                 continue
 
             # === Permissive pass: quick-match only (0.6) ===
-            quick_audio, quick_frames, total_clean_perm = sr_mod._lccs_from_timeline(
-                alone_timeline,
-                sr_mod.PER_FRAME_ALONE_THRESHOLD_QUICK,
-                cluster_audio, bytes_per_frame
-            )
-            quick_lccs_s = quick_frames / frame_rate_hz
+            quick_lccs_s = gate["quick_lccs_s"]
 
-            if quick_lccs_s < sr_mod.MIN_CLEAN_DURATION_QUICKMATCH:
+            if gate["tier"] == "skip":
                 # === SKIP tier ===
-                _filter_ms = (time.perf_counter() - _t0) * 1000
                 logger.info(
                     f"  {DIM}{_ts()}{RESET}  {DIM}    SKIP {diar_label}: "
                     f"raw={cluster_dur:.1f}s lccs@0.8={enroll_lccs_s:.1f}s "
@@ -369,7 +580,9 @@ def process_video(video_path, max_duration, speaker_recognition, diarization):
 
             # === QUICK-ONLY tier ===
             try:
-                embedding = speaker_recognition.extract_embedding(quick_audio, sample_rate)
+                embedding = embeddings.get(diar_label)
+                if embedding is None:   # batch failed: embed this span alone
+                    embedding = speaker_recognition.extract_embedding(gate["audio"], sample_rate)
                 matched_id, match_conf = speaker_recognition._match_voice(embedding)
             except Exception as e:
                 logger.error(f"  {DIM}{_ts()}{RESET}  {YELLOW}    QUICK {diar_label}: embed/match failed: {e}{RESET}")
@@ -377,7 +590,6 @@ def process_video(video_path, max_duration, speaker_recognition, diarization):
                     diar_timeline.append((seg_start, seg_end, diar_label, "?", win_idx + 1))
                 continue
 
-            _filter_ms = (time.perf_counter() - _t0) * 1000
             if matched_id is not None:
                 _get_color(matched_id, voice_color_map, VOICE_COLORS)
                 logger.info(
@@ -406,8 +618,28 @@ def process_video(video_path, max_duration, speaker_recognition, diarization):
 
     num_diar_speakers = len(diar_color_map)
     num_voices = len(voice_color_map)
+    num_windows = windows_seen
     logger.info(f"  {DIM}{_ts()}{RESET}  {GREEN}OK PIPELINE{RESET}    {num_diar_speakers} diar speakers, {num_voices} enrolled voices")
 
+    if ingest is not None:
+        yield "Waiting for upload to finish...", None
+        ingest.wait_upload()
+        logger.info(
+            f"  {DIM}{_ts()}{RESET}  {GREEN}OK UPLOAD{RESET}      "
+            f"{ingest.received_bytes / 1024 / 1024:.1f}MB, {audio.duration:.1f}s audio"
+            f"{' (demuxed after upload)' if ingest.fallback else ' (demuxed while uploading)'}"
+        )
+        working_video = _trim_video(video_path, max_duration)
+
+    # Open video
+    cap = cv2.VideoCapture(working_video)
+    video_fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    frame_w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    frame_h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+    logger.info(f"  {DIM}{_ts()}{RESET}  {GREEN}OK VIDEO{RESET}       {frame_w}x{frame_h} @ {video_fps:.0f}fps, {total_frames} frames")
+
     # ===================== ACTIVE SPEAKER DETECTION =====================
     # Run /workspace/asd_pipeline.py (S3FD detect + IOU track + Light-ASD score)
     # to get per-face bounding boxes + speaking flags. Aligned to native video fps.
@@ -484,13 +716,16 @@ def process_video(video_path, max_duration, speaker_recognition, diarization):
     #   2. Build per-frame lookup arrays voice_per_frame / diar_per_frame.
     #      Each frame index resolves to a tiny picklable tuple — no
     #      timeline scans inside the worker.
-    #   3. Split frames into N == cpu_count chunks. Each worker opens its
-    #      own VideoCapture, seeks to its start frame, annotates, writes
-    #      its own segment .mp4.
-    #   4. ffmpeg concat all segments + mux original audio in one call.
+    #   3. Render with RENDER_ENGINE:
+    #      "pipelined"  video_render.render_pipelined — decode once into a
+    #                   shared-memory ring, N annotators, one ffmpeg encoder
+    #                   that also muxes the audio.
+    #      "chunked"    _render_chunked — per-worker VideoCapture + seek,
+    #                   mp4v segments, ffmpeg concat + mux.
+    #      A pipelined failure falls back to chunked.
     cap.release()  # release main-thread capture before workers spawn
 
-    yield "Annotating (parallel) ...", None
+    yield f"Annotating ({RENDER_ENGINE}) ...", None
 
     # ---- 1. Pre-resolve colors for every voice/diar id we'll draw ----
     for _, _, vid, _, _ in voice_timeline:
@@ -521,59 +756,48 @@ def process_video(video_path, max_duration, speaker_recognition, diarization):
         for f in range(f0, f1):
             diar_per_frame[f].append(entry)
 
-    # ---- 3. Split into chunks and run pool ----
-    n_workers = max(1, mp.cpu_count())
-    if total_frames < n_workers:
-        n_workers = max(1, total_frames)
-    chunk_size = (total_frames + n_workers - 1) // n_workers
-
     # Summary banner for the first 60 seconds of the annotated video.
     # Mirrors the `OK PIPELINE` log line.
     summary_text = f"{num_voices} enrolled voices"
     SUMMARY_BANNER_DURATION_S = 60.0
     summary_until_frame = int(SUMMARY_BANNER_DURATION_S * video_fps)
 
-    chunk_paths = []
-    chunk_args = []
-    for w in range(n_workers):
-        f_start = w * chunk_size
-        f_end = min(f_start + chunk_size, total_frames)
-        if f_start >= f_end:
-            break
-        chunk_path = tempfile.NamedTemporaryFile(
-            delete=False, suffix=f"_chunk{w:02d}.mp4"
-        ).name
-        chunk_paths.append(chunk_path)
-        chunk_args.append((
-            working_video, f_start, f_end, video_fps, frame_w, frame_h,
-            voice_per_frame[f_start:f_end],
-            diar_per_frame[f_start:f_end],
-            face_per_frame[f_start:f_end],
-            num_diar_speakers,
-            summary_text,
-            summary_until_frame,
-            chunk_path,
-        ))
-
-    logger.info(
-        f"  {DIM}{_ts()}{RESET}  {CYAN}.. PARALLEL{RESET}    "
-        f"{total_frames} frames across {len(chunk_args)} workers "
-        f"(~{chunk_size} frames/worker)"
-    )
-
-    # Use spawn context to avoid potential cv2/fork interactions in a server.
-    ctx = mp.get_context("spawn")
-    with ctx.Pool(processes=len(chunk_args)) as pool:
-        results = pool.map(_annotate_chunk, chunk_args)
-
-    total_written = sum(n for _, n in results)
+    # ---- 3. Render ----
+    t_render = time.perf_counter()
+    final_output = None
+    if RENDER_ENGINE == "pipelined":
+        final_output = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4").name
+        try:
+            total_written, _ = render_pipelined(
+                working_video, final_output, total_frames, video_fps, frame_w, frame_h,
+                voice_per_frame, face_per_frame, summary_text, summary_until_frame,
+                codec=RENDER_CODEC, preset=RENDER_PRESET or None, audio_src=working_video,
+            )
+            engine = f"pipelined/{RENDER_CODEC}"
+        except Exception as e:
+            logger.warning(
+                f"  {DIM}{_ts()}{RESET}  {YELLOW}!! RENDER{RESET}      "
+                f"pipelined renderer failed: {e}  (falling back to chunked)"
+            )
+            if os.path.exists(final_output):
+                os.remove(final_output)
+            final_output = None
+    if final_output is None:
+        final_output, total_written = _render_chunked(
+            working_video, total_frames, video_fps, frame_w, frame_h,
+            voice_per_frame, diar_per_frame, face_per_frame,
+            num_diar_speakers, summary_text, summary_until_frame,
+        )
+        engine = "chunked/mp4v"
+    render_s = time.perf_counter() - t_render
     logger.info(
-        f"  {DIM}{_ts()}{RESET}  {GREEN}{BOLD}OK ANNOTATED{RESET}   "
-        f"{total_written} frames in {len(chunk_args)} chunks"
+        f"  {DIM}{_ts()}{RESET}  {GREEN}OK RENDER{RESET}      "
+        f"{total_written} frames in {render_s:.1f}s "
+        f"({total_written / max(render_s, 1e-9):.1f} fps, {engine})"
     )
 
     # *** A/V DESYNC GUARD ***
-    # If total_written != total_frames, the concatenated video will have a
+    # If total_written != total_frames, the rendered video will have a
     # different duration than the source audio, and ffmpeg's -shortest flag
     # will clip whichever stream ends first. Warn loudly so the operator
     # knows the annotation pipeline dropped/duplicated frames.
@@ -586,64 +810,6 @@ def process_video(video_path, max_duration, speaker_recognition, diarization):
             f"delta={delta:+d} frames ({drift_s:+.2f}s). "
             f"A/V desync may be visible in the final muxed video."
         )
-        # Per-chunk breakdown for debugging
-        for idx, (path, nw) in enumerate(results):
-            expected_n = chunk_args[idx][2] - chunk_args[idx][1]  # end - start
-            if nw != expected_n:
-                logger.warning(
-                    f"  {DIM}{_ts()}{RESET}  {YELLOW}   chunk {idx}{RESET}: "
-                    f"wrote {nw}/{expected_n} frames "
-                    f"(range [{chunk_args[idx][1]}, {chunk_args[idx][2]}))"
-                )
-
-    # ---- 4. ffmpeg concat segments + mux original audio in one call ----
-    concat_list_file = tempfile.NamedTemporaryFile(
-        delete=False, suffix=".txt", mode="w"
-    )
-    for cp in chunk_paths:
-        concat_list_file.write(f"file '{cp}'\n")
-    concat_list_file.close()
-
-    final_output = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4").name
-    try:
-        subprocess.run([
-            "ffmpeg", "-y",
-            "-f", "concat", "-safe", "0", "-i", concat_list_file.name,
-            "-i", working_video,
-            "-c:v", "copy",
-            "-map", "0:v:0", "-map", "1:a:0",
-            "-shortest", final_output
-        ], capture_output=True, check=True)
-        logger.info(
-            f"  {DIM}{_ts()}{RESET}  {GREEN}OK MUX{RESET}         "
-            f"Concatenated {len(chunk_paths)} chunks + audio"
-        )
-    except subprocess.CalledProcessError as e:
-        logger.warning(
-            f"  {DIM}{_ts()}{RESET}  {YELLOW}!! MUX{RESET}         "
-            f"{e.stderr.decode(errors='replace')[-200:] if e.stderr else e}"
-        )
-        # Fallback: try concat without mux (audio missing) so user still
-        # gets a video back rather than nothing.
-        try:
-            subprocess.run([
-                "ffmpeg", "-y",
-                "-f", "concat", "-safe", "0", "-i", concat_list_file.name,
-                "-c", "copy", final_output
-            ], capture_output=True, check=True)
-        except Exception:
-            final_output = chunk_paths[0] if chunk_paths else None
-
-    # Cleanup chunks + concat list
-    for cp in chunk_paths:
-        try:
-            os.remove(cp)
-        except OSError:
-            pass
-    try:
-        os.remove(concat_list_file.name)
-    except OSError:
-        pass
 
     if working_video != video_path and os.path.exists(working_video):
         os.remove(working_video)
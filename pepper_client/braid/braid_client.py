@@ -1,5 +1,9 @@
 """BRAID client — 30s capture → RunTick → execute action → repeat.
 
+With ``--pipelined`` the three stages overlap instead: a capture thread
+records tick N+1 while the server computes tick N, and actions are applied
+as results arrive (see ``BraidClient.run_pipelined``).
+
 Invocation (on the robot's host machine, NOT this dev env):
 
     python -m pepper_client.braid.braid_client \
@@ -16,13 +20,15 @@ from __future__ import annotations
 import argparse
 import logging
 import math
+import queue
+import statistics
 import sys
+import threading
 import time
 import uuid
-from typing import Iterator
+from typing import Iterator, List, Tuple
 
 import grpc
-import qi  # type: ignore
 
 # Repo layout: we import the generated protobuf from the /workspace
 # grpc_communication package.
@@ -58,18 +64,18 @@ def _chunk_iter(bundle: ClientBundle) -> Iterator[pb2.BraidTickChunk]:
         meta=meta,
     )
 
-    # 2) audio
-    buf = bundle.audio_pcm
+    # 2) audio — slice through a memoryview so the only copy per chunk is the
+    # one protobuf makes when the field is set (it rejects memoryview itself).
+    buf = memoryview(bundle.audio_pcm)
+    bytes_per_sec = 2.0 * bundle.audio_sample_rate * max(1, bundle.audio_channels)
     for i in range(0, len(buf), AUDIO_CHUNK_BYTES):
-        piece = buf[i:i + AUDIO_CHUNK_BYTES]
         yield pb2.BraidTickChunk(
             tick_id=bundle.tick_id,
             session_id=bundle.session_id,
             robot_heading_rad=float(bundle.robot_heading_rad),
             audio_chunk=pb2.BraidAudioChunk(
-                pcm=piece,
-                ts=float(bundle.window_start_ts + i / (2.0 * bundle.audio_sample_rate
-                                                        * max(1, bundle.audio_channels))),
+                pcm=buf[i:i + AUDIO_CHUNK_BYTES].tobytes(),
+                ts=float(bundle.window_start_ts + i / bytes_per_sec),
                 channels=int(bundle.audio_channels),
                 sample_rate=int(bundle.audio_sample_rate),
             ),
@@ -99,6 +105,38 @@ def _chunk_iter(bundle: ClientBundle) -> Iterator[pb2.BraidTickChunk]:
         )
 
 
+# -------- heading compensation -----------------------------------------------
+
+ROTATE_EPS_RAD = math.radians(3.0)   # residual below this → STAY
+
+
+def _wrap(angle: float) -> float:
+    return (angle + math.pi) % (2.0 * math.pi) - math.pi
+
+
+def _compensate_rotation(action, captured_heading: float,
+                         current_heading: float):
+    """Re-express a rotation decided on a bundle captured at
+    ``captured_heading`` relative to where the robot faces now. The server's
+    target is ``captured_heading ± magnitude``; any rotation applied since the
+    capture is subtracted so the robot doesn't overshoot."""
+    name = pb2.ActionType.Name(action.type)
+    if name not in ("ROTATE_LEFT", "ROTATE_RIGHT"):
+        return action
+    sign = 1.0 if name == "ROTATE_LEFT" else -1.0
+    residual = _wrap(captured_heading + sign * float(action.magnitude) - current_heading)
+    out = pb2.BraidAction()
+    out.CopyFrom(action)
+    if abs(residual) < ROTATE_EPS_RAD:
+        out.type = pb2.ActionType.STAY
+        out.magnitude = 0.0
+        out.reason = f"{action.reason} (already at target after heading compensation)"
+    else:
+        out.type = pb2.ActionType.ROTATE_LEFT if residual > 0 else pb2.ActionType.ROTATE_RIGHT
+        out.magnitude = abs(residual)
+    return out
+
+
 # -------- main loop ----------------------------------------------------------
 
 class BraidClient:
@@ -127,9 +165,16 @@ class BraidClient:
         )
         t0 = time.time()
         result = self.stub.RunTick(_chunk_iter(bundle))
+        self._log_result(result, time.time() - t0)
+        # Execute action.
+        new_heading = self.action.execute(result.action)
+        self.heading = new_heading
+        return result
+
+    def _log_result(self, result, rpc_seconds: float):
         logger.info("[client] server returned %d persons, action=%s, wall=%.2fs",
                     len(result.persons), pb2.ActionType.Name(result.action.type),
-                    time.time() - t0)
+                    rpc_seconds)
         for pd in result.persons:
             logger.info(
                 "  person=%s state=%s p_best=%.2f p_unk=%.2f margin=%.2f "
@@ -139,10 +184,139 @@ class BraidClient:
                 pd.identity or "-", pd.modality_agreement, pd.face_quality,
                 pd.reason,
             )
-        # Execute action.
-        new_heading = self.action.execute(result.action)
-        self.heading = new_heading
-        return result
+
+    # ---------- pipelined mode ----------
+
+    def _capture_loop(self, bundles: "queue.Queue", stop: threading.Event,
+                      num_ticks: int, capture_spans: List[Tuple[float, float]]):
+        """Back-to-back captures. Each bundle carries the odometry heading at
+        its own start, so the server's temporal compensation stays correct
+        even while an action is rotating the robot."""
+        i = 0
+        try:
+            while not stop.is_set() and (not num_ticks or i < num_ticks):
+                i += 1
+                t0 = time.time()
+                bundle = self.capture.run(
+                    tick_id=i, session_id=self.session_id,
+                    duration_seconds=self.tick_seconds,
+                    robot_heading_rad=self.action._current_heading(),
+                )
+                capture_spans.append((t0, time.time()))
+                # Blocks when the sender is behind: bounded in-flight work.
+                while not stop.is_set():
+                    try:
+                        bundles.put(bundle, timeout=0.5)
+                        break
+                    except queue.Full:
+                        continue
+        except Exception as e:
+            logger.exception("[client] capture loop failed: %s", e)
+        finally:
+            bundles.put(None)
+
+    def _send_loop(self, bundles: "queue.Queue", results: "queue.Queue",
+                   stop: threading.Event, max_in_flight: int):
+        """Issue RunTick futures, at most ``max_in_flight`` outstanding, and
+        pass them to the consumer in send order."""
+        slots = threading.BoundedSemaphore(max_in_flight)
+        try:
+            while True:
+                bundle = bundles.get()
+                if bundle is None:
+                    break
+                slots.acquire()
+                if stop.is_set():
+                    slots.release()
+                    break
+                t_send = time.time()
+                try:
+                    fut = self.stub.RunTick.future(_chunk_iter(bundle))
+                except Exception as e:
+                    slots.release()
+                    logger.error("[client] tick %d RunTick could not be sent: %s",
+                                 bundle.tick_id, e)
+                    continue
+
+                fut.add_done_callback(lambda _f: slots.release())
+                # Handed over in send order; the consumer waits on each.
+                results.put((bundle, fut, t_send))
+        finally:
+            results.put(None)
+
+    def run_pipelined(self, num_ticks: int = 0, max_queued: int = 1,
+                      max_in_flight: int = 1):
+        """Capture, RunTick and action execution on separate threads.
+
+        ``max_queued`` captured bundles may wait for the sender and
+        ``max_in_flight`` RunTick calls may be outstanding. Keep
+        ``max_in_flight`` at 1 unless the server serialises ticks per session,
+        since ticks of one session share temporal state.
+
+        Reports the coverage duty cycle (fraction of wall time with sensors
+        recording) and end-to-end action latency (end of the capture window
+        → action applied).
+        """
+        bundles: "queue.Queue" = queue.Queue(maxsize=max(1, max_queued))
+        results: "queue.Queue" = queue.Queue()
+        stop = threading.Event()
+        capture_spans: List[Tuple[float, float]] = []
+        latencies: List[float] = []
+
+        t_start = time.time()
+        thr_cap = threading.Thread(target=self._capture_loop, name="braid-capture",
+                                   args=(bundles, stop, num_ticks, capture_spans),
+                                   daemon=True)
+        thr_send = threading.Thread(target=self._send_loop, name="braid-send",
+                                    args=(bundles, results, stop, max(1, max_in_flight)),
+                                    daemon=True)
+        thr_cap.start(); thr_send.start()
+        try:
+            while True:
+                item = results.get()
+                if item is None:
+                    break
+                bundle, fut, t_send = item
+                try:
+                    result = fut.result()
+                except Exception as e:
+                    logger.error("[client] tick %d RunTick failed: %s", bundle.tick_id, e)
+                    continue
+                logger.info("[client] ===== tick %d result (captured heading=%.2frad) =====",
+                            bundle.tick_id, bundle.robot_heading_rad)
+                self._log_result(result, time.time() - t_send)
+                now_heading = self.action._current_heading()
+                action = _compensate_rotation(result.action, bundle.robot_heading_rad,
+                                              now_heading)
+                if action.type != result.action.type or action.magnitude != result.action.magnitude:
+                    logger.info("[client] heading compensation: %s %.2frad → %s %.2frad "
+                                "(moved %.2frad since capture)",
+                                pb2.ActionType.Name(result.action.type), result.action.magnitude,
+                                pb2.ActionType.Name(action.type), action.magnitude,
+                                _wrap(now_heading - bundle.robot_heading_rad))
+                self.heading = self.action.execute(action)
+                capture_end = bundle.window_start_ts + self.tick_seconds
+                latencies.append(time.time() - capture_end)
+                wall = time.time() - t_start
+                covered = sum(b - a for a, b in capture_spans)
+                logger.info("[client] tick %d action latency=%.2fs duty_cycle=%.0f%%",
+                            bundle.tick_id, latencies[-1], 100.0 * covered / max(1e-6, wall))
+        except KeyboardInterrupt:
+            logger.info("[client] interrupted")
+        finally:
+            stop.set()
+            thr_cap.join(timeout=self.tick_seconds + 5.0)
+            thr_send.join(timeout=5.0)
+
+        wall = time.time() - t_start
+        covered = sum(b - a for a, b in capture_spans)
+        duty = covered / max(1e-6, wall)
+        if latencies:
+            logger.info("[client] pipelined run: ticks=%d wall=%.1fs duty_cycle=%.0f%% "
+                        "action latency p50=%.2fs max=%.2fs",
+                        len(latencies), wall, 100.0 * duty,
+                        statistics.median(latencies), max(latencies))
+        return {"duty_cycle": duty, "latencies": latencies, "wall_seconds": wall}
 
     def run_forever(self, num_ticks: int = 0):
         i = 0
@@ -181,6 +355,13 @@ def _parse_args():
                    help="Local TCP port for qi session.listen.")
     p.add_argument("--num-ticks", type=int, default=0,
                    help="0 = run forever.")
+    p.add_argument("--pipelined", action="store_true",
+                   help="Capture the next tick while the server processes "
+                        "the current one.")
+    p.add_argument("--max-queued", type=int, default=1,
+                   help="Pipelined: captured bundles allowed to wait for upload.")
+    p.add_argument("--max-in-flight", type=int, default=1,
+                   help="Pipelined: concurrent RunTick calls.")
     p.add_argument("--log-level", type=str, default="INFO")
     return p.parse_args()
 
@@ -193,6 +374,9 @@ def main():
     )
     session_id = args.session_id or f"braid_{uuid.uuid4().hex[:8]}"
 
+    # Imported here so the chunker / client can be used off-robot (benchmarks).
+    import qi  # type: ignore
+
     url = f"tcp://{args.robot_ip}:{args.robot_port}"
     app = qi.Application(["BraidClient", f"--qi-url={url}"])
     app.start()
@@ -205,7 +389,12 @@ def main():
                          listen_port=int(args.listen_port))
     logger.info("BRAID client connected to server=%s robot=%s session=%s",
                 args.server, url, session_id)
-    client.run_forever(num_ticks=args.num_ticks)
+    if args.pipelined:
+        client.run_pipelined(num_ticks=args.num_ticks,
+                             max_queued=args.max_queued,
+                             max_in_flight=args.max_in_flight)
+    else:
+        client.run_forever(num_ticks=args.num_ticks)
 
 
 if __name__ == "__main__":
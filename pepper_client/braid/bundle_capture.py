@@ -36,7 +36,7 @@ class ClientBundle:
     session_id: str
     window_start_ts: float
     robot_heading_rad: float
-    audio_pcm: bytes
+    audio_pcm: bytes | bytearray
     audio_sample_rate: int
     audio_channels: int
     # frames: list of (ts, jpeg_bytes, width, height)
@@ -83,9 +83,10 @@ class BraidAudioCapture(object):
         except Exception as e:
             logger.warning("[capture] audio unsubscribe failed: %s", e)
 
-    def drain(self) -> bytes:
+    def drain(self) -> bytearray:
+        """Hand over the accumulated buffer (no copy) and start a fresh one."""
         with self._lock:
-            data = bytes(self._buf)
+            data = self._buf
             self._buf = bytearray()
         return data
 
@@ -94,7 +95,7 @@ class BraidAudioCapture(object):
         if not self._active:
             return
         with self._lock:
-            self._buf.extend(bytes(inputBuffer))
+            self._buf.extend(inputBuffer)
 
 
 class BundleCapture:
@@ -261,7 +262,7 @@ class BundleCapture:
             thr_cam.join(timeout=2.0)
             thr_ssl.join(timeout=2.0)
 
-            # Stop audio and drain. stop() unsubscribes; drain() returns bytes.
+            # Stop audio and drain. stop() unsubscribes; drain() hands over the buffer.
             self._audio_collector.stop()
             audio_pcm = self._audio_collector.drain()
 
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Batched Light-ASD scoring parity: asd_batch.score_tracks vs reference_scores
+
+Builds a random-weight model with Light-ASD's interface (audio frontend at
+4x the video rate, per-frame visual frontend, GRU backend, lossAV returning
+the speaking score per frame) and synthetic tracks: some share one window's
+audio as prefixes (the BRAID case), some have their own. Fails if
+max_parity_error exceeds --tol.
+
+Usage:
+    python test/braid/asd_batch_parity.py [--tracks 6] [--seconds 7] [--tol 1e-5]
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "tools"))
+import _bootstrap  # noqa: F401,E402
+
+import numpy as np  # noqa: E402
+import torch  # noqa: E402
+from torch import nn  # noqa: E402
+
+from core_api.braid.asd_batch import (  # noqa: E402
+    AUDIO_FPS, ASDTrackInput, max_parity_error,
+)
+
+VIDEO_FPS = 25
+DIM = 32
+
+
+class _ASDNet(nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.audio = nn.Conv1d(13, DIM, kernel_size=4, stride=4)
+        self.visual = nn.Linear(14 * 14, DIM)
+        self.gru = nn.GRU(2 * DIM, DIM, batch_first=True)
+
+    def forward_audio_frontend(self, x):          # (B, 4T, 13) -> (B, T, D)
+        return self.audio(x.transpose(1, 2)).transpose(1, 2)
+
+    def forward_visual_frontend(self, x):         # (B, T, 112, 112) -> (B, T, D)
+        b, t = x.shape[:2]
+        x = nn.functional.avg_pool2d(x.reshape(b * t, 1, 112, 112) / 255.0, 8)
+        return torch.tanh(self.visual(x.reshape(b, t, -1)))
+
+    def forward_audio_visual_backend(self, a, v):  # -> (B*T, D)
+        out, _ = self.gru(torch.cat([a, v], dim=2))
+        return out.reshape(-1, DIM)
+
+
+class _LossAV(nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.fc = nn.Linear(DIM, 2)
+
+    def forward(self, x, labels=None):
+        return torch.softmax(self.fc(x), dim=-1)[:, 1].detach().cpu().numpy()
+
+
+class _ASD(nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.model = _ASDNet()
+        self.lossAV = _LossAV()
+
+
+def _tracks(n_tracks, seconds, rng):
+    window_audio = rng.normal(size=(int(seconds * AUDIO_FPS), 13)).astype(np.float32)
+    items = []
+    for t in range(n_tracks):
+        # Lengths on the 40 ms grid asd_pipeline/perception align to.
+        length = round(float(rng.uniform(0.5, seconds)) / 0.04) * 0.04
+        n_a, n_v = int(round(length * AUDIO_FPS)), int(round(length * VIDEO_FPS))
+        video = rng.integers(0, 256, (n_v, 112, 112)).astype(np.float32)
+        if t % 2 == 0:
+            items.append(ASDTrackInput(window_audio[:n_a], video, length, VIDEO_FPS,
+                                       audio_key="window"))
+        else:
+            audio = rng.normal(size=(n_a, 13)).astype(np.float32)
+            items.append(ASDTrackInput(audio, video, length, VIDEO_FPS))
+    return items
+
+
+def main():
+    p = argparse.ArgumentParser(description="Batched Light-ASD scoring parity")
+    p.add_argument("--tracks", type=int, default=6)
+    p.add_argument("--seconds", type=float, default=7.0)
+    p.add_argument("--tol", type=float, default=1e-5)
+    p.add_argument("--seed", type=int, default=0)
+    args = p.parse_args()
+
+    torch.manual_seed(args.seed)
+    model = _ASD().eval()
+    items = _tracks(args.tracks, args.seconds, np.random.default_rng(args.seed))
+    err = max_parity_error(model, items, torch.device("cpu"))
+    ok = err <= args.tol
+    print(f"tracks={len(items)} max |batched - reference| = {err:.3g} "
+          f"(tol {args.tol:g}) {'PASS' if ok else 'FAIL'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+BRAID per-tick allocation bound and payload release
+
+Builds synthetic TickBundles (BGR frames + interleaved int16 PCM), runs
+run_tick with the replay StubPerceptionEngine under tracemalloc, and fails if
+any tick's heap peak above the pre-tick baseline (bundle already built)
+exceeds --max-tick-alloc-mb, or if run_tick returns with bundle.frames /
+bundle.audio_pcm still populated (TickBundle.release_payloads not reached).
+
+Usage:
+    python test/braid/tick_alloc_check.py [--ticks 3] [--seconds 10] [--frames 30]
+                                          [--max-tick-alloc-mb 64]
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "tools"))
+import _bootstrap  # noqa: F401,E402
+
+import numpy as np  # noqa: E402
+
+from core_api.braid.config import load_config  # noqa: E402
+from core_api.braid.gallery import BraidGallery  # noqa: E402
+from core_api.braid.perception import TickBundle  # noqa: E402
+from core_api.braid.replay import StubPerceptionEngine  # noqa: E402
+from core_api.braid.temporal import SessionState  # noqa: E402
+from core_api.braid.tick import run_tick  # noqa: E402
+
+
+def _synthetic_bundle(tick_id, seconds, n_frames, sr=16000, ch=4, w=640, h=480):
+    rng = np.random.default_rng(tick_id)
+    pcm = rng.integers(-2000, 2000, size=int(seconds * sr) * ch, dtype=np.int16)
+    t0 = 1000.0 + tick_id * seconds
+    frames = []
+    for i in range(n_frames):
+        img = np.full((h, w, 3), 96, dtype=np.uint8)
+        x = 200 + 4 * i
+        img[150:300, x:x + 120] = rng.integers(0, 256, (150, 120, 3), dtype=np.uint8)
+        frames.append((t0 + i * seconds / n_frames, img))
+    ssl = [(t0 + i * 0.1, 0.2, 0.5) for i in range(int(seconds * 10))]
+    return TickBundle(tick_id=tick_id, session_id="alloc", window_start_ts=t0,
+                      robot_heading_rad=0.0, audio_pcm=bytearray(pcm.tobytes()),
+                      audio_sample_rate=sr, audio_channels=ch,
+                      frames=frames, ssl_events=ssl)
+
+
+def main():
+    p = argparse.ArgumentParser(description="BRAID per-tick allocation bound")
+    p.add_argument("--ticks", type=int, default=3)
+    p.add_argument("--seconds", type=float, default=10.0, help="audio seconds per tick")
+    p.add_argument("--frames", type=int, default=30, help="640x480 frames per tick")
+    p.add_argument("--max-tick-alloc-mb", type=float, default=64.0)
+    args = p.parse_args()
+
+    cfg = load_config()
+    engine = StubPerceptionEngine(cfg)
+    gallery_dir = tempfile.mkdtemp(prefix="braid_alloc_gallery_")
+    session = SessionState(session_id="alloc")
+    failed = False
+    try:
+        gallery = BraidGallery(gallery_dir)
+        tracemalloc.start()
+        for tick_id in range(1, args.ticks + 1):
+            bundle = _synthetic_bundle(tick_id, args.seconds, args.frames)
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            run_tick(bundle, engine, gallery, session, cfg)
+            peak_mb = (tracemalloc.get_traced_memory()[1] - before) / 1e6
+            released = not bundle.frames and len(bundle.audio_pcm) == 0
+            ok = peak_mb <= args.max_tick_alloc_mb and released
+            failed |= not ok
+            print(f"tick {tick_id}: alloc_peak={peak_mb:.2f}MB "
+                  f"(bound {args.max_tick_alloc_mb:g}MB) payloads_released={released}  "
+                  f"{'OK' if ok else 'FAIL'}")
+            del bundle
+    finally:
+        tracemalloc.stop()
+        shutil.rmtree(gallery_dir, ignore_errors=True)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    sys.exit(main())
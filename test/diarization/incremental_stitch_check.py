@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+IncrementalDiarizer._stitch on synthetic posteriors
+
+Builds per-chunk local-speaker activity and embeddings for known speakers,
+numbers the clusters differently on every "push" (as a re-clustering does),
+and checks the stitched global ids:
+
+  first push     one id per speaker, bank counts one entry per chunk speaker
+  must-link      chunks labelled by the previous push carry their ids onto
+                 the renumbered clusters and the new chunks
+  cannot-link    two clusters voting for one id: the larger keeps it, the
+                 other falls back to the centroid bank
+  bank / new id  without votes, a returning voice re-uses its id and an
+                 unseen voice opens a new one
+
+No models are loaded. Exits non-zero on any failed check.
+
+Usage:
+    python test/diarization/incremental_stitch_check.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "tools"))
+import _bootstrap  # noqa: E402
+
+# Skip core_api/diarization/__init__.py (it imports the DiariZen pipeline).
+_bootstrap.skip_package_init(
+    "core_api.diarization", os.path.join(_bootstrap.GINNY_DIR, "core_api", "diarization"))
+
+import numpy as np  # noqa: E402
+
+from core_api.diarization.incremental import IncrementalDiarizer  # noqa: E402
+
+A, B, C = 0, 1, 2
+LOCAL = 3        # local speakers per chunk
+FRAMES = 20      # frames per chunk
+DIM = 8
+RNG = np.random.default_rng(0)
+VOICES = np.eye(DIM)[:3]
+
+
+def _diarizer(bank_threshold=0.6):
+    d = IncrementalDiarizer.__new__(IncrementalDiarizer)
+    d.bank_threshold = bank_threshold
+    d._bank = {}
+    d._next_label = 0
+    return d
+
+
+def _context(chunks):
+    """``chunks``: per chunk ``{local_speaker: (speaker, active_frames)}``.
+    Returns (frames, embeddings, valid, true speaker per (chunk, local))."""
+    binarized = np.zeros((len(chunks), FRAMES, LOCAL), dtype=np.float32)
+    embeddings = np.full((len(chunks), LOCAL, DIM), np.nan, dtype=np.float32)
+    true = np.full((len(chunks), LOCAL), -1, dtype=np.int64)
+    for i, chunk in enumerate(chunks):
+        for s, (spk, n) in chunk.items():
+            binarized[i, :n, s] = 1.0
+            embeddings[i, s] = VOICES[spk] + 0.05 * RNG.normal(size=DIM)
+            true[i, s] = spk
+    frames = binarized.sum(axis=1)
+    valid = (frames > 0) & ~np.isnan(embeddings).any(axis=-1)
+    return frames, embeddings, valid, true
+
+
+def _cluster(true, perm):
+    """What a clustering run returns: its own cluster numbering, -2 inactive."""
+    hard = np.full(true.shape, -2, dtype=np.int64)
+    for spk, c in perm.items():
+        hard[true == spk] = c
+    return hard
+
+
+def _ids(global_clusters, true, spk):
+    return set(global_clusters[true == spk].tolist())
+
+
+def main():
+    results = []
+
+    def check(name, ok):
+        results.append(ok)
+        print(f"{'OK  ' if ok else 'FAIL'} {name}")
+
+    d = _diarizer()
+
+    # 1. First push: no anchors, clusters numbered B=0, A=1.
+    chunks1 = [{0: (A, 20), 1: (B, 12)}, {0: (B, 20)}, {0: (A, 8), 1: (B, 15)}]
+    frames, emb, valid, true = _context(chunks1)
+    anchors = np.full(true.shape, -1, dtype=np.int64)
+    g1 = d._stitch(_cluster(true, {B: 0, A: 1}), anchors, frames, emb, valid)
+    ids_a, ids_b = _ids(g1, true, A), _ids(g1, true, B)
+    check("first push: one id per speaker", len(ids_a) == 1 and len(ids_b) == 1 and ids_a != ids_b)
+    check("first push: inactive slots stay -2", bool(np.all(g1[true < 0] == -2)))
+    g_a, g_b = ids_a.pop(), ids_b.pop()
+    check("first push: bank counts", d._bank[g_a][1] == 2 and d._bank[g_b][1] == 3)
+
+    # 2. Must-link: chunks 1-2 keep push 1's labels, clusters renumbered A=0, B=1.
+    chunks2 = chunks1[1:] + [{0: (A, 20)}, {0: (A, 10), 1: (B, 10)}]
+    frames, emb, valid, true = _context(chunks2)
+    anchors = np.concatenate([g1[1:], np.full((2, LOCAL), -1, dtype=np.int64)])
+    g2 = d._stitch(_cluster(true, {A: 0, B: 1}), anchors, frames, emb, valid)
+    check("must-link: ids carried across renumbering",
+          _ids(g2, true, A) == {g_a} and _ids(g2, true, B) == {g_b})
+    check("must-link: labelled chunks not re-counted in the bank",
+          d._bank[g_a][1] == 4 and d._bank[g_b][1] == 4 and d._next_label == 2)
+
+    # 3. Cannot-link: a mislabelled B slot makes both clusters vote for A's id.
+    chunks3 = [{0: (A, 20), 1: (B, 5)}, {0: (B, 20)}, {0: (A, 20)}]
+    frames, emb, valid, true = _context(chunks3)
+    anchors = np.full(true.shape, -1, dtype=np.int64)
+    anchors[0] = [g_a, g_a, -2]
+    g3 = d._stitch(_cluster(true, {A: 0, B: 1}), anchors, frames, emb, valid)
+    check("cannot-link: larger vote keeps the id", _ids(g3, true, A) == {g_a})
+    check("cannot-link: the other cluster falls back to the bank", _ids(g3, true, B) == {g_b})
+
+    # 4. No votes: A returns after its labelled chunks were trimmed, C is new.
+    chunks4 = [{0: (C, 20), 1: (A, 20)}, {0: (C, 10)}]
+    frames, emb, valid, true = _context(chunks4)
+    anchors = np.full(true.shape, -1, dtype=np.int64)
+    g4 = d._stitch(_cluster(true, {C: 0, A: 1}), anchors, frames, emb, valid)
+    ids_c = _ids(g4, true, C)
+    check("bank: returning voice re-uses its id", _ids(g4, true, A) == {g_a})
+    check("bank: unseen voice opens a new id",
+          len(ids_c) == 1 and not ids_c & {g_a, g_b} and d._next_label == 3)
+
+    failed = results.count(False)
+    print(f"{len(results) - failed}/{len(results)} checks passed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Masked ERes2NetV2 batch forward vs one-clip-at-a-time extraction
+
+_SpeakerRecognition._extract_batch_eres2netv2 re-implements the ModelScope
+forward for zero-padded batches: a pre-hook masks every Conv2d input past each
+clip's length and the TSTP statistics only cover valid frames. This builds a
+random-weight backbone with the attributes that path uses (conv1/bn1,
+layer1-4 with stride-2 convs, layer3_ds, fuse34, seg_1) behind a wrapper that
+does what ModelScope's does for one clip (fbank + CMN + backbone), then
+compares extract_embeddings_batch with extract_embedding per clip, both at
+the default pad ratio and with every clip padded into one batch. Fails if any
+cosine is below --min-cos.
+
+Usage:
+    python test/speaker_recognition/batch_embedding_parity.py [--clips 8] [--min-cos 0.9999]
+"""
+
+import argparse
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "tools"))
+import _bootstrap  # noqa: F401,E402
+
+import numpy as np  # noqa: E402
+import torch  # noqa: E402
+import torchaudio.compliance.kaldi as Kaldi  # noqa: E402
+from torch import nn  # noqa: E402
+
+from core_api.speaker_recognition.speaker_recognition import _SpeakerRecognition  # noqa: E402
+
+FEAT_DIM = 80
+CHANNELS = 4
+EMB_DIM = 64
+
+
+class _Block(nn.Module):
+    def __init__(self, cin, cout, stride):
+        super().__init__()
+        self.conv1 = nn.Conv2d(cin, cout, 3, stride=stride, padding=1, bias=False)
+        self.bn1 = nn.BatchNorm2d(cout)
+        self.conv2 = nn.Conv2d(cout, cout, 3, stride=1, padding=1, bias=False)
+        self.bn2 = nn.BatchNorm2d(cout)
+        self.shortcut = nn.Identity()
+        if stride != 1 or cin != cout:
+            self.shortcut = nn.Sequential(
+                nn.Conv2d(cin, cout, 1, stride=stride, bias=False), nn.BatchNorm2d(cout))
+
+    def forward(self, x):
+        out = torch.relu(self.bn1(self.conv1(x)))
+        return torch.relu(self.bn2(self.conv2(out)) + self.shortcut(x))
+
+
+class _AFF(nn.Module):
+    """ERes2NetV2's attentional feature fusion (pointwise in time)."""
+
+    def __init__(self, channels):
+        super().__init__()
+        self.local_att = nn.Sequential(
+            nn.Conv2d(2 * channels, channels // 2, 1), nn.BatchNorm2d(channels // 2), nn.SiLU(),
+            nn.Conv2d(channels // 2, channels, 1), nn.BatchNorm2d(channels))
+
+    def forward(self, x, ds_y):
+        att = 1.0 + torch.tanh(self.local_att(torch.cat((x, ds_y), dim=1)))
+        return x * att + ds_y * (2.0 - att)
+
+
+class _Backbone(nn.Module):
+    def __init__(self, c=CHANNELS):
+        super().__init__()
+        self.conv1 = nn.Conv2d(1, c, 3, stride=1, padding=1, bias=False)
+        self.bn1 = nn.BatchNorm2d(c)
+        self.layer1 = _Block(c, c, 1)
+        self.layer2 = _Block(c, 2 * c, 2)
+        self.layer3 = _Block(2 * c, 4 * c, 2)
+        self.layer4 = _Block(4 * c, 8 * c, 2)
+        self.layer3_ds = nn.Conv2d(4 * c, 8 * c, 3, stride=2, padding=1, bias=False)
+        self.fuse34 = _AFF(8 * c)
+        self.seg_1 = nn.Linear(8 * c * (FEAT_DIM // 8) * 2, EMB_DIM)
+        self.two_emb_layer = False
+
+    def forward(self, x):                                  # (B, T, F)
+        out = x.permute(0, 2, 1).unsqueeze(1)
+        out = torch.relu(self.bn1(self.conv1(out)))
+        out3 = self.layer3(self.layer2(self.layer1(out)))
+        fused = self.fuse34(self.layer4(out3), self.layer3_ds(out3))
+        stats = torch.cat((fused.mean(dim=-1).flatten(1),
+                           torch.sqrt(torch.var(fused, dim=-1) + 1e-8).flatten(1)), dim=1)
+        return self.seg_1(stats)
+
+
+class _Wrapper(nn.Module):
+    """What ModelScope's ERes2NetV2 wrapper does for one clip."""
+
+    def __init__(self):
+        super().__init__()
+        self.embedding_model = _Backbone()
+        self.feature_dim = FEAT_DIM
+
+    def forward(self, audio):
+        f = Kaldi.fbank(audio.reshape(1, -1).float(), num_mel_bins=self.feature_dim)
+        f = f - f.mean(dim=0, keepdim=True)
+        return self.embedding_model(f.unsqueeze(0)).detach()
+
+
+def _randomise(model, gen):
+    with torch.no_grad():
+        for m in model.modules():
+            if isinstance(m, nn.BatchNorm2d):
+                m.running_mean.normal_(0.0, 0.1, generator=gen)
+                m.running_var.uniform_(0.5, 1.5, generator=gen)
+                m.weight.normal_(1.0, 0.1, generator=gen)
+                m.bias.normal_(0.0, 0.1, generator=gen)
+    return model.eval()
+
+
+def _recognizer():
+    """_SpeakerRecognition around the random-weight model, without loading
+    a checkpoint or opening the voice DB."""
+    rec = _SpeakerRecognition.__new__(_SpeakerRecognition)
+    rec.model_name = "eres2netv2"
+    rec.device = "cpu"
+    rec.emb_dim = EMB_DIM
+    rec._batch_masked = True
+    rec._lock = threading.Lock()
+    rec._display_name = "ERes2NetV2 (random weights)"
+    rec.model = _randomise(_Wrapper(), torch.Generator().manual_seed(0))
+    return rec
+
+
+def _cosines(a, b):
+    return [float(np.dot(x, y) / (np.linalg.norm(x) * np.linalg.norm(y) + 1e-12))
+            for x, y in zip(a, b)]
+
+
+def main():
+    p = argparse.ArgumentParser(description="Masked ERes2NetV2 batch parity")
+    p.add_argument("--clips", type=int, default=8)
+    p.add_argument("--min-cos", type=float, default=0.9999)
+    p.add_argument("--seed", type=int, default=0)
+    args = p.parse_args()
+
+    torch.manual_seed(args.seed)
+    rec = _recognizer()
+    rng = np.random.default_rng(args.seed)
+    # 0.6-3 s clips: lengths that are not multiples of the 8x time downsampling.
+    clips = [rng.integers(-8000, 8000, int(rng.uniform(0.6, 3.0) * 16000), dtype=np.int16)
+             for _ in range(args.clips)]
+
+    single = [rec.extract_embedding(c) for c in clips]
+    failed = False
+    for label, pad_ratio in (("default buckets", None), ("one padded batch", 10.0)):
+        batch = rec.extract_embeddings_batch(clips, max_batch=len(clips), max_pad_ratio=pad_ratio)
+        cos = np.array(_cosines(single, batch))
+        below = int((cos < args.min_cos).sum())
+        failed |= below > 0
+        print(f"{label:<16} cos min={cos.min():.7f} ({below} of {len(cos)} below "
+              f"{args.min_cos:g})  {'FAIL' if below else 'OK'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,38 @@
+"""
+Import setup shared by the scripts under tools/ and test/
+
+core_api/__init__.py instantiates every model (Whisper, LLMs, YOLO, ...) and
+speaker_service/__init__.py pulls in the gRPC servicer. Register those
+packages without running their __init__ so a script only loads the modules it
+imports — the same reason asd_pipeline.py loads modules by path.
+
+Usage (first import in a script, before any core_api import):
+    import _bootstrap  # noqa: F401
+
+Scripts outside tools/ put it on sys.path first:
+    sys.path.insert(0, os.path.join(<repo root>, "tools"))
+"""
+
+import os
+import sys
+import types
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(TOOLS_DIR)
+GINNY_DIR = os.path.join(REPO_ROOT, "ginny_server")
+
+
+def skip_package_init(name, path):
+    """Register package ``name`` at ``path`` without executing its __init__."""
+    pkg = types.ModuleType(name)
+    pkg.__path__ = [path]
+    sys.modules.setdefault(name, pkg)
+    return sys.modules[name]
+
+
+# grpc_communication and pepper_client are imported from the repo root.
+if REPO_ROOT not in sys.path:
+    sys.path.append(REPO_ROOT)
+
+skip_package_init("core_api", os.path.join(GINNY_DIR, "core_api"))
+skip_package_init("speaker_service", os.path.join(GINNY_DIR, "speaker_service"))
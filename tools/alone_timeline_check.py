@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Per-frame gate check: per-window alone frames vs the per-cluster scatter
+
+  reference  the original _compute_alone_timeline body (copied below): per
+             cluster, re-sum the single-speaker classes of every chunk, build
+             chunk frame grid positions, and scatter each segment's frames
+             with a masked pass over all chunk frames + np.add.at
+  window     speaker_recognition._window_alone_frames once per window, then
+             _compute_alone_timeline(..., window_alone=...) per cluster
+             (a gather of the segments' grid frames)
+
+Both timelines must be bit-identical (np.array_equal) for every cluster, and
+so must the _gate_cluster tiers / spans. Inputs are windows recorded by
+ProcessVideo with SPEAKER_GATE_RECORD_DIR=<dir> (one gate_wNNN.npz per
+window), or synthetic powerset posteriors when no directory is given.
+Recordings also carry the timeline and tier the server computed for each
+cluster; the replayed window path must reproduce those exactly as well.
+Exits non-zero on any mismatch.
+
+Usage:
+    python tools/alone_timeline_check.py [recordings_dir] [--windows 50]
+        [--chunk 16 --step 1.6 --frame-rate 62.5 --speakers 4]
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+import types
+
+import _bootstrap  # noqa: F401  (registers core_api without its __init__)
+
+import numpy as np
+
+from core_api.speaker_recognition import speaker_recognition as sr_mod
+
+
+class _Chunks:
+    """The part of pyannote's SlidingWindow the gate uses: sw[c].start."""
+
+    def __init__(self, starts):
+        self._starts = [float(s) for s in starts]
+
+    def __getitem__(self, c):
+        return types.SimpleNamespace(start=self._starts[c])
+
+
+def reference_alone_timeline(cluster_segments, cluster_segment_byte_lens, soft_data_raw,
+                             chunk_sliding_window, powerset_class_map, frame_rate_hz,
+                             sample_rate, window_offset_s=0.0):
+    """_compute_alone_timeline before the per-window precompute."""
+    from scipy.ndimage import median_filter
+
+    bytes_per_frame = round(sample_rate / frame_rate_hz) * 2
+    per_segment_frames = [bl // bytes_per_frame for bl in cluster_segment_byte_lens]
+    total_output_frames = sum(per_segment_frames)
+    if total_output_frames == 0 or not cluster_segments:
+        return np.zeros(0, dtype=np.float32)
+
+    single_idxs = sr_mod._single_speaker_idxs(powerset_class_map, soft_data_raw)
+    alone_per_chunk = soft_data_raw[:, :, single_idxs].sum(axis=-1).astype(np.float32)
+    num_chunks, frames_per_chunk = alone_per_chunk.shape
+    chunk_starts = np.array([chunk_sliding_window[c].start for c in range(num_chunks)],
+                            dtype=np.float64)
+    frame_offsets_sec = np.arange(frames_per_chunk, dtype=np.float64) / frame_rate_hz
+    chunk_frame_wc = chunk_starts[:, None] + frame_offsets_sec[None, :]
+    chunk_frame_global = np.round(chunk_frame_wc * frame_rate_hz).astype(np.int64)
+
+    output = np.zeros(total_output_frames, dtype=np.float32)
+    counts = np.zeros(total_output_frames, dtype=np.int32)
+    chunk_flat_global = chunk_frame_global.ravel()
+    chunk_flat_probs = alone_per_chunk.ravel()
+
+    out_offset = 0
+    for (s_start_global, _s_end_global), seg_frames in zip(cluster_segments, per_segment_frames):
+        if seg_frames == 0:
+            continue
+        seg_start_frame = int(round((s_start_global - window_offset_s) * frame_rate_hz))
+        rel_pos = chunk_flat_global - seg_start_frame
+        valid = (rel_pos >= 0) & (rel_pos < seg_frames)
+        flat_out_idx = out_offset + rel_pos[valid]
+        np.add.at(output, flat_out_idx, chunk_flat_probs[valid])
+        np.add.at(counts, flat_out_idx, 1)
+        out_offset += seg_frames
+
+    mask = counts > 0
+    output[mask] /= counts[mask]
+    return median_filter(output, size=11, mode='reflect')
+
+
+def load_recording(path):
+    """One window recorded by video_processor._record_gate_inputs."""
+    z = np.load(path)
+    clusters = {}
+    for k, label in enumerate(z["labels"].tolist()):
+        sel = z["seg_cluster"] == k
+        clusters[label] = (
+            list(zip(z["seg_starts"][sel].tolist(), z["seg_ends"][sel].tolist())),
+            z["byte_lens"][sel].tolist(),
+        )
+    live = {}
+    if "live_timeline" in z.files:
+        offsets = np.concatenate([[0], np.cumsum(np.maximum(z["live_timeline_len"], 0))])
+        for k, label in enumerate(z["labels"].tolist()):
+            if z["live_timeline_len"][k] >= 0:
+                live[label] = (z["live_timeline"][offsets[k]:offsets[k + 1]],
+                               str(z["live_tier"][k]))
+    return {
+        "name": os.path.basename(path),
+        "live": live,
+        "soft_data": z["soft_data"],
+        "sw": _Chunks(z["chunk_starts"]),
+        "class_map": {"single_speaker_class_idxs": z["single_idxs"].tolist()},
+        "frame_rate_hz": float(z["frame_rate_hz"]),
+        "sample_rate": int(z["sample_rate"]),
+        "win_start": float(z["win_start"]),
+        "clusters": clusters,
+    }
+
+
+def synth_window(rng, idx, args, sample_rate=16000, window_s=30.0):
+    """Powerset posteriors for a 30s window (silence, N singles, pairs) and
+    2-4 clusters of diarization-like segments, in window-global seconds."""
+    n = args.speakers
+    num_classes = 1 + n + n * (n - 1) // 2
+    frames = int(round(args.chunk * args.frame_rate))
+    num_chunks = int(np.floor((window_s - args.chunk) / args.step)) + 1
+    logits = rng.normal(0, 2.5, (num_chunks, frames, num_classes))
+    soft = np.exp(logits - logits.max(-1, keepdims=True))
+    soft = (soft / soft.sum(-1, keepdims=True)).astype(np.float32)
+
+    win_start = idx * 20.0
+    clusters = {}
+    t = 0.0
+    while t < window_s - 0.3:
+        dur = float(min(rng.uniform(0.3, 6.0), window_s - t))
+        label = f"SPEAKER_{int(rng.integers(rng.integers(2, 5))):02d}"
+        segs, lens = clusters.setdefault(label, ([], []))
+        segs.append((t + win_start, t + dur + win_start))
+        lens.append(int(dur * sample_rate) * 2)
+        t += dur + float(rng.uniform(0.0, 0.8))
+    return {
+        "name": f"synthetic_w{idx:03d}",
+        "soft_data": soft,
+        "sw": _Chunks([c * args.step for c in range(num_chunks)]),
+        "class_map": {"single_speaker_class_idxs": list(range(1, n + 1))},
+        "frame_rate_hz": args.frame_rate,
+        "sample_rate": sample_rate,
+        "win_start": win_start,
+        "clusters": clusters,
+    }
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description="Bit-exact check of the per-window alone-frame gate")
+    p.add_argument("recordings", nargs="?", help="dir of gate_w*.npz (default: synthetic)")
+    p.add_argument("--windows", type=int, default=50, help="synthetic windows")
+    p.add_argument("--chunk", type=float, default=16.0, help="synthetic chunk seconds")
+    p.add_argument("--step", type=float, default=1.6, help="synthetic chunk step seconds")
+    p.add_argument("--frame-rate", type=float, default=62.5)
+    p.add_argument("--speakers", type=int, default=4, help="synthetic local speakers")
+    args = p.parse_args()
+
+    if args.recordings:
+        paths = sorted(glob.glob(os.path.join(args.recordings, "gate_w*.npz")))
+        if not paths:
+            print(f"{args.recordings}: no gate_w*.npz recordings")
+            return 1
+        windows = (load_recording(path) for path in paths)
+    else:
+        rng = np.random.default_rng(0)
+        windows = (synth_window(rng, i, args) for i in range(args.windows))
+
+    n_windows = n_clusters = n_frames = n_live = 0
+    bad = []
+    ref_s = new_s = 0.0
+    for w in windows:
+        n_windows += 1
+        rate, sr = w["frame_rate_hz"], w["sample_rate"]
+        bytes_per_frame = round(sr / rate) * 2
+
+        t = time.perf_counter()
+        ref = {label: reference_alone_timeline(segs, lens, w["soft_data"], w["sw"],
+                                               w["class_map"], rate, sr, w["win_start"])
+               for label, (segs, lens) in w["clusters"].items()}
+        ref_s += time.perf_counter() - t
+
+        t = time.perf_counter()
+        window_alone = sr_mod._window_alone_frames(w["soft_data"], w["sw"], w["class_map"], rate)
+        new = {label: sr_mod._compute_alone_timeline(segs, lens, w["soft_data"], w["sw"],
+                                                     w["class_map"], rate, sr,
+                                                     window_offset_s=w["win_start"],
+                                                     window_alone=window_alone)
+               for label, (segs, lens) in w["clusters"].items()}
+        new_s += time.perf_counter() - t
+
+        for label, (_segs, lens) in w["clusters"].items():
+            n_clusters += 1
+            n_frames += len(ref[label])
+            audio = bytes(sum(lens))
+            g_ref = sr_mod._gate_cluster(ref[label], audio, bytes_per_frame, rate)
+            g_new = sr_mod._gate_cluster(new[label], audio, bytes_per_frame, rate)
+            same_gate = all(g_ref[k] == g_new[k] for k in g_ref)
+            if not (np.array_equal(ref[label], new[label]) and same_gate):
+                bad.append(f"{w['name']} {label}: reference vs window")
+            if label in w.get("live", {}):
+                n_live += 1
+                live_timeline, live_tier = w["live"][label]
+                if not (np.array_equal(live_timeline, new[label]) and live_tier == g_new["tier"]):
+                    bad.append(f"{w['name']} {label}: recorded vs replayed")
+
+    print(f"{n_windows} windows, {n_clusters} clusters, {n_frames} timeline frames, "
+          f"source={'recorded' if args.recordings else 'synthetic'}")
+    print(f"  reference  {ref_s * 1e3 / max(n_windows, 1):8.2f} ms/window")
+    print(f"  window     {new_s * 1e3 / max(n_windows, 1):8.2f} ms/window  "
+          f"x{ref_s / max(new_s, 1e-9):.2f}")
+    print(f"  checked    {n_clusters} clusters (timeline + gate), {n_live} also "
+          f"against the recorded run: {len(bad)} mismatches")
+    for name in bad[:10]:
+        print(f"    {name}")
+    return 1 if bad else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
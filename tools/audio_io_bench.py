@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Diarization input benchmark: temp WAV round trip vs in-memory waveform
+
+Before, every diarization window was written to a temp WAV and reloaded by
+the pipeline: write + torchaudio.load + unlink. Now
+_Diarization._waveform_input builds the pyannote {"waveform", "sample_rate"}
+dict in memory. This times both per window and checks that they produce the
+same tensor. Falls back to the wave module for reading when torchaudio is
+missing; the output says which loader was used.
+
+Usage:
+    python tools/audio_io_bench.py [--seconds 30] [--windows 50] [--tmpdir /tmp]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import wave
+
+import _bootstrap  # noqa: F401  (registers core_api without its __init__)
+
+import numpy as np
+import torch
+
+from core_api.diarization.diarization import _Diarization
+
+try:
+    import torchaudio
+except ImportError:
+    torchaudio = None
+
+
+def _load(path):
+    if torchaudio is not None:
+        return torchaudio.load(path)
+    with wave.open(path, "rb") as wf:
+        pcm = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+        sr = wf.getframerate()
+    return torch.from_numpy(pcm.astype(np.float32) / 32768.0).unsqueeze(0), sr
+
+
+def temp_wav_roundtrip(pcm, sample_rate, tmpdir):
+    fd, path = tempfile.mkstemp(suffix=".wav", dir=tmpdir)
+    os.close(fd)
+    try:
+        with wave.open(path, "wb") as wf:
+            wf.setnchannels(1); wf.setsampwidth(2); wf.setframerate(sample_rate)
+            wf.writeframes(pcm.tobytes())
+        waveform, sr = _load(path)
+    finally:
+        os.remove(path)
+    return {"waveform": torch.unsqueeze(waveform[0], 0), "sample_rate": sr}
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description="Temp-WAV vs in-memory diarization input")
+    p.add_argument("--seconds", type=float, default=30.0, help="window length")
+    p.add_argument("--windows", type=int, default=50)
+    p.add_argument("--sample-rate", type=int, default=16000)
+    p.add_argument("--tmpdir", default=None)
+    args = p.parse_args()
+
+    rng = np.random.default_rng(0)
+    pcm = rng.integers(-8000, 8000, int(args.seconds * args.sample_rate), dtype=np.int16)
+
+    old = temp_wav_roundtrip(pcm, args.sample_rate, args.tmpdir)
+    new = _Diarization._waveform_input(pcm, args.sample_rate)
+    same = torch.equal(old["waveform"], new["waveform"]) and old["sample_rate"] == new["sample_rate"]
+
+    timings = {}
+    for name, fn in (("temp_wav", lambda: temp_wav_roundtrip(pcm, args.sample_rate, args.tmpdir)),
+                     ("in_memory", lambda: _Diarization._waveform_input(pcm, args.sample_rate))):
+        fn()
+        t = time.perf_counter()
+        for _ in range(args.windows):
+            fn()
+        timings[name] = (time.perf_counter() - t) / args.windows
+
+    print(f"{args.seconds:.0f}s window, loader={'torchaudio' if torchaudio else 'wave'}")
+    print(f"  temp_wav   {timings['temp_wav'] * 1e3:8.3f} ms/window")
+    print(f"  in_memory  {timings['in_memory'] * 1e3:8.3f} ms/window")
+    print(f"  saved      {(timings['temp_wav'] - timings['in_memory']) * 1e3:8.3f} ms/window  "
+          f"identical input: {'yes' if same else 'NO'}")
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
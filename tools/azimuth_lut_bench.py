@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+BRAID azimuth likelihood benchmark: lookup tables vs exact Gaussians
+
+For each bin count, builds the (loc, drift, ssl) tables that
+PosteriorComputer uses and compares them with the exact wrapped-Gaussian
+evaluation on random means / SSL confidences (SSL queries too wide to
+tabulate take the exact path, as in the posterior). Reports build time, table
+memory, per-call latency of both paths, and the max absolute / max relative
+(to the vector peak) error. Exits non-zero if the error exceeds --max-err.
+
+Usage:
+    python tools/azimuth_lut_bench.py [--bins 36 72 360] [--steps-per-sigma 16]
+                                      [--queries 20000] [--max-err 2e-3]
+"""
+
+import argparse
+import math
+import sys
+import time
+
+import _bootstrap  # noqa: F401  (registers core_api without its __init__)
+
+import numpy as np
+
+from core_api.braid.azimuth_lut import gaussian_bins, luts_for
+from core_api.braid.config import load_config
+
+
+def _time_per_call(fn, args) -> float:
+    t = time.perf_counter()
+    for a in args:
+        fn(*a)
+    return (time.perf_counter() - t) / max(1, len(args))
+
+
+def bench_bins(n_bins: int, steps_per_sigma: int, queries: int, seed: int = 0) -> dict:
+    cfg = load_config().with_overrides(num_azimuth_bins=n_bins,
+                                       azimuth_lut_steps_per_sigma=steps_per_sigma)
+    t = time.perf_counter()
+    luts = luts_for(cfg)
+    build_s = time.perf_counter() - t
+    bins = cfg.bin_centers
+    rng = np.random.default_rng(seed)
+    mus = rng.uniform(-math.pi, math.pi, queries)
+    confs = rng.uniform(0.0, 1.0, queries)
+    ssl_sigmas = cfg.sigma_0 / np.sqrt(np.maximum(0.01, confs) + 0.01)
+
+    cases = {
+        "loc": (luts.loc, [(m, None) for m in mus], [(m, cfg.sigma_det) for m in mus]),
+        "drift": (luts.drift, [(m, None) for m in mus], [(m, cfg.sigma_drift) for m in mus]),
+        "ssl": (luts.ssl, list(zip(mus, ssl_sigmas)), list(zip(mus, ssl_sigmas))),
+    }
+    out = {"bins": n_bins, "build_s": build_s,
+           "table_mb": sum(t.nbytes for t in luts if t is not None) / 1e6}
+    for name, (lut, lut_args, exact_args) in cases.items():
+        if lut is None:                 # sigma too wide to tabulate
+            continue
+
+        def lookup(m, s_lut, s):
+            p = lut.lookup(m, s_lut)
+            return gaussian_bins(bins, m, s) if p is None else p
+
+        lut_args = [(m, s_lut, s) for (m, s_lut), (_, s) in zip(lut_args, exact_args)]
+        abs_err = rel_err = 0.0
+        for m, s_lut, s in lut_args:
+            approx = lookup(m, s_lut, s)
+            exact = gaussian_bins(bins, m, s)
+            err = float(np.abs(approx - exact).max())
+            abs_err = max(abs_err, err)
+            rel_err = max(rel_err, err / float(exact.max()))
+        n = min(len(lut_args), 5000)
+        out[name] = {
+            "lut_us": 1e6 * _time_per_call(lookup, lut_args[:n]),
+            "exact_us": 1e6 * _time_per_call(lambda m, s: gaussian_bins(bins, m, s),
+                                             exact_args[:n]),
+            "max_abs_err": abs_err,
+            "max_rel_err": rel_err,
+        }
+    return out
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description="BRAID azimuth LUT benchmark")
+    p.add_argument("--bins", type=int, nargs="+", default=[36, 72, 360])
+    p.add_argument("--steps-per-sigma", type=int, default=16)
+    p.add_argument("--queries", type=int, default=20000)
+    p.add_argument("--max-err", type=float, default=2e-3,
+                   help="fail if any max error relative to the vector peak exceeds this")
+    args = p.parse_args()
+
+    worst = 0.0
+    for n in args.bins:
+        r = bench_bins(n, args.steps_per_sigma, args.queries)
+        print(f"bins={r['bins']:<4d} build={r['build_s'] * 1e3:7.1f}ms "
+              f"tables={r['table_mb']:6.2f}MB")
+        for name in ("loc", "drift", "ssl"):
+            c = r.get(name)
+            if c is None:
+                print(f"  {name:<5s} exact (sigma above MAX_SIGMA)")
+                continue
+            worst = max(worst, c["max_rel_err"])
+            print(f"  {name:<5s} lut={c['lut_us']:6.1f}us exact={c['exact_us']:6.1f}us "
+                  f"x{c['exact_us'] / max(1e-9, c['lut_us']):4.1f}  "
+                  f"max_abs_err={c['max_abs_err']:.2e} max_rel_err={c['max_rel_err']:.2e}")
+    ok = worst <= args.max_err
+    print(f"worst relative error {worst:.2e} (bound {args.max_err:.0e})  →  "
+          f"{'OK' if ok else 'FAIL'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+BRAID tick replay / regression benchmark
+
+Replays tick bundles recorded by the BRAID server (``record_dir`` in
+braid_config.yaml) through run_tick against a throwaway gallery, printing
+per-phase timings per tick. With --baseline, diffs decisions and median
+timings against a previous run's JSONL and exits non-zero on regression.
+With --max-tick-alloc-mb, traces allocations (tracemalloc) and fails if any
+tick's Python-heap peak exceeds the bound. With --tradeoff, reports keyframe
+stride vs video-pass accuracy on the recordings instead of replaying ticks.
+
+Usage:
+    python tools/braid_replay.py <recordings_dir> [--models stub|real] [--out run.jsonl]
+                                 [--baseline base.jsonl] [--max-decision-diffs 0]
+                                 [--max-slowdown 1.25] [--gallery <seed_gallery_dir>]
+                                 [--max-tick-alloc-mb 64]
+    python tools/braid_replay.py <recordings_dir> --tradeoff [--strides 1 2 3 5 8]
+                                 [--reembed-iou 0.7] [--out tradeoff.jsonl]
+
+Example:
+    python tools/braid_replay.py /workspace/braid_recordings --out base.jsonl
+    # ... change perception / posterior / decision code ...
+    python tools/braid_replay.py /workspace/braid_recordings --baseline base.jsonl
+"""
+
+import logging
+import os
+import sys
+
+import _bootstrap  # noqa: F401  (registers core_api without its __init__)
+
+from core_api.braid.replay import main
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO if os.environ.get("BRAID_REPLAY_VERBOSE") else logging.WARNING,
+        format="%(asctime)s %(levelname)s %(message)s",
+    )
+    sys.exit(main())
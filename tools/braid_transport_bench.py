@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+BRAID RunTick transport benchmark
+
+Streams synthetic tick bundles through a local in-process gRPC server whose
+RunTick only assembles the bundle (no perception), and reports upload
+throughput in MB/s and frames/s. Exercises the real client chunker
+(pepper_client/braid/braid_client.py::_chunk_iter) and the real server
+assembler (BraidServiceServicer._assemble_bundle).
+
+Usage:
+    python tools/braid_transport_bench.py [--ticks 5] [--seconds 30] [--frames 300]
+                                          [--decode-workers 4]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent import futures
+
+import _bootstrap
+
+# grpc_pb2_grpc imports grpc_pb2 as a top-level module.
+sys.path.insert(0, os.path.join(_bootstrap.REPO_ROOT, "grpc_communication"))
+
+import cv2  # noqa: E402
+import grpc  # noqa: E402
+import numpy as np  # noqa: E402
+
+from grpc_communication import grpc_pb2 as pb2  # noqa: E402
+from grpc_communication import grpc_pb2_grpc as pb2_grpc  # noqa: E402
+from core_api.braid.config import load_config  # noqa: E402
+from core_api.braid.gallery import BraidGallery  # noqa: E402
+from core_api.braid.grpc_handle import BraidServiceServicer  # noqa: E402
+from pepper_client.braid.braid_client import _chunk_iter  # noqa: E402
+from pepper_client.braid.bundle_capture import ClientBundle  # noqa: E402
+
+
+class _AssembleOnlyServicer(BraidServiceServicer):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = []
+
+    def RunTick(self, request_iterator, context):
+        t0 = time.time()
+        bundle = self._assemble_bundle(request_iterator)
+        self.stats.append((time.time() - t0, len(bundle.audio_pcm), len(bundle.frames)))
+        return pb2.BraidTickResult(tick_id=bundle.tick_id, session_id=bundle.session_id)
+
+
+def _synthetic_bundle(tick_id: int, seconds: float, n_frames: int,
+                      sr: int = 16000, ch: int = 4) -> ClientBundle:
+    rng = np.random.default_rng(tick_id)
+    pcm = rng.integers(-2000, 2000, size=int(seconds * sr) * ch, dtype=np.int16)
+    img = cv2.GaussianBlur(rng.integers(0, 255, size=(480, 640, 3), dtype=np.uint8), (9, 9), 0)
+    ok, jpg = cv2.imencode(".jpg", img, [int(cv2.IMWRITE_JPEG_QUALITY), 80])
+    jpeg = jpg.tobytes()
+    t0 = time.time()
+    frames = [(t0 + i * seconds / max(1, n_frames), jpeg, 640, 480) for i in range(n_frames)]
+    ssl = [(t0 + i * 0.1, 0.2, 0.0, 0.5) for i in range(int(seconds * 10))]
+    return ClientBundle(tick_id=tick_id, session_id="bench", window_start_ts=t0,
+                        robot_heading_rad=0.0, audio_pcm=bytearray(pcm.tobytes()),
+                        audio_sample_rate=sr, audio_channels=ch,
+                        frames=frames, ssl_events=ssl)
+
+
+def main():
+    p = argparse.ArgumentParser(description="BRAID RunTick transport benchmark")
+    p.add_argument("--ticks", type=int, default=5)
+    p.add_argument("--seconds", type=float, default=30.0, help="audio seconds per tick")
+    p.add_argument("--frames", type=int, default=300, help="JPEG frames per tick")
+    p.add_argument("--decode-workers", type=int, default=None,
+                   help="override frame_decode_workers from braid_config.yaml")
+    args = p.parse_args()
+
+    overrides = {"record_dir": ""}
+    if args.decode_workers is not None:
+        overrides["frame_decode_workers"] = args.decode_workers
+    cfg = load_config().with_overrides(**overrides)
+    gallery_dir = tempfile.mkdtemp(prefix="braid_bench_gallery_")
+    servicer = _AssembleOnlyServicer(cfg=cfg, gallery=BraidGallery(gallery_dir))
+
+    opts = [("grpc.max_receive_message_length", 64 * 1024 * 1024),
+            ("grpc.max_send_message_length", 64 * 1024 * 1024)]
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=4), options=opts)
+    pb2_grpc.add_BraidServiceServicer_to_server(servicer, server)
+    port = server.add_insecure_port("127.0.0.1:0")
+    server.start()
+    channel = grpc.insecure_channel(f"127.0.0.1:{port}", options=opts)
+    stub = pb2_grpc.BraidServiceStub(channel)
+
+    bundles = [_synthetic_bundle(i + 1, args.seconds, args.frames) for i in range(args.ticks)]
+    stub.RunTick(_chunk_iter(_synthetic_bundle(0, 1.0, 2)))   # warm-up
+    servicer.stats.clear()
+
+    total_bytes = 0
+    total_frames = 0
+    t0 = time.time()
+    for b in bundles:
+        stub.RunTick(_chunk_iter(b))
+        total_bytes += len(b.audio_pcm) + sum(len(f[1]) for f in b.frames)
+        total_frames += len(b.frames)
+    wall = time.time() - t0
+
+    server.stop(0)
+    mb = total_bytes / 1e6
+    print(f"ticks={args.ticks} payload={mb:.1f}MB frames={total_frames} "
+          f"decode_workers={cfg.frame_decode_workers}")
+    print(f"end-to-end   {wall:.2f}s  {mb / wall:.1f} MB/s  {total_frames / wall:.0f} frames/s")
+    assemble = sum(s[0] for s in servicer.stats)
+    print(f"server assemble {assemble:.2f}s  ({assemble / max(1, len(servicer.stats)) * 1e3:.0f} ms/tick)")
+
+
+if __name__ == "__main__":
+    main()
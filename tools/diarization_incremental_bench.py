@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Diarization benchmark: sliding windows vs incremental
+
+Runs each long recording through both paths and reports model time and DER:
+
+  window       the RecognizeSpeakers/video_processor path —
+               diarize_with_posteriors on 30s windows every 20s
+  incremental  IncrementalDiarizer fed in 20s pushes, one fixed chunk grid,
+               cached chunk outputs, cross-push label stitching
+
+The reference is <rttm-dir>/<stem>.rttm if given, otherwise an offline
+diarize() of the whole file (so DER then means "agreement with offline").
+Window labels are only consistent within a window, so both paths are
+scored per window (optimal mapping per window, errors summed over windows).
+The incremental path is also scored over the whole file with one mapping.
+Times are wall seconds after a CUDA sync: the whole diarize call per window,
+and for the incremental path the model calls (segmentation + embeddings),
+the re-clustering, and their total. The totals line compares whole-path times.
+
+Usage:
+    python tools/diarization_incremental_bench.py rec1.wav [rec2.wav ...]
+        [--rttm-dir refs/] [--window 30] [--overlap 10] [--step-s 3.2]
+        [--device cuda:2] [--collar 0.0]
+"""
+
+import argparse
+import os
+import sys
+import time
+import wave
+
+import _bootstrap  # noqa: F401  (registers core_api without its __init__)
+
+import numpy as np
+import torch
+
+from core_api.diarization.diarization import _Diarization
+from pyannote.core import Annotation, Segment, Timeline
+from pyannote.metrics.diarization import DiarizationErrorRate
+
+
+def _sync():
+    if torch.cuda.is_available():
+        torch.cuda.synchronize()
+
+
+def _load_wav(path):
+    with wave.open(path, "rb") as wf:
+        if wf.getsampwidth() != 2 or wf.getnchannels() != 1:
+            raise ValueError(f"{path}: expected mono 16-bit PCM")
+        return np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16), wf.getframerate()
+
+
+def _load_rttm(path, uri):
+    ref = Annotation(uri=uri)
+    with open(path) as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 8 and parts[0] == "SPEAKER":
+                start, dur = float(parts[3]), float(parts[4])
+                ref[Segment(start, start + dur)] = parts[7]
+    return ref
+
+
+def _annotation(segments, uri, offset=0.0, prefix=""):
+    ann = Annotation(uri=uri)
+    for i, seg in enumerate(segments):
+        ann[Segment(seg["start"] + offset, seg["end"] + offset), i] = f"{prefix}{seg['speaker']}"
+    return ann
+
+
+def _windows(duration, window, step, min_dur):
+    out, start = [], 0.0
+    while True:
+        end = min(start + window, duration)
+        if end - start >= min_dur:
+            out.append((start, end))
+        if end >= duration:
+            return out
+        start += step
+
+
+def bench_file(diar, path, args):
+    audio, sr = _load_wav(path)
+    uri = os.path.splitext(os.path.basename(path))[0]
+    duration = len(audio) / sr
+    step = args.window - args.overlap
+    rttm = os.path.join(args.rttm_dir, uri + ".rttm") if args.rttm_dir else None
+    if rttm and os.path.exists(rttm):
+        reference, ref_kind = _load_rttm(rttm, uri), "rttm"
+    else:
+        reference, ref_kind = _annotation(diar.diarize(audio, sr), uri), "offline"
+
+    # Window path.
+    windows = _windows(duration, args.window, step, diar.MIN_DIARIZATION_DURATION)
+    window_der = DiarizationErrorRate(collar=args.collar)
+    window_model_s = 0.0
+    for w, (ws, we) in enumerate(windows):
+        _sync()
+        t = time.perf_counter()
+        segs = diar.diarize_with_posteriors(audio[int(ws * sr):int(we * sr)], sr)[0]
+        _sync()
+        window_model_s += time.perf_counter() - t
+        window_der(reference, _annotation(segs, uri, offset=ws, prefix=f"w{w}_"),
+                   uem=Timeline([Segment(ws, we)]))
+
+    # Incremental path.
+    inc = diar.incremental(sr, context_s=args.window, step_s=args.step_s)
+    segs = []
+    _sync()
+    t = time.perf_counter()
+    push = int(step * sr)
+    for p in range(0, len(audio), push):
+        segs += inc.push(audio[p:p + push])
+    segs += inc.flush()
+    _sync()
+    inc_wall_s = time.perf_counter() - t
+    hyp = _annotation(segs, uri)
+    inc_window_der = DiarizationErrorRate(collar=args.collar)
+    for ws, we in windows:
+        inc_window_der(reference, hyp, uem=Timeline([Segment(ws, we)]))
+    inc_global_der = DiarizationErrorRate(collar=args.collar)(reference, hyp)
+    inc_model_s = inc.stats["segmentation_s"] + inc.stats["embedding_s"]
+
+    return {
+        "file": uri, "duration": duration, "reference": ref_kind, "windows": len(windows),
+        "window_model_s": window_model_s, "window_der": abs(window_der),
+        "inc_model_s": inc_model_s, "inc_wall_s": inc_wall_s,
+        "inc_cluster_s": inc.stats["clustering_s"], "inc_chunks": inc.stats["chunks"],
+        "inc_window_der": abs(inc_window_der), "inc_global_der": inc_global_der,
+    }
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description="Sliding-window vs incremental diarization")
+    p.add_argument("wavs", nargs="+", help="mono 16 kHz PCM_16 recordings")
+    p.add_argument("--rttm-dir", default=None, help="reference RTTMs named <stem>.rttm")
+    p.add_argument("--window", type=float, default=30.0)
+    p.add_argument("--overlap", type=float, default=10.0)
+    p.add_argument("--step-s", type=float, default=None,
+                   help="incremental chunk hop (default: 2x the pipeline segmentation step)")
+    p.add_argument("--model", default="BUT-FIT/diarizen-wavlm-large-s80-md-v2")
+    p.add_argument("--device", default="cuda:2")
+    p.add_argument("--collar", type=float, default=0.0)
+    args = p.parse_args()
+
+    diar = _Diarization(model_name=args.model, device=args.device)
+    total_audio = total_window = total_inc = 0.0
+    for path in args.wavs:
+        r = bench_file(diar, path, args)
+        total_audio += r["duration"]
+        total_window += r["window_model_s"]
+        total_inc += r["inc_wall_s"]
+        print(f"{r['file']}: {r['duration']:.0f}s audio, ref={r['reference']}, "
+              f"{r['windows']} windows")
+        print(f"  window       wall={r['window_model_s']:7.2f}s  "
+              f"DER/window={100 * r['window_der']:5.2f}%")
+        print(f"  incremental  model={r['inc_model_s']:7.2f}s  "
+              f"cluster={r['inc_cluster_s']:5.2f}s  wall={r['inc_wall_s']:7.2f}s  "
+              f"chunks={r['inc_chunks']}  DER/window={100 * r['inc_window_der']:5.2f}%  "
+              f"DER/file={100 * r['inc_global_der']:5.2f}%")
+    print(f"total: {total_audio:.0f}s audio  window={total_window:.2f}s "
+          f"(RTF {total_window / max(total_audio, 1e-9):.3f})  incremental={total_inc:.2f}s "
+          f"(RTF {total_inc / max(total_audio, 1e-9):.3f})  "
+          f"x{total_window / max(total_inc, 1e-9):.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+"""
+Gallery search benchmark: IVF-flat index vs exact scan
+
+Builds synthetic galleries of increasing size and reports recall@k, rank-1
+agreement with the exact scan, and per-query latency for both. Use it to
+pick ``gallery_ann_nprobe`` (braid_config.yaml) / ``SPEAKER_INDEX`` before
+switching a large deployment from ``exact`` to ``ivf``.
+
+Usage:
+    python tools/vector_index_bench.py [--sizes 1000 10000 50000] [--dim 512]
+                                       [--nprobe 16] [--noise 0.8] [--clusters 0]
+"""
+
+import sys
+
+import _bootstrap  # noqa: F401  (registers core_api without its __init__)
+
+from core_api.vector_index.bench import main
+
+if __name__ == "__main__":
+    sys.exit(main())
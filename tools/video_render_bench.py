@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+ProcessVideo annotation benchmark: chunked vs pipelined renderer
+
+  chunked    video_processor._render_chunked: cpu_count workers, each with its
+             own VideoCapture that grab()s up to its start frame, mp4v
+             segments, ffmpeg concat + mux
+  pipelined  video_render.render_pipelined: one decoder, shared-memory ring,
+             N annotators, one encoder (ffmpeg pipe, --codec/--preset)
+
+Both render the same synthetic voice timeline and face boxes. Parity first
+draws --parity-frames frames with _annotate_frame and FrameAnnotator and
+compares pixels (must be identical). Throughput is output frames / wall
+seconds, end to end including the audio mux.
+
+Usage:
+    python tools/video_render_bench.py [video.mp4] [--seconds 60] [--size 1280x720]
+        [--workers 8] [--codec libx264] [--preset veryfast]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import _bootstrap  # noqa: F401  (registers speaker_service without its __init__)
+
+import cv2
+import numpy as np
+
+from speaker_service import video_processor as vp
+from speaker_service.video_render import FrameAnnotator, render_pipelined
+
+
+def _synth_video(path, seconds, fps, w, h, rng):
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (w, h))
+    base = rng.integers(0, 256, (h, w, 3), dtype=np.uint8)
+    for i in range(int(seconds * fps)):
+        out.write(np.roll(base, 4 * i, axis=1))
+    out.release()
+
+
+def _timeline(total_frames, fps, w, h, rng):
+    """Per-frame voice entries (a new speaker/confidence every 2-6 s, some
+    silence) and 0-2 face boxes per frame, shaped like process_video's."""
+    voice_per_frame = [None] * total_frames
+    f = 0
+    while f < total_frames:
+        n = int(rng.uniform(2, 6) * fps)
+        if rng.random() < 0.8:
+            k = int(rng.integers(4))
+            entry = (f"voice_{k + 1}", round(float(rng.uniform(0.4, 1.0)), 3),
+                     vp.VOICE_COLORS[k % len(vp.VOICE_COLORS)])
+            voice_per_frame[f:f + n] = [entry] * min(n, total_frames - f)
+        f += n
+    face_per_frame = []
+    for _ in range(total_frames):
+        boxes = []
+        for _ in range(int(rng.integers(3))):
+            x1, y1 = int(rng.integers(0, w - 100)), int(rng.integers(0, h - 100))
+            boxes.append((x1, y1, x1 + 80, y1 + 90, bool(rng.random() < 0.5)))
+        face_per_frame.append(boxes)
+    return voice_per_frame, face_per_frame
+
+
+def _count_frames(path):
+    cap = cv2.VideoCapture(path)
+    n = 0
+    while cap.grab():
+        n += 1
+    cap.release()
+    return n
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description="Chunked vs pipelined ProcessVideo rendering")
+    p.add_argument("video", nargs="?", help="source video (default: synthetic)")
+    p.add_argument("--seconds", type=float, default=60.0, help="synthetic length")
+    p.add_argument("--size", default="1280x720", help="synthetic WxH")
+    p.add_argument("--fps", type=float, default=25.0, help="synthetic fps")
+    p.add_argument("--workers", type=int, default=None, help="pipelined annotators")
+    p.add_argument("--codec", default="libx264")
+    p.add_argument("--preset", default="veryfast")
+    p.add_argument("--parity-frames", type=int, default=200)
+    args = p.parse_args()
+
+    rng = np.random.default_rng(0)
+    synth = None
+    if args.video:
+        src = args.video
+    else:
+        w, h = (int(v) for v in args.size.split("x"))
+        synth = src = tempfile.NamedTemporaryFile(delete=False, suffix="_src.mp4").name
+        _synth_video(src, args.seconds, args.fps, w, h, rng)
+
+    cap = cv2.VideoCapture(src)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    voice, faces = _timeline(total, fps, w, h, rng)
+    summary_text, summary_until = "3 enrolled voices", int(60.0 * fps)
+
+    # ---- parity ----
+    annotator = FrameAnnotator(w, h, summary_text, summary_until)
+    diff = checked = 0
+    for i in range(min(args.parity_frames, total)):
+        ok, frame = cap.read()
+        if not ok:
+            break
+        ref = vp._annotate_frame(frame.copy(), w, h, faces[i], voice[i],
+                                 summary_text if i < summary_until else None)
+        new = annotator.annotate(frame, i, faces[i], voice[i])
+        diff += not np.array_equal(ref, new)
+        checked += 1
+    cap.release()
+
+    # ---- throughput ----
+    t = time.perf_counter()
+    chunked_out, chunked_n = vp._render_chunked(
+        src, total, fps, w, h, voice, [[] for _ in range(total)], faces,
+        0, summary_text, summary_until)
+    chunked_s = time.perf_counter() - t
+
+    pipelined_out = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4").name
+    t = time.perf_counter()
+    pipelined_n, decoded = render_pipelined(
+        src, pipelined_out, total, fps, w, h, voice, faces, summary_text, summary_until,
+        n_workers=args.workers, codec=args.codec, preset=args.preset or None, audio_src=src)
+    pipelined_s = time.perf_counter() - t
+
+    print(f"{w}x{h} @ {fps:.0f}fps, {total} frames, {os.cpu_count()} cpus, "
+          f"source={'file' if args.video else 'synthetic'}")
+    print(f"  parity     {checked - diff}/{checked} frames identical")
+    print(f"  chunked    {chunked_n / chunked_s:8.1f} fps  ({chunked_s:.1f}s, mp4v, "
+          f"{_count_frames(chunked_out)} frames out)")
+    print(f"  pipelined  {pipelined_n / pipelined_s:8.1f} fps  ({pipelined_s:.1f}s, {args.codec}, "
+          f"{_count_frames(pipelined_out)} frames out, {decoded} decoded)  "
+          f"x{chunked_s / max(pipelined_s, 1e-9):.2f}")
+
+    for path in (chunked_out, pipelined_out, synth):
+        if path and os.path.exists(path):
+            os.remove(path)
+    return 0 if diff == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
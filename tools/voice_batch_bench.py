@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Voice embedding benchmark: one call per cluster vs extract_embeddings_batch
+
+Cuts clips shaped like one window's diarization clusters (1-12 s each) from
+the given recordings (or synthetic noise when none are given), then embeds
+every window both ways:
+
+  single  extract_embedding per clip (the old per-cluster loop)
+  batch   extract_embeddings_batch over the window's clips
+
+Parity is the cosine between the two embeddings of each clip. For eres2netv2
+and titanet (masked batch path) it should be ~1.0; redimnet and wavlm_ssl
+only batch equal lengths by default, so pass --max-pad-ratio to see what
+padding costs them. Exits non-zero if any clip's cosine is below --min-cos
+(default 0.9999 when the batch path is exact: masked models, or equal-length
+batches; otherwise unchecked unless given). Times are wall seconds after a
+CUDA sync.
+
+Usage:
+    python tools/voice_batch_bench.py [rec1.wav ...] [--model eres2netv2]
+        [--windows 20] [--clusters 4] [--device cuda:1] [--max-pad-ratio 0.5]
+        [--min-cos 0.9999]
+"""
+
+import argparse
+import sys
+import time
+import wave
+
+import _bootstrap  # noqa: F401  (registers core_api without its __init__)
+
+import numpy as np
+import torch
+
+from core_api.speaker_recognition.speaker_recognition import (
+    MODEL_REGISTRY, _SpeakerRecognition,
+)
+
+
+def _sync():
+    if torch.cuda.is_available():
+        torch.cuda.synchronize()
+
+
+def _load_wav(path):
+    with wave.open(path, "rb") as wf:
+        if wf.getsampwidth() != 2 or wf.getnchannels() != 1:
+            raise ValueError(f"{path}: expected mono 16-bit PCM")
+        return np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+
+
+def _windows(sources, n_windows, n_clusters, sample_rate, rng):
+    """n_windows lists of n_clusters int16 clips with 1-12 s lengths."""
+    out = []
+    for _ in range(n_windows):
+        clips = []
+        for _ in range(n_clusters):
+            n = int(rng.uniform(1.0, 12.0) * sample_rate)
+            src = sources[rng.integers(len(sources))]
+            if len(src) > n:
+                start = int(rng.integers(len(src) - n))
+                clips.append(src[start:start + n].tobytes())
+            else:
+                clips.append(src.tobytes())
+        out.append(clips)
+    return out
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description="Per-cluster vs batched voice embeddings")
+    p.add_argument("wavs", nargs="*", help="mono 16 kHz PCM_16 recordings")
+    p.add_argument("--model", default="eres2netv2", choices=sorted(MODEL_REGISTRY))
+    p.add_argument("--device", default="cuda:1")
+    p.add_argument("--windows", type=int, default=20)
+    p.add_argument("--clusters", type=int, default=4, help="clips per window")
+    p.add_argument("--max-batch", type=int, default=16)
+    p.add_argument("--max-pad-ratio", type=float, default=None,
+                   help="default: the model's own (0.5 masked, 0.0 otherwise)")
+    p.add_argument("--min-cos", type=float, default=None,
+                   help="fail below this batch/single cosine (default 0.9999 when "
+                        "the batch path is exact, else no check)")
+    p.add_argument("--seed", type=int, default=0)
+    args = p.parse_args()
+    min_cos = args.min_cos
+    if min_cos is None and (MODEL_REGISTRY[args.model]["batch_masked"]
+                            or not args.max_pad_ratio):
+        min_cos = 0.9999
+
+    sample_rate = 16000
+    rng = np.random.default_rng(args.seed)
+    if args.wavs:
+        sources = [_load_wav(path) for path in args.wavs]
+    else:
+        sources = [rng.integers(-8000, 8000, 60 * sample_rate, dtype=np.int16)]
+    windows = _windows(sources, args.windows, args.clusters, sample_rate, rng)
+
+    rec = _SpeakerRecognition(model_name=args.model, device=args.device)
+    rec.extract_embeddings_batch(windows[0], sample_rate)      # warm-up
+    rec.extract_embedding(windows[0][0], sample_rate)
+
+    single_s = batch_s = 0.0
+    cosines = []
+    for clips in windows:
+        _sync()
+        t = time.perf_counter()
+        single = [rec.extract_embedding(c, sample_rate) for c in clips]
+        _sync()
+        single_s += time.perf_counter() - t
+
+        t = time.perf_counter()
+        batch = rec.extract_embeddings_batch(clips, sample_rate, max_batch=args.max_batch,
+                                             max_pad_ratio=args.max_pad_ratio)
+        _sync()
+        batch_s += time.perf_counter() - t
+
+        for a, b in zip(single, batch):
+            cosines.append(float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b) + 1e-12)))
+
+    cosines = np.array(cosines)
+    n = len(cosines)
+    print(f"{args.model}: {args.windows} windows x {args.clusters} clips, "
+          f"source={'wav' if args.wavs else 'noise'}")
+    print(f"  single  {single_s * 1e3 / args.windows:8.2f} ms/window")
+    print(f"  batch   {batch_s * 1e3 / args.windows:8.2f} ms/window  "
+          f"x{single_s / max(batch_s, 1e-9):.2f}")
+    if min_cos is None:
+        print(f"  parity  cos min={cosines.min():.6f} mean={cosines.mean():.6f} "
+              f"({n} clips, not checked)")
+        return 0
+    below = int((cosines < min_cos).sum())
+    print(f"  parity  cos min={cosines.min():.6f} mean={cosines.mean():.6f} "
+          f"({n} clips, {below} below {min_cos:g})  {'FAIL' if below else 'OK'}")
+    return 1 if below else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
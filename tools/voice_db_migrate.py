@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Voice DB migration: per-file <id>.npy layout -> voices.f32 + voices.ids
+
+_SpeakerRecognition migrates automatically the first time it opens a DB
+directory without voices.f32. This does the same offline, without loading
+the model, then checks every row against its .npy and times a cold open of
+both layouts. The .npy files are left in place; delete them by hand once
+the new store has been checked.
+
+Usage:
+    python tools/voice_db_migrate.py [--model eres2netv2 | --db-dir DIR --dim 192]
+"""
+
+import argparse
+import glob
+import sys
+import time
+from pathlib import Path
+
+import _bootstrap  # noqa: F401  (registers core_api without its __init__)
+
+import numpy as np
+
+from core_api.speaker_recognition.speaker_recognition import MODEL_REGISTRY
+from core_api.speaker_recognition.voice_store import VoiceStore
+
+
+def load_npy_dir(db_dir):
+    """The old _load_database: glob + np.load + vstack."""
+    ids, embs = [], []
+    for path in glob.glob(str(Path(db_dir) / "*.npy")):
+        ids.append(Path(path).stem)
+        embs.append(np.load(path).flatten())
+    return ids, (np.vstack(embs) if embs else np.array([]))
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description="Migrate a per-file voice DB to voices.f32")
+    p.add_argument("--model", default="eres2netv2", choices=sorted(MODEL_REGISTRY))
+    p.add_argument("--db-dir", default=None, help="default: the model's db_dir")
+    p.add_argument("--dim", type=int, default=None, help="default: the model's emb_dim")
+    args = p.parse_args()
+
+    config = MODEL_REGISTRY[args.model]
+    db_dir = Path(args.db_dir or config["db_dir"])
+    dim = args.dim or config["emb_dim"]
+    if not db_dir.is_dir():
+        print(f"{db_dir}: no such directory")
+        return 1
+
+    existed = (db_dir / VoiceStore.MATRIX_FILE).exists()
+    t = time.perf_counter()
+    store = VoiceStore(db_dir, dim)
+    open_s = time.perf_counter() - t
+    if existed:
+        print(f"{db_dir}: already migrated ({len(store)} voices)")
+    else:
+        print(f"{db_dir}: migrated {store.migrated} .npy files in {open_s * 1e3:.1f} ms")
+
+    t = time.perf_counter()
+    ids, embs = load_npy_dir(db_dir)
+    npy_s = time.perf_counter() - t
+    missing = [vid for vid in ids if vid not in store]
+    mismatched = [vid for vid, emb in zip(ids, embs)
+                  if vid in store and not np.array_equal(store.get(vid), emb.astype(np.float32))]
+    store.close()
+
+    t = time.perf_counter()
+    reopened = VoiceStore(db_dir, dim)
+    _ = np.asarray(reopened.matrix).sum()        # touch every row
+    store_s = time.perf_counter() - t
+    n = len(reopened)
+    reopened.close()
+
+    print(f"  rows      {n}  (.npy files: {len(ids)}, store-only: {n - len(ids) + len(missing)})")
+    print(f"  cold open .npy {npy_s * 1e3:8.1f} ms   store {store_s * 1e3:8.1f} ms")
+    print(f"  check     missing={len(missing)} mismatched={len(mismatched)}")
+    for vid in (missing + mismatched)[:10]:
+        print(f"    {vid}")
+    return 1 if missing or mismatched else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())